@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: replays synthetic Discord traffic through the real bot and its cogs
+Raw gateway payloads are fed to the bot's connection state and every REST call goes to a fake HTTP
+client, so nothing talks to Discord. Each storage backend runs in a fresh interpreter.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import itertools
+import subprocess
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+DEFAULT_MIX = "message=60,reaction=15,slash=20,join=5"
+# Everyday slash commands without required options
+DEFAULT_COMMANDS = "balance,profile,leaderboard,cookies,daily,work,ping,portfolio"
+GUILD_ID = 900000000000000000
+BOT_ID = 900000000000000001
+APPLICATION_ID = 900000000000000002
+CHANNEL_NAMES = ("general", "welcome", "logs", "mod-logs", "starboard", "suggestions")
+
+
+class Snowflakes:
+    """Increasing fake Discord ids"""
+
+    def __init__(self, start: int = 910000000000000000):
+        self.counter = itertools.count(start)
+
+    def __call__(self) -> str:
+        return str(next(self.counter))
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeGateway:
+    """Builds raw gateway payloads and hands them to the bot's parsers, as the websocket would"""
+
+    def __init__(self, bot, users: int, seed: int):
+        self.bot = bot
+        self.state = bot._connection
+        self.ids = Snowflakes()
+        self.rng = random.Random(seed)
+        self.users = [self._user(920000000000000000 + i, f"member{i}") for i in range(users)]
+        self.channels = {name: int(self.ids()) for name in CHANNEL_NAMES}
+        self.recent_messages = deque(maxlen=200)
+        self.command_ids = {}
+
+    @staticmethod
+    def _user(user_id: int, name: str, bot: bool = False) -> dict:
+        return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None,
+                "avatar": None, "bot": bot}
+
+    @staticmethod
+    def _member(user: dict, roles=()) -> dict:
+        return {"user": user, "roles": list(roles), "joined_at": now_iso(), "deaf": False, "mute": False,
+                "flags": 0, "nick": None}
+
+    def connect(self):
+        """Stand-in for READY + GUILD_CREATE: one guild with channels, roles and members cached"""
+        from discord import ClientUser
+
+        bot_user = self._user(BOT_ID, "coalbot", bot=True)
+        self.state.user = ClientUser(state=self.state, data=bot_user)
+        self.state.application_id = APPLICATION_ID
+        admin_role = self.ids()
+        role = lambda role_id, name, permissions, position: {
+            "id": str(role_id), "name": name, "permissions": str(permissions), "position": position, "color": 0,
+            "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+        self.state._add_guild_from_data({
+            "id": str(GUILD_ID), "name": "Load Test", "owner_id": self.users[0]["id"], "icon": None,
+            "roles": [role(GUILD_ID, "@everyone", 104324673, 0), role(admin_role, "Bot", 8, 1)],
+            "channels": [{"id": str(channel_id), "type": 0, "name": name, "position": i, "permission_overwrites": [],
+                          "nsfw": False, "parent_id": None, "topic": None}
+                         for i, (name, channel_id) in enumerate(self.channels.items())],
+            "members": [self._member(bot_user, [admin_role])] + [self._member(user) for user in self.users],
+            "member_count": len(self.users) + 1, "emojis": [], "stickers": [], "features": [], "presences": [],
+            "voice_states": [], "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+            "large": False, "premium_tier": 0, "preferred_locale": "en-US", "verification_level": 0,
+            "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0, "nsfw_level": 0,
+            "system_channel_id": str(self.channels["welcome"]), "system_channel_flags": 0, "afk_timeout": 300,
+        })
+        for command in self.bot.tree.get_commands():
+            self.command_ids[command.name] = self.ids()
+        self.bot._ready.set()
+
+    def dispatch(self, event: str, payload: dict):
+        self.state.parsers[event](payload)
+
+    def message(self):
+        user = self.rng.choice(self.users)
+        message_id = self.ids()
+        words = self.rng.randint(1, 20)
+        self.dispatch("MESSAGE_CREATE", {
+            "id": message_id, "channel_id": str(self.channels["general"]), "guild_id": str(GUILD_ID),
+            "author": user, "member": {k: v for k, v in self._member(user).items() if k != "user"},
+            "content": " ".join(self.rng.choice(("hello", "coal", "mining", "gg", "lol", "anyone", "up", "for"))
+                                for _ in range(words)),
+            "timestamp": now_iso(), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False,
+            "type": 0, "flags": 0,
+        })
+        self.recent_messages.append(message_id)
+
+    def reaction(self):
+        if not self.recent_messages:
+            return self.message()
+        user = self.rng.choice(self.users)
+        self.dispatch("MESSAGE_REACTION_ADD", {
+            "user_id": user["id"], "channel_id": str(self.channels["general"]), "guild_id": str(GUILD_ID),
+            "message_id": self.rng.choice(self.recent_messages), "member": self._member(user),
+            "emoji": {"id": None, "name": self.rng.choice(("⭐", "👍", "😂"))}, "burst": False, "type": 0,
+        })
+
+    def slash(self, name: str):
+        user = self.rng.choice(self.users)
+        self.dispatch("INTERACTION_CREATE", {
+            "id": self.ids(), "application_id": str(APPLICATION_ID), "type": 2, "token": "load-test", "version": 1,
+            "guild_id": str(GUILD_ID), "channel_id": str(self.channels["general"]),
+            "member": {**self._member(user), "permissions": "2147483647"},
+            "data": {"id": self.command_ids.get(name, "0"), "name": name, "type": 1, "options": []},
+            "locale": "en-US", "guild_locale": "en-US", "app_permissions": "2147483647", "entitlements": [],
+            "authorizing_integration_owners": {"0": str(GUILD_ID)}, "context": 0, "attachment_size_limit": 8388608,
+        })
+
+    def join(self):
+        user_id = int(self.ids())
+        self.dispatch("GUILD_MEMBER_ADD", {"guild_id": str(GUILD_ID),
+                                           **self._member(self._user(user_id, f"joiner{user_id % 100000}"))})
+
+
+class FakeHTTP:
+    """Answers REST and interaction-webhook calls with plausible payloads after a fixed latency"""
+
+    def __init__(self, gateway: FakeGateway, latency: float):
+        self.gateway = gateway
+        self.latency = latency
+        self.calls = Counter()
+
+    def _message(self, channel_id, payload) -> dict:
+        payload = payload or {}
+        return {"id": self.gateway.ids(), "channel_id": str(channel_id or self.gateway.channels["general"]),
+                "guild_id": str(GUILD_ID), "author": self.gateway._user(BOT_ID, "coalbot", bot=True),
+                "content": payload.get("content") or "", "embeds": payload.get("embeds") or [],
+                "components": payload.get("components") or [], "timestamp": now_iso(), "edited_timestamp": None,
+                "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+                "pinned": False, "type": 0, "flags": payload.get("flags", 0)}
+
+    def respond(self, method: str, path: str, payload, channel_id=None):
+        self.calls[f"{method} {path}"] += 1
+        if path.endswith("/callback"):
+            data = (payload or {}).get("data") or {}
+            return {"interaction": {"id": self.gateway.ids(), "type": 2, "response_message_id": self.gateway.ids(),
+                                    "response_message_loading": payload.get("type") == 5,
+                                    "response_message_ephemeral": bool(data.get("flags", 0) & 64)},
+                    "resource": {"type": payload.get("type", 4), "message": self._message(channel_id, data)}}
+        if "/messages" in path and method in ("POST", "PATCH") or path.startswith("/webhooks/"):
+            return self._message(channel_id, payload)
+        if "/members/" in path and method == "GET":
+            return self.gateway._member(self.gateway.rng.choice(self.gateway.users))
+        if "/messages" in path and method == "GET":
+            return []
+        return None
+
+    async def request(self, route, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self.respond(route.method, route.path, kwargs.get("json"), getattr(route, "channel_id", None))
+
+    def install(self, bot):
+        from discord.webhook import async_ as webhook_async
+
+        http = self
+
+        async def webhook_request(adapter, route, session=None, *, payload=None, **kwargs):
+            await asyncio.sleep(http.latency)
+            path = route.url.split("/api/v10", 1)[-1]
+            return http.respond(route.method, path, payload)
+
+        bot.http.request = self.request
+        webhook_async.AsyncWebhookAdapter.request = webhook_request
+
+
+class LoadProbe:
+    """Per-cog handler latency (from dispatch to completion), errors and event-loop lag"""
+
+    def __init__(self, bot):
+        from core.histogram import LatencyTracker
+
+        self.bot = bot
+        self.latency = LatencyTracker()
+        self.errors = Counter()
+        self.first_errors = {}
+        self.in_flight = 0
+        self.handled = 0
+        self.running = True
+
+    @staticmethod
+    def _owner(handler) -> str:
+        owner = getattr(handler, "__self__", None)
+        return type(owner).__name__ if owner is not None else getattr(handler, "__qualname__", "unknown")
+
+    async def _timed(self, started: float, run, cog_of):
+        try:
+            await run()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            cog = cog_of()
+            self.errors[cog] += 1
+            self.first_errors.setdefault(cog, f"{type(e).__name__}: {e}"[:160])
+        finally:
+            self.latency.record("cog", cog_of(), time.perf_counter() - started)
+            self.in_flight -= 1
+            self.handled += 1
+
+    def install(self):
+        """Time listeners (Client._schedule_event) and slash commands (CommandTree._from_interaction)"""
+        from discord.app_commands import AppCommandError
+
+        bot, probe = self.bot, self
+        call = bot.tree._call
+
+        def schedule_event(coro, event_name, *args, **kwargs):
+            probe.in_flight += 1
+            owner = probe._owner(coro)
+            return bot.loop.create_task(probe._timed(time.perf_counter(), lambda: coro(*args, **kwargs), lambda: owner),
+                                        name=f"discord.py: {event_name}")
+
+        def from_interaction(interaction):
+            probe.in_flight += 1
+
+            async def invoke():
+                # Same as CommandTree._from_interaction: command errors go to the tree's error handler
+                try:
+                    await call(interaction)
+                except AppCommandError as e:
+                    await bot.tree._dispatch_error(interaction, e)
+
+            def cog_of():
+                # Only known once the tree has resolved the command
+                command = interaction.command
+                return type(command.binding).__name__ if command and command.binding else "CommandTree"
+
+            bot.loop.create_task(probe._timed(time.perf_counter(), invoke, cog_of),
+                                 name="CommandTree-invoker")
+
+        bot._schedule_event = schedule_event
+        bot.tree._from_interaction = from_interaction
+
+    async def watch_loop(self, interval: float = 0.01):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.latency.record("loop", "lag", max(loop.time() - start - interval, 0.0))
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("message", "reaction", "slash", "join"):
+            raise ValueError(f"Unknown event kind in mix: {kind}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+async def drive(gateway: FakeGateway, mix: dict, commands: list, rate: float, duration: float) -> Counter:
+    """Open-loop traffic at `rate` events/s for `duration` seconds; returns events sent per kind"""
+    kinds, weights = list(mix), list(mix.values())
+    sent = Counter()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    total = 0
+    while (elapsed := loop.time() - start) < duration:
+        # Catch up to the schedule even if the loop fell behind, so a slow bot builds a backlog
+        due = int(elapsed * rate) - total
+        for _ in range(max(due, 0)):
+            kind = gateway.rng.choices(kinds, weights)[0]
+            if kind == "slash":
+                gateway.slash(gateway.rng.choice(commands))
+            else:
+                getattr(gateway, kind)()
+            sent[kind] += 1
+            total += 1
+        await asyncio.sleep(0.005)
+    return sent
+
+
+def child(args):
+    """Run one backend inside this process and print the result as JSON"""
+    import logging
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+    from database import db
+    logging.disable(logging.CRITICAL)
+
+    async def run():
+        bot = main.bot
+        async with bot:
+            gateway = FakeGateway(bot, args.users, args.seed)
+            http = FakeHTTP(gateway, args.http_latency / 1000)
+            http.install(bot)
+            # The parts of setup_hook that don't need a gateway session
+            bot.instrumentation.install()
+            if db.connected_to_mongodb:
+                main.initialize_database(db)
+            await bot.load_all_cogs()
+            gateway.connect()
+
+            commands = [name for name in args.commands.split(",") if name in gateway.command_ids]
+            probe = LoadProbe(bot)
+            probe.install()
+            watcher = asyncio.create_task(probe.watch_loop())
+            start = time.perf_counter()
+            sent = await drive(gateway, parse_mix(args.mix), commands or ["ping"], args.rate, args.duration)
+            dispatched = time.perf_counter() - start
+            handled_in_window = probe.handled
+            deadline = time.perf_counter() + args.drain
+            while probe.in_flight > 0 and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            wall = time.perf_counter() - start
+            probe.running = False
+            await watcher
+            db.flush_writes()
+
+            cogs = probe.latency.summary("cog")
+            for cog, summary in cogs.items():
+                summary["errors"] = probe.errors.get(cog, 0)
+                summary["first_error"] = probe.first_errors.get(cog)
+            return {
+                "backend": db.storage.name if db.storage is not None else "mongodb",
+                "sent": dict(sent), "commands": commands, "dispatch_s": dispatched, "wall_s": wall,
+                "sent_per_s": sum(sent.values()) / dispatched, "handled": probe.handled,
+                "handled_per_s": handled_in_window / dispatched, "unfinished": probe.in_flight,
+                "loop_lag": probe.latency.get("loop", "lag").summary(), "cogs": cogs,
+                "http_calls": sum(http.calls.values()), "cogs_loaded": bot.cogs_loaded,
+            }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def run_backend(backend: str, args, directory: str) -> dict:
+    env = dict(os.environ, DISCORD_TOKEN=os.getenv("DISCORD_TOKEN", "benchmark"), PERF_LOG_PATH="",
+               STORAGE_BACKEND=backend, SQLITE_PATH=os.path.join(directory, "load.db"),
+               MONGODB_WRITE_BUFFER_PATH=os.path.join(directory, "pending.jsonl"))
+    if backend != "mongodb":
+        # cogs.economy's config insists on a URI even when storage is local
+        env.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    child_args = [sys.executable, os.path.abspath(__file__), "--child", "--rate", str(args.rate),
+                  "--duration", str(args.duration), "--drain", str(args.drain), "--users", str(args.users),
+                  "--mix", args.mix, "--commands", args.commands, "--http-latency", str(args.http_latency),
+                  "--seed", str(args.seed)]
+    output = subprocess.run(child_args, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(result: dict, top: int):
+    lag = result["loop_lag"]
+    print(f"\n📦 {result['backend']}: sent {sum(result['sent'].values())} events ({result['sent_per_s']:.0f}/s) "
+          f"{dict(result['sent'])}, {result['http_calls']} fake HTTP calls")
+    print(f"   {result['handled_per_s']:.0f} handler runs/s during traffic, {result['handled']} in total "
+          f"after {result['wall_s']:.2f}s"
+          + (f", {result['unfinished']} still running" if result["unfinished"] else ""))
+    print(f"   event loop lag p50={lag['p50_ms']:.1f}ms p99={lag['p99_ms']:.1f}ms max={lag['max_ms']:.1f}ms")
+    print(f"   {'cog':<24}{'runs':>7}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for cog, summary in list(result["cogs"].items())[:top]:
+        print(f"   {cog:<24}{summary['count']:>7}{summary['errors']:>8}{summary['p50_ms']:>9.1f}"
+              f"{summary['p99_ms']:>9.1f}{summary['max_ms']:>9.1f}")
+    for cog, summary in result["cogs"].items():
+        if summary["first_error"]:
+            print(f"   ⚠️ {cog}: {summary['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Discord traffic load benchmark")
+    parser.add_argument("--backends", default="memory,sqlite",
+                        help="Comma-separated storage backends (memory, sqlite, mongodb - needs MONGODB_URI)")
+    parser.add_argument("--rate", type=float, default=200.0, help="Target gateway events per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of traffic per backend")
+    parser.add_argument("--drain", type=float, default=30.0, help="Max seconds to wait for handlers afterwards")
+    parser.add_argument("--users", type=int, default=500, help="Members in the synthetic guild")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Event weights, e.g. message=60,reaction=15,slash=20,join=5")
+    parser.add_argument("--commands", default=DEFAULT_COMMANDS, help="Slash commands to invoke (no required options)")
+    parser.add_argument("--http-latency", type=float, default=30.0, help="Fake Discord REST latency in ms")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the traffic")
+    parser.add_argument("--top", type=int, default=12, help="Cogs shown per backend (slowest p99 first)")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print("🧪 Load benchmark")
+    print(f"   {args.rate:.0f} events/s for {args.duration:.0f}s, mix {args.mix}, "
+          f"{args.users} members, HTTP latency {args.http_latency:.0f}ms")
+    print("=" * 80)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends.split(","):
+            if backend == "mongodb" and not os.getenv("MONGODB_URI"):
+                print("\n⏭️  mongodb: skipped (set MONGODB_URI to a local mongod)")
+                continue
+            results.append(run_backend(backend, args, directory))
+            if not args.json:
+                report(results[-1], args.top)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Simulated raid benchmark for the modlog dispatcher
+Compares one-send-per-event logging against the coalescing queue using a fake HTTP client
+"""
+
+import sys
+import os
+import asyncio
+import time
+import argparse
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from core.modlog import ModlogDispatcher
+
+
+class FakeRateLimited(Exception):
+    """Mimics discord.HTTPException for a 429 response"""
+
+    def __init__(self, retry_after: float, headers: dict):
+        super().__init__("429 Too Many Requests")
+        self.status = 429
+        self.retry_after = retry_after
+        self.response = type("FakeResponse", (), {"headers": headers})()
+
+
+class FakeHTTPClient:
+    """Fake Discord HTTP client enforcing a per-channel message bucket"""
+
+    def __init__(self, limit: int, window: float, latency: float):
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.buckets = {}
+        self.messages_sent = 0
+        self.rate_limited = 0
+
+    async def send_message(self, channel_id: int, payload: dict):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        remaining, reset_at = self.buckets.get(channel_id, (self.limit, 0.0))
+        if now >= reset_at:
+            remaining, reset_at = self.limit, now + self.window
+        if remaining <= 0:
+            self.rate_limited += 1
+            retry_after = reset_at - now
+            raise FakeRateLimited(retry_after, {
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": f"{retry_after:.3f}"
+            })
+        self.buckets[channel_id] = (remaining - 1, reset_at)
+        self.messages_sent += 1
+        return payload
+
+
+class FakeChannel:
+    """Text channel whose send() goes through the fake HTTP client"""
+
+    def __init__(self, channel_id: int, http: FakeHTTPClient):
+        self.id = channel_id
+        self.http = http
+        self.received = []
+
+    async def send(self, content=None, embed=None, embeds=None):
+        payload = {"content": content, "embeds": embeds or ([embed] if embed else [])}
+        await self.http.send_message(self.id, payload)
+        self.received.append(time.monotonic())
+
+
+def make_raid_embed(i: int) -> discord.Embed:
+    embed = discord.Embed(title="📥 Member Joined", description=f"**User:** raider{i}#0001\n**Account Age:** 0 days", color=0x00ff00)
+    embed.set_footer(text="Simple Mod Log")
+    return embed
+
+
+async def run_direct(events: int, rate: float, http: FakeHTTPClient):
+    """Old behaviour: every event awaits its own channel.send, retrying on 429 like discord.py"""
+    channel = FakeChannel(1, http)
+    delays = []
+
+    async def log_event(i):
+        start = time.monotonic()
+        while True:
+            try:
+                await channel.send(embed=make_raid_embed(i))
+                break
+            except FakeRateLimited as e:
+                await asyncio.sleep(e.retry_after)
+        delays.append(time.monotonic() - start)
+
+    tasks = []
+    for i in range(events):
+        tasks.append(asyncio.create_task(log_event(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return delays
+
+
+async def run_dispatcher(events: int, rate: float, http: FakeHTTPClient, policy: str, max_queue: int, window: float):
+    """New behaviour: events go through the coalescing modlog dispatcher"""
+    channel = FakeChannel(1, http)
+    dispatcher = ModlogDispatcher(max_queue=max_queue, overflow_policy=policy, linger=window / 50,
+                                  bucket_limit=http.limit, bucket_window=window)
+    for i in range(events):
+        await dispatcher.enqueue(channel, embed=make_raid_embed(i), event_type="member_join")
+        await asyncio.sleep(1 / rate)
+    await dispatcher.close(timeout=60)
+    return dispatcher.get_stats()
+
+
+def report(name: str, http: FakeHTTPClient, elapsed: float, avg_delay_ms: float, max_delay_ms: float = None, extra: str = ""):
+    line = f"{name:<18} messages={http.messages_sent:<5} 429s={http.rate_limited:<5} wall={elapsed:6.2f}s avg_delay={avg_delay_ms:8.1f}ms"
+    if max_delay_ms is not None:
+        line += f" max_delay={max_delay_ms:8.1f}ms"
+    print(line + extra)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Modlog raid benchmark")
+    parser.add_argument("--events", type=int, default=500, help="Number of raid join events")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Events per second")
+    parser.add_argument("--window", type=float, default=0.1, help="Bucket window in seconds (Discord uses 5s)")
+    parser.add_argument("--latency", type=float, default=0.005, help="Fake HTTP latency in seconds")
+    parser.add_argument("--max-queue", type=int, default=50, help="Dispatcher queue bound")
+    args = parser.parse_args()
+
+    print("🧪 Modlog raid benchmark")
+    print(f"   {args.events} events at {args.rate:.0f}/s, bucket 5 per {args.window}s, latency {args.latency * 1000:.0f}ms")
+    print("=" * 80)
+
+    http = FakeHTTPClient(5, args.window, args.latency)
+    start = time.monotonic()
+    delays = await run_direct(args.events, args.rate, http)
+    report("direct send", http, time.monotonic() - start,
+           sum(delays) / len(delays) * 1000, max(delays) * 1000)
+
+    for policy in ("merge", "drop"):
+        http = FakeHTTPClient(5, args.window, args.latency)
+        start = time.monotonic()
+        stats = await run_dispatcher(args.events, args.rate, http, policy, args.max_queue, args.window)
+        report(f"dispatcher/{policy}", http, time.monotonic() - start, stats["avg_delay_ms"],
+               extra=f" delivered={stats['delivered']} merged={stats['merged']} dropped={stats['dropped']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
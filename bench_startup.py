@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the bot's startup pipeline
+Each run is a fresh interpreter: import main, load every cog and connect Gemini, without logging in to Discord
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Modules the old startup path imported eagerly at module level
+EAGER_IMPORTS = ["google.generativeai", "PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "matplotlib.pyplot"]
+
+
+def child(eager: bool):
+    """Measure one startup inside this process and print the result as JSON"""
+    start = time.perf_counter()
+    if eager:
+        import importlib
+        for module in EAGER_IMPORTS:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import asyncio
+    import main
+    imported = time.perf_counter()
+
+    async def load():
+        async with main.bot:
+            ai_ready = asyncio.create_task(main.ai.initialize_async())
+            await main.bot.load_all_cogs()
+            await ai_ready
+
+    asyncio.run(load())
+    finished = time.perf_counter()
+    print(json.dumps({
+        "import_s": imported - start,
+        "cogs_s": finished - imported,
+        "total_s": finished - start,
+        "cogs_loaded": main.bot.cogs_loaded,
+        "cog_load_ms": main.bot.cog_load_times
+    }))
+
+
+def run(mode: str, eager: bool, parallel: bool) -> dict:
+    env = dict(os.environ, DISCORD_TOKEN=os.getenv("DISCORD_TOKEN", "benchmark"),
+               PARALLEL_COG_LOADING=str(parallel), PERF_LOG_PATH="")
+    args = [sys.executable, os.path.abspath(__file__), "--child"] + (["--eager"] if eager else [])
+    output = subprocess.run(args, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per configuration")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.eager)
+        return
+
+    print("🧪 Startup benchmark")
+    print(f"   {args.runs} cold starts per configuration (median shown)")
+    print("=" * 80)
+
+    configurations = [
+        ("eager imports, sequential", True, False),
+        ("lazy imports, sequential", False, False),
+        ("lazy imports, parallel", False, True),
+    ]
+    last = None
+    for name, eager, parallel in configurations:
+        results = [run(name, eager, parallel) for _ in range(args.runs)]
+        median = {key: statistics.median(r[key] for r in results) for key in ("import_s", "cogs_s", "total_s")}
+        print(f"{name:<28} import={median['import_s']:5.2f}s cogs={median['cogs_s']:5.2f}s "
+              f"total={median['total_s']:5.2f}s loaded={results[0]['cogs_loaded']}")
+        last = results[-1]
+
+    print("\nSlowest cogs (last run):")
+    for cog, ms in sorted(last["cog_load_ms"].items(), key=lambda item: item[1], reverse=True)[:5]:
+        print(f"   {cog:<28} {ms:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
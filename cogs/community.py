@@ -5,10 +5,8 @@ import random
 import os
 import re
 from datetime import datetime, timedelta
-import google.generativeai as genai
 import database as db
 from discord.ui import Button, View
-from PIL import Image, ImageDraw, ImageFont
 import asyncio
 import math
 from permissions import has_special_permissions
@@ -411,15 +409,6 @@ def has_announce_permission(user_roles):
 class Community(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.genai_api_key = os.getenv("GEMINI_API_KEY")
-        self.model = None
-        if self.genai_api_key:
-            try:
-                genai.configure(api_key=self.genai_api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-            except Exception as e:
-                print(f"[Community] Failed to initialize Gemini AI: {e}")
-                self.model = None
 
     async def cog_load(self):
         print("[Community] Loaded successfully.")
@@ -427,6 +416,9 @@ class Community(commands.Cog):
     def create_pie_wheel_image(self, options, title="Spin the Wheel!", winner=None):
         """Create a modern, professional wheel with premium fonts and sleek design"""
         try:
+            # Pillow is only needed for the wheel, so import it on first use
+            from PIL import Image, ImageDraw, ImageFont
+            
             # Create ultra high-quality image
             size = 1200  # Ultra high resolution for crisp quality
             img = Image.new('RGBA', (size, size), (30, 30, 30, 255))  # Dark background
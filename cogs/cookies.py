@@ -179,9 +179,9 @@ class Cookies(commands.Cog):
             user_data = db.get_user_data(target.id)
             cookies = user_data.get('cookies', 0)
             
-            # Get user's rank
-            leaderboard = db.get_leaderboard('cookies')
-            rank = next((i + 1 for i, u in enumerate(leaderboard) if u['user_id'] == target.id), None)
+            # Get user's exact rank
+            cookie_rank = db.get_ranks({'cookies': cookies})['cookies']
+            rank = cookie_rank['rank']
             
             embed = discord.Embed(
                 title="🍪 Cookie Balance",
@@ -201,7 +201,7 @@ class Cookies(commands.Cog):
             if rank:
                 embed.add_field(
                     name="📊 Server Rank",
-                    value=f"**#{rank}** of {len(leaderboard)}",
+                    value=f"**#{rank}** of {cookie_rank['total']:,}",
                     inline=True
                 )
             else:
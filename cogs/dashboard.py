@@ -7,18 +7,20 @@ import asyncio
 import random
 from typing import Dict, List
 from datetime import datetime, timedelta
+import importlib.util
+import io
 
-# Matplotlib imports with fallback
-try:
+# Matplotlib is imported on first chart render to keep it off the startup path
+MATPLOTLIB_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
+if not MATPLOTLIB_AVAILABLE:
+    print("⚠️ Matplotlib not available - charts will be disabled")
+
+def _pyplot():
+    """Import pyplot with the non-interactive backend"""
     import matplotlib
     matplotlib.use('Agg')  # Use non-interactive backend
     import matplotlib.pyplot as plt
-    import matplotlib.dates as mdates
-    import io
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
-    print("⚠️ Matplotlib not available - charts will be disabled")
+    return plt
 
 # Local import
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -34,6 +36,7 @@ class Dashboard(commands.Cog):
             return None
             
         try:
+            plt = _pyplot()
             plt.style.use('dark_background')
             fig, ax = plt.subplots(figsize=(12, 6))
             
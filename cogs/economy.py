@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 import random
 import os, sys
 import time
+import asyncio
 from discord.ui import Button, View, Modal, TextInput
 
 # Local import
@@ -472,12 +473,12 @@ class Economy(commands.Cog):
         target = user or interaction.user
         
         try:
-            user_data = db.get_user_data(target.id)
+            user_data = db.get_user_view(target.id, "balance")
             coins = user_data.get('coins', 0)
             
-            # Get user's rank in coin leaderboard
-            leaderboard = db.get_leaderboard('coins')
-            rank = next((i + 1 for i, u in enumerate(leaderboard) if u['user_id'] == target.id), 'N/A')
+            # Get user's exact rank in coin leaderboard
+            coin_rank = db.get_ranks({'coins': coins})['coins']
+            rank = coin_rank['rank'] or 'N/A'
             
             embed = discord.Embed(
                 title="💰 Coin Wallet",
@@ -497,7 +498,7 @@ class Economy(commands.Cog):
             if rank != 'N/A':
                 embed.add_field(
                     name="📊 Server Rank",
-                    value=f"**#{rank}** of {len(leaderboard)}",
+                    value=f"**#{rank}** of {coin_rank['total']:,}",
                     inline=True
                 )
             else:
@@ -1018,7 +1019,7 @@ class Economy(commands.Cog):
             
             # Banking Status
             balance = user_data.get('coins', 0)
-            bank_balance = user_data.get('bank_balance', 0)
+            bank_balance = user_data.get('bank', 0)
             savings_balance = user_data.get('savings_balance', 0)
             has_atm = user_data.get('atm_card', False)
             
@@ -2256,7 +2257,7 @@ class Economy(commands.Cog):
         
         # Get user's financial data
         wallet = user_data.get('coins', 0)
-        bank_balance = user_data.get('bank_balance', 0)
+        bank_balance = user_data.get('bank', 0)
         savings_balance = user_data.get('savings_balance', 0)
         loan_amount = user_data.get('loan_amount', 0)
         is_premium = user_data.get('premium_account', False)
@@ -2334,21 +2335,17 @@ class Economy(commands.Cog):
                                 await modal_interaction.response.send_message("❌ Amount must be positive!", ephemeral=True)
                                 return
                             
-                            current_data = db.get_user_data(user_id)
-                            current_wallet = current_data.get('coins', 0)
+                            # One guarded $inc on coins and bank, so the wallet check and both balances move together
+                            result = await asyncio.to_thread(db.move_coins, user_id, amount, 'coins', 'bank')
+                            current_data = await asyncio.to_thread(db.get_user_data, user_id)
                             
-                            if current_wallet < amount:
-                                await modal_interaction.response.send_message(
-                                    f"❌ Insufficient funds! You have {current_wallet:,} coins in wallet.",
-                                    ephemeral=True
-                                )
+                            if not result['success']:
+                                current_wallet = current_data.get('coins', 0)
+                                message = (f"❌ Insufficient funds! You have {current_wallet:,} coins in wallet."
+                                           if result['message'] == "Insufficient funds" else f"❌ {result['message']}")
+                                await modal_interaction.response.send_message(message, ephemeral=True)
                                 return
                             
-                            # Process deposit
-                            db.add_coins(user_id, -amount)  # Remove from wallet
-                            current_data['bank_balance'] = current_data.get('bank_balance', 0) + amount
-                            db.update_user_data(user_id, current_data)
-                            
                             success_embed = discord.Embed(
                                 title="✅ **Deposit Successful**",
                                 description=f"Successfully deposited {amount:,} coins to your bank account!",
@@ -2356,7 +2353,7 @@ class Economy(commands.Cog):
                             )
                             success_embed.add_field(
                                 name="💰 **Updated Balance**",
-                                value=f"Bank: {current_data['bank_balance']:,} coins",
+                                value=f"Bank: {current_data.get('bank', 0):,} coins",
                                 inline=True
                             )
                             await modal_interaction.response.send_message(embed=success_embed, ephemeral=True)
@@ -2388,21 +2385,16 @@ class Economy(commands.Cog):
                                 await modal_interaction.response.send_message("❌ Amount must be positive!", ephemeral=True)
                                 return
                             
-                            current_data = db.get_user_data(user_id)
-                            current_bank = current_data.get('bank_balance', 0)
+                            result = await asyncio.to_thread(db.move_coins, user_id, amount, 'bank', 'coins')
+                            current_data = await asyncio.to_thread(db.get_user_data, user_id)
                             
-                            if current_bank < amount:
-                                await modal_interaction.response.send_message(
-                                    f"❌ Insufficient bank funds! You have {current_bank:,} coins in bank.",
-                                    ephemeral=True
-                                )
+                            if not result['success']:
+                                current_bank = current_data.get('bank', 0)
+                                message = (f"❌ Insufficient bank funds! You have {current_bank:,} coins in bank."
+                                           if result['message'] == "Insufficient funds" else f"❌ {result['message']}")
+                                await modal_interaction.response.send_message(message, ephemeral=True)
                                 return
                             
-                            # Process withdrawal
-                            db.add_coins(user_id, amount)  # Add to wallet
-                            current_data['bank_balance'] = current_data.get('bank_balance', 0) - amount
-                            db.update_user_data(user_id, current_data)
-                            
                             success_embed = discord.Embed(
                                 title="✅ **Withdrawal Successful**",
                                 description=f"Successfully withdrew {amount:,} coins from your bank account!",
@@ -2410,7 +2402,7 @@ class Economy(commands.Cog):
                             )
                             success_embed.add_field(
                                 name="💰 **Updated Balance**",
-                                value=f"Bank: {current_data['bank_balance']:,} coins",
+                                value=f"Bank: {current_data.get('bank', 0):,} coins",
                                 inline=True
                             )
                             await modal_interaction.response.send_message(embed=success_embed, ephemeral=True)
@@ -2475,14 +2467,16 @@ class Economy(commands.Cog):
                                 await modal_interaction.response.send_message("❌ You can't transfer to yourself!", ephemeral=True)
                                 return
                             
-                            # Check sender's balance
-                            current_data = db.get_user_data(user_id)
-                            current_bank = current_data.get('bank_balance', 0)
-                            
                             transfer_fee = max(1, amount // 100)  # 1% fee, minimum 1 coin
                             total_cost = amount + transfer_fee
                             
-                            if current_bank < total_cost:
+                            # Debit and credit happen together or not at all
+                            result = db.transfer(user_id, target_user.id, amount, fee=transfer_fee, field='bank')
+                            if not result["success"]:
+                                if result["message"] != "Insufficient funds":
+                                    await modal_interaction.response.send_message(f"❌ {result['message']}", ephemeral=True)
+                                    return
+                                current_bank = db.get_user_data(user_id).get('bank', 0)
                                 await modal_interaction.response.send_message(
                                     f"❌ Insufficient bank funds! You need {total_cost:,} coins (including {transfer_fee:,} transfer fee).\n"
                                     f"You have {current_bank:,} coins in bank.",
@@ -2490,15 +2484,6 @@ class Economy(commands.Cog):
                                 )
                                 return
                             
-                            # Process transfer
-                            current_data['bank_balance'] -= total_cost
-                            db.update_user_data(user_id, current_data)
-                            
-                            # Add to recipient's bank
-                            recipient_data = db.get_user_data(target_user.id)
-                            recipient_data['bank_balance'] = recipient_data.get('bank_balance', 0) + amount
-                            db.update_user_data(target_user.id, recipient_data)
-                            
                             success_embed = discord.Embed(
                                 title="✅ **Transfer Successful**",
                                 description=f"Successfully transferred {amount:,} coins to {target_user.display_name}!",
@@ -2511,7 +2496,7 @@ class Economy(commands.Cog):
                             )
                             success_embed.add_field(
                                 name="🏦 **Your Bank Balance**",
-                                value=f"{current_data['bank_balance']:,} coins",
+                                value=f"{result['balance']:,} coins",
                                 inline=True
                             )
                             await modal_interaction.response.send_message(embed=success_embed, ephemeral=True)
@@ -2531,7 +2516,7 @@ class Economy(commands.Cog):
                 
                 current_data = db.get_user_data(user_id)
                 savings = current_data.get('savings_balance', 0)
-                bank = current_data.get('bank_balance', 0)
+                bank = current_data.get('bank', 0)
                 
                 savings_embed = discord.Embed(
                     title="💎 **Savings Account**",
@@ -2583,21 +2568,17 @@ class Economy(commands.Cog):
                                         await savings_modal_interaction.response.send_message("❌ Minimum savings deposit is 100 coins!", ephemeral=True)
                                         return
                                     
-                                    current_data = db.get_user_data(user_id)
-                                    current_bank = current_data.get('bank_balance', 0)
+                                    # Guarded $inc, so interest credited meanwhile is not overwritten
+                                    result = await asyncio.to_thread(db.move_coins, user_id, amount, 'bank', 'savings_balance')
+                                    current_data = await asyncio.to_thread(db.get_user_data, user_id)
                                     
-                                    if current_bank < amount:
-                                        await savings_modal_interaction.response.send_message(
-                                            f"❌ Insufficient bank funds! You have {current_bank:,} coins in bank.",
-                                            ephemeral=True
-                                        )
+                                    if not result['success']:
+                                        current_bank = current_data.get('bank', 0)
+                                        message = (f"❌ Insufficient bank funds! You have {current_bank:,} coins in bank."
+                                                   if result['message'] == "Insufficient funds" else f"❌ {result['message']}")
+                                        await savings_modal_interaction.response.send_message(message, ephemeral=True)
                                         return
                                     
-                                    # Transfer to savings
-                                    current_data['bank_balance'] -= amount
-                                    current_data['savings_balance'] = current_data.get('savings_balance', 0) + amount
-                                    db.update_user_data(user_id, current_data)
-                                    
                                     success_embed = discord.Embed(
                                         title="✅ **Savings Deposit Successful**",
                                         description=f"Deposited {amount:,} coins to savings!",
@@ -2605,7 +2586,7 @@ class Economy(commands.Cog):
                                     )
                                     success_embed.add_field(
                                         name="💎 **New Savings Balance**",
-                                        value=f"{current_data['savings_balance']:,} coins",
+                                        value=f"{current_data.get('savings_balance', 0):,} coins",
                                         inline=True
                                     )
                                     await savings_modal_interaction.response.send_message(embed=success_embed, ephemeral=True)
@@ -153,36 +153,13 @@ class EnhancedEconomy(commands.Cog):
                 await asyncio.sleep(86400)  # 24 hours
                 
                 if self.db_manager:
-                    # Get all users with savings
-                    users_with_savings = await self.db_manager.db.users.find({
-                        "savings_balance": {"$gt": 0}
-                    }).to_list(None)
+                    # Interest and its ledger entries are computed server-side
+                    result = await self.db_manager.apply_savings_interest(
+                        self.config.economy.savings_interest_rate
+                    )
                     
-                    updates = []
-                    for user_data in users_with_savings:
-                        savings = user_data.get('savings_balance', 0)
-                        interest = int(savings * self.config.economy.savings_interest_rate)
-                        
-                        if interest > 0:
-                            updates.append({
-                                "user_id": user_data["user_id"],
-                                "data": {
-                                    "savings_balance": savings + interest,
-                                    "last_interest": time.time()
-                                }
-                            })
-                            
-                            # Log interest transaction
-                            await self.db_manager.log_transaction(
-                                user_data["user_id"], 
-                                "savings_interest", 
-                                interest,
-                                {"rate": self.config.economy.savings_interest_rate}
-                            )
-                    
-                    if updates:
-                        await self.db_manager.bulk_update_users(updates)
-                        print(f"✅ Applied daily interest to {len(updates)} users")
+                    if result["success"] and result["users"]:
+                        print(f"✅ Applied daily interest to {result['users']} users")
                         
             except Exception as e:
                 print(f"Error in daily interest task: {e}")
@@ -421,9 +398,6 @@ class EnhancedEconomy(commands.Cog):
                 )
                 return
             
-            # Analytics: Track command usage
-            await self.analytics.track_command_usage("work", user_id, interaction.guild.id if interaction.guild else None, start_time)
-            
             # Check if feature is enabled
             if not self.config.is_feature_enabled("economy"):
                 await interaction.response.send_message("❌ Economy system is currently disabled.", ephemeral=True)
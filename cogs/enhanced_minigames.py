@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button, Select, Modal, TextInput
 import random
@@ -8,18 +8,70 @@ import time
 from datetime import datetime, timedelta
 import os, sys
 import json
+from collections import deque
 
 # Local import
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import database as db
+from gemini_ai import ai, TRIVIA_DIFFICULTIES
+from core.shared_state import get_shared_store
+
+TRIVIA_REWARDS = {"easy": 1, "medium": 2, "hard": 3}
+TRIVIA_POOL_SIZE = 10  # Ready questions kept per difficulty
 
 class EnhancedMiniGames(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Anti-spam protection
-        self.game_cooldowns = {}
         self.word_lists = self.load_word_lists()
         
+        # Pre-generated trivia so /trivia never waits on the model
+        self.trivia_pool = {difficulty: deque() for difficulty in TRIVIA_DIFFICULTIES}
+        self.recent_trivia = deque(maxlen=200)
+        self.refill_trivia_pool.start()
+    
+    def cog_unload(self):
+        self.refill_trivia_pool.cancel()
+    
+    @tasks.loop(minutes=2)
+    async def refill_trivia_pool(self):
+        """Top up each difficulty's pool with AI questions (template questions if AI is unavailable)"""
+        for difficulty, pool in self.trivia_pool.items():
+            missing = TRIVIA_POOL_SIZE - len(pool)
+            if missing <= 0:
+                continue
+            
+            try:
+                questions = await ai.generate_trivia_questions(difficulty, missing)
+            except Exception as e:
+                print(f"Error generating trivia pool: {e}")
+                questions = []
+            if not questions:
+                if ai.initialization_pending():
+                    # Don't fill the pool with templates that would sit ahead of AI questions
+                    continue
+                questions = [self.generate_ai_trivia_question(difficulty) for _ in range(missing)]
+            
+            queued = {q["question"] for q in pool}
+            for question in questions:
+                if question["question"] in queued or question["question"] in self.recent_trivia:
+                    continue
+                question["reward"] = TRIVIA_REWARDS.get(difficulty, 1)
+                pool.append(question)
+                queued.add(question["question"])
+    
+    @refill_trivia_pool.before_loop
+    async def before_refill_trivia_pool(self):
+        """First fill once the bot is ready and Gemini has connected (or failed to)"""
+        await self.bot.wait_until_ready()
+        await ai.initialize_async()
+    
+    def next_trivia_question(self, difficulty: str) -> dict:
+        """Take a ready question from the pool, generating one inline only if it is empty"""
+        pool = self.trivia_pool.get(difficulty)
+        question = pool.popleft() if pool else self.generate_ai_trivia_question(difficulty)
+        self.recent_trivia.append(question["question"])
+        return question
+        
     def load_word_lists(self):
         """Load word lists for word chain validation"""
         return {
@@ -46,18 +98,9 @@ class EnhancedMiniGames(commands.Cog):
             ]
         }
 
-    def check_cooldown(self, user_id: int, game_type: str, cooldown_seconds: int = 30) -> tuple:
-        """Check if user is on cooldown for specific game"""
-        current_time = time.time()
-        cooldown_key = f"{user_id}_{game_type}"
-        
-        if cooldown_key in self.game_cooldowns:
-            time_left = self.game_cooldowns[cooldown_key] - current_time
-            if time_left > 0:
-                return False, time_left
-                
-        self.game_cooldowns[cooldown_key] = current_time + cooldown_seconds
-        return True, 0
+    async def check_cooldown(self, user_id: int, game_type: str, cooldown_seconds: int = 30) -> tuple:
+        """Check if user is on cooldown for specific game (shared across shards)"""
+        return await get_shared_store().hit(f"cooldown:{game_type}:{user_id}", 1, cooldown_seconds)
 
     def validate_word(self, word: str, required_start_letter: str) -> bool:
         """Enhanced word validation using comprehensive word lists"""
@@ -807,11 +850,7 @@ class EnhancedMiniGames(commands.Cog):
             correct = random.randint(0, 3)
         
         # Set reward based on difficulty - Updated as requested
-        rewards = {
-            "easy": 1,
-            "medium": 2,
-            "hard": 3
-        }
+        rewards = TRIVIA_REWARDS
         
         return {
             "question": question_text,
@@ -832,7 +871,7 @@ class EnhancedMiniGames(commands.Cog):
     async def trivia(self, interaction: discord.Interaction, difficulty: app_commands.Choice[str] = None):
         # No entry fee - trivia is free to play but gives small rewards
         # Check cooldown
-        can_play, time_left = self.check_cooldown(interaction.user.id, "trivia", 60)
+        can_play, time_left = await self.check_cooldown(interaction.user.id, "trivia", 60)
         if not can_play:
             await interaction.response.send_message(
                 f"🕐 You can play trivia again in {int(time_left)} seconds!", 
@@ -850,7 +889,7 @@ class EnhancedMiniGames(commands.Cog):
         if difficulty_str == "normal":
             difficulty_str = "medium"
 
-        question_data = self.generate_ai_trivia_question(difficulty_str)
+        question_data = self.next_trivia_question(difficulty_str)
         
         class SmartTriviaView(View):
             def __init__(self, question_data, user_id):
@@ -977,7 +1016,7 @@ class EnhancedMiniGames(commands.Cog):
     @app_commands.command(name="wordchain", description="🔤 Enhanced word chain - no hints, just skill!")
     async def wordchain(self, interaction: discord.Interaction):
         # Check for 2.5-hour time limit to prevent exploitation (2.5 hours = 9000 seconds)
-        can_play, time_left = self.check_cooldown(interaction.user.id, "wordchain", 9000)  # 2.5 hours = 9000 seconds
+        can_play, time_left = await self.check_cooldown(interaction.user.id, "wordchain", 9000)  # 2.5 hours = 9000 seconds
         if not can_play:
             hours = int(time_left // 3600)
             minutes = int((time_left % 3600) // 60)
@@ -1177,7 +1216,7 @@ class EnhancedMiniGames(commands.Cog):
             return
         
         # Check cooldown
-        can_play, time_left = self.check_cooldown(interaction.user.id, "rps", 30)
+        can_play, time_left = await self.check_cooldown(interaction.user.id, "rps", 30)
         if not can_play:
             await interaction.response.send_message(
                 f"🕐 You can play RPS again in {int(time_left)} seconds!", 
@@ -1284,7 +1323,7 @@ class EnhancedMiniGames(commands.Cog):
     @app_commands.describe(amount="Amount to bet (minimum 10 coins)")
     async def slots(self, interaction: discord.Interaction, amount: int = 25):
         # Check cooldown
-        can_play, time_left = self.check_cooldown(interaction.user.id, "slots", 45)
+        can_play, time_left = await self.check_cooldown(interaction.user.id, "slots", 45)
         if not can_play:
             await interaction.response.send_message(
                 f"🕐 You can play slots again in {int(time_left)} seconds!", 
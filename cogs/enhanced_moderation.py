@@ -9,6 +9,7 @@ import asyncio
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import database as db
 from permissions import has_special_permissions
+from core.modlog import get_modlog_dispatcher
 
 class SimpleModeration(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -39,7 +40,7 @@ class SimpleModeration(commands.Cog):
             )
             embed.set_footer(text="Simple Mod Log")
             
-            await channel.send(embed=embed)
+            await get_modlog_dispatcher().enqueue(channel, embed=embed, event_type=title)
             
         except Exception as e:
             print(f"Error in simple logging: {e}")
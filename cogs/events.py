@@ -10,6 +10,7 @@ import io
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import database as db
 from assets.media_links import WELCOME_GIF, LEAVE_GIF
+from core.modlog import get_modlog_dispatcher
 
 class Events(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -510,13 +511,13 @@ class Events(commands.Cog):
             
             icon = important_events[event_type]
             
-            # Ultra-simple one-line message (no embeds)
+            # Ultra-simple one-line message (no embeds), coalesced with other events
             if "user" in data:
                 message = f"{icon} **{data['user'].display_name}** {data.get('description', '')}"
             else:
                 message = f"{icon} {data.get('description', '')}"
             
-            await channel.send(message)
+            await get_modlog_dispatcher().enqueue(channel, content=message, event_type=event_type)
             
         except Exception as e:
             print(f"Error logging to modlog: {e}")
@@ -451,7 +451,7 @@ class Leveling(commands.Cog):
         target = user or interaction.user
         
         try:
-            user_data = db.get_user_data(target.id)
+            user_data = db.get_user_view(target.id, "profile")
             xp = user_data.get('xp', 0)
             cookies = user_data.get('cookies', 0)
             coins = user_data.get('coins', 0)
@@ -459,14 +459,11 @@ class Leveling(commands.Cog):
             last_work = user_data.get('last_work', 0)
             level = self.calculate_level_from_xp(xp)
             
-            # Get ranks
-            xp_leaderboard = db.get_leaderboard('xp')
-            cookie_leaderboard = db.get_leaderboard('cookies')
-            coin_leaderboard = db.get_leaderboard('coins')
-            
-            xp_rank = next((i + 1 for i, u in enumerate(xp_leaderboard) if u['user_id'] == target.id), 'N/A')
-            cookie_rank = next((i + 1 for i, u in enumerate(cookie_leaderboard) if u['user_id'] == target.id), 'N/A')
-            coin_rank = next((i + 1 for i, u in enumerate(coin_leaderboard) if u['user_id'] == target.id), 'N/A')
+            # Exact ranks: one indexed count per field (ranked-user totals are cached)
+            ranks = db.get_ranks({'xp': xp, 'cookies': cookies, 'coins': coins})
+            xp_rank = ranks['xp']['rank'] or 'N/A'
+            cookie_rank = ranks['cookies']['rank'] or 'N/A'
+            coin_rank = ranks['coins']['rank'] or 'N/A'
 
             embed = discord.Embed(
                 title=f"👤 Profile - {target.display_name}",
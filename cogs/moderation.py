@@ -9,8 +9,10 @@ import asyncio
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import database as db
 from permissions import has_special_permissions
+from core.modlog import get_modlog_dispatcher
+from gemini_ai import ai
+from core.streaming import StreamingReply
 
-import google.generativeai as genai
 
 # Config
 GUILD_ID = 1370009417726169250
@@ -89,9 +91,8 @@ INSTRUCTIONS:
 
 Continue the adventure:"""
 
-            # Call Gemini AI
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
+            # Stream the reply from Gemini AI
+            if not await ai.ensure_available():
                 embed = discord.Embed(
                     title="❌ **AI Service Unavailable**",
                     description="🤖 The roleplay AI is currently offline. Please contact an administrator!",
@@ -99,17 +100,12 @@ Continue the adventure:"""
                 )
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
-                
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            response = model.generate_content(prompt)
             
-            if response.text:
+            def build_embed(text):
                 # Create adventure continuation embed
                 embed = discord.Embed(
                     title=f"🎭 **Adventure Continues - {self.character}**",
-                    description=response.text,
+                    description=text,
                     color=0x7c3aed,
                     timestamp=datetime.now()
                 )
@@ -131,11 +127,13 @@ Continue the adventure:"""
                     icon_url=interaction.user.display_avatar.url
                 )
                 embed.set_footer(text="🎮 Interactive Roleplay System")
-                
-                # Add the view again for continuous play
-                view = RoleplayView(self.character, self.style)
-                await interaction.followup.send(embed=embed, view=view)
-            else:
+                return embed
+            
+            # Add the view again for continuous play
+            view = RoleplayView(self.character, self.style)
+            response_text = await StreamingReply(interaction, build_embed).run(ai.stream_text(prompt), view=view)
+            
+            if not response_text:
                 embed = discord.Embed(
                     title="❌ **AI Response Error**",
                     description="The AI couldn't generate a response. Please try again with a different action.",
@@ -261,9 +259,8 @@ INSTRUCTIONS:
 
 Respond as Bleky:"""
 
-            # Call Gemini AI
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
+            # Stream the reply from Gemini AI
+            if not await ai.ensure_available():
                 embed = discord.Embed(
                     title="❌ **Bleky is Busy**",
                     description="🤖 Bleky can't talk right now! Try again later.",
@@ -271,21 +268,12 @@ Respond as Bleky:"""
                 )
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
-                
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
             
-            response = model.generate_content(prompt)
-            
-            if response.text:
-                # Add Bleky's response to conversation history
-                self.conversation_history.append(f"Bleky: {response.text}")
-                
+            def build_embed(text):
                 # Create response embed
                 embed = discord.Embed(
                     title="💬 **Bleky Responds**",
-                    description=response.text,
+                    description=text,
                     color=0x5865f2,
                     timestamp=datetime.now()
                 )
@@ -307,10 +295,15 @@ Respond as Bleky:"""
                     icon_url=interaction.user.display_avatar.url
                 )
                 embed.set_footer(text="🎯 Talk to Bleky • Your favorite nephew!")
-                
-                # Add the view again for continuous conversation
-                view = TalkToBlekyView(self.conversation_history)
-                await interaction.followup.send(embed=embed, view=view)
+                return embed
+            
+            # Add the view again for continuous conversation
+            view = TalkToBlekyView(self.conversation_history)
+            response_text = await StreamingReply(interaction, build_embed).run(ai.stream_text(prompt), view=view)
+            
+            if response_text:
+                # Add Bleky's response to conversation history
+                self.conversation_history.append(f"Bleky: {response_text}")
             else:
                 embed = discord.Embed(
                     title="❌ **Bleky Can't Respond**",
@@ -439,7 +432,7 @@ class Moderation(commands.Cog):
         try:
             log_channel = await self.get_log_channel(guild)
             if log_channel:
-                await log_channel.send(embed=embed)
+                await get_modlog_dispatcher().enqueue(log_channel, embed=embed, event_type=action_type)
         except Exception as e:
             print(f"Failed to log moderation action: {e}")
 
@@ -1641,16 +1634,10 @@ class Moderation(commands.Cog):
         await interaction.response.defer()
         
         try:
-            # Clear existing commands
-            self.bot.tree.clear_commands(guild=None)
-            await asyncio.sleep(2)
-            
-            # Sync to current guild first (faster)
+            # Sync to current guild first (faster), then globally - forced, so stored hashes are ignored
             guild = discord.Object(id=interaction.guild.id)
-            synced_guild = await self.bot.tree.sync(guild=guild)
-            
-            # Sync globally
-            synced_global = await self.bot.tree.sync()
+            synced_guild = await self.bot.command_syncer.sync(guild=guild, force=True)
+            synced_global = await self.bot.command_syncer.sync(force=True)
             
             embed = discord.Embed(
                 title="✅ **Commands Synced Successfully!**",
@@ -1661,7 +1648,7 @@ class Moderation(commands.Cog):
             
             embed.add_field(
                 name="📊 **Sync Results**",
-                value=f"**Guild Sync:** {len(synced_guild)} commands\n**Global Sync:** {len(synced_global)} commands",
+                value=f"**Guild Sync:** {synced_guild['commands']} commands\n**Global Sync:** {synced_global['commands']} commands",
                 inline=False
             )
             
@@ -1712,7 +1699,7 @@ class Moderation(commands.Cog):
             
             # Get user's banking and stats data for context
             balance = user_data.get('coins', 0)
-            bank_balance = user_data.get('bank_balance', 0)
+            bank_balance = user_data.get('bank', 0)
             savings = user_data.get('savings_balance', 0)
             level = user_data.get('level', 1)
             xp = user_data.get('xp', 0)
@@ -1720,9 +1707,8 @@ class Moderation(commands.Cog):
             portfolio = user_data.get('portfolio', {})
             pets = user_data.get('pets', {})
             
-            # Get recent conversation history
-            conversation_key = f"sensei_conversation_{user_id}"
-            conversation_history = db.get_user_data(user_id).get('sensei_conversation', [])
+            # Get recent conversation history (bounded AI memory, not the user document)
+            conversation_history = await ai.memory.get_history(user_id, "sensei")
             
             # Available commands list for Bleky to reference
             commands_list = """
@@ -1748,7 +1734,10 @@ class Moderation(commands.Cog):
             # Add conversation history context
             history_context = ""
             if conversation_history:
-                recent_history = conversation_history[-6:]  # Last 3 exchanges
+                recent_history = []
+                for turn in conversation_history[-3:]:  # Last 3 exchanges
+                    recent_history.append(f"You: {turn['user_message']}")
+                    recent_history.append(f"Sensei: {turn['ai_response']}")
                 history_context = "\n\nPREVIOUS CONVERSATION:\n" + "\n".join(recent_history)
             
             prompt = f"""You are Sensei, a wise, knowledgeable, and patient mentor who's also a Discord bot master! You have years of experience and wisdom, and you have access to ALL the bot's commands and the student's account data.
@@ -1796,9 +1785,8 @@ RESPONSE INSTRUCTIONS:
 
 Respond as Sensei:"""
 
-            # Call Gemini AI
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
+            # Stream the reply from Gemini AI
+            if not await ai.ensure_available():
                 embed = discord.Embed(
                     title="❌ **Sensei is Unavailable**",
                     description="🤖 Sensei cannot provide guidance right now! The AI service isn't configured.",
@@ -1806,32 +1794,12 @@ Respond as Sensei:"""
                 )
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
-                
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
             
-            response = model.generate_content(prompt)
-            
-            if response.text:
-                response_text = response.text.strip()
-                
-                # Update conversation history
-                conversation_history.append(f"You: {user_message}")
-                conversation_history.append(f"Sensei: {response_text}")
-                
-                # Keep only last 20 messages (10 exchanges)
-                if len(conversation_history) > 20:
-                    conversation_history = conversation_history[-20:]
-                
-                # Save conversation history
-                user_data['sensei_conversation'] = conversation_history
-                db.update_user_data(user_id, user_data)
-                
+            def build_embed(text):
                 # Create response embed with user's stats
                 embed = discord.Embed(
                     title="🧘 **Sensei - Your Wise Mentor**",
-                    description=response_text,
+                    description=text,
                     color=0x5865f2,
                     timestamp=datetime.now()
                 )
@@ -1855,70 +1823,75 @@ Respond as Sensei:"""
                     icon_url=interaction.user.display_avatar.url
                 )
                 embed.set_footer(text="🧘 Enhanced Sensei • Command Master • Wise Advisor")
+                return embed
+            
+            # Create continue conversation view
+            class ContinueSenseiView(discord.ui.View):
+                def __init__(self):
+                    super().__init__(timeout=300)  # 5 minutes
                 
-                # Create continue conversation view
-                class ContinueSenseiView(discord.ui.View):
-                    def __init__(self):
-                        super().__init__(timeout=300)  # 5 minutes
+                @discord.ui.button(label="Continue Chat", emoji="💬", style=discord.ButtonStyle.primary)
+                async def continue_chat(self, button_interaction: discord.Interaction, button: discord.ui.Button):
+                    if button_interaction.user.id != interaction.user.id:
+                        await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
+                        return
                     
-                    @discord.ui.button(label="Continue Chat", emoji="💬", style=discord.ButtonStyle.primary)
-                    async def continue_chat(self, button_interaction: discord.Interaction, button: discord.ui.Button):
-                        if button_interaction.user.id != interaction.user.id:
-                            await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
-                            return
+                    # Create modal for user input
+                    class ChatModal(discord.ui.Modal, title="Continue conversation with Sensei"):
+                        message_input = discord.ui.TextInput(
+                            label="What wisdom do you seek from Sensei?",
+                            placeholder="Ask about commands, banking, games, or seek guidance!",
+                            max_length=500,
+                            style=discord.TextStyle.paragraph
+                        )
                         
-                        # Create modal for user input
-                        class ChatModal(discord.ui.Modal, title="Continue conversation with Sensei"):
-                            message_input = discord.ui.TextInput(
-                                label="What wisdom do you seek from Sensei?",
-                                placeholder="Ask about commands, banking, games, or seek guidance!",
-                                max_length=500,
-                                style=discord.TextStyle.paragraph
-                            )
+                        async def on_submit(self, modal_interaction: discord.Interaction):
+                            await modal_interaction.response.defer()
                             
-                            async def on_submit(self, modal_interaction: discord.Interaction):
-                                await modal_interaction.response.defer()
-                                
-                                # Call the same function recursively with the new message
-                                await talk_to_sensei(interaction, self.message_input.value)
-                        
-                        await button_interaction.response.send_modal(ChatModal())
+                            # Call the same function recursively with the new message
+                            await talk_to_sensei(interaction, self.message_input.value)
                     
-                    @discord.ui.button(label="Command Help", emoji="❓", style=discord.ButtonStyle.secondary)
-                    async def command_help(self, button_interaction: discord.Interaction, button: discord.ui.Button):
-                        if button_interaction.user.id != interaction.user.id:
-                            await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
-                            return
-                        
-                        help_embed = discord.Embed(
-                            title="🧘 **Sensei's Command Wisdom**",
-                            description="I have mastered all these commands and can guide you in their use!",
-                            color=0x00ff00
-                        )
-                        
-                        help_embed.add_field(
-                            name="💰 **Economy & Banking**",
-                            value="`/balance` `/shop` `/inventory` `/atm`\n`/deposit` `/withdraw` `/savings`",
-                            inline=True
-                        )
-                        
-                        help_embed.add_field(
-                            name="🎮 **Games & Fun**",
-                            value="`/trivia` `/wordchain` `/slots`\n`/coinflip` `/rps` `/spinwheel`",
-                            inline=True
-                        )
-                        
-                        help_embed.add_field(
-                            name="📈 **Stocks & Pets**",
-                            value="`/stocks` `/portfolio` `/pet`\n`/feed-pet` `/play-pet`",
-                            inline=True
-                        )
-                        
-                        help_embed.set_footer(text="🧘 Ask Sensei about any command for detailed guidance!")
-                        await button_interaction.response.send_message(embed=help_embed, ephemeral=True)
+                    await button_interaction.response.send_modal(ChatModal())
                 
-                view = ContinueSenseiView()
-                await interaction.followup.send(embed=embed, view=view)
+                @discord.ui.button(label="Command Help", emoji="❓", style=discord.ButtonStyle.secondary)
+                async def command_help(self, button_interaction: discord.Interaction, button: discord.ui.Button):
+                    if button_interaction.user.id != interaction.user.id:
+                        await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
+                        return
+                    
+                    help_embed = discord.Embed(
+                        title="🧘 **Sensei's Command Wisdom**",
+                        description="I have mastered all these commands and can guide you in their use!",
+                        color=0x00ff00
+                    )
+                    
+                    help_embed.add_field(
+                        name="💰 **Economy & Banking**",
+                        value="`/balance` `/shop` `/inventory` `/atm`\n`/deposit` `/withdraw` `/savings`",
+                        inline=True
+                    )
+                    
+                    help_embed.add_field(
+                        name="🎮 **Games & Fun**",
+                        value="`/trivia` `/wordchain` `/slots`\n`/coinflip` `/rps` `/spinwheel`",
+                        inline=True
+                    )
+                    
+                    help_embed.add_field(
+                        name="📈 **Stocks & Pets**",
+                        value="`/stocks` `/portfolio` `/pet`\n`/feed-pet` `/play-pet`",
+                        inline=True
+                    )
+                    
+                    help_embed.set_footer(text="🧘 Ask Sensei about any command for detailed guidance!")
+                    await button_interaction.response.send_message(embed=help_embed, ephemeral=True)
+            
+            view = ContinueSenseiView()
+            response_text = (await StreamingReply(interaction, build_embed).run(ai.stream_text(prompt), view=view)).strip()
+            
+            if response_text:
+                # Append the exchange to conversation memory (one insert, no user document rewrite)
+                await ai.memory.append(user_id, "sensei", user_message, response_text)
             else:
                 embed = discord.Embed(
                     title="❌ **Sensei Cannot Respond**",
@@ -1943,10 +1916,9 @@ Respond as Sensei:"""
 
         try:
             user_id = interaction.user.id
-            user_data = db.get_user_data(user_id)
             
-            # Get conversation history for this command
-            conversation_history = user_data.get('bleky_nephew_conversation', [])
+            # Get conversation history for this command (bounded AI memory, not the user document)
+            conversation_history = await ai.memory.get_history(user_id, "nephew")
             
             # Create the question
             if question:
@@ -1957,7 +1929,10 @@ Respond as Sensei:"""
             # Add conversation history context
             history_context = ""
             if conversation_history:
-                recent_history = conversation_history[-10:]  # Last 5 exchanges
+                recent_history = []
+                for turn in conversation_history[-5:]:  # Last 5 exchanges
+                    recent_history.append(f"You: {turn['user_message']}")
+                    recent_history.append(f"Bleky: {turn['ai_response']}")
                 history_context = "\n\nPREVIOUS CONVERSATION:\n" + "\n".join(recent_history)
             
             # Create AI prompt for Bleky Nephew
@@ -1986,9 +1961,8 @@ RESPONSE INSTRUCTIONS:
 
 Respond as Bleky:"""
 
-            # Call Gemini AI
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
+            # Stream the reply from Gemini AI
+            if not await ai.ensure_available():
                 embed = discord.Embed(
                     title="❌ **Bleky is Offline**",
                     description="🤖 Your nephew Bleky can't answer right now! The AI service isn't configured.",
@@ -1996,32 +1970,12 @@ Respond as Bleky:"""
                 )
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 return
-                
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
             
-            response = model.generate_content(prompt)
-            
-            if response.text:
-                response_text = response.text.strip()
-                
-                # Update conversation history
-                conversation_history.append(f"You: {user_question}")
-                conversation_history.append(f"Bleky: {response_text}")
-                
-                # Keep only last 20 messages (10 exchanges)
-                if len(conversation_history) > 20:
-                    conversation_history = conversation_history[-20:]
-                
-                # Save conversation history
-                user_data['bleky_nephew_conversation'] = conversation_history
-                db.update_user_data(user_id, user_data)
-                
+            def build_embed(text):
                 # Create response embed
                 embed = discord.Embed(
                     title="🤖 **Bleky - Your Smart Nephew**",
-                    description=response_text,
+                    description=text,
                     color=0x00d4ff,
                     timestamp=datetime.now()
                 )
@@ -2031,55 +1985,58 @@ Respond as Bleky:"""
                     icon_url=interaction.user.display_avatar.url
                 )
                 embed.set_footer(text="🤖 Ask Bleky Nephew • AI Powered • Conversation Memory")
+                return embed
+            
+            # Create continue conversation view
+            class ContinueBlekyView(discord.ui.View):
+                def __init__(self):
+                    super().__init__(timeout=300)  # 5 minutes
                 
-                # Create continue conversation view
-                class ContinueBlekyView(discord.ui.View):
-                    def __init__(self):
-                        super().__init__(timeout=300)  # 5 minutes
+                @discord.ui.button(label="Continue Chat", emoji="💬", style=discord.ButtonStyle.primary)
+                async def continue_chat(self, button_interaction: discord.Interaction, button: discord.ui.Button):
+                    if button_interaction.user.id != interaction.user.id:
+                        await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
+                        return
                     
-                    @discord.ui.button(label="Continue Chat", emoji="💬", style=discord.ButtonStyle.primary)
-                    async def continue_chat(self, button_interaction: discord.Interaction, button: discord.ui.Button):
-                        if button_interaction.user.id != interaction.user.id:
-                            await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
-                            return
+                    # Create modal for user input
+                    class ChatModal(discord.ui.Modal, title="Continue chatting with Bleky"):
+                        message_input = discord.ui.TextInput(
+                            label="What do you want to ask Bleky?",
+                            placeholder="Ask anything! I remember our conversation.",
+                            max_length=500,
+                            style=discord.TextStyle.paragraph
+                        )
                         
-                        # Create modal for user input
-                        class ChatModal(discord.ui.Modal, title="Continue chatting with Bleky"):
-                            message_input = discord.ui.TextInput(
-                                label="What do you want to ask Bleky?",
-                                placeholder="Ask anything! I remember our conversation.",
-                                max_length=500,
-                                style=discord.TextStyle.paragraph
-                            )
+                        async def on_submit(self, modal_interaction: discord.Interaction):
+                            await modal_interaction.response.defer()
                             
-                            async def on_submit(self, modal_interaction: discord.Interaction):
-                                await modal_interaction.response.defer()
-                                
-                                # Call the same function recursively with the new message
-                                await ask_bleky_nephew(interaction, self.message_input.value)
-                        
-                        await button_interaction.response.send_modal(ChatModal())
+                            # Call the same function recursively with the new message
+                            await ask_bleky_nephew(interaction, self.message_input.value)
                     
-                    @discord.ui.button(label="Clear History", emoji="🗑️", style=discord.ButtonStyle.secondary)
-                    async def clear_history(self, button_interaction: discord.Interaction, button: discord.ui.Button):
-                        if button_interaction.user.id != interaction.user.id:
-                            await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
-                            return
-                        
-                        # Clear conversation history
-                        user_data = db.get_user_data(user_id)
-                        user_data['bleky_nephew_conversation'] = []
-                        db.update_user_data(user_id, user_data)
-                        
-                        clear_embed = discord.Embed(
-                            title="🗑️ **Conversation Cleared**",
-                            description="Bleky's memory of your conversation has been cleared. Start fresh!",
-                            color=0x00ff00
-                        )
-                        await button_interaction.response.send_message(embed=clear_embed, ephemeral=True)
+                    await button_interaction.response.send_modal(ChatModal())
                 
-                view = ContinueBlekyView()
-                await interaction.followup.send(embed=embed, view=view)
+                @discord.ui.button(label="Clear History", emoji="🗑️", style=discord.ButtonStyle.secondary)
+                async def clear_history(self, button_interaction: discord.Interaction, button: discord.ui.Button):
+                    if button_interaction.user.id != interaction.user.id:
+                        await button_interaction.response.send_message("This isn't your conversation!", ephemeral=True)
+                        return
+                    
+                    # Clear conversation history
+                    await ai.clear_conversation(user_id, "nephew")
+                    
+                    clear_embed = discord.Embed(
+                        title="🗑️ **Conversation Cleared**",
+                        description="Bleky's memory of your conversation has been cleared. Start fresh!",
+                        color=0x00ff00
+                    )
+                    await button_interaction.response.send_message(embed=clear_embed, ephemeral=True)
+            
+            view = ContinueBlekyView()
+            response_text = (await StreamingReply(interaction, build_embed).run(ai.stream_text(prompt), view=view)).strip()
+            
+            if response_text:
+                # Append the exchange to conversation memory (one insert, no user document rewrite)
+                await ai.memory.append(user_id, "nephew", user_question, response_text)
             else:
                 embed = discord.Embed(
                     title="❌ **Bleky Can't Answer**",
@@ -12,6 +12,8 @@ import json
 # Local import
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import database as db
+from core.histogram import get_latency_tracker
+from core.loop_monitor import get_loop_watchdog
 
 class SecurityPerformance(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -25,9 +27,9 @@ class SecurityPerformance(commands.Cog):
         self.user_message_history = defaultdict(deque)
         self.spam_warnings = defaultdict(int)
         
-        # Performance monitoring
-        self.command_performance = defaultdict(list)
-        self.db_query_times = deque(maxlen=1000)
+        # Performance monitoring (constant-memory latency histograms)
+        self.latency = get_latency_tracker()
+        self.loop_watchdog = get_loop_watchdog()
         
         # Security tracking
         self.failed_attempts = defaultdict(int)
@@ -37,6 +39,13 @@ class SecurityPerformance(commands.Cog):
         self.cleanup_rate_limits.start()
         self.performance_monitor.start()
         self.security_audit.start()
+    
+    async def cog_load(self):
+        """Start sampling the event loop for slow callbacks"""
+        self.loop_watchdog.start()
+    
+    async def cog_unload(self):
+        await self.loop_watchdog.stop()
         
     @tasks.loop(minutes=5)
     async def cleanup_rate_limits(self):
@@ -75,25 +84,21 @@ class SecurityPerformance(commands.Cog):
     async def performance_monitor(self):
         """Monitor bot performance and optimize"""
         try:
-            # Calculate average command response times
-            total_commands = 0
-            total_time = 0
+            # Alert on tail latency rather than averages
+            for command_name, summary in self.latency.summary("command").items():
+                if summary["p95_ms"] > 3000:  # p95 above 3 seconds
+                    print(f"⚠️ Slow command detected: {command_name} p95 {summary['p95_ms'] / 1000:.2f}s, p99 {summary['p99_ms'] / 1000:.2f}s")
             
-            for command_name, times in self.command_performance.items():
-                if times:
-                    avg_time = sum(times) / len(times)
-                    total_time += avg_time
-                    total_commands += 1
-                    
-                    # Alert for slow commands
-                    if avg_time > 3.0:  # Commands taking more than 3 seconds
-                        print(f"⚠️ Slow command detected: {command_name} averaging {avg_time:.2f}s")
+            db_latency = self.latency.combined("db")
+            if db_latency.count and db_latency.percentile(95) > 1.0:  # p95 above 1 second
+                print(f"⚠️ Slow database queries detected: p95 {db_latency.percentile(95):.2f}s")
             
-            # Calculate average DB query time
-            if self.db_query_times:
-                avg_db_time = sum(self.db_query_times) / len(self.db_query_times)
-                if avg_db_time > 1.0:  # DB queries taking more than 1 second
-                    print(f"⚠️ Slow database queries detected: averaging {avg_db_time:.2f}s")
+            # Event loop health
+            loop_lag = self.latency.get("loop", "lag")
+            if loop_lag and loop_lag.percentile(95) > 0.1:  # p95 lag above 100ms
+                culprits = self.loop_watchdog.top_culprits(3)
+                blame = ", ".join(f"{c['culprit']} ({c['blocked_ms']:.0f}ms)" for c in culprits) or "no stalls attributed"
+                print(f"⚠️ Event loop lag detected: p95 {loop_lag.percentile(95) * 1000:.0f}ms, top blockers: {blame}")
             
             # Memory usage check (simplified)
             import psutil
@@ -102,10 +107,6 @@ class SecurityPerformance(commands.Cog):
             
             if memory_usage > 500:  # Alert if using more than 500MB
                 print(f"⚠️ High memory usage detected: {memory_usage:.1f}MB")
-                # Clear old performance data to free memory
-                for command_name in self.command_performance:
-                    if len(self.command_performance[command_name]) > 100:
-                        self.command_performance[command_name] = self.command_performance[command_name][-50:]
                         
         except Exception as e:
             print(f"Error in performance monitor: {e}")
@@ -188,15 +189,11 @@ class SecurityPerformance(commands.Cog):
     
     def log_command_performance(self, command_name: str, execution_time: float):
         """Log command execution time for performance monitoring"""
-        self.command_performance[command_name].append(execution_time)
-        
-        # Keep only last 50 entries per command
-        if len(self.command_performance[command_name]) > 50:
-            self.command_performance[command_name] = self.command_performance[command_name][-25:]
+        self.latency.record("command", command_name, execution_time)
     
-    def log_db_query_time(self, query_time: float):
+    def log_db_query_time(self, query_time: float, operation: str = "query"):
         """Log database query time"""
-        self.db_query_times.append(query_time)
+        self.latency.record("db", operation, query_time)
     
     def validate_input(self, input_string: str, max_length: int = 2000, allow_special_chars: bool = True) -> bool:
         """Validate user input for security"""
@@ -306,33 +303,44 @@ class SecurityPerformance(commands.Cog):
         )
         
         # Performance stats
-        if self.command_performance:
-            total_commands = sum(len(times) for times in self.command_performance.values())
-            avg_response = sum(sum(times) for times in self.command_performance.values()) / max(total_commands, 1)
-        else:
-            total_commands = 0
-            avg_response = 0
-        
+        commands = self.latency.combined("command").summary()
         embed.add_field(
             name="📊 Performance",
-            value=f"**Commands Executed:** {total_commands}\n**Avg Response:** {avg_response:.2f}s",
+            value=f"**Commands Executed:** {commands['count']}\n"
+                  f"**p50/p95/p99:** {commands['p50_ms']:.0f}/{commands['p95_ms']:.0f}/{commands['p99_ms']:.0f}ms",
             inline=True
         )
         
         # Database performance
-        if self.db_query_times:
-            avg_db_time = sum(self.db_query_times) / len(self.db_query_times)
-            db_status = "🟢 Fast" if avg_db_time < 0.5 else "🟡 Slow" if avg_db_time < 2.0 else "🔴 Very Slow"
+        database = self.latency.combined("db").summary()
+        if database["count"]:
+            p95_db_time = database["p95_ms"] / 1000
+            db_status = "🟢 Fast" if p95_db_time < 0.5 else "🟡 Slow" if p95_db_time < 2.0 else "🔴 Very Slow"
         else:
-            avg_db_time = 0
             db_status = "🟢 No Data"
         
         embed.add_field(
             name="🗄️ Database",
-            value=f"**Avg Query Time:** {avg_db_time:.3f}s\n**Status:** {db_status}",
+            value=f"**p50/p95/p99:** {database['p50_ms']:.1f}/{database['p95_ms']:.1f}/{database['p99_ms']:.1f}ms\n**Status:** {db_status}",
             inline=True
         )
         
+        # Tail latency by command, split into Discord API / DB / CPU time
+        slowest = self.latency.summary("command", top=5)
+        if slowest:
+            lines = []
+            for name, s in slowest.items():
+                line = f"`{name}`: {s['p99_ms']:.0f}ms (p50 {s['p50_ms']:.0f}ms, n={s['count']})"
+                phases = self.bot.instrumentation.phase_breakdown(name) if hasattr(self.bot, "instrumentation") else {}
+                if phases:
+                    line += " • " + " / ".join(f"{phase} {p['mean_ms']:.0f}" for phase, p in phases.items())
+                lines.append(line)
+            embed.add_field(
+                name="🐢 Slowest Commands (p99, mean ms by phase)",
+                value="\n".join(lines)[:1024],
+                inline=False
+            )
+        
         # Security threats
         recent_threats = len([
             activity for activity in self.suspicious_activities
@@ -406,11 +414,9 @@ class SecurityPerformance(commands.Cog):
         
         # Check performance issues
         slow_commands = []
-        for command_name, times in self.command_performance.items():
-            if times:
-                avg_time = sum(times) / len(times)
-                if avg_time > 2.0:
-                    slow_commands.append(f"`{command_name}`: {avg_time:.2f}s")
+        for command_name, summary in self.latency.summary("command").items():
+            if summary["p95_ms"] > 2000:
+                slow_commands.append(f"`{command_name}`: p95 {summary['p95_ms'] / 1000:.2f}s")
         
         embed = discord.Embed(
             title="🔍 Security Audit Results",
@@ -441,7 +447,7 @@ class SecurityPerformance(commands.Cog):
         embed.add_field(
             name="📊 Audit Summary",
             value=f"**Total Users Monitored:** {len(self.rate_limits)}\n"
-                  f"**Commands Tracked:** {len(self.command_performance)}\n"
+                  f"**Commands Tracked:** {len(self.latency.names('command'))}\n"
                   f"**Suspicious Activities:** {len(self.suspicious_activities)}",
             inline=False
         )
@@ -451,5 +457,56 @@ class SecurityPerformance(commands.Cog):
         
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="perf", description="🐢 Event loop lag and slow callback report (owner only)")
+    @app_commands.describe(reset="Clear collected stalls and loop lag after showing the report")
+    async def perf(self, interaction: discord.Interaction, reset: bool = False):
+        """Show loop lag percentiles and the code that blocked the loop"""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ This command is restricted to bot owners!", ephemeral=True)
+            return
+        
+        stats = self.loop_watchdog.get_stats()
+        lag = stats["lag"]
+        embed = discord.Embed(
+            title="🐢 Event Loop Profile",
+            description=f"**Watchdog:** {'🟢 Running' if stats['running'] else '🔴 Stopped'} • threshold {stats['threshold_ms']:.0f}ms",
+            color=0x2ecc71 if not stats["stalls"] else 0xf39c12
+        )
+        
+        if lag:
+            embed.add_field(
+                name="⏱️ Loop Lag",
+                value=f"**p50/p95/p99:** {lag['p50_ms']:.1f}/{lag['p95_ms']:.1f}/{lag['p99_ms']:.1f}ms\n**Max:** {lag['max_ms']:.0f}ms",
+                inline=True
+            )
+        embed.add_field(
+            name="🚧 Stalls",
+            value=f"**Count:** {stats['stalls']}\n**Total Blocked:** {stats['blocked_ms'] / 1000:.2f}s",
+            inline=True
+        )
+        
+        culprits = self.loop_watchdog.top_culprits(5)
+        if culprits:
+            embed.add_field(
+                name="🔍 Top Blockers",
+                value="\n".join(f"`{c['culprit']}`: {c['blocked_ms']:.0f}ms over {c['stalls']} stalls" for c in culprits),
+                inline=False
+            )
+        
+        for event in self.loop_watchdog.recent_events(2):
+            stack = "\n".join(event["stack"][-4:])[-900:]
+            embed.add_field(
+                name=f"📌 {event['duration_ms']:.0f}ms in {event['culprit']}"[:256],
+                value=f"Task: `{event['handler']}`\n```py\n{stack}\n```",
+                inline=False
+            )
+        
+        if reset:
+            self.loop_watchdog.reset()
+        
+        embed.set_footer(text="Full stall records are written to the JSON perf log")
+        embed.timestamp = datetime.now()
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(SecurityPerformance(bot))
\ No newline at end of file
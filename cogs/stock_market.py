@@ -8,6 +8,13 @@ import json
 from datetime import datetime, timedelta
 import database as db
 import math
+from core.sharding import is_primary_process
+from core.shared_state import get_shared_store
+
+MARKET_STATE_KEY = "market:prices"
+PRICE_UPDATE_SECONDS = 300
+# How often processes that don't drive the market pick up new prices
+FOLLOWER_REFRESH_SECONDS = 30
 
 class StockMarket(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -36,9 +43,16 @@ class StockMarket(commands.Cog):
         asyncio.create_task(self.update_prices())
 
     async def update_prices(self):
-        """Update stock prices every 5 minutes"""
+        """Update stock prices every 5 minutes on the primary shard; other shards follow the shared prices"""
+        await self.load_prices()
+        primary = is_primary_process(self.bot)
         while True:
-            await asyncio.sleep(300)  # 5 minutes
+            if not primary:
+                await asyncio.sleep(FOLLOWER_REFRESH_SECONDS)
+                await self.load_prices()
+                continue
+            
+            await asyncio.sleep(PRICE_UPDATE_SECONDS)
             for symbol, info in self.stocks.items():
                 current_price = self.current_prices[symbol]
                 volatility = info['volatility']
@@ -58,6 +72,33 @@ class StockMarket(commands.Cog):
                     self.price_history[symbol] = self.price_history[symbol][-100:]
             
             self.last_update = datetime.now()
+            await self.publish_prices()
+
+    async def load_prices(self):
+        """Pick up the market state published by the primary shard, if any"""
+        try:
+            state = await get_shared_store().get(MARKET_STATE_KEY)
+        except Exception as e:
+            print(f"Error loading shared stock prices: {e}")
+            return
+        if not state:
+            return
+        for symbol in self.stocks:
+            if symbol in state["prices"]:
+                self.current_prices[symbol] = state["prices"][symbol]
+                self.price_history[symbol] = list(state["history"].get(symbol, [state["prices"][symbol]]))
+        self.last_update = datetime.fromisoformat(state["updated"])
+
+    async def publish_prices(self):
+        """Share the current market state with every shard"""
+        try:
+            await get_shared_store().set(MARKET_STATE_KEY, {
+                "prices": dict(self.current_prices),
+                "history": {symbol: list(history) for symbol, history in self.price_history.items()},
+                "updated": self.last_update.isoformat()
+            })
+        except Exception as e:
+            print(f"Error publishing shared stock prices: {e}")
 
     def get_user_portfolio(self, user_id: int) -> dict:
         """Get user's stock portfolio"""
@@ -0,0 +1,251 @@
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Linear-counting bitmap used to estimate unique users per bucket
+USER_BITMAP_BITS = 4096
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+SESSION_GAP = 1800  # 30 minutes gap = new session
+
+
+def _user_bit(user_id: int) -> int:
+    """Spread a user id onto one bit of the unique-user bitmap (splitmix64 finalizer)"""
+    x = (user_id + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    x ^= x >> 31
+    return 1 << (x % USER_BITMAP_BITS)
+
+
+def estimate_unique(bitmap: int, bits: int = USER_BITMAP_BITS) -> int:
+    """Estimate distinct users from a linear-counting bitmap"""
+    zeros = bits - bitmap.bit_count()
+    if zeros == 0:
+        return int(bits * math.log(bits))
+    return int(round(-bits * math.log(zeros / bits)))
+
+
+class ActivityBucket:
+    """Pre-aggregated command counters for one time slot"""
+    __slots__ = ("epoch", "counts", "durations", "users")
+
+    def __init__(self):
+        self.epoch = -1
+        self.counts: Counter = Counter()
+        self.durations: Dict[Tuple[str, Optional[int]], float] = {}
+        self.users = 0
+
+    def reset(self, epoch: int):
+        self.epoch = epoch
+        self.counts.clear()
+        self.durations.clear()
+        self.users = 0
+
+
+class BucketRing:
+    """Fixed ring of time buckets, old slots are recycled in place"""
+
+    def __init__(self, width: int, slots: int):
+        self.width = width
+        self.slots = slots
+        self.buckets = [ActivityBucket() for _ in range(slots)]
+
+    def bucket_for(self, timestamp: float) -> ActivityBucket:
+        epoch = int(timestamp // self.width)
+        bucket = self.buckets[epoch % self.slots]
+        if bucket.epoch != epoch:
+            bucket.reset(epoch)
+        return bucket
+
+    def window(self, seconds: float, now: float) -> List[ActivityBucket]:
+        """Live buckets overlapping the last `seconds`"""
+        newest = int(now // self.width)
+        oldest = int((now - seconds) // self.width)
+        return [b for b in self.buckets if oldest <= b.epoch <= newest]
+
+
+class UserActivityProfile:
+    """Constant-size per-user activity summary"""
+    __slots__ = ("total", "commands", "recent", "hours", "day_epochs", "day_counts",
+                 "session_start", "last_seen", "sessions", "session_total")
+
+    def __init__(self, now: float):
+        self.total = 0
+        self.commands: Counter = Counter()
+        self.recent: deque = deque(maxlen=20)
+        self.hours = [0] * 24
+        self.day_epochs = [-1] * 7
+        self.day_counts = [0] * 7
+        self.session_start = now
+        self.last_seen = now
+        self.sessions = 0
+        self.session_total = 0.0
+
+    def record(self, command: str, now: float):
+        if now - self.last_seen > SESSION_GAP:
+            self.sessions += 1
+            self.session_total += self.last_seen - self.session_start
+            self.session_start = now
+        self.last_seen = now
+
+        self.total += 1
+        self.commands[command] += 1
+        self.recent.append(command)
+        self.hours[datetime.fromtimestamp(now).hour] += 1
+
+        day = int(now // DAY)
+        slot = day % 7
+        if self.day_epochs[slot] != day:
+            self.day_epochs[slot] = day
+            self.day_counts[slot] = 0
+        self.day_counts[slot] += 1
+
+    def count_since(self, days: int, now: float) -> int:
+        """Commands in the current day and the `days - 1` before it"""
+        today = int(now // DAY)
+        return sum(count for epoch, count in zip(self.day_epochs, self.day_counts) if today - days < epoch <= today)
+
+    def avg_session_length(self) -> float:
+        if self.total < 2:
+            return 0.0
+        return (self.session_total + self.last_seen - self.session_start) / (self.sessions + 1)
+
+    def most_active_hours(self, top: int = 3) -> List[int]:
+        return sorted((h for h in range(24) if self.hours[h]), key=lambda h: self.hours[h], reverse=True)[:top]
+
+
+class ActivityStore:
+    """Bounded command analytics: minute/hour rings plus an LRU of user profiles"""
+
+    def __init__(self, hours: int = 168, max_profiles: int = 10000):
+        self.minutes = BucketRing(MINUTE, 60)
+        self.hourly = BucketRing(HOUR, hours)
+        self.profiles: "OrderedDict[int, UserActivityProfile]" = OrderedDict()
+        self.max_profiles = max_profiles
+        self.pending: Counter = Counter()
+        self.pending_durations: Dict[Tuple[int, str, Optional[int]], float] = {}
+        self.last_rollup_minute = int(time.time() // MINUTE)
+
+    def record(self, command: str, user_id: int, guild_id: Optional[int] = None,
+               execution_time: Optional[float] = None, now: Optional[float] = None):
+        """Count one command invocation in O(1)"""
+        now = now or time.time()
+        key = (command, guild_id)
+        bit = _user_bit(user_id)
+        for ring in (self.minutes, self.hourly):
+            bucket = ring.bucket_for(now)
+            bucket.counts[key] += 1
+            bucket.users |= bit
+            if execution_time is not None:
+                bucket.durations[key] = bucket.durations.get(key, 0.0) + execution_time
+
+        # Counters waiting to be rolled up to the database
+        pending_key = (int(now // HOUR) * HOUR, command, guild_id)
+        self.pending[pending_key] += 1
+        if execution_time is not None:
+            self.pending_durations[pending_key] = self.pending_durations.get(pending_key, 0.0) + execution_time
+
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            profile = UserActivityProfile(now)
+            self.profiles[user_id] = profile
+            if len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+        else:
+            self.profiles.move_to_end(user_id)
+        profile.record(command, now)
+
+    # ==================== ROLLUPS ====================
+
+    def rollup_due(self, now: Optional[float] = None) -> bool:
+        """True once per minute while there are counters to persist (claims that minute)"""
+        minute = int((now or time.time()) // MINUTE)
+        if not self.pending or minute == self.last_rollup_minute:
+            return False
+        self.last_rollup_minute = minute
+        return True
+
+    def drain_pending(self) -> List[Dict[str, Any]]:
+        """Take the counters accumulated since the last rollup"""
+        rows = [
+            {
+                "hour": hour,
+                "command": command,
+                "guild_id": guild_id,
+                "count": count,
+                "total_time": self.pending_durations.get((hour, command, guild_id), 0.0)
+            }
+            for (hour, command, guild_id), count in self.pending.items()
+        ]
+        self.pending.clear()
+        self.pending_durations.clear()
+        return rows
+
+    def restore_pending(self, rows: List[Dict[str, Any]]):
+        """Put rows back after a failed rollup so they are retried"""
+        for row in rows:
+            key = (row["hour"], row["command"], row["guild_id"])
+            self.pending[key] += row["count"]
+            if row["total_time"]:
+                self.pending_durations[key] = self.pending_durations.get(key, 0.0) + row["total_time"]
+
+    # ==================== QUERIES ====================
+
+    def _window(self, seconds: float, now: Optional[float]) -> List[ActivityBucket]:
+        now = now or time.time()
+        ring = self.minutes if seconds <= HOUR else self.hourly
+        return ring.window(seconds, now)
+
+    def command_counts(self, seconds: float, guild_id: Optional[int] = None, now: Optional[float] = None) -> Counter:
+        """Per-command totals over the window, optionally for one guild"""
+        totals: Counter = Counter()
+        for bucket in self._window(seconds, now):
+            for (command, bucket_guild), count in bucket.counts.items():
+                if guild_id is None or bucket_guild == guild_id:
+                    totals[command] += count
+        return totals
+
+    def total_commands(self, seconds: float, guild_id: Optional[int] = None, now: Optional[float] = None) -> int:
+        return sum(self.command_counts(seconds, guild_id, now).values())
+
+    def unique_users(self, seconds: float, now: Optional[float] = None) -> int:
+        """Estimated distinct users over the window"""
+        bitmap = 0
+        for bucket in self._window(seconds, now):
+            bitmap |= bucket.users
+        return estimate_unique(bitmap)
+
+    def peak_hours(self, seconds: float = DAY, top: int = 3, now: Optional[float] = None) -> List[int]:
+        """Hours of day with the most commands over the window"""
+        hours: Counter = Counter()
+        for bucket in self.hourly.window(seconds, now or time.time()):
+            hours[datetime.fromtimestamp(bucket.epoch * HOUR).hour] += sum(bucket.counts.values())
+        return [hour for hour, _ in hours.most_common(top)]
+
+    def average_duration(self, seconds: float, now: Optional[float] = None) -> float:
+        """Average recorded execution time over the window"""
+        total_time = 0.0
+        timed = 0
+        for bucket in self._window(seconds, now):
+            for key, duration in bucket.durations.items():
+                total_time += duration
+                timed += bucket.counts[key]
+        return total_time / timed if timed else 0.0
+
+    def get_profile(self, user_id: int) -> Optional[UserActivityProfile]:
+        return self.profiles.get(user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Memory footprint indicators"""
+        return {
+            "profiles": len(self.profiles),
+            "hourly_keys": sum(len(b.counts) for b in self.hourly.buckets),
+            "pending_rollup_rows": len(self.pending)
+        }
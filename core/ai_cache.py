@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model: str, context: str, prompt: str) -> str:
+    """Content address of a model request"""
+    digest = hashlib.sha256()
+    for part in (model, context, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """TTL + LRU cache of model responses with single-flight request coalescing"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evicted": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.time() > expires:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.entries[key] = (time.time() + (ttl or self.ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             should_cache: Callable[[Any], bool] = lambda value: True,
+                             ttl: Optional[float] = None) -> Any:
+        """Return a cached value, join an identical in-flight call, or compute it once"""
+        value = self.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await compute()
+            if should_cache(value):
+                self.put(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters receive the exception; mark it retrieved for the no-waiter case
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            "size": len(self.entries),
+            "inflight": len(self.inflight),
+            **self.stats,
+            "hit_ratio": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        }
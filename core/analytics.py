@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import logging
 from .database import get_db_manager
+from .ledger import ledger_timestamp
+from .activity import ActivityStore, DAY
+from .histogram import get_latency_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -13,39 +16,46 @@ class BotAnalytics:
     
     def __init__(self):
         self.command_usage = defaultdict(int)
-        self.user_activity = defaultdict(list)
+        self.activity = ActivityStore()
         self.error_tracking = []
-        self.performance_metrics = []
+        self.latency = get_latency_tracker()
+        self.performance_outcomes = Counter()
         self.engagement_data = defaultdict(dict)
+        self.rollup_task: Optional[asyncio.Task] = None
         
     async def track_command_usage(self, command: str, user_id: int, guild_id: int = None, execution_time: float = None):
         """Track detailed command usage statistics"""
         try:
-            db_manager = get_db_manager()
-            if db_manager:
-                await db_manager.track_command_usage(command, user_id, guild_id)
-            
             # In-memory tracking for real-time analytics
             self.command_usage[command] += 1
+            self.activity.record(command, user_id, guild_id, execution_time)
             
-            # Track user activity patterns
-            self.user_activity[user_id].append({
-                "command": command,
-                "timestamp": time.time(),
-                "guild_id": guild_id,
-                "execution_time": execution_time
-            })
-            
-            # Clean old activity data (keep last 7 days)
-            cutoff_time = time.time() - 604800  # 7 days
-            self.user_activity[user_id] = [
-                activity for activity in self.user_activity[user_id]
-                if activity["timestamp"] > cutoff_time
-            ]
+            # Persist pre-aggregated counters at most once a minute
+            if self.activity.rollup_due() and (self.rollup_task is None or self.rollup_task.done()):
+                self.rollup_task = asyncio.create_task(self.rollup_activity())
             
         except Exception as e:
             logger.error(f"Error tracking command usage: {e}")
     
+    async def flush_activity(self):
+        """Finish any rollup in flight, then write whatever is still pending (periodic and on shutdown)"""
+        if self.rollup_task is not None and not self.rollup_task.done():
+            await self.rollup_task
+        await self.rollup_activity()
+    
+    async def rollup_activity(self):
+        """Write pending hourly command counters to the database"""
+        rows = self.activity.drain_pending()
+        if not rows:
+            return
+        
+        db_manager = get_db_manager()
+        if not db_manager:
+            return
+        
+        if not await db_manager.rollup_command_usage(rows):
+            self.activity.restore_pending(rows)
+    
     async def track_error(self, error_type: str, command: str, user_id: int, error_details: str):
         """Track errors for analysis and improvement"""
         error_data = {
@@ -73,18 +83,8 @@ class BotAnalytics:
     
     async def track_performance(self, operation: str, duration: float, success: bool):
         """Track performance metrics"""
-        metric = {
-            "operation": operation,
-            "duration": duration,
-            "success": success,
-            "timestamp": time.time()
-        }
-        
-        self.performance_metrics.append(metric)
-        
-        # Keep only last 10000 metrics
-        if len(self.performance_metrics) > 10000:
-            self.performance_metrics = self.performance_metrics[-10000:]
+        self.latency.record("operation", operation, duration)
+        self.performance_outcomes["success" if success else "failure"] += 1
     
     async def get_user_insights(self, user_id: int) -> Dict[str, Any]:
         """Generate personalized insights for a user"""
@@ -94,25 +94,16 @@ class BotAnalytics:
                 return {}
             
             user_data = await db_manager.get_user_data_cached(user_id)
-            user_activities = self.user_activity.get(user_id, [])
-            
-            # Calculate activity patterns
-            recent_activities = [
-                act for act in user_activities
-                if time.time() - act["timestamp"] < 86400  # Last 24 hours
-            ]
-            
-            command_frequency = Counter(act["command"] for act in recent_activities)
-            avg_session_length = self._calculate_avg_session_length(user_activities)
-            most_active_hours = self._get_most_active_hours(user_activities)
+            profile = self.activity.get_profile(user_id)
+            now = time.time()
             
             insights = {
                 "user_id": user_id,
-                "total_commands": len(user_activities),
-                "commands_today": len(recent_activities),
-                "favorite_commands": dict(command_frequency.most_common(5)),
-                "avg_session_length_minutes": round(avg_session_length / 60, 2),
-                "most_active_hours": most_active_hours,
+                "total_commands": profile.total if profile else 0,
+                "commands_today": profile.count_since(1, now) if profile else 0,
+                "favorite_commands": dict(profile.commands.most_common(5)) if profile else {},
+                "avg_session_length_minutes": round(profile.avg_session_length() / 60, 2) if profile else 0,
+                "most_active_hours": profile.most_active_hours() if profile else [],
                 "engagement_level": self._calculate_engagement_level(user_id),
                 "achievements_unlocked": len(user_data.get("achievements", [])),
                 "economic_activity": {
@@ -140,15 +131,8 @@ class BotAnalytics:
             
             server_stats = await db_manager.get_server_stats()
             
-            # Calculate real-time metrics
-            current_time = time.time()
-            recent_activity = []
-            
-            for user_activities in self.user_activity.values():
-                recent_activity.extend([
-                    act for act in user_activities
-                    if current_time - act["timestamp"] < 86400
-                ])
+            # Real-time metrics come from the pre-aggregated buckets
+            recent_commands = self.activity.command_counts(DAY, guild_id)
             
             insights = {
                 "timestamp": datetime.now().isoformat(),
@@ -165,15 +149,16 @@ class BotAnalytics:
                     "economic_activity_score": await self._calculate_economic_activity()
                 },
                 "command_analytics": {
-                    "total_commands_24h": len(recent_activity),
-                    "most_popular_commands": dict(Counter(act["command"] for act in recent_activity).most_common(10)),
+                    "total_commands_24h": sum(recent_commands.values()),
+                    "most_popular_commands": dict(recent_commands.most_common(10)),
                     "command_success_rate": await self._calculate_command_success_rate(),
-                    "average_response_time": self._calculate_avg_response_time()
+                    "average_response_time": self._calculate_avg_response_time(),
+                    "latency_percentiles": self.latency.summary("command", top=10)
                 },
                 "engagement_metrics": {
-                    "daily_active_users": len(set(act["user_id"] for act in recent_activity if "user_id" in act)),
+                    "daily_active_users": self.activity.unique_users(DAY),
                     "average_session_length": self._calculate_global_avg_session_length(),
-                    "peak_activity_hours": self._get_peak_activity_hours(recent_activity),
+                    "peak_activity_hours": self.activity.peak_hours(DAY),
                     "user_engagement_score": await self._calculate_global_engagement_score()
                 },
                 "error_analysis": {
@@ -184,6 +169,8 @@ class BotAnalytics:
                 },
                 "performance_metrics": {
                     "average_response_time": self._calculate_avg_response_time(),
+                    "response_time_percentiles": self.latency.combined("operation").summary(),
+                    "database_latency": self.latency.combined("db").summary(),
                     "success_rate": self._calculate_overall_success_rate(),
                     "database_performance": await self._get_database_performance(),
                     "system_health_score": await self._calculate_system_health_score()
@@ -256,48 +243,10 @@ class BotAnalytics:
             logger.error(f"Error generating recommendations: {e}")
             return []
     
-    def _calculate_avg_session_length(self, activities: List[Dict[str, Any]]) -> float:
-        """Calculate average session length for a user"""
-        if len(activities) < 2:
-            return 0
-        
-        sessions = []
-        current_session_start = activities[0]["timestamp"]
-        last_activity = activities[0]["timestamp"]
-        
-        for activity in activities[1:]:
-            time_gap = activity["timestamp"] - last_activity
-            
-            if time_gap > 1800:  # 30 minutes gap = new session
-                sessions.append(last_activity - current_session_start)
-                current_session_start = activity["timestamp"]
-            
-            last_activity = activity["timestamp"]
-        
-        # Add final session
-        sessions.append(last_activity - current_session_start)
-        
-        return sum(sessions) / len(sessions) if sessions else 0
-    
-    def _get_most_active_hours(self, activities: List[Dict[str, Any]]) -> List[int]:
-        """Get the most active hours for a user"""
-        hour_counts = defaultdict(int)
-        
-        for activity in activities:
-            hour = datetime.fromtimestamp(activity["timestamp"]).hour
-            hour_counts[hour] += 1
-        
-        return sorted(hour_counts.keys(), key=lambda x: hour_counts[x], reverse=True)[:3]
-    
     def _calculate_engagement_level(self, user_id: int) -> str:
         """Calculate user engagement level"""
-        activities = self.user_activity.get(user_id, [])
-        recent_activities = [
-            act for act in activities
-            if time.time() - act["timestamp"] < 604800  # Last week
-        ]
-        
-        activity_count = len(recent_activities)
+        profile = self.activity.get_profile(user_id)
+        activity_count = profile.count_since(7, time.time()) if profile else 0  # Last week
         
         if activity_count >= 50:
             return "very_high"
@@ -349,8 +298,8 @@ class BotAnalytics:
         if len(user_data.get("achievements", [])) < 5:
             suggestions.append("🏆 Try different commands to unlock achievements!")
         
-        activities = self.user_activity.get(user_id, [])
-        recent_commands = set(act["command"] for act in activities[-20:])
+        profile = self.activity.get_profile(user_id)
+        recent_commands = set(profile.recent) if profile else set()
         
         if "trivia" not in recent_commands:
             suggestions.append("🧠 Test your knowledge with the trivia game!")
@@ -408,7 +357,7 @@ class BotAnalytics:
                 return 0.0
             
             # Count transactions in last 24 hours
-            yesterday = datetime.now() - timedelta(days=1)
+            yesterday = ledger_timestamp() - timedelta(days=1)
             transaction_count = await db_manager.db.transactions.count_documents({
                 "timestamp": {"$gte": yesterday}
             })
@@ -425,49 +374,28 @@ class BotAnalytics:
     
     async def _calculate_command_success_rate(self) -> float:
         """Calculate overall command success rate"""
-        if not self.performance_metrics:
-            return 1.0
-        
-        successful = sum(1 for metric in self.performance_metrics if metric["success"])
-        total = len(self.performance_metrics)
-        
-        return successful / total if total > 0 else 1.0
+        total = sum(self.performance_outcomes.values())
+        return self.performance_outcomes["success"] / total if total > 0 else 1.0
     
     def _calculate_avg_response_time(self) -> float:
         """Calculate average response time"""
-        if not self.performance_metrics:
-            return 0.0
-        
-        total_time = sum(metric["duration"] for metric in self.performance_metrics)
-        return total_time / len(self.performance_metrics)
+        return self.latency.combined("operation").mean
     
     def _calculate_global_avg_session_length(self) -> float:
-        """Calculate global average session length"""
-        all_session_lengths = []
-        
-        for user_activities in self.user_activity.values():
-            session_length = self._calculate_avg_session_length(user_activities)
-            if session_length > 0:
-                all_session_lengths.append(session_length)
+        """Calculate global average session length over tracked user profiles"""
+        all_session_lengths = [
+            length for length in (profile.avg_session_length() for profile in self.activity.profiles.values())
+            if length > 0
+        ]
         
         return sum(all_session_lengths) / len(all_session_lengths) if all_session_lengths else 0
     
-    def _get_peak_activity_hours(self, activities: List[Dict[str, Any]]) -> List[int]:
-        """Get peak activity hours globally"""
-        hour_counts = defaultdict(int)
-        
-        for activity in activities:
-            hour = datetime.fromtimestamp(activity["timestamp"]).hour
-            hour_counts[hour] += 1
-        
-        return sorted(hour_counts.keys(), key=lambda x: hour_counts[x], reverse=True)[:3]
-    
     async def _calculate_global_engagement_score(self) -> float:
         """Calculate global user engagement score"""
-        if not self.user_activity:
+        if not self.activity.profiles:
             return 0.0
         
-        engagement_levels = [self._calculate_engagement_level(user_id) for user_id in self.user_activity.keys()]
+        engagement_levels = [self._calculate_engagement_level(user_id) for user_id in self.activity.profiles.keys()]
         
         score_map = {
             "very_high": 1.0,
@@ -487,13 +415,8 @@ class BotAnalytics:
     
     def _calculate_error_rate(self) -> float:
         """Calculate current error rate"""
-        if not self.performance_metrics:
-            return 0.0
-        
-        errors = sum(1 for metric in self.performance_metrics if not metric["success"])
-        total = len(self.performance_metrics)
-        
-        return errors / total if total > 0 else 0.0
+        total = sum(self.performance_outcomes.values())
+        return self.performance_outcomes["failure"] / total if total > 0 else 0.0
     
     async def _identify_critical_issues(self) -> List[str]:
         """Identify critical issues that need immediate attention"""
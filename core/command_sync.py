@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Above this many changed commands a single bulk overwrite is cheaper than per-command upserts
+MAX_INCREMENTAL_CHANGES = 5
+STATE_FILE = os.getenv('COMMAND_SYNC_STATE_FILE', '.command_sync.json')
+
+
+def _hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def serialize_tree(tree: discord.app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> Dict[str, Dict[str, Any]]:
+    """Sync payload of every command in a scope, keyed by (type, name)"""
+    payloads = {}
+    for command in tree.get_commands(guild=guild):
+        payload = command.to_dict(tree)
+        payloads[f"{payload.get('type', 1)}:{payload['name']}"] = payload
+    return payloads
+
+
+class CommandSyncState:
+    """Last synced command hashes per scope, in MongoDB when available, else a JSON file"""
+
+    def __init__(self, collection=None, path: str = STATE_FILE):
+        self.collection = collection
+        self.path = path
+
+    def load(self, scope: str) -> Optional[Dict[str, Any]]:
+        try:
+            if self.collection is not None:
+                return self.collection.find_one({"_id": f"command_sync:{scope}"})
+            if os.path.exists(self.path):
+                with open(self.path) as state_file:
+                    return json.load(state_file).get(scope)
+        except Exception as e:
+            logger.error(f"Error loading command sync state: {e}")
+        return None
+
+    def save(self, scope: str, state: Dict[str, Any]):
+        try:
+            if self.collection is not None:
+                self.collection.replace_one({"_id": f"command_sync:{scope}"}, state, upsert=True)
+                return
+            states = {}
+            if os.path.exists(self.path):
+                with open(self.path) as state_file:
+                    states = json.load(state_file)
+            states[scope] = state
+            with open(self.path, "w") as state_file:
+                json.dump(states, state_file, indent=2, default=str)
+        except Exception as e:
+            logger.error(f"Error saving command sync state: {e}")
+
+
+class CommandSyncer:
+    """Syncs the app command tree only when its serialised hash changes"""
+
+    def __init__(self, bot: discord.Client, state: Optional[CommandSyncState] = None):
+        self.bot = bot
+        self.state = state or CommandSyncState()
+
+    async def sync(self, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> Dict[str, Any]:
+        """Skip, upsert changed commands, or bulk overwrite; returns what was done"""
+        tree = self.bot.tree
+        scope = str(guild.id) if guild else "global"
+        payloads = serialize_tree(tree, guild)
+        hashes = {key: _hash(payload) for key, payload in payloads.items()}
+        tree_hash = _hash(hashes)
+
+        previous = None if force else self.state.load(scope)
+        result = {"scope": scope, "hash": tree_hash[:12], "commands": len(payloads), "changed": [], "removed": []}
+
+        if previous and previous.get("hash") == tree_hash:
+            result["action"] = "skipped"
+            return result
+
+        old_hashes = previous.get("commands", {}) if previous else {}
+        changed = [key for key, value in hashes.items() if old_hashes.get(key) != value]
+        removed = [key for key in old_hashes if key not in hashes]
+        result["changed"] = [key.split(":", 1)[1] for key in changed]
+        result["removed"] = [key.split(":", 1)[1] for key in removed]
+
+        if previous and len(changed) + len(removed) <= MAX_INCREMENTAL_CHANGES:
+            await self._sync_incremental(guild, [payloads[key] for key in changed], removed)
+            result["action"] = "incremental"
+        else:
+            await tree.sync(guild=guild)
+            result["action"] = "full"
+
+        self.state.save(scope, {"hash": tree_hash, "commands": hashes, "synced_at": datetime.utcnow()})
+        return result
+
+    async def _sync_incremental(self, guild: Optional[discord.abc.Snowflake], changed: List[Dict[str, Any]], removed: List[str]):
+        """Upsert changed commands and delete removed ones individually"""
+        http = self.bot.http
+        application_id = self.bot.application_id
+        for payload in changed:
+            if guild is None:
+                await http.upsert_global_command(application_id, payload)
+            else:
+                await http.upsert_guild_command(application_id, guild.id, payload)
+
+        if removed:
+            remote = {f"{command.type.value}:{command.name}": command for command in await self.bot.tree.fetch_commands(guild=guild)}
+            for key in removed:
+                command = remote.get(key)
+                if command is None:
+                    continue
+                if guild is None:
+                    await http.delete_global_command(application_id, command.id)
+                else:
+                    await http.delete_guild_command(application_id, guild.id, command.id)
@@ -0,0 +1,263 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import ConnectionFailure
+
+logger = logging.getLogger(__name__)
+
+
+class PoolConfig:
+    """MongoClient pool and timeout settings (MONGODB_* environment overrides)"""
+
+    def __init__(self, max_pool_size: int = 50, min_pool_size: int = 5, max_idle_ms: int = 300000,
+                 wait_queue_timeout_ms: int = 5000, server_selection_timeout_ms: int = 3000,
+                 heartbeat_ms: int = 5000, connect_timeout_ms: int = 5000, socket_timeout_ms: int = 10000):
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.max_idle_ms = max_idle_ms
+        self.wait_queue_timeout_ms = wait_queue_timeout_ms
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.connect_timeout_ms = connect_timeout_ms
+        self.socket_timeout_ms = socket_timeout_ms
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        def env(name: str, default: int) -> int:
+            return int(os.getenv(name, default))
+
+        return cls(
+            max_pool_size=env('MONGODB_MAX_POOL_SIZE', 50),
+            min_pool_size=env('MONGODB_MIN_POOL_SIZE', 5),
+            max_idle_ms=env('MONGODB_MAX_IDLE_MS', 300000),
+            wait_queue_timeout_ms=env('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 5000),
+            server_selection_timeout_ms=env('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 3000),
+            heartbeat_ms=env('MONGODB_HEARTBEAT_MS', 5000),
+        )
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "heartbeatFrequencyMS": self.heartbeat_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "retryWrites": True,
+            "retryReads": True,
+        }
+
+
+class CircuitBreaker:
+    """Stops sending requests to MongoDB after repeated connection failures
+
+    closed    - requests flow normally
+    open      - requests are short-circuited (writes buffered, reads served from defaults)
+    half_open - reset_timeout has passed; the next request probes the server
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.stats = {"trips": 0, "recoveries": 0, "failures": 0, "short_circuited": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            self.stats["short_circuited"] += 1
+            return False
+        return True
+
+    def trip(self):
+        with self.lock:
+            if self.opened_at is None:
+                self.stats["trips"] += 1
+                logger.warning("⚡ MongoDB circuit open - buffering writes until it recovers")
+            self.opened_at = time.monotonic()
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.stats["failures"] += 1
+            should_trip = self.opened_at is not None or self.failures >= self.failure_threshold
+        if should_trip:
+            self.trip()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.opened_at is None:
+                return
+            self.opened_at = None
+            self.stats["recoveries"] += 1
+        logger.info("✅ MongoDB circuit closed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, **self.stats}
+
+
+class WriteAheadBuffer:
+    """Ordered update_one calls that could not reach MongoDB, replayed on reconnect
+
+    Entries are appended to a JSON-lines file as they are queued, so writes accepted
+    during an outage survive a restart too. Writes the server rejects on replay go to
+    a dead-letter file so they can be inspected without holding up the rest.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 50000, dead_letter_path: Optional[str] = None):
+        self.path = path
+        self.dead_letter_path = dead_letter_path
+        self.max_size = max_size
+        self.entries = deque()
+        self.lock = threading.Lock()
+        self.stats = {"queued": 0, "replayed": 0, "dropped": 0, "dead_lettered": 0}
+        if path and os.path.exists(path):
+            with open(path) as handle:
+                self.entries.extend(json_util.loads(line) for line in handle if line.strip())
+            if self.entries:
+                logger.info(f"📼 {len(self.entries)} buffered MongoDB writes pending from a previous run")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, collection: str, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        entry = {"collection": collection, "filter": query, "update": update, "upsert": upsert}
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                self.stats["dropped"] += 1
+                logger.error(f"❌ Write buffer full ({self.max_size}) - dropping {collection} write")
+                return
+            self.entries.append(entry)
+            self.stats["queued"] += 1
+            if self.path:
+                with open(self.path, "a") as handle:
+                    handle.write(json_util.dumps(entry) + "\n")
+
+    def _rewrite(self):
+        if not self.path:
+            return
+        if not self.entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        with open(self.path, "w") as handle:
+            handle.writelines(json_util.dumps(entry) + "\n" for entry in self.entries)
+
+    def _dead_letter(self, entry: Dict[str, Any], error: Exception):
+        self.stats["dead_lettered"] += 1
+        logger.error(f"❌ Buffered {entry['collection']} write rejected on replay, moved to dead letters: {error}")
+        if self.dead_letter_path:
+            with open(self.dead_letter_path, "a") as handle:
+                handle.write(json_util.dumps({**entry, "error": str(error), "failed_at": time.time()}) + "\n")
+
+    def replay(self, database) -> int:
+        """Apply queued writes in order; stops (keeping the rest) at the first connection failure
+
+        Any other error would fail the same way on every retry and block the queue,
+        so that write is dead-lettered and replay moves on.
+        """
+        replayed = 0
+        try:
+            while self.entries:
+                entry = self.entries[0]
+                try:
+                    database[entry["collection"]].update_one(entry["filter"], entry["update"], upsert=entry["upsert"])
+                except ConnectionFailure:
+                    raise
+                except Exception as e:
+                    self._dead_letter(entry, e)
+                else:
+                    replayed += 1
+                with self.lock:
+                    self.entries.popleft()
+        finally:
+            with self.lock:
+                self.stats["replayed"] += replayed
+                self._rewrite()
+        return replayed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"buffered": len(self.entries), **self.stats}
+
+
+class TopologyMonitor(monitoring.TopologyListener):
+    """Calls back when the deployment gains or loses a writable server"""
+
+    def __init__(self, on_up: Callable[[], None], on_down: Callable[[], None]):
+        self.on_up = on_up
+        self.on_down = on_down
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        writable = event.new_description.has_writable_server()
+        if writable != event.previous_description.has_writable_server():
+            (self.on_up if writable else self.on_down)()
+
+    def closed(self, event):
+        pass
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool gauges for tuning maxPoolSize / waitQueueTimeoutMS"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.stats = {"peak_checked_out": 0, "created": 0, "closed": 0, "checkout_failures": 0,
+                      "checkout_timeouts": 0, "pool_clears": 0}
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.stats["pool_clears"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.stats["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.stats["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.stats["checkout_failures"] += 1
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self.stats["checkout_timeouts"] += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+        self.stats["peak_checked_out"] = max(self.stats["peak_checked_out"], self.checked_out)
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"checked_out": self.checked_out, **self.stats}
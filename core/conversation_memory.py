@@ -0,0 +1,275 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+# Transcripts older than this are dropped from MongoDB by a TTL index
+PERSIST_TTL_SECONDS = 30 * 86400
+
+# Transcripts the AI commands used to keep on the user document (["You: ...", "Sensei: ...", ...]),
+# imported into the conversation collection the first time each conversation is loaded
+LEGACY_FIELDS = {"sensei": "sensei_conversation", "nephew": "bleky_nephew_conversation"}
+# Where those fields may still live (before and after the cold field split), and their id field
+LEGACY_COLLECTIONS = (("user_ai", "_id"), ("users", "user_id"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def legacy_turns(lines: List[str]) -> List[Tuple[str, str]]:
+    """(user_message, ai_response) pairs from a legacy "You: ..." / "<Name>: ..." transcript"""
+    turns = []
+    for question, answer in zip(lines, lines[1:]):
+        if (isinstance(question, str) and isinstance(answer, str)
+                and question.startswith("You: ") and not answer.startswith("You: ") and ": " in answer):
+            turns.append((question[len("You: "):], answer.split(": ", 1)[1]))
+    return turns
+
+
+class Conversation:
+    """Turns of one user/context conversation kept within a token budget"""
+    __slots__ = ("turns", "tokens", "last_active", "summary", "overflow")
+
+    def __init__(self):
+        self.turns: deque = deque()
+        self.tokens = 0
+        self.last_active = time.time()
+        self.summary = ""
+        self.overflow: List[Dict[str, Any]] = []
+
+    def add(self, turn: Dict[str, Any]):
+        self.turns.append(turn)
+        self.tokens += turn["tokens"]
+        self.last_active = time.time()
+
+    def trim(self, max_tokens: int, max_turns: int) -> List[Dict[str, Any]]:
+        """Drop the oldest turns until the conversation fits its budget"""
+        dropped = []
+        while self.turns and (self.tokens > max_tokens or len(self.turns) > max_turns):
+            turn = self.turns.popleft()
+            self.tokens -= turn["tokens"]
+            dropped.append(turn)
+        return dropped
+
+
+class ConversationMemory:
+    """LRU + TTL conversation store with append-only persistence"""
+
+    def __init__(self, max_conversations: int = 5000, ttl: float = 86400, max_tokens: int = 2000,
+                 max_turns: int = 20):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.collection = None
+        self.stats = {"evicted_lru": 0, "evicted_ttl": 0, "loaded": 0, "persisted": 0, "persist_failed": 0,
+                      "legacy_imported": 0}
+
+    @staticmethod
+    def key(user_id: int, context: str) -> str:
+        return f"{user_id}_{context}"
+
+    def attach_collection(self, collection):
+        """Persist turns to a (synchronous pymongo) collection"""
+        self.collection = collection
+        try:
+            collection.create_index([("conversation", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)],
+                                    name="conversation_timestamp", background=True)
+            collection.create_index("timestamp", name="timestamp_ttl",
+                                    expireAfterSeconds=PERSIST_TTL_SECONDS, background=True)
+        except Exception as e:
+            logger.error(f"Error creating conversation indexes: {e}")
+
+    # ==================== READS ====================
+
+    def _get_live(self, key: str) -> Optional[Conversation]:
+        conversation = self.conversations.get(key)
+        if conversation is None:
+            return None
+        if time.time() - conversation.last_active > self.ttl:
+            del self.conversations[key]
+            self.stats["evicted_ttl"] += 1
+            return None
+        self.conversations.move_to_end(key)
+        return conversation
+
+    async def get_history(self, user_id: int, context: str) -> List[Dict[str, Any]]:
+        """Turns for a conversation, oldest first, restoring from storage on a miss"""
+        key = self.key(user_id, context)
+        conversation = self._get_live(key)
+        if conversation is None and self.collection is not None:
+            conversation = await self._load(key, user_id, context)
+        return list(conversation.turns) if conversation else []
+
+    def _find(self, key: str) -> List[Dict[str, Any]]:
+        return list(self.collection.find({"conversation": key}, {"_id": 0})
+                    .sort("timestamp", pymongo.DESCENDING).limit(self.max_turns))
+
+    def _import_legacy(self, key: str, user_id: int, context: str) -> List[Dict[str, Any]]:
+        """Move a transcript stored on the user document into the collection (newest first, like _find)"""
+        field = LEGACY_FIELDS.get(context)
+        if field is None:
+            return []
+        database = self.collection.database
+        for name, id_field in LEGACY_COLLECTIONS:
+            document = database[name].find_one({id_field: user_id, field: {"$exists": True}}, {field: 1})
+            if document is not None:
+                break
+        else:
+            return []
+        turns = legacy_turns(document[field] or [])
+        # Only the order of the old turns is known; space them a millisecond apart ending now
+        now = datetime.now(timezone.utc)
+        documents = [{"conversation": key, "user_id": user_id, "context": context,
+                      "user_message": question, "ai_response": answer,
+                      "timestamp": now - timedelta(milliseconds=len(turns) - i),
+                      "tokens": estimate_tokens(question) + estimate_tokens(answer)}
+                     for i, (question, answer) in enumerate(turns)]
+        if documents:
+            self.collection.insert_many(documents)
+        database[name].update_one({id_field: user_id}, {"$unset": {field: ""}})
+        self.stats["legacy_imported"] += len(documents)
+        logger.info(f"📥 Imported {len(documents)} legacy {context} turns for {user_id}")
+        return list(reversed(documents))[:self.max_turns]
+
+    async def _load(self, key: str, user_id: int, context: str) -> Optional[Conversation]:
+        try:
+            documents = await asyncio.to_thread(self._find, key)
+            if not documents:
+                documents = await asyncio.to_thread(self._import_legacy, key, user_id, context)
+        except Exception as e:
+            logger.error(f"Error loading conversation {key}: {e}")
+            return None
+        if not documents:
+            return None
+
+        # Another coroutine may have started this conversation while we were loading
+        conversation = self.conversations.get(key) or Conversation()
+        if not conversation.turns:
+            for document in reversed(documents):
+                conversation.add({
+                    "user_message": document["user_message"],
+                    "ai_response": document["ai_response"],
+                    "timestamp": document["timestamp"].isoformat(),
+                    "tokens": document.get("tokens") or estimate_tokens(document["user_message"] + document["ai_response"])
+                })
+            conversation.trim(self.max_tokens, self.max_turns)
+        self._store(key, conversation)
+        self.stats["loaded"] += 1
+        return conversation
+
+    # ==================== WRITES ====================
+
+    def _store(self, key: str, conversation: Conversation):
+        self.conversations[key] = conversation
+        self.conversations.move_to_end(key)
+        while len(self.conversations) > self.max_conversations:
+            self.conversations.popitem(last=False)
+            self.stats["evicted_lru"] += 1
+
+    async def append(self, user_id: int, context: str, user_message: str, ai_response: str) -> bool:
+        """Add one exchange in memory and insert it as a single document
+
+        Returns True when older turns overflowed the budget and are waiting to be summarised.
+        """
+        key = self.key(user_id, context)
+        timestamp = datetime.now(timezone.utc)
+        turn = {
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "timestamp": timestamp.isoformat(),
+            "tokens": estimate_tokens(user_message) + estimate_tokens(ai_response)
+        }
+
+        conversation = self._get_live(key) or Conversation()
+        conversation.add(turn)
+        conversation.overflow.extend(conversation.trim(self.max_tokens, self.max_turns))
+        self._store(key, conversation)
+
+        if self.collection is not None:
+            document = {"conversation": key, "user_id": user_id, "context": context,
+                        **turn, "timestamp": timestamp}
+            try:
+                await asyncio.to_thread(self.collection.insert_one, document)
+                self.stats["persisted"] += 1
+            except Exception as e:
+                self.stats["persist_failed"] += 1
+                logger.error(f"Error persisting conversation turn: {e}")
+        return bool(conversation.overflow)
+
+    # ==================== SUMMARIES ====================
+
+    def get_summary(self, user_id: int, context: str) -> str:
+        conversation = self.conversations.get(self.key(user_id, context))
+        return conversation.summary if conversation else ""
+
+    def take_overflow(self, user_id: int, context: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Current summary plus the turns trimmed since it was written"""
+        conversation = self.conversations.get(self.key(user_id, context))
+        if conversation is None or not conversation.overflow:
+            return "", []
+        overflow, conversation.overflow = conversation.overflow, []
+        return conversation.summary, overflow
+
+    def set_summary(self, user_id: int, context: str, summary: str):
+        conversation = self.conversations.get(self.key(user_id, context))
+        if conversation is not None:
+            conversation.summary = summary
+
+    async def clear(self, user_id: int, context: str) -> bool:
+        """Forget a conversation in memory (on the event loop) and in storage (in a worker thread)"""
+        key = self.key(user_id, context)
+        existed = self.conversations.pop(key, None) is not None
+        if self.collection is not None:
+            try:
+                existed = await asyncio.to_thread(self._delete_stored, key, user_id, context) or existed
+            except Exception as e:
+                logger.error(f"Error clearing stored conversation {key}: {e}")
+        return existed
+
+    def _delete_stored(self, key: str, user_id: int, context: str) -> bool:
+        deleted = self.collection.delete_many({"conversation": key}).deleted_count > 0
+        field = LEGACY_FIELDS.get(context)
+        if field is not None:
+            for name, id_field in LEGACY_COLLECTIONS:
+                self.collection.database[name].update_one({id_field: user_id}, {"$unset": {field: ""}})
+        return deleted
+
+    def sweep(self) -> int:
+        """Evict every conversation idle longer than the TTL"""
+        cutoff = time.time() - self.ttl
+        expired = [key for key, conversation in self.conversations.items() if conversation.last_active < cutoff]
+        for key in expired:
+            del self.conversations[key]
+        self.stats["evicted_ttl"] += len(expired)
+        return len(expired)
+
+    # ==================== STATS ====================
+
+    def conversation_stats(self, user_id: int, context: str) -> Dict[str, Any]:
+        conversation = self._get_live(self.key(user_id, context))
+        turns = list(conversation.turns) if conversation else []
+        return {
+            "messages": len(turns),
+            "tokens": conversation.tokens if conversation else 0,
+            "last_interaction": turns[-1]["timestamp"] if turns else None,
+            "context": context
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "total_conversations": len(self.conversations),
+            "total_messages": sum(len(c.turns) for c in self.conversations.values()),
+            "total_tokens": sum(c.tokens for c in self.conversations.values()),
+            "active_users": len({key.split('_')[0] for key in self.conversations}),
+            **self.stats
+        }
@@ -1,197 +1,268 @@
-import motor.motor_asyncio
 import pymongo
-import os
 import time
 import asyncio
+import itertools
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-from functools import lru_cache
-import json
+from datetime import datetime
+from functools import wraps
 import logging
 
+from .ledger import TransactionLedger, ledger_timestamp
+from .histogram import get_latency_tracker
+from .instrumentation import measure_phase
+from .user_schema import split_user_update
+
 logger = logging.getLogger(__name__)
 
-class DatabaseManager:
-    """Enhanced database manager with connection pooling and caching"""
-    
-    def __init__(self, mongodb_uri: str):
-        self.mongodb_uri = mongodb_uri
-        self.client = None
-        self.db = None
-        self.cache = {}
-        self.cache_timestamps = {}
-        self.cache_ttl = 300  # 5 minutes cache TTL
-        self.connection_pool_size = 50
-        self.setup_connection()
-    
-    def setup_connection(self):
-        """Setup MongoDB connection with enhanced configuration"""
+# Field names from the old enhanced schema, mapped onto the shared user schema
+FIELD_ALIASES = {"bank_balance": "bank"}
+
+# Collection methods run on the shared pymongo pool in a worker thread
+ASYNC_METHODS = frozenset({
+    "find_one", "find_one_and_update", "insert_one", "insert_many", "update_one", "update_many",
+    "delete_one", "delete_many", "count_documents", "estimated_document_count", "distinct",
+    "bulk_write", "create_index", "index_information",
+})
+
+def timed_operation(func):
+    """Record how long an async storage operation takes in the shared latency histograms"""
+    name = func.__name__
+    tracker = get_latency_tracker()
+    
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
         try:
-            self.client = motor.motor_asyncio.AsyncIOMotorClient(
-                self.mongodb_uri,
-                maxPoolSize=self.connection_pool_size,
-                serverSelectionTimeoutMS=5000,
-                socketTimeoutMS=10000,
-                connectTimeoutMS=10000,
-                retryWrites=True,
-                retryReads=True,
-                w="majority",
-                readPreference="primaryPreferred"
-            )
-            self.db = self.client.coal_bot
-            logger.info("✅ Enhanced database connection established")
-        except Exception as e:
-            logger.error(f"❌ Database connection failed: {e}")
-            raise
+            with measure_phase("db"):
+                return await func(*args, **kwargs)
+        finally:
+            tracker.record("db", name, time.perf_counter() - start)
+    return wrapper
+
+class AsyncCursor:
+    """Chains sort/skip/limit and materialises a pymongo cursor in a worker thread"""
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cached data is still valid"""
-        if cache_key not in self.cache_timestamps:
-            return False
-        return time.time() - self.cache_timestamps[cache_key] < self.cache_ttl
+    def __init__(self, factory):
+        self._factory = factory
+        self._steps = []
     
-    def _set_cache(self, cache_key: str, data: Any):
-        """Set data in cache with timestamp"""
-        self.cache[cache_key] = data
-        self.cache_timestamps[cache_key] = time.time()
+    def _chain(self, name: str, *args, **kwargs) -> "AsyncCursor":
+        self._steps.append((name, args, kwargs))
+        return self
     
-    def _get_cache(self, cache_key: str) -> Optional[Any]:
-        """Get data from cache if valid"""
-        if self._is_cache_valid(cache_key):
-            return self.cache[cache_key]
-        return None
+    def sort(self, *args, **kwargs) -> "AsyncCursor":
+        return self._chain("sort", *args, **kwargs)
     
-    async def get_user_data_cached(self, user_id: int) -> Dict[str, Any]:
-        """Get user data with caching"""
-        cache_key = f"user_{user_id}"
-        
-        # Try cache first
-        cached_data = self._get_cache(cache_key)
-        if cached_data is not None:
-            return cached_data
+    def skip(self, count: int) -> "AsyncCursor":
+        return self._chain("skip", count)
+    
+    def limit(self, count: int) -> "AsyncCursor":
+        return self._chain("limit", count)
+    
+    def _materialise(self, length: Optional[int]) -> List[Dict[str, Any]]:
+        cursor = self._factory()
+        for name, args, kwargs in self._steps:
+            cursor = getattr(cursor, name)(*args, **kwargs)
+        return list(cursor if length is None else itertools.islice(cursor, length))
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._materialise, length)
+
+class AsyncCollection:
+    """Motor-style awaitable view of a pymongo collection"""
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    def find(self, *args, **kwargs) -> AsyncCursor:
+        return AsyncCursor(lambda: self.collection.find(*args, **kwargs))
+    
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> AsyncCursor:
+        return AsyncCursor(lambda: self.collection.aggregate(pipeline, **kwargs))
+    
+    def __getattr__(self, name: str):
+        if name not in ASYNC_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.collection, name)
         
-        # Fetch from database
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+class AsyncDatabase:
+    """Motor-style awaitable view of a pymongo database"""
+    
+    def __init__(self, database):
+        self.database = database
+    
+    def __getattr__(self, name: str) -> AsyncCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return AsyncCollection(self.database[name])
+    
+    def __getitem__(self, name: str) -> AsyncCollection:
+        return AsyncCollection(self.database[name])
+    
+    async def command(self, *args, **kwargs):
+        return await asyncio.to_thread(self.database.command, *args, **kwargs)
+
+class DatabaseManager:
+    """Async adapter over the shared user repository (the root `database.DatabaseManager`)
+    
+    Reads and writes go through the repository's connection pool, schema and view cache,
+    so the enhanced cogs and analytics see exactly what the rest of the bot sees.
+    """
+    
+    def __init__(self, repository):
+        self.repository = repository
+        self.db = AsyncDatabase(repository.mongodb_db)
+        self.ledger = TransactionLedger(self.db.transactions)
+        self.connection_pool_size = repository.mongodb_client.options.pool_options.max_pool_size
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Cache size and hit ratio (the repository's view cache)"""
+        return self.repository.get_view_cache_stats()
+    
+    @staticmethod
+    def _canonical(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Rename enhanced-schema fields to their shared names"""
+        for alias, field in FIELD_ALIASES.items():
+            if alias in data:
+                data[field] = data.pop(alias)
+        return data
+    
+    @timed_operation
+    async def get_user_data_cached(self, user_id: int) -> Dict[str, Any]:
+        """Get user data from the shared repository"""
         try:
-            data = await self.db.users.find_one({"user_id": user_id})
-            if data is None:
-                data = self._create_default_user_data(user_id)
-                await self.db.users.insert_one(data)
-            
-            # Cache the result
-            self._set_cache(cache_key, data)
-            return data
-            
+            return await asyncio.to_thread(self.repository.get_user_data, user_id)
         except Exception as e:
             logger.error(f"Error fetching user data for {user_id}: {e}")
-            return self._create_default_user_data(user_id)
+            return self.repository._create_default_user_data(user_id)
     
-    async def bulk_update_users(self, updates: List[Dict[str, Any]]) -> bool:
-        """Batch update multiple users at once"""
+    @timed_operation
+    async def update_user_data_cached(self, user_id: int, data: Dict[str, Any]) -> bool:
+        """Update user data through the shared repository"""
         try:
-            operations = []
-            for update in updates:
-                operations.append(
-                    pymongo.UpdateOne(
-                        {"user_id": update["user_id"]}, 
-                        {"$set": update["data"]}, 
-                        upsert=True
-                    )
-                )
-            
-            if operations:
-                result = await self.db.users.bulk_write(operations)
-                
-                # Invalidate cache for updated users
-                for update in updates:
-                    cache_key = f"user_{update['user_id']}"
-                    if cache_key in self.cache:
-                        del self.cache[cache_key]
-                        del self.cache_timestamps[cache_key]
-                
-                return result.acknowledged
-            return True
-            
+            data['last_updated'] = time.time()
+            return await asyncio.to_thread(self.repository.update_user_data, user_id, self._canonical(data))
         except Exception as e:
-            logger.error(f"Bulk update failed: {e}")
+            logger.error(f"Error updating user data for {user_id}: {e}")
             return False
     
-    async def update_user_data_cached(self, user_id: int, data: Dict[str, Any]) -> bool:
-        """Update user data and invalidate cache"""
+    def _bulk_update(self, updates: List[Dict[str, Any]]) -> bool:
+        # Queued per-user writes land first so the batch is applied on top of them
+        self.repository.flush_writes()
+        operations: Dict[str, List[pymongo.UpdateOne]] = {}
+        for update in updates:
+            user_id = update["user_id"]
+            hot, cold = split_user_update(self._canonical(dict(update["data"])))
+            if hot:
+                operations.setdefault("users", []).append(
+                    pymongo.UpdateOne({"user_id": user_id}, {"$set": hot}, upsert=True))
+            for collection, fields in cold.items():
+                operations.setdefault(collection, []).append(
+                    pymongo.UpdateOne({"_id": user_id}, {"$set": fields}, upsert=True))
+            self.repository._invalidate_views(user_id)
+        results = [self.repository.mongodb_db[name].bulk_write(batch, ordered=False)
+                   for name, batch in operations.items()]
+        return all(result.acknowledged for result in results)
+    
+    @timed_operation
+    async def bulk_update_users(self, updates: List[Dict[str, Any]]) -> bool:
+        """Batch update multiple users at once"""
         try:
-            data['last_updated'] = time.time()
-            result = await self.db.users.update_one(
-                {"user_id": user_id},
-                {"$set": data},
-                upsert=True
-            )
-            
-            # Invalidate cache
-            cache_key = f"user_{user_id}"
-            if cache_key in self.cache:
-                del self.cache[cache_key]
-                del self.cache_timestamps[cache_key]
-            
-            return result.acknowledged
-            
+            return await asyncio.to_thread(self._bulk_update, updates)
         except Exception as e:
-            logger.error(f"Error updating user data for {user_id}: {e}")
+            logger.error(f"Bulk update failed: {e}")
             return False
     
     async def get_multiple_users(self, user_ids: List[int]) -> List[Dict[str, Any]]:
         """Get multiple users in parallel"""
-        tasks = []
-        for user_id in user_ids:
-            tasks.append(self.get_user_data_cached(user_id))
-        return await asyncio.gather(*tasks)
+        return await asyncio.gather(*(self.get_user_data_cached(user_id) for user_id in user_ids))
     
+    @timed_operation
     async def get_leaderboard_cached(self, field: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get leaderboard with caching"""
-        cache_key = f"leaderboard_{field}_{limit}"
-        
-        # Try cache first
-        cached_data = self._get_cache(cache_key)
-        if cached_data is not None:
-            return cached_data
-        
+        """Get leaderboard rows from the shared repository"""
         try:
-            cursor = self.db.users.find({field: {"$exists": True}}).sort(field, -1).limit(limit)
-            data = await cursor.to_list(length=limit)
-            
-            # Cache the result with shorter TTL for leaderboards
-            self.cache[cache_key] = data
-            self.cache_timestamps[cache_key] = time.time()
-            
-            return data
-            
+            return await asyncio.to_thread(self.repository.get_leaderboard, FIELD_ALIASES.get(field, field), limit)
         except Exception as e:
             logger.error(f"Error fetching leaderboard: {e}")
             return []
     
     async def log_transaction(self, user_id: int, transaction_type: str, amount: int, details: Dict[str, Any] = None):
-        """Log transaction for audit trail"""
+        """Log transaction for audit trail (buffered, written in bulk by the ledger)"""
         try:
-            transaction = {
-                "user_id": user_id,
-                "type": transaction_type,
-                "amount": amount,
-                "details": details or {},
-                "timestamp": datetime.now(),
-                "ip_hash": None  # Could add IP hashing for security
-            }
-            await self.db.transactions.insert_one(transaction)
+            await self.ledger.log(user_id, transaction_type, amount, details)
         except Exception as e:
             logger.error(f"Error logging transaction: {e}")
     
-    async def get_transaction_history(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get user transaction history"""
+    async def flush_transactions(self) -> int:
+        """Write any buffered transactions immediately"""
+        try:
+            return await self.ledger.flush()
+        except Exception as e:
+            logger.error(f"Error flushing transactions: {e}")
+            return 0
+    
+    @timed_operation
+    async def apply_savings_interest(self, rate: float, day: Optional[str] = None) -> Dict[str, Any]:
+        """Apply one day of savings interest server-side (idempotent per day)"""
+        # Same UTC timestamps the ledger writes, so interest rows sort with other transactions
+        now = ledger_timestamp()
+        day = day or now.date().isoformat()
         try:
-            cursor = self.db.transactions.find(
-                {"user_id": user_id}
-            ).sort("timestamp", -1).limit(limit)
-            return await cursor.to_list(length=limit)
+            await self.repository.flush_writes_async()
+            # Computed inside an update pipeline so concurrent deposits are never overwritten
+            result = await self.db.users.update_many(
+                {"savings_balance": {"$gt": 0}, "last_interest_day": {"$ne": day}},
+                [
+                    {"$set": {"last_interest_amount": {"$floor": {"$multiply": ["$savings_balance", rate]}}}},
+                    {"$set": {
+                        "savings_balance": {"$add": ["$savings_balance", "$last_interest_amount"]},
+                        "last_interest_day": day,
+                        "last_interest": time.time()
+                    }}
+                ]
+            )
+            
+            # Ledger entries use deterministic ids so re-running the same day is a no-op
+            await self.db.users.aggregate([
+                {"$match": {"last_interest_day": day, "last_interest_amount": {"$gt": 0}}},
+                {"$project": {
+                    "_id": {"$concat": ["savings_interest:", day, ":", {"$toString": "$user_id"}]},
+                    "user_id": 1,
+                    "type": "savings_interest",
+                    "amount": "$last_interest_amount",
+                    "details": {"rate": {"$literal": rate}, "day": day},
+                    "timestamp": {"$literal": now},
+                    "ip_hash": {"$literal": None}
+                }},
+                {"$merge": {"into": "transactions", "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}}
+            ]).to_list(None)
+            
+            # Cached views now hold stale balances
+            self.repository.view_cache.clear()
+            
+            return {"success": True, "day": day, "users": result.modified_count}
+        
+        except Exception as e:
+            logger.error(f"Error applying savings interest: {e}")
+            return {"success": False, "day": day, "users": 0}
+    
+    async def get_transaction_history(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get user transaction history, continuing after `cursor` when given"""
+        page = await self.get_transaction_page(user_id, limit, cursor)
+        return page["transactions"]
+    
+    @timed_operation
+    async def get_transaction_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of user transaction history plus the cursor for the next page"""
+        try:
+            return await self.ledger.get_page(user_id, limit, cursor)
         except Exception as e:
             logger.error(f"Error fetching transaction history: {e}")
-            return []
+            return {"transactions": [], "next_cursor": None}
     
     async def track_command_usage(self, command: str, user_id: int, guild_id: int = None):
         """Track command usage for analytics"""
@@ -208,6 +279,35 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error tracking command usage: {e}")
     
+    @timed_operation
+    async def rollup_command_usage(self, rows: List[Dict[str, Any]]) -> bool:
+        """Persist pre-aggregated command counters as hourly and daily rollups in one bulk write"""
+        try:
+            operations = []
+            for row in rows:
+                hour = datetime.fromtimestamp(row["hour"])
+                increments = {"count": row["count"], "total_time": row["total_time"]}
+                operations.append(pymongo.UpdateOne(
+                    {"type": "command_usage_hourly", "command": row["command"], "guild_id": row["guild_id"], "hour": hour},
+                    {"$inc": increments, "$set": {"last_used": datetime.now()}},
+                    upsert=True
+                ))
+                operations.append(pymongo.UpdateOne(
+                    {"type": "command_usage", "command": row["command"], "date": hour.date().isoformat()},
+                    {"$inc": increments, "$set": {"last_used": datetime.now()}},
+                    upsert=True
+                ))
+            
+            if operations:
+                result = await self.db.analytics.bulk_write(operations, ordered=False)
+                return result.acknowledged
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error rolling up command usage: {e}")
+            return False
+    
+    @timed_operation
     async def get_server_stats(self) -> Dict[str, Any]:
         """Get comprehensive server statistics"""
         try:
@@ -224,7 +324,7 @@ class DatabaseManager:
                 {"$group": {
                     "_id": None,
                     "total_coins": {"$sum": "$coins"},
-                    "total_bank": {"$sum": "$bank_balance"},
+                    "total_bank": {"$sum": "$bank"},
                     "avg_coins": {"$avg": "$coins"}
                 }}
             ]
@@ -238,56 +338,14 @@ class DatabaseManager:
             ).sort("count", -1).limit(10).to_list(10)
             
             return stats
-            
+        
         except Exception as e:
             logger.error(f"Error fetching server stats: {e}")
             return {}
     
     def _create_default_user_data(self, user_id: int) -> Dict[str, Any]:
-        """Create default user data structure"""
-        return {
-            "user_id": user_id,
-            "coins": 100,
-            "bank_balance": 0,
-            "savings_balance": 0,
-            "xp": 0,
-            "level": 1,
-            "last_work": 0,
-            "last_daily": 0,
-            "last_updated": time.time(),
-            "job_tier": "entry",
-            "successful_works": 0,
-            "pets": [],
-            "stocks": {},
-            "items": [],
-            "achievements": [],
-            "settings": {
-                "notifications": True,
-                "dm_reminders": False,
-                "privacy_mode": False
-            },
-            "statistics": {
-                "commands_used": 0,
-                "games_played": 0,
-                "total_earned": 0,
-                "total_spent": 0
-            }
-        }
-    
-    async def cleanup_cache(self):
-        """Clean up expired cache entries"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, timestamp in self.cache_timestamps.items():
-            if current_time - timestamp > self.cache_ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.cache[key]
-            del self.cache_timestamps[key]
-        
-        logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+        """Create default user data structure (the repository's schema)"""
+        return self.repository._create_default_user_data(user_id)
     
     async def health_check(self) -> Dict[str, Any]:
         """Check database health"""
@@ -299,25 +357,34 @@ class DatabaseManager:
             return {
                 "status": "healthy",
                 "latency_ms": round(latency, 2),
-                "cache_size": len(self.cache),
+                "cache_size": len(self.repository.view_cache),
                 "connection_pool_size": self.connection_pool_size
             }
         except Exception as e:
             return {
                 "status": "unhealthy",
                 "error": str(e),
-                "cache_size": len(self.cache)
+                "cache_size": len(self.repository.view_cache)
             }
 
 # Global database manager instance
 db_manager = None
 
-def initialize_database(mongodb_uri: str):
-    """Initialize the global database manager"""
+def initialize_database(repository=None) -> Optional[DatabaseManager]:
+    """Initialize the global adapter over the shared repository (MongoDB only)
+    
+    In memory mode there is nothing to adapt: callers fall back to the repository directly.
+    """
     global db_manager
-    db_manager = DatabaseManager(mongodb_uri)
+    if repository is None:
+        from database import db as repository
+    if not repository.connected_to_mongodb:
+        logger.info("📝 Enhanced database adapter disabled (repository is in memory mode)")
+        db_manager = None
+        return None
+    db_manager = DatabaseManager(repository)
     return db_manager
 
 def get_db_manager() -> DatabaseManager:
     """Get the global database manager instance"""
-    return db_manager
\ No newline at end of file
+    return db_manager
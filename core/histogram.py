@@ -0,0 +1,175 @@
+import math
+import threading
+from array import array
+from typing import Dict, List, Any, Optional
+
+# Log-bucketed range: 1µs .. ~3h with ~2% relative error per bucket
+DEFAULT_MIN_VALUE = 1e-6
+DEFAULT_MAX_VALUE = 1e4
+DEFAULT_GROWTH = 1.04
+
+PERCENTILES = (50, 95, 99)
+
+
+class LogHistogram:
+    """Constant-memory latency histogram with logarithmic buckets"""
+
+    def __init__(self, min_value: float = DEFAULT_MIN_VALUE, max_value: float = DEFAULT_MAX_VALUE,
+                 growth: float = DEFAULT_GROWTH):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.bucket_count = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+        self.counts = array("Q", bytes(8 * self.bucket_count))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(int(math.log(value / self.min_value) / self._log_growth) + 1, self.bucket_count - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """Representative value (geometric midpoint) of a bucket"""
+        if index == 0:
+            return self.min_value
+        low = self.min_value * self.growth ** (index - 1)
+        return low * math.sqrt(self.growth)
+
+    def record(self, value: float):
+        """Record one observation in seconds"""
+        if value < 0:
+            return
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        """Approximate p-th percentile (0-100)"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * p / 100)))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: "LogHistogram"):
+        """Add another histogram with the same bucket layout into this one"""
+        if (other.min_value, other.growth, other.bucket_count) != (self.min_value, self.growth, self.bucket_count):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        for index, bucket in enumerate(other.counts):
+            if bucket:
+                self.counts[index] += bucket
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable, mergeable copy (sparse bucket counts)"""
+        counts = self.counts.tolist()
+        return {
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "growth": self.growth,
+            "buckets": {str(i): c for i, c in enumerate(counts) if c},
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "LogHistogram":
+        histogram = cls(snapshot["min_value"], snapshot["max_value"], snapshot["growth"])
+        for index, count in snapshot["buckets"].items():
+            histogram.counts[int(index)] = count
+        histogram.count = snapshot["count"]
+        histogram.total = snapshot["sum"]
+        histogram.min = snapshot["min"] if snapshot["count"] else math.inf
+        histogram.max = snapshot["max"]
+        return histogram
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, mean and tail percentiles in milliseconds"""
+        result = {"count": self.count, "mean_ms": round(self.mean * 1000, 2), "max_ms": round(self.max * 1000, 2)}
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = round(self.percentile(p) * 1000, 2)
+        return result
+
+
+class LatencyTracker:
+    """Named latency histograms grouped by category (command, db, operation)"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[str, LogHistogram]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, category: str, name: str) -> LogHistogram:
+        group = self.histograms.get(category)
+        if group is None or name not in group:
+            with self._lock:
+                group = self.histograms.setdefault(category, {})
+                if name not in group:
+                    group[name] = LogHistogram()
+        return group[name]
+
+    def record(self, category: str, name: str, seconds: float):
+        """Record a duration for category/name"""
+        self._get(category, name).record(seconds)
+
+    def names(self, category: str) -> List[str]:
+        with self._lock:
+            return list(self.histograms.get(category, {}))
+
+    def get(self, category: str, name: str) -> Optional[LogHistogram]:
+        return self.histograms.get(category, {}).get(name)
+
+    def combined(self, category: str) -> LogHistogram:
+        """Merge every histogram in a category"""
+        merged = LogHistogram()
+        for name in self.names(category):
+            merged.merge(self.histograms[category][name])
+        return merged
+
+    def summary(self, category: str, top: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Percentile summaries for a category, slowest p99 first"""
+        summaries = {name: self.histograms[category][name].summary() for name in self.names(category)}
+        ordered = sorted(summaries.items(), key=lambda item: item[1]["p99_ms"], reverse=True)
+        return dict(ordered[:top] if top else ordered)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Mergeable snapshot of every histogram"""
+        return {
+            category: {name: self.histograms[category][name].snapshot() for name in self.names(category)}
+            for category in list(self.histograms)
+        }
+
+    def reset(self, category: Optional[str] = None):
+        with self._lock:
+            if category is None:
+                self.histograms.clear()
+            else:
+                self.histograms.pop(category, None)
+
+
+# Global latency tracker instance
+latency_tracker = LatencyTracker()
+
+def get_latency_tracker() -> LatencyTracker:
+    """Get the global latency tracker instance"""
+    return latency_tracker
@@ -0,0 +1,203 @@
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+import pymongo
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_FIELDS = ("xp", "coins", "cookies", "daily_streak")
+
+
+class IndexSpec:
+    """One index the bot's queries depend on"""
+
+    def __init__(self, collection: str, keys: List[Tuple[str, int]], name: str, reason: str, **options):
+        self.collection = collection
+        self.keys = keys
+        self.name = name
+        self.reason = reason
+        self.options = options
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """Whether an existing index (from index_information) is this spec"""
+        if [(field, int(direction)) for field, direction in info["key"]] != self.keys:
+            return False
+        return all(info.get(option) == value for option, value in self.options.items())
+
+
+# Declarative registry: the reconciler creates whatever is missing at startup
+INDEX_REGISTRY: List[IndexSpec] = [
+    IndexSpec("users", [("user_id", pymongo.ASCENDING)], "user_id_unique",
+              "every per-user lookup and upsert", unique=True),
+    *[
+        IndexSpec("users", [(field, pymongo.DESCENDING)], f"{field}_leaderboard",
+                  f"{field} leaderboards and rank counts", partialFilterExpression={field: {"$gt": 0}})
+        for field in LEADERBOARD_FIELDS
+    ],
+    IndexSpec("users", [("temporary_roles.expires_at", pymongo.ASCENDING)], "temporary_roles_expiry",
+              "temporary role sweep over legacy documents until the cold field split completes", sparse=True),
+    IndexSpec("users", [("reminders.remind_at", pymongo.ASCENDING)], "reminders_due",
+              "reminder sweep over legacy documents until the cold field split completes", sparse=True),
+    IndexSpec("user_temporary", [("temporary_roles.expires_at", pymongo.ASCENDING)], "temporary_roles_expiry",
+              "active temporary role sweep", sparse=True),
+    IndexSpec("user_reminders", [("reminders.remind_at", pymongo.ASCENDING)], "reminders_due",
+              "due reminder sweep", sparse=True),
+    IndexSpec("users", [("last_updated", pymongo.ASCENDING)], "last_updated",
+              "active user analytics", sparse=True),
+    IndexSpec("users", [("first_seen", pymongo.ASCENDING)], "first_seen",
+              "new user and retention analytics", sparse=True),
+    IndexSpec("transfers", [("state", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)], "state_created_at",
+              "recovery sweep for interrupted two-phase transfers"),
+    IndexSpec("guilds", [("guild_id", pymongo.ASCENDING)], "guild_id_unique",
+              "per-guild settings lookups", unique=True),
+    IndexSpec("ai_conversations", [("timestamp", pymongo.ASCENDING)], "timestamp_ttl",
+              "expire AI transcripts after 30 days", expireAfterSeconds=30 * 86400),
+    IndexSpec("shared_state", [("expires_at", pymongo.ASCENDING)], "expires_at_ttl",
+              "expire cross-shard rate limits and cooldowns", expireAfterSeconds=0),
+]
+
+# Query shapes on hot paths, checked against explain plans so they never regress to COLLSCAN
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {"collection": "users", "filter": {"user_id": 1}},
+    *[{"collection": "users", "filter": {field: {"$gt": 0}}, "sort": [(field, pymongo.DESCENDING)]}
+      for field in LEADERBOARD_FIELDS],
+    {"collection": "users", "filter": {"coins": {"$gt": 500}}, "count": True},
+    {"collection": "user_temporary", "filter": {"temporary_roles.expires_at": {"$gt": 0}}},
+    {"collection": "user_reminders", "filter": {"reminders.remind_at": {"$lte": 0}}},
+    {"collection": "guilds", "filter": {"guild_id": 1}},
+]
+
+
+def _seen_at(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+def _dedupe_user_ids(database) -> Dict[str, Any]:
+    """Keep the most recently seen document per user_id so the unique index can be built"""
+    removed = 0
+    duplicates = database.users.aggregate([
+        {"$group": {"_id": "$user_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    for group in duplicates:
+        documents = list(database.users.find({"_id": {"$in": group["ids"]}}, {"_id": 1, "last_seen": 1}))
+        documents.sort(key=lambda d: _seen_at(d.get("last_seen")), reverse=True)
+        removed += database.users.delete_many({"_id": {"$in": [d["_id"] for d in documents[1:]]}}).deleted_count
+    return {"removed": removed}
+
+
+def _merge_bank_balance(database) -> Dict[str, Any]:
+    """Fold the enhanced economy's `bank_balance` into the canonical `bank` field"""
+    result = database.users.update_many(
+        {"bank_balance": {"$exists": True}},
+        [{"$set": {"bank": {"$add": [{"$ifNull": ["$bank", 0]}, {"$ifNull": ["$bank_balance", 0]}]}}},
+         {"$unset": "bank_balance"}]
+    )
+    return {"merged": result.modified_count}
+
+
+# Ordered, run-once data migrations recorded in the schema_migrations collection
+# (0002 is the background cold field split in core.user_schema)
+MIGRATIONS: List[Tuple[str, Callable[[Any], Dict[str, Any]]]] = [
+    ("0001_dedupe_user_ids", _dedupe_user_ids),
+    ("0003_merge_bank_balance", _merge_bank_balance),
+]
+
+
+class IndexReconciler:
+    """Applies pending migrations and brings a database's indexes in line with the registry"""
+
+    def __init__(self, database, registry: Optional[List[IndexSpec]] = None,
+                 migrations: Optional[List[Tuple[str, Callable]]] = None):
+        self.database = database
+        self.registry = INDEX_REGISTRY if registry is None else registry
+        self.migrations = MIGRATIONS if migrations is None else migrations
+
+    def run_migrations(self) -> List[str]:
+        applied = {doc["_id"] for doc in self.database.schema_migrations.find({}, {"_id": 1})}
+        ran = []
+        for name, migration in self.migrations:
+            if name in applied:
+                continue
+            start = time.perf_counter()
+            result = migration(self.database)
+            self.database.schema_migrations.insert_one({"_id": name, "result": result,
+                                                        "seconds": round(time.perf_counter() - start, 3)})
+            logger.info(f"🧬 Applied migration {name}: {result}")
+            ran.append(name)
+        return ran
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Create missing indexes and report conflicting or unused ones (nothing is dropped)"""
+        report = {"migrations": [], "created": [], "existing": [], "conflicting": [], "failed": [], "unused": []}
+        try:
+            report["migrations"] = self.run_migrations()
+        except Exception as e:
+            logger.error(f"Error running migrations: {e}")
+
+        by_collection: Dict[str, List[IndexSpec]] = {}
+        for spec in self.registry:
+            by_collection.setdefault(spec.collection, []).append(spec)
+
+        for collection_name, specs in by_collection.items():
+            collection = self.database[collection_name]
+            existing = collection.index_information()
+            for spec in specs:
+                current = existing.get(spec.name)
+                if current is not None:
+                    (report["existing"] if spec.matches(current) else report["conflicting"]).append(
+                        f"{collection_name}.{spec.name}")
+                    continue
+                try:
+                    collection.create_index(spec.keys, name=spec.name, **spec.options)
+                    report["created"].append(f"{collection_name}.{spec.name}")
+                except OperationFailure as e:
+                    # e.g. an index with the same keys under another name, or different options
+                    report["failed"].append(f"{collection_name}.{spec.name}: {e}")
+            report["unused"].extend(self.unused_indexes(collection_name))
+
+        for key in ("created", "conflicting", "failed", "unused"):
+            if report[key]:
+                log = logger.warning if key in ("conflicting", "failed") else logger.info
+                log(f"🗂️ Indexes {key}: {', '.join(report[key])}")
+        return report
+
+    def unused_indexes(self, collection_name: str) -> List[str]:
+        """Indexes with no recorded use since the server started that the registry does not own"""
+        managed = {spec.name for spec in self.registry if spec.collection == collection_name}
+        try:
+            stats = self.database[collection_name].aggregate([{"$indexStats": {}}])
+            return [f"{collection_name}.{s['name']}" for s in stats
+                    if s["name"] != "_id_" and s["name"] not in managed and s["accesses"]["ops"] == 0]
+        except Exception:
+            return []
+
+
+def winning_plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """Every stage name in an explain() winning plan"""
+    stages = []
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    pending = [plan.get("queryPlan", plan)]
+    while pending:
+        node = pending.pop()
+        if "stage" in node:
+            stages.append(node["stage"])
+        pending.extend(node.get("inputStages", []))
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+    return stages
+
+
+def explain_hot_query(database, query: Dict[str, Any]) -> List[str]:
+    """Winning plan stages for one HOT_QUERIES entry"""
+    command = {"find": query["collection"], "filter": query["filter"]}
+    if query.get("count"):
+        command = {"count": query["collection"], "query": query["filter"]}
+    elif query.get("sort"):
+        command["sort"] = dict(query["sort"])
+    return winning_plan_stages(database.command("explain", command, verbosity="queryPlanner"))
@@ -0,0 +1,212 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Any, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.webhook import async_ as webhook_async
+
+from .histogram import get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+# Time not spent waiting on Discord or the database is reported as "cpu"
+PHASES = ("discord", "db", "cpu")
+OUTCOMES = ("succeeded", "failed", "timed_out")
+# Discord's "Unknown interaction": the interaction was not answered within its 3 second deadline
+UNKNOWN_INTERACTION = 10062
+
+_current_timing: ContextVar[Optional["CommandTiming"]] = ContextVar("command_timing", default=None)
+
+
+class CommandTiming:
+    """Wall-clock split of one command invocation into Discord, DB and CPU phases"""
+    __slots__ = ("name", "start", "phases", "active", "phase_started", "failed", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.phases = {"discord": 0.0, "db": 0.0}
+        self.active = {"discord": 0, "db": 0}
+        self.phase_started = {"discord": 0.0, "db": 0.0}
+        # Set by the caller when an error handler swallowed the command's exception
+        self.failed = False
+        self.error: Optional[BaseException] = None
+
+    def enter(self, phase: str):
+        if self.active[phase] == 0:
+            self.phase_started[phase] = time.perf_counter()
+        self.active[phase] += 1
+
+    def exit(self, phase: str):
+        self.active[phase] -= 1
+        if self.active[phase] == 0:
+            # Nested or overlapping calls are counted once
+            self.phases[phase] += time.perf_counter() - self.phase_started[phase]
+
+    @property
+    def outcome(self) -> str:
+        if is_timeout(self.error):
+            return "timed_out"
+        return "failed" if self.failed or self.error is not None else "succeeded"
+
+    def finish(self) -> Dict[str, float]:
+        total = time.perf_counter() - self.start
+        result = dict(self.phases)
+        result["cpu"] = max(total - result["discord"] - result["db"], 0.0)
+        result["total"] = total
+        return result
+
+
+def is_timeout(error: Optional[BaseException]) -> bool:
+    """Whether an error (or the one it wraps) is a timeout or a missed interaction deadline"""
+    while error is not None:
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        if isinstance(error, discord.NotFound) and error.code == UNKNOWN_INTERACTION:
+            return True
+        error = getattr(error, "original", None) or error.__cause__
+    return False
+
+
+def note_error(error: BaseException):
+    """Record an error handled inside the current command, if any"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.failed = True
+        timing.error = error
+
+
+@contextmanager
+def measure_phase(phase: str):
+    """Attribute the enclosed work to a phase of the current command, if any"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    timing.enter(phase)
+    try:
+        yield
+    finally:
+        timing.exit(phase)
+
+
+def _timed_discord_request(request):
+    @wraps(request)
+    async def wrapper(*args, **kwargs):
+        with measure_phase("discord"):
+            return await request(*args, **kwargs)
+    return wrapper
+
+
+def _patch_webhook_adapter():
+    """Interaction responses and followups bypass HTTPClient and go through the webhook adapter"""
+    adapter = webhook_async.AsyncWebhookAdapter
+    if not getattr(adapter.request, "_command_timed", False):
+        adapter.request = _timed_discord_request(adapter.request)
+        adapter.request._command_timed = True
+
+
+def _patch_prefix_errors():
+    """Prefix command errors are handled before Bot.invoke returns, so note them on the way through"""
+    dispatch_error = commands.Command.dispatch_error
+    if getattr(dispatch_error, "_command_timed", False):
+        return
+
+    @wraps(dispatch_error)
+    async def wrapper(self, ctx, error):
+        note_error(error)
+        return await dispatch_error(self, ctx, error)
+
+    wrapper._command_timed = True
+    commands.Command.dispatch_error = wrapper
+
+
+class CommandInstrumentation:
+    """Times every slash and prefix command and feeds the analytics and latency stores"""
+
+    def __init__(self, bot, analytics=None):
+        self.bot = bot
+        self.analytics = analytics
+        self.latency = get_latency_tracker()
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+
+    def install(self):
+        """Route all Discord HTTP traffic through the phase timer and note prefix command errors"""
+        http = self.bot.http
+        if not getattr(http.request, "_command_timed", False):
+            http.request = _timed_discord_request(http.request)
+            http.request._command_timed = True
+        _patch_webhook_adapter()
+        _patch_prefix_errors()
+
+    @asynccontextmanager
+    async def time_command(self, name: str, kind: str, user_id: int, guild_id: Optional[int] = None):
+        """Run a command invocation with phase timing active"""
+        timing = CommandTiming(name)
+        token = _current_timing.set(timing)
+        try:
+            yield timing
+        except BaseException as e:
+            timing.error = timing.error or e
+            raise
+        finally:
+            _current_timing.reset(token)
+            await self._record(timing, kind, user_id, guild_id)
+
+    async def _record(self, timing: CommandTiming, kind: str, user_id: int, guild_id: Optional[int]):
+        phases = timing.finish()
+        outcome = timing.outcome
+        success = outcome == "succeeded"
+        self.latency.record("command", timing.name, phases["total"])
+        for phase in PHASES:
+            self.latency.record(f"command_{phase}", timing.name, phases[phase])
+        self.outcomes[outcome] += 1
+        self.bot.commands_used += 1
+
+        if self.analytics is None:
+            return
+        try:
+            await self.analytics.track_command_usage(timing.name, user_id, guild_id, phases["total"])
+            await self.analytics.track_performance(f"{kind}_command", phases["total"], success)
+        except Exception as e:
+            logger.error(f"Error recording command timing for {timing.name}: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """How many commands succeeded, failed or timed out"""
+        return dict(self.outcomes)
+
+    def phase_breakdown(self, name: str) -> Dict[str, Any]:
+        """Mean and p95 of each phase for one command, in milliseconds"""
+        breakdown = {}
+        for phase in PHASES:
+            histogram = self.latency.get(f"command_{phase}", name)
+            if histogram:
+                breakdown[phase] = {"mean_ms": round(histogram.mean * 1000, 2),
+                                    "p95_ms": round(histogram.percentile(95) * 1000, 2)}
+        return breakdown
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that times every application command invocation"""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        instrumentation = getattr(self.client, "instrumentation", None)
+        if instrumentation is None or interaction.type is not discord.InteractionType.application_command:
+            return await super()._call(interaction)
+
+        name = interaction.data.get("name", "unknown") if interaction.data else "unknown"
+        async with instrumentation.time_command(name, "slash", interaction.user.id, interaction.guild_id) as timing:
+            await super()._call(interaction)
+            timing.failed = timing.failed or interaction.command_failed
+            if interaction.command is not None:
+                timing.name = interaction.command.qualified_name
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        note_error(error)
+        await super().on_error(interaction, error)
@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+import pymongo
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Compound indexes backing the ledger's query patterns
+LEDGER_INDEXES = [
+    ([("user_id", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], "user_id_timestamp"),
+    ([("type", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)], "type_timestamp"),
+]
+
+
+def ledger_timestamp() -> datetime:
+    """Timestamp for a new ledger row (UTC, which is how MongoDB stores dates)"""
+    return datetime.now(timezone.utc)
+
+
+def encode_cursor(transaction: Dict[str, Any]) -> str:
+    """Encode a transaction's sort position as an opaque pagination cursor"""
+    timestamp = transaction["timestamp"]
+    raw = f"{timestamp.isoformat()}|{transaction['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Decode a pagination cursor into (timestamp, _id)"""
+    from bson import ObjectId
+
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, object_id = raw.split("|", 1)
+    # Server-side ledger entries (e.g. daily interest) use deterministic string ids
+    if ObjectId.is_valid(object_id):
+        object_id = ObjectId(object_id)
+    return datetime.fromisoformat(timestamp), object_id
+
+
+class TransactionLedger:
+    """Buffered, append-only transaction ledger flushed with unordered bulk inserts"""
+
+    def __init__(self, collection, batch_size: int = 1000, flush_interval: float = 2.0, max_buffer: int = 20000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.buffer: List[Dict[str, Any]] = []
+        self.indexes_ready = False
+        self.flush_lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def record(self, user_id: int, transaction_type: str, amount: int, details: Dict[str, Any] = None,
+               timestamp: datetime = None) -> Dict[str, Any]:
+        """Append a transaction to the buffer without touching the database"""
+        transaction = {
+            "user_id": user_id,
+            "type": transaction_type,
+            "amount": amount,
+            "details": details or {},
+            "timestamp": timestamp or ledger_timestamp(),
+            "ip_hash": None  # Could add IP hashing for security
+        }
+        self.buffer.append(transaction)
+        self.stats["recorded"] += 1
+        self._ensure_flusher()
+        return transaction
+
+    async def log(self, user_id: int, transaction_type: str, amount: int, details: Dict[str, Any] = None):
+        """Record a transaction, flushing inline only when the buffer is full"""
+        self.record(user_id, transaction_type, amount, details)
+        if len(self.buffer) >= self.max_buffer:
+            await self.flush()
+        elif len(self.buffer) >= self.batch_size:
+            asyncio.get_running_loop().create_task(self.flush())
+
+    def _ensure_flusher(self):
+        """Start the periodic flush task on the running loop"""
+        if self.flush_task is not None and not self.flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.buffer:
+                await self.flush()
+
+    async def ensure_indexes(self):
+        """Create the ledger's compound indexes if they are missing"""
+        if self.indexes_ready:
+            return
+        try:
+            for keys, name in LEDGER_INDEXES:
+                await self.collection.create_index(keys, name=name, background=True)
+            self.indexes_ready = True
+        except Exception as e:
+            logger.error(f"Error creating transaction indexes: {e}")
+
+    async def flush(self) -> int:
+        """Write all buffered transactions with insert_many(ordered=False)"""
+        async with self.flush_lock:
+            if not self.buffer:
+                return 0
+            await self.ensure_indexes()
+
+            pending, self.buffer = self.buffer, []
+            written = 0
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                try:
+                    result = await self.collection.insert_many(batch, ordered=False)
+                    written += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    inserted = e.details.get("nInserted", 0)
+                    written += inserted
+                    self.stats["failed"] += len(batch) - inserted
+                    logger.error(f"Partial transaction flush: {len(batch) - inserted} failed")
+                except Exception as e:
+                    # Keep the unwritten tail for the next flush
+                    self.buffer = pending[start:] + self.buffer
+                    logger.error(f"Error flushing transactions: {e}")
+                    break
+
+            self.stats["written"] += written
+            self.stats["flushes"] += 1
+            return written
+
+    async def get_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of a user's history, newest first, with a cursor for the next page"""
+        if any(t["user_id"] == user_id for t in self.buffer):
+            await self.flush()
+
+        query: Dict[str, Any] = {"user_id": user_id}
+        if cursor:
+            timestamp, object_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": object_id}}
+            ]
+
+        results = await self.collection.find(query).sort(
+            [("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+        ).limit(limit).to_list(length=limit)
+
+        next_cursor = encode_cursor(results[-1]) if len(results) == limit else None
+        return {"transactions": results, "next_cursor": next_cursor}
+
+    async def close(self):
+        """Stop the periodic flusher and write anything still buffered"""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ledger statistics"""
+        return {**self.stats, "buffered": len(self.buffer)}
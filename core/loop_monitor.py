@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import logging
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from .histogram import get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAX_STACK_DEPTH = 12
+
+
+def _project_path(filename: str) -> Optional[str]:
+    """Path relative to the bot's source tree, or None for library/stdlib frames"""
+    path = os.path.abspath(filename)
+    if not path.startswith(PROJECT_ROOT + os.sep) or "site-packages" in path:
+        return None
+    return os.path.relpath(path, PROJECT_ROOT)
+
+
+def attribute_frame(frame) -> str:
+    """Name the innermost bot-owned frame (cog, command or listener) holding the loop"""
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        relative = _project_path(code.co_filename)
+        if relative and relative != os.path.join("core", "loop_monitor.py"):
+            return f"{relative}:{code.co_name}"
+        if fallback is None:
+            fallback = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class StallEvent:
+    """One period where the event loop stopped answering heartbeats"""
+
+    def __init__(self, started: float, handler: Optional[str]):
+        self.started = started
+        self.wall_time = datetime.utcnow()
+        self.handler = handler
+        self.duration = 0.0
+        self.culprits: Counter = Counter()
+        self.stack: List[str] = []
+
+    def add_sample(self, frame, max_samples: int):
+        """Attribute one stack sample taken while the loop was blocked"""
+        if sum(self.culprits.values()) >= max_samples:
+            return
+        self.culprits[attribute_frame(frame)] += 1
+        if not self.stack:
+            self.stack = [line.rstrip() for line in traceback.format_stack(frame)[-MAX_STACK_DEPTH:]]
+
+    @property
+    def culprit(self) -> str:
+        return self.culprits.most_common(1)[0][0] if self.culprits else "unknown"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.wall_time.isoformat(),
+            "duration_ms": round(self.duration * 1000, 1),
+            "culprit": self.culprit,
+            "handler": self.handler,
+            "samples": dict(self.culprits),
+            "stack": self.stack
+        }
+
+
+class LoopWatchdog:
+    """Detects callbacks that hold the event loop and samples what they were running"""
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05, max_samples: int = 20,
+                 max_events: int = 100, log_path: Optional[str] = "perf.jsonl"):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_samples = max_samples
+        self.log_path = log_path
+        self.events: deque = deque(maxlen=max_events)
+        self.blocked_time: Counter = Counter()
+        self.blocked_count: Counter = Counter()
+        self.latency = get_latency_tracker()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.heartbeat = time.monotonic()
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self):
+        """Start the heartbeat task and the sampling thread for the running loop"""
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.running = True
+        self.heartbeat_task = self.loop.create_task(self._heartbeat_loop())
+        self.thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+        logger.info(f"Loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self.running = False
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            await asyncio.gather(self.heartbeat_task, return_exceptions=True)
+            self.heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        while True:
+            self.heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    # ==================== SAMPLING THREAD ====================
+
+    def _current_handler(self) -> Optional[str]:
+        """Name of the task the loop is currently running (discord.py names listener tasks)"""
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            return None
+        return task.get_name() if task is not None else None
+
+    def _watch(self):
+        event: Optional[StallEvent] = None
+        while self.running:
+            time.sleep(self.interval)
+            beat = self.heartbeat
+            stalled = time.monotonic() - beat - self.interval
+
+            if stalled > self.threshold:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if event is None:
+                    event = StallEvent(beat, self._current_handler())
+                if frame is not None:
+                    event.add_sample(frame, self.max_samples)
+                event.duration = stalled
+            elif event is not None and beat > event.started:
+                # The loop caught up: close the stall
+                event.duration = max(event.duration, beat - event.started - self.interval)
+                self._finish(event)
+                event = None
+
+    def _finish(self, event: StallEvent):
+        culprit = event.culprit
+        self.events.append(event)
+        self.blocked_time[culprit] += event.duration
+        self.blocked_count[culprit] += 1
+        self.latency.record("loop", "stall", event.duration)
+
+        record = event.to_dict()
+        logger.warning(f"Event loop blocked for {record['duration_ms']:.0f}ms by {culprit} (task: {event.handler})")
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as log_file:
+                    log_file.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.error(f"Error writing perf log: {e}")
+
+    # ==================== REPORTING ====================
+
+    def top_culprits(self, top: int = 5) -> List[Dict[str, Any]]:
+        """Code locations ranked by total time they held the loop"""
+        return [
+            {"culprit": culprit, "blocked_ms": round(seconds * 1000, 1), "stalls": self.blocked_count[culprit]}
+            for culprit, seconds in self.blocked_time.most_common(top)
+        ]
+
+    def recent_events(self, limit: int = 5) -> List[Dict[str, Any]]:
+        return [event.to_dict() for event in list(self.events)[-limit:]][::-1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lag = self.latency.get("loop", "lag")
+        return {
+            "running": self.running,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": sum(self.blocked_count.values()),
+            "blocked_ms": round(sum(self.blocked_time.values()) * 1000, 1),
+            "lag": lag.summary() if lag else None
+        }
+
+    def reset(self):
+        self.events.clear()
+        self.blocked_time.clear()
+        self.blocked_count.clear()
+        self.latency.reset("loop")
+
+
+# Global loop watchdog instance
+loop_watchdog = None
+
+def get_loop_watchdog() -> LoopWatchdog:
+    """Get the global loop watchdog instance"""
+    global loop_watchdog
+    if loop_watchdog is None:
+        loop_watchdog = LoopWatchdog(
+            threshold=float(os.getenv("LOOP_STALL_THRESHOLD_MS", "250")) / 1000,
+            log_path=os.getenv("PERF_LOG_PATH", "perf.jsonl")
+        )
+    return loop_watchdog
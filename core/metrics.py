@@ -0,0 +1,156 @@
+import asyncio
+import re
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from .histogram import get_latency_tracker, PERCENTILES
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "coalbot"
+
+
+class MetricSource:
+    """A named provider whose result is cached in the metrics snapshot"""
+
+    def __init__(self, name: str, provider: Callable[[], Any], interval: float, blocking: bool):
+        self.name = name
+        self.provider = provider
+        self.interval = interval
+        self.blocking = blocking
+        self.last_run = 0.0
+
+
+def _metric_name(*parts: str) -> str:
+    name = "_".join(p for p in parts if p)
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name).lower()
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]):
+    """Collect numeric leaves of a nested dict as gauge values"""
+    if isinstance(value, bool):
+        out[prefix] = 1.0 if value else 0.0
+    elif isinstance(value, (int, float)):
+        out[prefix] = float(value)
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(_metric_name(prefix, str(key)), child, out)
+
+
+class MetricsCollector:
+    """Background-refreshed metrics snapshot served to health probes and /metrics"""
+
+    def __init__(self, refresh_interval: float = 15.0, lag_interval: float = 0.5):
+        self.refresh_interval = refresh_interval
+        self.lag_interval = lag_interval
+        self.sources: Dict[str, MetricSource] = {}
+        self.snapshot: Dict[str, Any] = {"timestamp": None}
+        self.latency = get_latency_tracker()
+        self.loop_lag = 0.0
+        self.tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, provider: Callable[[], Any], interval: Optional[float] = None, blocking: bool = False):
+        """Register a snapshot section; blocking providers run in a worker thread"""
+        self.sources[name] = MetricSource(name, provider, interval or self.refresh_interval, blocking)
+
+    # ==================== BACKGROUND TASKS ====================
+
+    def start(self):
+        """Start the refresh and loop-lag tasks on the running loop"""
+        if self.tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self._refresh_loop()), loop.create_task(self._lag_loop())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing metrics snapshot: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _lag_loop(self):
+        """Measure how late the loop wakes us compared to the requested sleep"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag = max(loop.time() - start - self.lag_interval, 0.0)
+            self.latency.record("loop", "lag", self.loop_lag)
+
+    async def refresh(self, force: bool = False):
+        """Re-run every source whose interval has elapsed and publish a new snapshot"""
+        now = time.time()
+        snapshot = dict(self.snapshot)
+        for source in list(self.sources.values()):
+            if not force and now - source.last_run < source.interval and source.name in snapshot:
+                continue
+            try:
+                if source.blocking:
+                    snapshot[source.name] = await asyncio.to_thread(source.provider)
+                else:
+                    snapshot[source.name] = source.provider()
+            except Exception as e:
+                logger.error(f"Metrics source {source.name} failed: {e}")
+                snapshot[source.name] = {"error": str(e)}
+            source.last_run = now
+
+        snapshot["loop_lag_ms"] = round(self.loop_lag * 1000, 2)
+        snapshot["timestamp"] = datetime.utcnow().isoformat()
+        # Swap in one assignment so the Flask thread always sees a complete snapshot
+        self.snapshot = snapshot
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Latest cached snapshot (never touches the database)"""
+        return self.snapshot
+
+    # ==================== PROMETHEUS ====================
+
+    def render_prometheus(self) -> str:
+        """Render the snapshot and latency histograms in Prometheus text format"""
+        lines: List[str] = []
+
+        gauges: Dict[str, float] = {}
+        for key, value in self.snapshot.items():
+            _flatten(_metric_name(METRIC_PREFIX, key), value, gauges)
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+
+        for category in ("command", "db", "operation", "loop"):
+            names = self.latency.names(category)
+            if not names:
+                continue
+            metric = _metric_name(METRIC_PREFIX, category, "latency_seconds")
+            lines.append(f"# HELP {metric} {category} latency from log-bucketed histograms")
+            lines.append(f"# TYPE {metric} summary")
+            for name in names:
+                histogram = self.latency.get(category, name)
+                label = f'name="{_escape_label(name)}"'
+                for p in PERCENTILES:
+                    lines.append(f'{metric}{{{label},quantile="{p / 100:g}"}} {histogram.percentile(p):.6f}')
+                lines.append(f"{metric}_sum{{{label}}} {histogram.total:.6f}")
+                lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics collector instance
+metrics_collector = MetricsCollector()
+
+def get_metrics_collector() -> MetricsCollector:
+    """Get the global metrics collector instance"""
+    return metrics_collector
@@ -0,0 +1,397 @@
+import asyncio
+import os
+import time
+import logging
+from collections import deque, Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord message limits
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_CONTENT_LENGTH = 2000
+MAX_SUMMARY_LENGTH = 4000
+MAX_SUMMARY_LINES = 100
+
+# Documented per-channel message bucket (used until a 429 tells us otherwise)
+DEFAULT_BUCKET_LIMIT = 5
+DEFAULT_BUCKET_WINDOW = 5.0
+
+OVERFLOW_POLICIES = ("merge", "drop")
+
+
+@dataclass
+class ModlogEntry:
+    """A single pending modlog event"""
+    event_type: str
+    embed: Optional[discord.Embed] = None
+    content: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def summary_line(self) -> str:
+        """One-line description used when the entry is merged into a flood summary"""
+        if self.embed is not None:
+            text = self.embed.title or self.event_type
+            if self.embed.description:
+                text += f" — {self.embed.description.splitlines()[0]}"
+            return text[:200]
+        return (self.content or self.event_type).splitlines()[0][:200]
+
+
+class ChannelBucket:
+    """Client-side model of a Discord per-channel rate limit bucket"""
+
+    def __init__(self, limit: int = DEFAULT_BUCKET_LIMIT, window: float = DEFAULT_BUCKET_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def delay(self, now: float) -> float:
+        """Seconds to wait before the next send is allowed"""
+        if now >= self.reset_at:
+            return 0.0
+        if self.remaining > 0:
+            return 0.0
+        return self.reset_at - now
+
+    def consume(self, now: float):
+        """Account for one message sent"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        self.remaining = max(self.remaining - 1, 0)
+
+    def update(self, now: float, remaining: Optional[int] = None, reset_after: Optional[float] = None, limit: Optional[int] = None):
+        """Apply authoritative bucket state reported by Discord"""
+        if limit is not None and limit > 0:
+            self.limit = limit
+        if remaining is not None:
+            self.remaining = max(int(remaining), 0)
+        if reset_after is not None:
+            self.reset_at = now + max(float(reset_after), 0.0)
+
+    def update_from_headers(self, headers: Any, now: float) -> bool:
+        """Apply X-RateLimit-* response headers, returns True if any were present"""
+        if not headers:
+            return False
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        limit = headers.get("X-RateLimit-Limit")
+        if remaining is None and reset_after is None:
+            return False
+        try:
+            self.update(
+                now,
+                remaining=int(remaining) if remaining is not None else None,
+                reset_after=float(reset_after) if reset_after is not None else None,
+                limit=int(limit) if limit is not None else None
+            )
+            return True
+        except (TypeError, ValueError):
+            return False
+
+
+def _rate_limit_info(error: Exception) -> Optional[Tuple[float, Any]]:
+    """Extract (retry_after, headers) from a rate limit error, None for other errors"""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after, None
+    if not isinstance(error, discord.HTTPException) or error.status != 429:
+        return None
+    headers = getattr(error.response, "headers", None)
+    retry_after = None
+    if headers:
+        retry_after = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+    try:
+        return float(retry_after or 1.0), headers
+    except (TypeError, ValueError):
+        return 1.0, headers
+
+
+class ChannelQueue:
+    """Pending modlog entries and rate limit state for one channel"""
+
+    def __init__(self, channel, bucket: ChannelBucket):
+        self.channel = channel
+        self.entries: deque = deque()
+        self.bucket = bucket
+        self.merged: Counter = Counter()
+        self.merged_lines: List[str] = []
+        self.dropped: Counter = Counter()
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.task: Optional[asyncio.Task] = None
+
+    def has_pending(self) -> bool:
+        return bool(self.entries or self.merged or self.dropped)
+
+    def depth(self) -> int:
+        return len(self.entries) + sum(self.merged.values())
+
+
+class ModlogDispatcher:
+    """Per-channel modlog output queue that coalesces events into as few messages as possible"""
+
+    def __init__(self, max_queue: int = 50, overflow_policy: str = "merge", linger: float = 0.5,
+                 bucket_limit: int = DEFAULT_BUCKET_LIMIT, bucket_window: float = DEFAULT_BUCKET_WINDOW):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.linger = linger
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.queues: Dict[int, ChannelQueue] = {}
+        self.closing = False
+        self.stats = Counter()
+
+    # ==================== PRODUCER SIDE ====================
+
+    async def enqueue(self, channel, embed: Optional[discord.Embed] = None, content: Optional[str] = None,
+                      event_type: str = "event") -> bool:
+        """Queue a modlog event, returns False if it was dropped by backpressure"""
+        if embed is None and not content:
+            return False
+
+        queue = self._get_queue(channel)
+        entry = ModlogEntry(event_type=event_type, embed=embed, content=content)
+        self.stats["enqueued"] += 1
+
+        if len(queue.entries) >= self.max_queue:
+            if self.overflow_policy == "drop":
+                queue.dropped[event_type] += 1
+                self.stats["dropped"] += 1
+                queue.idle.clear()
+                queue.wakeup.set()
+                return False
+
+            # Merge: fold the oldest entry into the flood summary to make room
+            oldest = queue.entries.popleft()
+            self._merge(queue, oldest)
+
+        queue.entries.append(entry)
+        queue.idle.clear()
+        queue.wakeup.set()
+        return True
+
+    def _merge(self, queue: ChannelQueue, entry: ModlogEntry):
+        """Fold an entry into the channel's flood summary"""
+        queue.merged[entry.event_type] += 1
+        if len(queue.merged_lines) < MAX_SUMMARY_LINES:
+            queue.merged_lines.append(entry.summary_line())
+        self.stats["merged"] += 1
+
+    def _get_queue(self, channel) -> ChannelQueue:
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = ChannelQueue(channel, ChannelBucket(self.bucket_limit, self.bucket_window))
+            self.queues[channel.id] = queue
+        else:
+            queue.channel = channel
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.get_running_loop().create_task(self._run(queue))
+        return queue
+
+    # ==================== CONSUMER SIDE ====================
+
+    async def _run(self, queue: ChannelQueue):
+        """Drain one channel's queue while respecting its rate limit bucket"""
+        while True:
+            if not queue.has_pending():
+                queue.idle.set()
+                if self.closing:
+                    return
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            wait = queue.bucket.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            # Give a burst a moment to accumulate so it shares one message
+            if queue.entries and len(queue.entries) < MAX_EMBEDS_PER_MESSAGE and not self.closing:
+                wait = self.linger - (now - queue.entries[0].enqueued_at)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+
+            content, embeds, batch, summarised = self._build_batch(queue)
+            try:
+                if embeds:
+                    await queue.channel.send(content=content, embeds=embeds)
+                else:
+                    await queue.channel.send(content=content)
+            except Exception as e:
+                rate_limit = _rate_limit_info(e)
+                if rate_limit is None:
+                    self.stats["failed"] += len(batch)
+                    logger.error(f"Failed to send modlog batch to channel {queue.channel.id}: {e}")
+                    continue
+
+                # Put the batch back and wait for the bucket to reset
+                retry_after, headers = rate_limit
+                self.stats["rate_limited"] += 1
+                queue.entries.extendleft(reversed(batch))
+                now = time.monotonic()
+                if not queue.bucket.update_from_headers(headers, now):
+                    queue.bucket.update(now, remaining=0, reset_after=retry_after)
+                continue
+
+            # Only a delivered summary clears the flood counts; a 429 leaves them for the retry
+            self._clear_summary(queue, summarised)
+            # Pace from our own sends; a 429 above corrects the model if Discord disagrees
+            now = time.monotonic()
+            queue.bucket.consume(now)
+
+            self.stats["messages_sent"] += 1
+            self.stats["embeds_sent"] += len(embeds or [])
+            for entry in batch:
+                self.stats["total_delay_ms"] += int((now - entry.enqueued_at) * 1000)
+            self.stats["delivered"] += len(batch)
+
+    def _build_batch(self, queue: ChannelQueue) -> Tuple[Optional[str], Optional[List[discord.Embed]],
+                                                          List[ModlogEntry], Optional[Tuple[Counter, int, Counter]]]:
+        """Pop as many entries as fit into a single Discord message (plus what its summary covers)"""
+        embeds: List[discord.Embed] = []
+        lines: List[str] = []
+        batch: List[ModlogEntry] = []
+        embed_chars = 0
+        content_chars = 0
+
+        summary = self._build_summary(queue)
+        summarised = None
+        if summary is not None:
+            embeds.append(summary)
+            embed_chars += len(summary)
+            summarised = (Counter(queue.merged), len(queue.merged_lines), Counter(queue.dropped))
+
+        while queue.entries:
+            entry = queue.entries[0]
+            embed_size = len(entry.embed) if entry.embed is not None else 0
+            content_size = len(entry.content) + (1 if lines else 0) if entry.content else 0
+            if entry.embed is not None and (
+                len(embeds) >= MAX_EMBEDS_PER_MESSAGE or (embeds and embed_chars + embed_size > MAX_EMBED_CHARS_PER_MESSAGE)
+            ):
+                break
+            if entry.content and lines and content_chars + content_size > MAX_CONTENT_LENGTH:
+                break
+
+            if entry.embed is not None:
+                embeds.append(entry.embed)
+                embed_chars += embed_size
+            if entry.content:
+                lines.append(entry.content[:MAX_CONTENT_LENGTH])
+                content_chars += content_size
+            batch.append(queue.entries.popleft())
+
+        content = "\n".join(lines) if lines else None
+        return content, embeds or None, batch, summarised
+
+    def _build_summary(self, queue: ChannelQueue) -> Optional[discord.Embed]:
+        """Build the flood summary embed for merged or dropped entries, if any"""
+        if not queue.merged and not queue.dropped:
+            return None
+
+        if queue.merged:
+            counts = ", ".join(f"{count}× {event}" for event, count in queue.merged.most_common())
+            description = ""
+            shown = 0
+            for line in queue.merged_lines:
+                if len(description) + len(line) + 3 > MAX_SUMMARY_LENGTH - 40:
+                    break
+                description += f"• {line}\n"
+                shown += 1
+            total = sum(queue.merged.values())
+            if shown < total:
+                description += f"…and {total - shown} more"
+            embed = discord.Embed(
+                title=f"🌊 Modlog Flood Summary ({total} events)",
+                description=description,
+                color=0xffa500
+            )
+            embed.add_field(name="Events", value=counts[:1024], inline=False)
+        else:
+            embed = discord.Embed(
+                title="⚠️ Modlog Events Dropped",
+                description="The modlog queue overflowed and some events were not logged.",
+                color=0xff0000
+            )
+
+        if queue.dropped:
+            dropped = ", ".join(f"{count}× {event}" for event, count in queue.dropped.most_common())
+            embed.add_field(name="Dropped", value=dropped[:1024], inline=False)
+
+        embed.set_footer(text="Modlog backpressure")
+        return embed
+
+    def _clear_summary(self, queue: ChannelQueue, summarised: Optional[Tuple[Counter, int, Counter]]):
+        """Forget the flood counts a sent summary covered (events merged meanwhile stay queued)"""
+        if summarised is None:
+            return
+        merged, lines, dropped = summarised
+        queue.merged.subtract(merged)
+        queue.dropped.subtract(dropped)
+        queue.merged += Counter()
+        queue.dropped += Counter()
+        del queue.merged_lines[:lines]
+
+    # ==================== LIFECYCLE ====================
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every channel queue has been drained"""
+        waiters = [queue.idle.wait() for queue in self.queues.values()]
+        if waiters:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+
+    async def close(self, timeout: float = 10.0):
+        """Stop accepting lingering and drain all queues"""
+        self.closing = True
+        for queue in self.queues.values():
+            queue.wakeup.set()
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out draining modlog queues")
+        for queue in self.queues.values():
+            if queue.task and not queue.task.done():
+                queue.task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dispatcher statistics"""
+        delivered = self.stats["delivered"]
+        return {
+            "channels": len(self.queues),
+            "queue_depth": sum(queue.depth() for queue in self.queues.values()),
+            "enqueued": self.stats["enqueued"],
+            "delivered": delivered,
+            "messages_sent": self.stats["messages_sent"],
+            "embeds_sent": self.stats["embeds_sent"],
+            "merged": self.stats["merged"],
+            "dropped": self.stats["dropped"],
+            "failed": self.stats["failed"],
+            "rate_limited": self.stats["rate_limited"],
+            "avg_delay_ms": round(self.stats["total_delay_ms"] / delivered, 1) if delivered else 0.0
+        }
+
+
+# Global modlog dispatcher instance
+modlog_dispatcher = None
+
+def get_modlog_dispatcher() -> ModlogDispatcher:
+    """Get the global modlog dispatcher instance"""
+    global modlog_dispatcher
+    if modlog_dispatcher is None:
+        modlog_dispatcher = ModlogDispatcher(
+            max_queue=int(os.getenv("MODLOG_MAX_QUEUE", "50")),
+            overflow_policy=os.getenv("MODLOG_OVERFLOW_POLICY", "merge"),
+            linger=float(os.getenv("MODLOG_LINGER", "0.5"))
+        )
+    return modlog_dispatcher
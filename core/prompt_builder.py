@@ -0,0 +1,48 @@
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple
+
+from .conversation_memory import estimate_tokens
+
+# Tokens for the "User:"/"Assistant:" labels and separators of one turn
+TURN_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=32)
+def render_system_prompt(system_prompt: str) -> Tuple[str, int]:
+    """Whitespace-normalised system block and its token count (cached per prompt)"""
+    rendered = "System: " + " ".join(system_prompt.split()) + "\n"
+    return rendered, estimate_tokens(rendered)
+
+
+class PromptBuilder:
+    """Assembles conversation prompts within a token budget, newest turns first"""
+
+    def __init__(self, max_prompt_tokens: int = 3000):
+        self.max_prompt_tokens = max_prompt_tokens
+
+    def build(self, system_prompt: str, history: List[Dict[str, Any]], current_message: str,
+              summary: str = "") -> Tuple[str, int]:
+        """Render the prompt and return it with its estimated token count"""
+        system_block, tokens = render_system_prompt(system_prompt)
+        closing = f"User: {current_message}\nAssistant:"
+        tokens += estimate_tokens(closing)
+
+        summary_block = f"Earlier in this conversation: {summary}" if summary else ""
+        if summary_block:
+            tokens += estimate_tokens(summary_block)
+
+        # Walk back from the newest turn until the budget is spent
+        selected: List[str] = []
+        for turn in reversed(history):
+            cost = turn["tokens"] + TURN_OVERHEAD_TOKENS
+            if tokens + cost > self.max_prompt_tokens:
+                break
+            selected.append(f"User: {turn['user_message']}\nAssistant: {turn['ai_response']}")
+            tokens += cost
+
+        parts = [system_block]
+        if summary_block:
+            parts.append(summary_block)
+        parts.extend(reversed(selected))
+        parts.append(closing)
+        return "\n".join(parts), tokens
@@ -7,13 +7,14 @@ from collections import defaultdict, deque
 import logging
 import asyncio
 
+from .shared_state import get_shared_store
+
 logger = logging.getLogger(__name__)
 
 class SecurityManager:
     """Enhanced security system for fraud detection and rate limiting"""
     
     def __init__(self):
-        self.rate_limits = defaultdict(deque)
         self.suspicious_activity = defaultdict(list)
         self.blocked_users = set()
         self.transaction_patterns = defaultdict(list)
@@ -43,29 +44,16 @@ class SecurityManager:
         if user_id in self.blocked_users:
             return False, float('inf')
         
-        current_time = time.time()
         config = self.rate_limit_configs.get(command, self.rate_limit_configs["default"])
         
-        key = f"{user_id}_{command}"
-        user_requests = self.rate_limits[key]
-        
-        # Clean old entries
-        while user_requests and current_time - user_requests[0] > config["window"]:
-            user_requests.popleft()
-        
-        # Check if limit exceeded
-        if len(user_requests) >= config["max_requests"]:
-            # Calculate time until next allowed request
-            oldest_request = user_requests[0]
-            time_left = config["window"] - (current_time - oldest_request)
-            
+        # Windows live in the shared store so every shard sees the same history
+        allowed, time_left = await get_shared_store().hit(
+            f"ratelimit:{user_id}:{command}", config["max_requests"], config["window"]
+        )
+        if not allowed:
             # Log potential abuse
             await self._log_rate_limit_violation(user_id, command)
-            return False, time_left
-        
-        # Add current request
-        user_requests.append(current_time)
-        return True, 0
+        return allowed, time_left
     
     async def detect_suspicious_activity(self, user_id: int, action: str, data: Dict[str, Any] = None) -> bool:
         """Comprehensive fraud detection system"""
@@ -352,14 +340,6 @@ class SecurityManager:
             ]
             if not self.transaction_patterns[user_id]:
                 del self.transaction_patterns[user_id]
-        
-        # Clean rate limits
-        for key in list(self.rate_limits.keys()):
-            requests = self.rate_limits[key]
-            while requests and current_time - requests[0] > 3600:  # 1 hour
-                requests.popleft()
-            if not requests:
-                del self.rate_limits[key]
     
     async def check_message_security(self, message):
         """Check message for security threats"""
@@ -0,0 +1,95 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shard_ids(value: str) -> List[int]:
+    """Parse a shard range such as "0-3" or "0,2,4-5" """
+    shard_ids = set()
+    for part in value.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.update(range(int(start), int(end) + 1))
+        else:
+            shard_ids.add(int(part))
+    return sorted(shard_ids)
+
+
+class ShardConfig:
+    """How this process connects to the gateway
+
+    off      - one unsharded connection (default)
+    auto     - AutoShardedBot with the shard count Discord recommends (or SHARD_COUNT)
+    explicit - AutoShardedBot running only SHARD_IDS out of SHARD_COUNT, one range per process
+    """
+
+    def __init__(self, mode: str = "off", shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        if mode not in ("off", "auto", "explicit"):
+            raise ValueError(f"Unknown sharding mode: {mode}")
+        if mode == "explicit":
+            if not shard_count or not shard_ids:
+                raise ValueError("Explicit sharding needs SHARD_COUNT and SHARD_IDS")
+            if max(shard_ids) >= shard_count:
+                raise ValueError(f"Shard ids {shard_ids} out of range for {shard_count} shards")
+        self.mode = mode
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+
+    @classmethod
+    def from_env(cls) -> "ShardConfig":
+        shard_ids = os.getenv('SHARD_IDS')
+        shard_count = os.getenv('SHARD_COUNT')
+        mode = os.getenv('SHARDING_MODE', 'explicit' if shard_ids else 'off').lower()
+        return cls(mode, int(shard_count) if shard_count else None,
+                   parse_shard_ids(shard_ids) if shard_ids else None)
+
+    @property
+    def is_sharded(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def is_multi_process(self) -> bool:
+        """Other processes run the remaining shards, so state must live in the shared store"""
+        return self.mode == "explicit" and len(self.shard_ids) < self.shard_count
+
+    def bot_kwargs(self) -> Dict[str, Any]:
+        """Extra constructor arguments for the bot class"""
+        kwargs = {}
+        if self.shard_count:
+            kwargs["shard_count"] = self.shard_count
+        if self.mode == "explicit":
+            kwargs["shard_ids"] = self.shard_ids
+        return kwargs
+
+    def describe(self) -> str:
+        if self.mode == "off":
+            return "unsharded"
+        if self.mode == "auto":
+            return f"auto-sharded ({self.shard_count or 'recommended'} shards)"
+        return f"shards {self.shard_ids} of {self.shard_count}"
+
+
+def is_primary_process(bot: discord.Client) -> bool:
+    """True for the one process that owns shard 0 (and so runs global singleton jobs)"""
+    shard_ids = getattr(bot, "shard_ids", None)
+    return not shard_ids or 0 in shard_ids
+
+
+def get_shard_metrics(bot: discord.Client) -> Dict[str, Any]:
+    """Shard ids and per-shard gateway latency for the metrics snapshot"""
+    shards = getattr(bot, "shards", None)
+    if not shards:
+        shard_ids = getattr(bot, "shard_ids", None)
+        return {"shard_count": bot.shard_count or 1, "shards_in_process": len(shard_ids) if shard_ids else 1}
+    return {
+        "shard_count": bot.shard_count,
+        "shards_in_process": len(shards),
+        "latency_ms": {str(shard_id): round(shard.latency * 1000, 2) for shard_id, shard in shards.items()
+                       if shard.latency == shard.latency and shard.latency != float('inf')}
+    }
@@ -0,0 +1,167 @@
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Tuple
+
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStore(ABC):
+    """State that must be consistent across shard processes (rate limits, cooldowns, market prices)"""
+
+    backend = "base"
+
+    @abstractmethod
+    async def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> Tuple[bool, float]:
+        """Record one use of `key` in a sliding window
+
+        Returns (allowed, retry_after_seconds); a refused hit is not recorded.
+        A cooldown is a hit with limit=1.
+        """
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+
+class MemorySharedStore(SharedStore):
+    """In-process store for a single process (and for tests)"""
+
+    backend = "memory"
+
+    def __init__(self, sweep_interval: float = 60):
+        self.values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self.windows: Dict[str, Tuple[deque, float]] = {}
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.time()
+
+    def _maybe_sweep(self, now: float):
+        if now - self.last_sweep < self.sweep_interval:
+            return
+        self.last_sweep = now
+        for key in [k for k, (_, expires) in self.values.items() if expires is not None and expires <= now]:
+            del self.values[key]
+        for key in [k for k, (hits, window) in self.windows.items() if not hits or hits[-1] <= now - window]:
+            del self.windows[key]
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        entry = self.values.get(key)
+        if entry is None:
+            return default
+        value, expires = entry
+        if expires is not None and expires <= time.time():
+            del self.values[key]
+            return default
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        self.values[key] = (value, now + ttl if ttl else None)
+        self._maybe_sweep(now)
+
+    async def delete(self, key: str):
+        self.values.pop(key, None)
+        self.windows.pop(key, None)
+
+    async def hit(self, key: str, limit: int, window: float) -> Tuple[bool, float]:
+        now = time.time()
+        self._maybe_sweep(now)
+        hits, _ = self.windows.setdefault(key, (deque(), window))
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) >= limit:
+            return False, hits[0] + window - now
+        hits.append(now)
+        self.windows[key] = (hits, window)
+        return True, 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "keys": len(self.values), "windows": len(self.windows)}
+
+
+class MongoSharedStore(SharedStore):
+    """Store shared by every shard process through one MongoDB collection
+
+    Each operation is a single atomic document update, so concurrent shards never
+    double-spend a rate limit or cooldown. Expired documents are removed by a TTL index.
+    """
+
+    backend = "mongodb"
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0, background=True)
+        except Exception as e:
+            logger.error(f"Error creating shared state index: {e}")
+
+    @staticmethod
+    def _expiry(seconds: Optional[float]) -> Optional[datetime]:
+        return datetime.now(timezone.utc) + timedelta(seconds=seconds) if seconds else None
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        document = await asyncio.to_thread(self.collection.find_one, {"_id": key})
+        if document is None or "value" not in document:
+            return default
+        # The TTL monitor only runs once a minute
+        expires = document.get("expires_at")
+        if expires is not None and expires.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+            return default
+        return document["value"]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await asyncio.to_thread(self.collection.replace_one, {"_id": key},
+                                {"value": value, "expires_at": self._expiry(ttl)}, upsert=True)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.collection.delete_one, {"_id": key})
+
+    async def hit(self, key: str, limit: int, window: float) -> Tuple[bool, float]:
+        now = time.time()
+        # Prune, test and append in one pipeline update so the check-and-record is atomic
+        pipeline = [
+            {"$set": {"hits": {"$filter": {"input": {"$ifNull": ["$hits", []]},
+                                           "cond": {"$gt": ["$$this", now - window]}}}}},
+            {"$set": {"allowed": {"$lt": [{"$size": "$hits"}, limit]}}},
+            {"$set": {"hits": {"$cond": ["$allowed", {"$concatArrays": ["$hits", [now]]}, "$hits"]},
+                      "expires_at": self._expiry(window)}}
+        ]
+        document = await asyncio.to_thread(
+            self.collection.find_one_and_update, {"_id": key}, pipeline,
+            upsert=True, return_document=pymongo.ReturnDocument.AFTER
+        )
+        if document["allowed"]:
+            return True, 0
+        return False, document["hits"][0] + window - now
+
+
+# Global shared store instance, replaced at startup when running sharded
+_shared_store: SharedStore = MemorySharedStore()
+
+
+def get_shared_store() -> SharedStore:
+    """Get the shared state store"""
+    return _shared_store
+
+
+def set_shared_store(store: SharedStore):
+    """Swap the shared state store (before cogs load)"""
+    global _shared_store
+    _shared_store = store
+    logger.info(f"🔗 Shared state backend: {store.backend}")
@@ -0,0 +1,388 @@
+import copy
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Iterable, Optional
+
+from bson import json_util
+
+from .indexes import LEADERBOARD_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Arrays of {"expires_at": ...} entries pruned by cleanup_expired_data
+EXPIRING_FIELDS = ("temporary_items", "temporary_purchases", "temporary_roles")
+
+
+def _apply_increments(document: Dict[str, Any], increments: Dict[str, int]):
+    """$inc semantics for dotted paths on a plain dict"""
+    for path, amount in increments.items():
+        *parents, leaf = path.split(".")
+        target = document
+        for name in parents:
+            target = target.setdefault(name, {})
+        target[leaf] = target.get(leaf, 0) + amount
+
+
+class LocalStorage(ABC):
+    """Storage used when the bot runs without MongoDB
+
+    Documents are plain dicts in the same shape as the MongoDB user and guild documents.
+    Leaderboard reads only return users whose field is above zero, like the partial indexes.
+    """
+
+    name = "local"
+    persistent = False
+
+    @abstractmethod
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def save_user(self, user_id: int, document: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def update_user(self, user_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        """Upsert, overwriting the top-level fields in `data`"""
+
+    @abstractmethod
+    def increment(self, user_id: int, increments: Dict[str, int], defaults: Dict[str, Any]):
+        """Atomically add to (dotted) numeric fields, creating the user from `defaults`"""
+
+    @abstractmethod
+    def push(self, user_id: int, field: str, item: Any, defaults: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def transfer(self, sender_id: int, recipient_id: int, field: str, debit: int, credit: int,
+                 sender_defaults: Dict[str, Any], recipient_defaults: Dict[str, Any]) -> Optional[int]:
+        """Atomically take `debit` from the sender (if they have it) and add `credit` to the recipient
+
+        Returns the sender's new balance, or None (and changes nothing) if they cannot cover it.
+        """
+
+    @abstractmethod
+    def move(self, user_id: int, source: str, target: str, amount: int, defaults: Dict[str, Any]) -> bool:
+        """Atomically move `amount` from one of the user's fields to another, if `source` covers it"""
+
+    @abstractmethod
+    def users(self) -> Iterable[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def top(self, field: str, limit: int, skip: int = 0) -> List[Dict[str, Any]]:
+        """Leaderboard rows ({user_id, field}) for users with field > 0, highest first"""
+
+    @abstractmethod
+    def count_above(self, field: str, value: float) -> int:
+        ...
+
+    @abstractmethod
+    def count_users(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update_guild(self, guild_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def count_guilds(self) -> int:
+        ...
+
+    def prune_expired(self, now: float) -> int:
+        """Drop expired entries from the expiring arrays, returning how many users changed"""
+        changed = 0
+        for document in list(self.users()):
+            dirty = False
+            for field in EXPIRING_FIELDS:
+                if field not in document:
+                    continue
+                kept = [item for item in document[field] if item.get("expires_at", 0) > now]
+                if len(kept) != len(document[field]):
+                    document[field] = kept
+                    dirty = True
+            if dirty:
+                self.save_user(document["user_id"], document)
+                changed += 1
+        return changed
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(LocalStorage):
+    """Process-local dicts; everything is lost on restart"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.user_documents: Dict[int, Dict[str, Any]] = {}
+        self.guild_documents: Dict[int, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.user_documents.get(user_id)
+
+    def save_user(self, user_id: int, document: Dict[str, Any]):
+        self.user_documents[user_id] = document
+
+    def update_user(self, user_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        with self.lock:
+            self.user_documents.setdefault(user_id, defaults).update(data)
+
+    def increment(self, user_id: int, increments: Dict[str, int], defaults: Dict[str, Any]):
+        with self.lock:
+            _apply_increments(self.user_documents.setdefault(user_id, defaults), increments)
+
+    def push(self, user_id: int, field: str, item: Any, defaults: Dict[str, Any]):
+        with self.lock:
+            self.user_documents.setdefault(user_id, defaults).setdefault(field, []).append(item)
+
+    def transfer(self, sender_id: int, recipient_id: int, field: str, debit: int, credit: int,
+                 sender_defaults: Dict[str, Any], recipient_defaults: Dict[str, Any]) -> Optional[int]:
+        with self.lock:
+            sender = self.user_documents.setdefault(sender_id, sender_defaults)
+            if sender.get(field, 0) < debit:
+                return None
+            recipient = self.user_documents.setdefault(recipient_id, recipient_defaults)
+            sender[field] = sender.get(field, 0) - debit
+            recipient[field] = recipient.get(field, 0) + credit
+            return sender[field]
+
+    def move(self, user_id: int, source: str, target: str, amount: int, defaults: Dict[str, Any]) -> bool:
+        with self.lock:
+            document = self.user_documents.setdefault(user_id, defaults)
+            if document.get(source, 0) < amount:
+                return False
+            _apply_increments(document, {source: -amount, target: amount})
+            return True
+
+    def users(self) -> Iterable[Dict[str, Any]]:
+        return self.user_documents.values()
+
+    def top(self, field: str, limit: int, skip: int = 0) -> List[Dict[str, Any]]:
+        users = [user for user in self.user_documents.values() if user.get(field, 0) > 0]
+        users.sort(key=lambda user: user.get(field, 0), reverse=True)
+        return [{"user_id": user.get("user_id"), field: user.get(field, 0)} for user in users[skip:skip + limit]]
+
+    def count_above(self, field: str, value: float) -> int:
+        return sum(1 for user in self.user_documents.values() if user.get(field, 0) > value)
+
+    def count_users(self) -> int:
+        return len(self.user_documents)
+
+    def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        return self.guild_documents.get(guild_id)
+
+    def update_guild(self, guild_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        with self.lock:
+            self.guild_documents.setdefault(guild_id, defaults).update(data)
+
+    def count_guilds(self) -> int:
+        return len(self.guild_documents)
+
+
+class SQLiteStorage(LocalStorage):
+    """Durable single-node storage: one JSON document per row in a WAL-mode SQLite file
+
+    Leaderboard fields have partial expression indexes, so top-N and rank counts are
+    index range scans, and increments are single UPDATE statements.
+    """
+
+    name = "sqlite"
+    persistent = True
+
+    def __init__(self, path: str = "coalbot.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, doc TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS guilds (guild_id INTEGER PRIMARY KEY, doc TEXT NOT NULL)")
+        for field in LEADERBOARD_FIELDS:
+            # Same shape as the MongoDB partial leaderboard indexes
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS users_{field}_leaderboard ON users ({self._value(field)} DESC) "
+                f"WHERE {self._value(field)} > 0"
+            )
+
+    @staticmethod
+    def _value(field: str) -> str:
+        # Field names come from code, never from user input
+        if not field.replace("_", "").replace(".", "").isalnum():
+            raise ValueError(f"Invalid field name: {field}")
+        return f"json_extract(doc, '$.{field}')"
+
+    @staticmethod
+    def _encode(document: Dict[str, Any]) -> str:
+        return json_util.dumps({key: value for key, value in document.items() if key != "_id"})
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+        return json_util.loads(raw) if raw is not None else None
+
+    def _read(self, table: str, key: str, value: int) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(f"SELECT doc FROM {table} WHERE {key} = ?", (value,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def _merge(self, table: str, key: str, value: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                document = self._read(table, key, value) or copy.deepcopy(defaults)
+                document.update(data)
+                self.conn.execute(f"INSERT OR REPLACE INTO {table} ({key}, doc) VALUES (?, ?)",
+                                  (value, self._encode(document)))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._read("users", "user_id", user_id)
+
+    def save_user(self, user_id: int, document: Dict[str, Any]):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO users (user_id, doc) VALUES (?, ?)",
+                              (user_id, self._encode(document)))
+
+    def update_user(self, user_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        self._merge("users", "user_id", user_id, data, defaults)
+
+    def increment(self, user_id: int, increments: Dict[str, int], defaults: Dict[str, Any]):
+        assignments, params = [], []
+        for path, amount in increments.items():
+            self._value(path)
+            assignments.append(f"'$.{path}', COALESCE(json_extract(doc, '$.{path}'), 0) + ?")
+            params.append(amount)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR IGNORE INTO users (user_id, doc) VALUES (?, ?)",
+                                  (user_id, self._encode(defaults)))
+                self.conn.execute(f"UPDATE users SET doc = json_set(doc, {', '.join(assignments)}) WHERE user_id = ?",
+                                  (*params, user_id))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def push(self, user_id: int, field: str, item: Any, defaults: Dict[str, Any]):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                document = self._read("users", "user_id", user_id) or copy.deepcopy(defaults)
+                document.setdefault(field, []).append(item)
+                self.conn.execute("INSERT OR REPLACE INTO users (user_id, doc) VALUES (?, ?)",
+                                  (user_id, self._encode(document)))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def transfer(self, sender_id: int, recipient_id: int, field: str, debit: int, credit: int,
+                 sender_defaults: Dict[str, Any], recipient_defaults: Dict[str, Any]) -> Optional[int]:
+        value = self._value(field)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for user_id, defaults in ((sender_id, sender_defaults), (recipient_id, recipient_defaults)):
+                    self.conn.execute("INSERT OR IGNORE INTO users (user_id, doc) VALUES (?, ?)",
+                                      (user_id, self._encode(defaults)))
+                debited = self.conn.execute(
+                    f"UPDATE users SET doc = json_set(doc, '$.{field}', COALESCE({value}, 0) - ?) "
+                    f"WHERE user_id = ? AND COALESCE({value}, 0) >= ?", (debit, sender_id, debit)
+                ).rowcount
+                if not debited:
+                    self.conn.execute("ROLLBACK")
+                    return None
+                self.conn.execute(f"UPDATE users SET doc = json_set(doc, '$.{field}', COALESCE({value}, 0) + ?) "
+                                  f"WHERE user_id = ?", (credit, recipient_id))
+                balance = self.conn.execute(f"SELECT {value} FROM users WHERE user_id = ?", (sender_id,)).fetchone()[0]
+                self.conn.execute("COMMIT")
+                return balance
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def move(self, user_id: int, source: str, target: str, amount: int, defaults: Dict[str, Any]) -> bool:
+        source_value, target_value = self._value(source), self._value(target)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR IGNORE INTO users (user_id, doc) VALUES (?, ?)",
+                                  (user_id, self._encode(defaults)))
+                moved = self.conn.execute(
+                    f"UPDATE users SET doc = json_set(doc, '$.{source}', COALESCE({source_value}, 0) - ?, "
+                    f"'$.{target}', COALESCE({target_value}, 0) + ?) "
+                    f"WHERE user_id = ? AND COALESCE({source_value}, 0) >= ?", (amount, amount, user_id, amount)
+                ).rowcount
+                self.conn.execute("COMMIT")
+                return bool(moved)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def users(self) -> Iterable[Dict[str, Any]]:
+        for (raw,) in self.conn.execute("SELECT doc FROM users").fetchall():
+            yield self._decode(raw)
+
+    def top(self, field: str, limit: int, skip: int = 0) -> List[Dict[str, Any]]:
+        value = self._value(field)
+        rows = self.conn.execute(
+            f"SELECT user_id, {value} FROM users WHERE {value} > 0 ORDER BY {value} DESC LIMIT ? OFFSET ?",
+            (limit, skip)
+        ).fetchall()
+        return [{"user_id": user_id, field: score} for user_id, score in rows]
+
+    def count_above(self, field: str, value: float) -> int:
+        # `> 0` first so the partial index applies even for higher thresholds
+        expression = self._value(field)
+        return self.conn.execute(f"SELECT COUNT(*) FROM users WHERE {expression} > 0 AND {expression} > ?",
+                                 (value,)).fetchone()[0]
+
+    def count_users(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        return self._read("guilds", "guild_id", guild_id)
+
+    def update_guild(self, guild_id: int, data: Dict[str, Any], defaults: Dict[str, Any]):
+        self._merge("guilds", "guild_id", guild_id, data, defaults)
+
+    def count_guilds(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM guilds").fetchone()[0]
+
+    def explain_top(self, field: str) -> str:
+        """Query plan for a leaderboard read (used by tests to check the index is picked)"""
+        value = self._value(field)
+        rows = self.conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT user_id, {value} FROM users WHERE {value} > 0 ORDER BY {value} DESC LIMIT 10"
+        ).fetchall()
+        return " ".join(str(row[-1]) for row in rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_storage(backend: str = "memory", path: str = "coalbot.db") -> LocalStorage:
+    """Local storage backend by name ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        start = time.perf_counter()
+        storage = SQLiteStorage(path)
+        logger.info(f"💾 SQLite storage at {path} ({storage.count_users()} users, "
+                    f"{(time.perf_counter() - start) * 1000:.0f}ms)")
+        return storage
+    if backend != "memory":
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return MemoryStorage()
@@ -0,0 +1,96 @@
+import time
+import logging
+from typing import AsyncIterator, Callable, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+EMBED_DESCRIPTION_LIMIT = 4096
+TYPING_CURSOR = " ▌"
+
+
+class StreamingReply:
+    """Renders a streamed AI reply into one followup message with throttled edits"""
+
+    def __init__(self, interaction: discord.Interaction, build_embed: Callable[[str], discord.Embed],
+                 min_interval: float = 1.2, min_chars: int = 40):
+        self.interaction = interaction
+        self.build_embed = build_embed
+        # Interaction webhooks allow roughly 5 edits per 5 seconds
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.message: Optional[discord.WebhookMessage] = None
+        self.text = ""
+        self.error: Optional[Exception] = None
+        self.first_chunk_delay: Optional[float] = None
+        self.edits = 0
+        self.pages = 0
+        # Start of the current page within `text`
+        self.offset = 0
+
+    def _render(self, done: bool) -> discord.Embed:
+        text = self.text[self.offset:]
+        return self.build_embed(text if done else text + TYPING_CURSOR)
+
+    async def _show(self, embed: discord.Embed, **kwargs):
+        """Send the current page as a new followup, or edit it in place"""
+        if self.message is None:
+            self.message = await self.interaction.followup.send(embed=embed, **kwargs, wait=True)
+            self.pages += 1
+        else:
+            await self.message.edit(embed=embed, **kwargs)
+            self.edits += 1
+
+    async def _split_overflow(self, done: bool):
+        """Close pages that outgrew one embed (at a line or word break) and continue in a new followup"""
+        limit = EMBED_DESCRIPTION_LIMIT - (0 if done else len(TYPING_CURSOR))
+        while len(self.text) - self.offset > limit:
+            page = self.text[self.offset:self.offset + EMBED_DESCRIPTION_LIMIT]
+            cut = max(page.rfind("\n"), page.rfind(" "))
+            if cut < EMBED_DESCRIPTION_LIMIT // 2:
+                # No break in the second half of the page: cut mid-word
+                await self._show(self.build_embed(page))
+                self.offset += len(page)
+            else:
+                await self._show(self.build_embed(page[:cut]))
+                self.offset += cut + 1
+            self.message = None
+
+    async def run(self, chunks: AsyncIterator[str], view: Optional[discord.ui.View] = None) -> str:
+        """Consume the stream, show progress, and attach `view` to the final message
+
+        Replies longer than one embed continue in further followups. Returns the full text
+        ('' if nothing arrived). A failure after partial output keeps what was shown and is
+        stored in `self.error`.
+        """
+        started = time.monotonic()
+        last_edit = 0.0
+        rendered_length = 0
+        try:
+            async for chunk in chunks:
+                if self.first_chunk_delay is None:
+                    self.first_chunk_delay = time.monotonic() - started
+                self.text += chunk
+                await self._split_overflow(False)
+
+                now = time.monotonic()
+                if self.message is None:
+                    await self._show(self._render(False))
+                    last_edit, rendered_length = now, len(self.text)
+                elif now - last_edit >= self.min_interval and len(self.text) - rendered_length >= self.min_chars:
+                    await self._show(self._render(False))
+                    last_edit, rendered_length = now, len(self.text)
+        except Exception as e:
+            self.error = e
+            logger.error(f"AI stream interrupted after {len(self.text)} chars: {e}")
+
+        if not self.text:
+            return ""
+
+        await self._split_overflow(True)
+        if view is not None:
+            await self._show(self._render(True), view=view)
+        else:
+            await self._show(self._render(True))
+        return self.text
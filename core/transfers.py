@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Transfer states: pending -> applied -> done, or pending -> cancelled
+RECOVERABLE_STATES = ("pending", "applied")
+
+
+class TwoPhaseTransfers:
+    """Coin transfers between two user documents without multi-document transactions
+
+    Each transfer is recorded in `transfers` before either balance moves. The debit and the
+    credit each push the transfer id onto the user's `pending_transfers`, so every step is
+    guarded by that marker and a transfer interrupted at any point can be finished exactly once
+    by recover().
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.stats = {"completed": 0, "insufficient": 0, "recovered": 0, "cancelled": 0}
+
+    def transfer(self, sender_id: int, recipient_id: int, field: str, debit: int, credit: int,
+                 recipient_defaults: Dict[str, Any]) -> Optional[int]:
+        """Move coins; returns the sender's new balance, or None if they could not cover `debit`"""
+        transfer = {
+            "_id": ObjectId(), "from": sender_id, "to": recipient_id, "field": field,
+            "debit": debit, "credit": credit, "state": "pending", "created_at": datetime.now(timezone.utc)
+        }
+        self.database.transfers.insert_one(transfer)
+        sender = self.database.users.find_one_and_update(
+            {"user_id": sender_id, field: {"$gte": debit}, "pending_transfers": {"$ne": transfer["_id"]}},
+            {"$inc": {field: -debit}, "$push": {"pending_transfers": transfer["_id"]}},
+            projection={field: 1}, return_document=ReturnDocument.AFTER
+        )
+        if sender is None:
+            self._set_state(transfer, "cancelled")
+            self.stats["insufficient"] += 1
+            return None
+        self._finish(transfer, recipient_defaults)
+        self.stats["completed"] += 1
+        return sender[field]
+
+    def _set_state(self, transfer: Dict[str, Any], state: str):
+        self.database.transfers.update_one({"_id": transfer["_id"]}, {"$set": {"state": state}})
+
+    def _finish(self, transfer: Dict[str, Any], recipient_defaults: Dict[str, Any]):
+        users, transfer_id, field = self.database.users, transfer["_id"], transfer["field"]
+        if transfer["state"] == "pending":
+            # Create the recipient first so the marker-guarded credit never needs an upsert
+            users.update_one({"user_id": transfer["to"]}, {"$setOnInsert": recipient_defaults}, upsert=True)
+            users.update_one({"user_id": transfer["to"], "pending_transfers": {"$ne": transfer_id}},
+                             {"$inc": {field: transfer["credit"]}, "$push": {"pending_transfers": transfer_id}})
+            self._set_state(transfer, "applied")
+        users.update_many({"user_id": {"$in": [transfer["from"], transfer["to"]]}},
+                          {"$pull": {"pending_transfers": transfer_id}})
+        self._set_state(transfer, "done")
+
+    def recover(self, older_than: float = 60.0, defaults_for=None) -> int:
+        """Finish or cancel transfers a crashed process left behind; returns how many were touched"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        touched = 0
+        for transfer in self.database.transfers.find({"state": {"$in": list(RECOVERABLE_STATES)},
+                                                      "created_at": {"$lt": cutoff}}):
+            try:
+                debited = self.database.users.find_one({"user_id": transfer["from"],
+                                                        "pending_transfers": transfer["_id"]}, {"_id": 1})
+                if transfer["state"] == "pending" and debited is None:
+                    # The debit never happened
+                    self._set_state(transfer, "cancelled")
+                    self.stats["cancelled"] += 1
+                else:
+                    self._finish(transfer, defaults_for(transfer["to"]) if defaults_for else {})
+                    self.stats["recovered"] += 1
+                touched += 1
+            except Exception as e:
+                logger.error(f"Error recovering transfer {transfer['_id']}: {e}")
+        if touched:
+            logger.info(f"🔁 Recovered {touched} interrupted transfers")
+        return touched
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
@@ -0,0 +1,233 @@
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Growing arrays and rarely read sub-documents, stored outside the hot `users` document.
+# Each feature collection holds one document per user: {_id: user_id, <field>: value, ...}
+COLD_FEATURES: Dict[str, Tuple[str, ...]] = {
+    "user_pets": ("pets",),
+    "user_moderation": ("warnings", "mutes", "bans", "tickets", "moderation"),
+    "user_reminders": ("reminders",),
+    "user_temporary": ("temporary_purchases", "temporary_roles"),
+    "user_portfolio": ("portfolio", "stocks", "investments", "loans", "credit_cards", "insurance"),
+    "user_inventory": ("inventory", "achievements"),
+    "user_ai": ("sensei_conversation", "bleky_nephew_conversation"),
+    "user_social": ("social", "job_performance"),
+}
+COLD_FIELDS: Dict[str, str] = {field: collection for collection, fields in COLD_FEATURES.items() for field in fields}
+
+MIGRATION_ID = "0002_split_cold_fields"
+MISSING = object()
+
+
+def fingerprint(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class UserDocument(dict):
+    """Hot user document that fetches cold fields from their feature collection on first access
+
+    Existing cogs keep reading and writing `user_data["pets"]` as before; only cold fields
+    that were actually changed are written back.
+    """
+
+    def __init__(self, data: Dict[str, Any], loader: Callable[[str], Dict[str, Any]], defaults: Dict[str, Any]):
+        super().__init__(data)
+        self._loader = loader
+        self._defaults = defaults
+        self._snapshots = {field: fingerprint(data[field]) for field in COLD_FIELDS if field in data}
+
+    def _load(self, field: str) -> Any:
+        # One read brings in every field of the feature document
+        loaded = self._loader(COLD_FIELDS[field])
+        for name in COLD_FEATURES[COLD_FIELDS[field]]:
+            if dict.__contains__(self, name):
+                continue
+            value = loaded.get(name, MISSING)
+            if value is MISSING:
+                if name not in self._defaults:
+                    continue
+                value = self._defaults[name]
+            dict.__setitem__(self, name, value)
+            self._snapshots[name] = fingerprint(value)
+        return dict.get(self, field, MISSING)
+
+    def __missing__(self, key):
+        if key in COLD_FIELDS:
+            value = self._load(key)
+            if value is not MISSING:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key) or key not in COLD_FIELDS:
+            return dict.get(self, key, default)
+        value = self._load(key)
+        return default if value is MISSING else value
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        return key in COLD_FIELDS and self._load(key) is not MISSING
+
+    def changed_cold_fields(self) -> List[str]:
+        return [field for field in COLD_FIELDS if dict.__contains__(self, field)
+                and self._snapshots.get(field) != fingerprint(dict.__getitem__(self, field))]
+
+
+class OfflineUserDocument(UserDocument):
+    """Defaults handed out while MongoDB is unreachable
+
+    Writes made from it are replayed as deltas against the baseline (see offline_changes)
+    so they never overwrite the user's real values once MongoDB is back.
+    """
+
+    def __init__(self, data: Dict[str, Any], defaults: Dict[str, Any]):
+        super().__init__(data, lambda collection: {}, defaults)
+        self.baseline = copy.deepcopy({**defaults, **data})
+
+
+def _is_counter(path: str, before: Any, after: Any) -> bool:
+    # Integer counters merge as $inc; timestamps and flags are plain overwrites
+    name = path.rsplit(".", 1)[-1]
+    if name.startswith("last_") or name.endswith(("_at", "_time")):
+        return False
+    return all(isinstance(value, int) and not isinstance(value, bool) for value in (before, after))
+
+
+def offline_changes(document: OfflineUserDocument) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Per-collection update ({"$set", "$inc", "$push"}) replaying edits made to an offline document"""
+    changes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def diff(collection: str, path: str, before: Any, after: Any):
+        if before == after:
+            return
+        if _is_counter(path, before, after):
+            operator, value = "$inc", after - before
+        elif isinstance(before, dict) and isinstance(after, dict):
+            for key, value in after.items():
+                diff(collection, f"{path}.{key}", before.get(key, MISSING), value)
+            return
+        elif isinstance(before, list) and isinstance(after, list) and after[:len(before)] == before:
+            operator, value = "$push", {"$each": after[len(before):]}
+        else:
+            operator, value = "$set", after
+        changes.setdefault(collection, {}).setdefault(operator, {})[path] = value
+
+    for key in dict.keys(document):
+        if key in ("_id", "user_id"):
+            continue
+        diff(COLD_FIELDS.get(key, "users"), key, document.baseline.get(key, MISSING), dict.__getitem__(document, key))
+    return changes
+
+
+def split_user_update(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Split a user update into hot `$set` fields and cold fields grouped by feature collection"""
+    if isinstance(data, UserDocument):
+        cold_names = set(data.changed_cold_fields())
+        items = [(key, dict.__getitem__(data, key)) for key in dict.keys(data)]
+    else:
+        cold_names = {key for key in data if key in COLD_FIELDS}
+        items = list(data.items())
+
+    hot, cold = {}, {}
+    for key, value in items:
+        if key == "_id":
+            continue
+        if key in COLD_FIELDS:
+            if key in cold_names:
+                cold.setdefault(COLD_FIELDS[key], {})[key] = value
+        else:
+            hot[key] = value
+    return hot, cold
+
+
+def hot_defaults(defaults: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in defaults.items() if key not in COLD_FIELDS}
+
+
+def move_cold_fields(database, document: Dict[str, Any]) -> int:
+    """Move one legacy user's cold fields into their feature collections
+
+    Never overwrites a value already written by the new code path, and only unsets the
+    legacy field if it still holds the value that was copied.
+    """
+    user_id = document["user_id"]
+    moved = 0
+    for field, collection in COLD_FIELDS.items():
+        if field not in document:
+            continue
+        try:
+            database[collection].update_one({"_id": user_id, field: {"$exists": False}},
+                                             {"$set": {field: document[field]}}, upsert=True)
+        except DuplicateKeyError:
+            pass  # The feature document already has this field
+        database.users.update_one({"_id": document["_id"], field: document[field]}, {"$unset": {field: ""}})
+        moved += 1
+    return moved
+
+
+class ColdFieldMigrator:
+    """Background pass over `users` that moves legacy cold fields out in small batches"""
+
+    def __init__(self, database, batch_size: int = 200, pause: float = 0.5):
+        self.database = database
+        self.batch_size = batch_size
+        self.pause = pause
+        self.complete = False
+        self.stats = {"scanned": 0, "users_migrated": 0, "fields_moved": 0, "batches": 0}
+        self.started_at: Optional[float] = None
+
+    def load_state(self) -> Dict[str, Any]:
+        state = self.database.schema_migrations.find_one({"_id": MIGRATION_ID}) or {}
+        self.complete = bool(state.get("complete"))
+        return state
+
+    def _migrate_batch(self, after) -> Tuple[Any, int]:
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        projection = {"user_id": 1, **{field: 1 for field in COLD_FIELDS}}
+        documents = list(self.database.users.find(query, projection).sort("_id", 1).limit(self.batch_size))
+        for document in documents:
+            moved = move_cold_fields(self.database, document)
+            if moved:
+                self.stats["users_migrated"] += 1
+                self.stats["fields_moved"] += moved
+        self.stats["scanned"] += len(documents)
+        self.stats["batches"] += 1
+        last = documents[-1]["_id"] if documents else after
+        self.database.schema_migrations.update_one({"_id": MIGRATION_ID}, {"$set": {"last_id": last}}, upsert=True)
+        return last, len(documents)
+
+    async def run(self):
+        """Resume from the last migrated _id and walk the collection once"""
+        try:
+            state = await asyncio.to_thread(self.load_state)
+            if self.complete:
+                return
+            self.started_at = time.time()
+            after = state.get("last_id")
+            logger.info(f"🧬 Splitting cold user fields{' (resuming)' if after is not None else ''}")
+            while True:
+                after, count = await asyncio.to_thread(self._migrate_batch, after)
+                if count < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+            await asyncio.to_thread(self.database.schema_migrations.update_one, {"_id": MIGRATION_ID},
+                                    {"$set": {"complete": True, "result": self.stats}}, upsert=True)
+            self.complete = True
+            logger.info(f"✅ Cold user field split complete: {self.stats}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error splitting cold user fields: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"complete": self.complete, **self.stats}
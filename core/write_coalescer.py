@@ -0,0 +1,367 @@
+import copy
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UNSET = object()
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """Whether two dotted paths touch the same data (equal, or one contains the other)"""
+    return a == b or a.startswith(b + ".") or b.startswith(a + ".")
+
+
+def _get_path(document: Dict[str, Any], path: str, default: Any = None) -> Any:
+    for name in path.split("."):
+        if not isinstance(document, dict) or name not in document:
+            return default
+        document = document[name]
+    return document
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    *parents, leaf = path.split(".")
+    for name in parents:
+        child = document.get(name)
+        if not isinstance(child, dict):
+            child = document[name] = {}
+        document = child
+    if value is UNSET:
+        document.pop(leaf, None)
+    else:
+        document[leaf] = value
+
+
+class PendingUpdate:
+    """$set/$inc/$push/$unset for one document, merged in arrival order"""
+
+    def __init__(self, upsert: bool):
+        self.upsert = upsert
+        self.set: Dict[str, Any] = {}
+        self.inc: Dict[str, Any] = {}
+        self.push: Dict[str, List[Any]] = {}
+        self.unset: Dict[str, Any] = {}
+        self.merged = 0
+        self.failures = 0
+        self.created_at = time.monotonic()
+
+    def _paths(self):
+        for operator in (self.set, self.inc, self.push, self.unset):
+            yield from ((operator, path) for path in operator)
+
+    def _conflicts(self, path: str, allowed: Tuple[Dict[str, Any], ...]) -> bool:
+        # Any overlapping path except the exact same path under an operator we know how to fold into
+        return any(_overlaps(path, other) and not (other == path and operator in allowed)
+                   for operator, other in self._paths())
+
+    def merge(self, update: Dict[str, Dict[str, Any]]) -> bool:
+        """Fold an update in; False (and unchanged) if it cannot be expressed as one update"""
+        staged = copy.deepcopy((self.set, self.inc, self.push, self.unset))
+        if not self._merge(copy.deepcopy(update)):
+            self.set, self.inc, self.push, self.unset = staged
+            return False
+        self.merged += 1
+        return True
+
+    def _set_ancestor(self, path: str) -> Optional[str]:
+        """The queued $set path holding `path` inside its (dict) value, if any"""
+        for other in self.set:
+            if path.startswith(other + ".") and isinstance(self.set[other], dict):
+                return other
+        return None
+
+    def _merge_into_set(self, operator: str, path: str, value: Any) -> bool:
+        # {"$set": {"economy": {...}}} then {"$inc": {"economy.total_spent": 5}} edits the queued dict
+        ancestor = self._set_ancestor(path)
+        document, inner = self.set[ancestor], path[len(ancestor) + 1:]
+        current = _get_path(document, inner, UNSET)
+        if operator == "$set":
+            _set_path(document, inner, value)
+        elif operator == "$unset":
+            _set_path(document, inner, UNSET)
+        elif operator == "$inc":
+            if current is UNSET:
+                current = 0
+            if not isinstance(current, (int, float)):
+                return False
+            _set_path(document, inner, current + value)
+        else:
+            if current is UNSET:
+                current = []
+            if not isinstance(current, list):
+                return False
+            _set_path(document, inner, current + value)
+        return True
+
+    def _merge(self, update: Dict[str, Dict[str, Any]]) -> bool:
+        for operator, fields in update.items():
+            if operator not in ("$set", "$inc", "$push", "$unset"):
+                return False
+            for path, value in fields.items():
+                if operator == "$push":
+                    value = list(value["$each"]) if isinstance(value, dict) and "$each" in value else [value]
+                if self._set_ancestor(path) is not None:
+                    if not self._merge_into_set(operator, path, value):
+                        return False
+                elif operator == "$set":
+                    if self._conflicts(path, (self.set, self.inc, self.push, self.unset)):
+                        return False
+                    self.inc.pop(path, None)
+                    self.push.pop(path, None)
+                    self.unset.pop(path, None)
+                    self.set[path] = value
+                elif operator == "$inc":
+                    if self._conflicts(path, (self.set, self.inc)):
+                        return False
+                    if path in self.set:
+                        if not isinstance(self.set[path], (int, float)):
+                            return False
+                        self.set[path] += value
+                    else:
+                        self.inc[path] = self.inc.get(path, 0) + value
+                elif operator == "$push":
+                    if self._conflicts(path, (self.set, self.push)):
+                        return False
+                    if path in self.set:
+                        if not isinstance(self.set[path], list):
+                            return False
+                        self.set[path] = self.set[path] + value
+                    else:
+                        self.push.setdefault(path, []).extend(value)
+                else:
+                    if self._conflicts(path, (self.set, self.inc, self.push, self.unset)):
+                        return False
+                    for operator_fields in (self.set, self.inc, self.push):
+                        operator_fields.pop(path, None)
+                    self.unset[path] = ""
+        return True
+
+    def guard_passes(self, guard: Dict[str, Any]) -> Optional[bool]:
+        """Evaluate {field: {"$gte": n}} against pending $set values, or None if unknown"""
+        for path, condition in guard.items():
+            if path not in self.set or set(condition) != {"$gte"}:
+                return None
+            if not isinstance(self.set[path], (int, float)) or self.set[path] < condition["$gte"]:
+                return False
+        return True
+
+    def to_update(self) -> Dict[str, Dict[str, Any]]:
+        update = {}
+        if self.set:
+            update["$set"] = self.set
+        if self.inc:
+            update["$inc"] = self.inc
+        if self.push:
+            update["$push"] = {path: items[0] if len(items) == 1 else {"$each": items}
+                               for path, items in self.push.items()}
+        if self.unset:
+            update["$unset"] = self.unset
+        return update
+
+    def apply(self, document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """What the document will look like once this update is written"""
+        document = copy.deepcopy(document) if document else {}
+        for path, value in self.set.items():
+            _set_path(document, path, copy.deepcopy(value))
+        for path, amount in self.inc.items():
+            _set_path(document, path, _get_path(document, path, 0) + amount)
+        for path, items in self.push.items():
+            _set_path(document, path, list(_get_path(document, path, [])) + copy.deepcopy(items))
+        for path in self.unset:
+            _set_path(document, path, UNSET)
+        return document
+
+
+class WriteCoalescer:
+    """Merges update_one calls to the same document made within `window` seconds
+
+    Reads go through read(), which layers queued updates over what the database returned,
+    so callers see their own writes before they are flushed.
+
+    Callers were told their write succeeded when it was queued, so an update whose write
+    raises is queued again (ahead of anything newer) and retried; after `max_retries`
+    failures, or if it cannot be combined with what was queued since, it goes to `fallback`.
+    """
+
+    def __init__(self, writer: Callable[[str, Dict[str, Any], Dict[str, Any], bool], Any],
+                 window: float = 0.05, max_merged: int = 50,
+                 fallback: Optional[Callable[[str, Dict[str, Any], Dict[str, Any], bool], Any]] = None,
+                 max_retries: int = 3):
+        self.writer = writer
+        self.window = window
+        self.max_merged = max_merged
+        self.fallback = fallback
+        self.max_retries = max_retries
+        self.pending: Dict[Tuple, Tuple[str, Dict[str, Any], PendingUpdate]] = {}
+        self.inflight = set()
+        # Bumped whenever a key's pending update starts flushing; reads retry if it moved
+        self.versions: Dict[Tuple, int] = {}
+        self.lock = threading.Lock()
+        self.settled = threading.Condition(self.lock)
+        self.thread: Optional[threading.Thread] = None
+        self.stats = {"submitted": 0, "written": 0, "conflict_flushes": 0, "guards_resolved": 0, "errors": 0,
+                      "requeued": 0, "handed_off": 0, "dropped": 0}
+
+    @staticmethod
+    def key(collection: str, query: Dict[str, Any]) -> Tuple:
+        return (collection, tuple(sorted(query.items())))
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.window / 2)
+            now = time.monotonic()
+            with self.lock:
+                due = [key for key, (_, _, pending) in self.pending.items()
+                       if now - pending.created_at >= self.window]
+            for key in due:
+                self.flush(key)
+
+    def submit(self, collection: str, query: Dict[str, Any], update: Dict[str, Dict[str, Any]], upsert: bool):
+        """Queue an update for `query` (an equality filter on the document id)"""
+        key = self.key(collection, query)
+        while True:
+            with self.lock:
+                entry = self.pending.get(key)
+                if entry is None:
+                    pending = PendingUpdate(upsert)
+                    if pending.merge(update):
+                        self.stats["submitted"] += 1
+                        self.pending[key] = (collection, query, pending)
+                        self._ensure_thread()
+                        return
+                    pending = None
+                elif entry[2].upsert == upsert and entry[2].merge(update):
+                    self.stats["submitted"] += 1
+                    full = entry[2].merged >= self.max_merged
+                    break
+            if entry is None:
+                # Not expressible as $set/$inc/$push/$unset - write it as is, after anything in flight
+                self.flush(key)
+                self.writer(collection, query, update, upsert)
+                return
+            # Cannot be combined with what is queued: write that first, then queue this one
+            self.stats["conflict_flushes"] += 1
+            self.flush(key)
+        if full:
+            self.flush(key)
+
+    def submit_guarded(self, collection: str, query: Dict[str, Any], guard: Dict[str, Any],
+                       update: Dict[str, Dict[str, Any]]) -> Optional[bool]:
+        """Merge a conditional update if queued $set values decide the guard; None if they don't"""
+        key = self.key(collection, query)
+        with self.lock:
+            entry = self.pending.get(key)
+            passes = entry[2].guard_passes(guard) if entry else None
+            if passes is None:
+                return None
+            self.stats["guards_resolved"] += 1
+            if not passes:
+                return False
+            if not entry[2].merge(update):
+                return None
+            self.stats["submitted"] += 1
+            return True
+
+    def flush(self, key: Optional[Tuple] = None) -> int:
+        """Write queued updates (one key, or all of them); returns how many were written"""
+        with self.lock:
+            keys = [key] if key is not None else list(self.pending)
+            # Wait out a flush of the same key so writes to one document stay in order
+            while any(k in self.inflight for k in keys):
+                self.settled.wait()
+            entries = [(k, self.pending.pop(k)) for k in keys if k in self.pending]
+            for k, _ in entries:
+                self.inflight.add(k)
+                self.versions[k] = self.versions.get(k, 0) + 1
+        written = 0
+        for k, (collection, query, pending) in entries:
+            failed = None
+            try:
+                self.writer(collection, query, pending.to_update(), pending.upsert)
+                written += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error writing coalesced {collection} update: {e}")
+                failed = pending
+            finally:
+                if failed is not None:
+                    with self.lock:
+                        failed = self._requeue(k, collection, query, failed)
+                    if failed is not None:
+                        # Still in flight, so newer writes to the document wait behind it
+                        self._hand_off(collection, query, failed)
+                with self.lock:
+                    self.inflight.discard(k)
+                    self.settled.notify_all()
+        self.stats["written"] += written
+        return written
+
+    def _requeue(self, key: Tuple, collection: str, query: Dict[str, Any], pending: PendingUpdate) -> Optional[PendingUpdate]:
+        """Put a failed update back ahead of newer ones (lock held); returns it if it must be handed off"""
+        pending.failures += 1
+        if pending.failures >= self.max_retries:
+            return pending
+        newer = self.pending.get(key)
+        if newer is not None:
+            if newer[2].upsert != pending.upsert or not pending.merge(newer[2].to_update()):
+                return pending
+            pending.merged += newer[2].merged
+        self.pending[key] = (collection, query, pending)
+        self.stats["requeued"] += 1
+        self._ensure_thread()
+        return None
+
+    def _hand_off(self, collection: str, query: Dict[str, Any], pending: PendingUpdate):
+        if self.fallback is None:
+            self.stats["dropped"] += 1
+            logger.error(f"❌ Dropping coalesced {collection} update after {pending.failures} failed writes")
+            return
+        try:
+            self.fallback(collection, query, pending.to_update(), pending.upsert)
+            self.stats["handed_off"] += 1
+        except Exception as e:
+            self.stats["dropped"] += 1
+            logger.error(f"❌ Dropping coalesced {collection} update, fallback failed: {e}")
+
+    def flush_document(self, collection: str, query: Dict[str, Any]) -> int:
+        return self.flush(self.key(collection, query))
+
+    def read(self, collection: str, query: Dict[str, Any], fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """fetch() the document and apply anything still queued for it"""
+        key = self.key(collection, query)
+        while True:
+            with self.lock:
+                while key in self.inflight:
+                    self.settled.wait()
+                version = self.versions.get(key, 0)
+            document = fetch()
+            with self.lock:
+                # A flush that started meanwhile may or may not be in `document`; read again
+                if self.versions.get(key, 0) != version:
+                    continue
+                entry = self.pending.get(key)
+                return entry[2].apply(document) if entry else document
+
+    async def flush_async(self, key: Optional[Tuple] = None) -> int:
+        """flush() from a coroutine, waiting on in-flight writes off the event loop"""
+        return await asyncio.to_thread(self.flush, key)
+
+    async def read_async(self, collection: str, query: Dict[str, Any],
+                         fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """read() from a coroutine, waiting on in-flight writes off the event loop"""
+        return await asyncio.to_thread(self.read, collection, query, fetch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            pending = len(self.pending)
+        return {"pending": pending, **self.stats,
+                "writes_saved": max(0, self.stats["submitted"] - self.stats["written"] - pending)}
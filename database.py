@@ -1,12 +1,15 @@
 """
 Professional Discord Bot Database System
-Supports MongoDB with automatic fallback to in-memory storage
+Supports MongoDB with automatic fallback to local storage (in-memory, or SQLite on disk)
 """
 
 import os
 import asyncio
 import time
 import logging
+import functools
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
 import json
@@ -32,6 +35,57 @@ try:
 except ImportError:
     logger.warning("⚠️ python-dotenv not available")
 
+from core.histogram import get_latency_tracker
+from core.instrumentation import measure_phase
+from core.user_schema import (COLD_FIELDS, UserDocument, OfflineUserDocument, ColdFieldMigrator,
+                              split_user_update, offline_changes, hot_defaults, move_cold_fields)
+from core.storage import create_storage
+from core.connection import PoolConfig, CircuitBreaker, WriteAheadBuffer, TopologyMonitor, PoolMonitor
+from core.write_coalescer import WriteCoalescer
+from core.transfers import TwoPhaseTransfers
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+# "mongodb" (falls back to memory when unreachable), "sqlite" or "memory"
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongodb').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'coalbot.db')
+# Writes accepted while MongoDB is unreachable, replayed in order once it is back
+WRITE_BUFFER_PATH = os.getenv('MONGODB_WRITE_BUFFER_PATH', '.pending_writes.jsonl')
+# Buffered writes the server rejected on replay (kept for inspection, never retried)
+DEAD_LETTER_PATH = os.getenv('MONGODB_DEAD_LETTER_PATH', '.dead_letter_writes.jsonl')
+# Per-user updates arriving within this window are merged into one update_one (0 disables)
+WRITE_COALESCE_MS = int(os.getenv('WRITE_COALESCE_MS', '50'))
+# Collections whose documents belong to one user (queried by user_id or _id)
+USER_COLLECTIONS = {"users", *COLD_FIELDS.values()}
+
+# Field projections for read paths that only need a slice of the user document
+USER_VIEWS = {
+    "stats": ("coins", "bank", "xp", "level", "cookies", "daily_streak", "work_streak", "last_xp_time"),
+    "balance": ("coins", "bank", "last_work"),
+    "profile": ("xp", "cookies", "coins", "daily_streak", "last_work", "job_tier", "current_job",
+                "successful_works", "total_works", "work_streak", "consecutive_works"),
+    "work": ("last_work",),
+    "cookies": ("cookies",),
+}
+VIEW_CACHE_TTL = 15  # seconds; writes through this manager invalidate immediately
+VIEW_CACHE_SIZE = 10000
+RANK_TOTAL_TTL = 60  # seconds; "of N" on ranks may lag new users by this much
+
+def timed_operation(func):
+    """Record how long a storage operation takes in the shared latency histograms"""
+    name = func.__name__
+    tracker = get_latency_tracker()
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with measure_phase("db"):
+                return func(*args, **kwargs)
+        finally:
+            tracker.record("db", name, time.perf_counter() - start)
+    return wrapper
+
 class DatabaseManager:
     """
     Professional Database Manager with MongoDB and Memory Storage
@@ -44,9 +98,36 @@ class DatabaseManager:
         self.guilds_collection = None
         self.connected_to_mongodb = False
         
-        # In-memory storage as fallback
-        self.memory_users = {}
-        self.memory_guilds = {}
+        # Local storage used whenever MongoDB is not
+        self.storage = None
+        
+        # Outage handling: short-circuit after repeated failures, buffer writes, replay on recovery
+        self.pool_config = PoolConfig.from_env()
+        self.circuit = CircuitBreaker()
+        self.write_buffer = WriteAheadBuffer(WRITE_BUFFER_PATH, dead_letter_path=DEAD_LETTER_PATH)
+        self.pool_monitor = PoolMonitor()
+        self.replay_lock = threading.Lock()
+        self.replay_thread = None
+        self.replay_requested = False
+        self.replay_thread_lock = threading.Lock()
+        
+        # Merges bursts of writes to the same user; reads see queued writes (read-your-writes)
+        self.coalescer = (WriteCoalescer(self._write_now, WRITE_COALESCE_MS / 1000, fallback=self._buffer_write)
+                          if WRITE_COALESCE_MS > 0 else None)
+        
+        # Projected user views keyed by (view, user_id)
+        self.view_cache = OrderedDict()
+        self.view_cache_hits = 0
+        self.view_cache_misses = 0
+        # {field: (fetched_at, ranked users)} for get_ranks
+        self.rank_totals = {}
+        
+        # Moves legacy cold fields out of `users` in the background (MongoDB only)
+        self.cold_migrator = None
+        
+        # Transfers use a session transaction unless the deployment is a standalone server
+        self.transactions_supported = True
+        self.two_phase_transfers = None
         
         # Initialize connection
         self.initialize_database()
@@ -56,24 +137,27 @@ class DatabaseManager:
         try:
             mongodb_uri = os.getenv('MONGODB_URI')
             
-            if MONGODB_AVAILABLE and mongodb_uri:
-                # Try MongoDB connection
+            if STORAGE_BACKEND == 'mongodb' and MONGODB_AVAILABLE and mongodb_uri:
+                # The driver reconnects in the background; the topology monitor tells us when
                 self.mongodb_client = MongoClient(
                     mongodb_uri,
-                    serverSelectionTimeoutMS=5000,
-                    connectTimeoutMS=5000,
-                    socketTimeoutMS=5000
+                    event_listeners=[TopologyMonitor(self._on_mongodb_up, self._on_mongodb_down), self.pool_monitor],
+                    **self.pool_config.client_kwargs()
                 )
-                
-                # Test connection
-                self.mongodb_client.admin.command('ping')
                 db_name = os.getenv('MONGODB_DATABASE', 'coalbot')
                 self.mongodb_db = self.mongodb_client[db_name]
                 self.users_collection = self.mongodb_db.users
                 self.guilds_collection = self.mongodb_db.guilds
                 self.connected_to_mongodb = True
+                self.cold_migrator = ColdFieldMigrator(self.mongodb_db)
                 
-                logger.info("🎯 MongoDB connection established successfully!")
+                # Unreachable at boot is an outage, not a reason to drop to memory for good
+                try:
+                    self.mongodb_client.admin.command('ping')
+                    logger.info("🎯 MongoDB connection established successfully!")
+                except ConnectionFailure as e:
+                    self.circuit.trip()
+                    logger.warning(f"⚠️ MongoDB unreachable at startup ({e}) - will reconnect in the background")
                 return
                 
         except Exception as e:
@@ -81,56 +165,330 @@ class DatabaseManager:
         self.users_collection = None
         self.guilds_collection = None
         
-        # Fallback to memory storage
+        # Fallback to local storage
         self.connected_to_mongodb = False
-        logger.info("📝 Using in-memory database storage")
+        self.storage = create_storage('sqlite' if STORAGE_BACKEND == 'sqlite' else 'memory', SQLITE_PATH)
+        logger.info(f"📝 Using {self.storage.name} database storage")
+    
+    # ==================== CONNECTION HEALTH ====================
+    
+    def _on_mongodb_up(self):
+        self.circuit.record_success()
+        self.schedule_replay()
+    
+    def schedule_replay(self):
+        """Replay in the background unless the circuit is open
+
+        Called on topology recovery and whenever a write or the cleanup task finds the
+        buffer non-empty, so a failure that never changed the topology (a socket
+        timeout) still drains; the replay itself is the probe. A request made while a
+        replay is running makes that thread go round again.
+        """
+        if not len(self.write_buffer) or not self.circuit.allow():
+            return
+        with self.replay_thread_lock:
+            if self.replay_thread is not None:
+                self.replay_requested = True
+                return
+            self.replay_thread = threading.Thread(target=self._replay_in_background, name="mongodb-replay", daemon=True)
+            self.replay_thread.start()
+    
+    def _replay_in_background(self):
+        while True:
+            with self.replay_thread_lock:
+                self.replay_requested = False
+            self.replay_pending_writes()
+            with self.replay_thread_lock:
+                if not (self.replay_requested and len(self.write_buffer) and self.circuit.allow()):
+                    self.replay_thread = None
+                    return
+    
+    def _on_mongodb_down(self):
+        self.circuit.trip()
+    
+    def replay_pending_writes(self) -> int:
+        """Apply writes buffered during an outage, in order"""
+        with self.replay_lock:
+            if not len(self.write_buffer):
+                return 0
+            try:
+                replayed = self.write_buffer.replay(self.mongodb_db)
+                self.circuit.record_success()
+                logger.info(f"📼 Replayed {replayed} buffered MongoDB writes")
+                return replayed
+            except ConnectionFailure as e:
+                self.circuit.record_failure()
+                logger.warning(f"⚠️ Replay interrupted, {len(self.write_buffer)} writes still buffered: {e}")
+                return 0
+            finally:
+                # Views read during the outage hold defaults
+                self.view_cache.clear()
+    
+    def _buffering(self) -> bool:
+        """Whether writes are going to the write-ahead buffer instead of MongoDB"""
+        return len(self.write_buffer) > 0 or not self.circuit.allow()
+    
+    def _write(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+               upsert: bool = False, require_match: bool = False) -> bool:
+        """update_one on a user document, merged with other writes to it when possible"""
+        if require_match and self._buffering():
+            # A guard can't be checked against a balance we can't see
+            return False
+        if self.coalescer is None or collection not in USER_COLLECTIONS:
+            return self._write_now(collection, query, update, upsert, require_match)
+        key = {field: value for field, value in query.items() if not isinstance(value, dict)}
+        guard = {field: value for field, value in query.items() if isinstance(value, dict)}
+        if not guard and upsert:
+            self.coalescer.submit(collection, key, update, upsert)
+            return True
+        if guard and require_match:
+            # e.g. a debit right after a full-document save: the queued balance decides the guard
+            matched = self.coalescer.submit_guarded(collection, key, guard, update)
+            if matched is not None:
+                return matched
+        # Conditional writes need the server's answer, so queued writes to the document go first
+        self.coalescer.flush_document(collection, key)
+        return self._write_now(collection, query, update, upsert, require_match)
+    
+    def _write_now(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                   upsert: bool = False, require_match: bool = False) -> bool:
+        """update_one that is buffered instead of lost when MongoDB is unreachable"""
+        # Queue behind anything not yet replayed so writes apply in order
+        if self._buffering():
+            if require_match:
+                return False
+            self._buffer_write(collection, query, update, upsert)
+            return True
+        try:
+            result = self.mongodb_db[collection].update_one(query, update, upsert=upsert)
+        except ConnectionFailure as e:
+            self.circuit.record_failure()
+            if require_match:
+                # Conditional writes (debits) are refused, never buffered as if they had matched
+                logger.warning(f"⚠️ Refused conditional {collection} write during MongoDB outage: {e}")
+                return False
+            self.write_buffer.append(collection, query, update, upsert)
+            logger.warning(f"⚠️ Buffered {collection} write during MongoDB outage: {e}")
+            return True
+        self.circuit.record_success()
+        self.schedule_replay()
+        return result.matched_count > 0 if require_match else result.acknowledged
+    
+    def _buffer_write(self, collection: str, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        """Queue a write for replay (rejected ones end up in the dead-letter file)"""
+        self.write_buffer.append(collection, query, update, upsert)
+        self.schedule_replay()
+    
+    def _read(self, collection: str, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """find_one on a user document, including writes still waiting to be coalesced"""
+        source = self.users_collection if collection == "users" else self.mongodb_db[collection]
+        fetch = lambda: source.find_one(query, projection)
+        if self.coalescer is None:
+            return fetch()
+        return self.coalescer.read(collection, query, fetch)
+    
+    def flush_writes(self) -> int:
+        """Write everything the coalescer is holding (before bulk jobs and on shutdown)"""
+        return self.coalescer.flush() if self.coalescer is not None else 0
+    
+    async def flush_writes_async(self) -> int:
+        """flush_writes() from a coroutine without blocking the event loop"""
+        return await self.coalescer.flush_async() if self.coalescer is not None else 0
+    
+    def _offline_user(self, user_id: int) -> OfflineUserDocument:
+        defaults = self._create_default_user_data(user_id)
+        return OfflineUserDocument(hot_defaults(defaults), defaults)
+    
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Circuit breaker, write buffer and pool gauges"""
+        return {
+            "circuit": self.circuit.get_stats(),
+            "write_buffer": self.write_buffer.get_stats(),
+            "pool": {"max_size": self.pool_config.max_pool_size, "min_size": self.pool_config.min_pool_size,
+                     **self.pool_monitor.get_stats()},
+            "coalescer": self.coalescer.get_stats() if self.coalescer is not None else None
+        }
     
     # ==================== USER DATA OPERATIONS ====================
     
+    @timed_operation
     def get_user_data(self, user_id: int) -> Dict[str, Any]:
-        """Get user data from database"""
+        """Get user data from database (cold fields load on first access in MongoDB mode)"""
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                result = self.users_collection.find_one({"user_id": user_id})
-                if result:
-                    return result
+                # Until buffered writes are replayed the stored document is behind too
+                if self._buffering():
+                    self.schedule_replay()
+                    return self._offline_user(user_id)
+                result = self._read("users", {"user_id": user_id})
+                self.circuit.record_success()
+                defaults = self._create_default_user_data(user_id)
+                return UserDocument(result or hot_defaults(defaults),
+                                    lambda collection: self._load_feature(user_id, collection), defaults)
             else:
-                if user_id in self.memory_users:
-                    return self.memory_users[user_id]
+                document = self.storage.get_user(user_id)
+                if document is not None:
+                    return document
             
             # Return default user data
             return self._create_default_user_data(user_id)
             
+        except ConnectionFailure as e:
+            self.circuit.record_failure()
+            logger.error(f"MongoDB unreachable getting user data for {user_id}: {e}")
+            return self._offline_user(user_id)
         except Exception as e:
             logger.error(f"Error getting user data for {user_id}: {e}")
             return self._create_default_user_data(user_id)
     
+    @timed_operation
     def update_user_data(self, user_id: int, data: Dict[str, Any]) -> bool:
         """Update user data in database"""
+        self._invalidate_views(user_id)
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                self.users_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": data},
-                    upsert=True
-                )
+                if isinstance(data, OfflineUserDocument):
+                    # Edits to defaults served during an outage merge in as deltas
+                    for collection, update in offline_changes(data).items():
+                        key = {"user_id": user_id} if collection == "users" else {"_id": user_id}
+                        self._write(collection, key, update, upsert=True)
+                    return True
+                # Hot counters go to `users`, changed cold fields to their feature collections
+                hot, cold = split_user_update(data)
+                update = {}
+                if hot:
+                    update["$set"] = hot
+                if cold and self.legacy_cold_fields:
+                    update["$unset"] = {field: "" for fields in cold.values() for field in fields}
+                if update:
+                    self._write("users", {"user_id": user_id}, update, upsert=True)
+                for collection, fields in cold.items():
+                    self._write(collection, {"_id": user_id}, {"$set": fields}, upsert=True)
                 return True
             else:
-                if user_id not in self.memory_users:
-                    self.memory_users[user_id] = self._create_default_user_data(user_id)
-                self.memory_users[user_id].update(data)
+                self.storage.update_user(user_id, data, self._create_default_user_data(user_id))
                 return True
                 
         except Exception as e:
             logger.error(f"Error updating user data for {user_id}: {e}")
             return False
     
+    # ==================== COLD FIELDS ====================
+    
+    @property
+    def legacy_cold_fields(self) -> bool:
+        """Whether some users may still carry cold fields in their `users` document"""
+        return not (self.cold_migrator and self.cold_migrator.complete)
+    
+    @timed_operation
+    def _load_feature(self, user_id: int, collection: str) -> Dict[str, Any]:
+        return self._read(collection, {"_id": user_id}) or {}
+    
+    def _migrate_user_now(self, user_id: int):
+        """Move one user's legacy cold fields before writing to them in place"""
+        if not self.legacy_cold_fields or not self.circuit.allow():
+            return
+        try:
+            document = self.users_collection.find_one({"user_id": user_id}, {"user_id": 1, **{f: 1 for f in COLD_FIELDS}})
+            if document and any(field in document for field in COLD_FIELDS):
+                move_cold_fields(self.mongodb_db, document)
+        except ConnectionFailure:
+            # The write itself gets buffered; the migrator moves this user later
+            self.circuit.record_failure()
+    
+    @timed_operation
+    def get_cold_field(self, user_id: int, field: str, default: Any = None) -> Any:
+        """Read one cold field without touching the hot document"""
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                if not self.circuit.allow():
+                    return default
+                document = self._read(COLD_FIELDS[field], {"_id": user_id}, {field: 1})
+                if document and field in document:
+                    return document[field]
+                if self.legacy_cold_fields:
+                    document = self.users_collection.find_one({"user_id": user_id}, {field: 1})
+                    if document and field in document:
+                        return document[field]
+                return default
+            return (self.storage.get_user(user_id) or {}).get(field, default)
+        except Exception as e:
+            logger.error(f"Error getting {field} for {user_id}: {e}")
+            return default
+    
+    @timed_operation
+    def push_cold_item(self, user_id: int, field: str, item: Any) -> bool:
+        """Append to a cold array with one $push instead of rewriting the user document"""
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                self._migrate_user_now(user_id)
+                self._write(COLD_FIELDS[field], {"_id": user_id}, {"$push": {field: item}}, upsert=True)
+            else:
+                self.storage.push(user_id, field, item, self._create_default_user_data(user_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error adding to {field} for {user_id}: {e}")
+            return False
+    
+    # ==================== PROJECTED VIEWS ====================
+    
+    @timed_operation
+    def find_user(self, user_id: int, fields: tuple) -> Dict[str, Any]:
+        """Fetch only `fields` of a user document, filling gaps from the defaults"""
+        defaults = self._create_default_user_data(user_id)
+        document = None
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                if self.circuit.allow():
+                    projection = {"_id": 0, "user_id": 1, **{field: 1 for field in fields}}
+                    document = self._read("users", {"user_id": user_id}, projection)
+            else:
+                document = self.storage.get_user(user_id)
+        except Exception as e:
+            logger.error(f"Error getting fields {fields} for {user_id}: {e}")
+        
+        document = document or {}
+        return {"user_id": user_id, **{field: document.get(field, defaults.get(field, 0)) for field in fields}}
+    
+    def get_user_view(self, user_id: int, view: str) -> Dict[str, Any]:
+        """Typed slice of a user document (see USER_VIEWS), cached per view"""
+        key = (view, user_id)
+        cached = self.view_cache.get(key)
+        if cached is not None and time.time() - cached[0] < VIEW_CACHE_TTL:
+            self.view_cache.move_to_end(key)
+            self.view_cache_hits += 1
+            return dict(cached[1])
+        
+        self.view_cache_misses += 1
+        data = self.find_user(user_id, USER_VIEWS[view])
+        self.view_cache[key] = (time.time(), data)
+        self.view_cache.move_to_end(key)
+        while len(self.view_cache) > VIEW_CACHE_SIZE:
+            self.view_cache.popitem(last=False)
+        return dict(data)
+    
+    def _invalidate_views(self, user_id: int):
+        for view in USER_VIEWS:
+            self.view_cache.pop((view, user_id), None)
+    
+    def get_view_cache_stats(self) -> Dict[str, Any]:
+        lookups = self.view_cache_hits + self.view_cache_misses
+        return {
+            "size": len(self.view_cache),
+            "hits": self.view_cache_hits,
+            "misses": self.view_cache_misses,
+            "hit_ratio": round(self.view_cache_hits / lookups, 4) if lookups else 0.0
+        }
+    
     def _create_default_user_data(self, user_id: int) -> Dict[str, Any]:
         """Create default user data structure"""
         return {
             "user_id": user_id,
             "coins": 1000,
             "bank": 0,
+            "savings_balance": 0,
+            "job_tier": "entry",
+            "successful_works": 0,
             "xp": 0,
             "level": 1,
             "daily_streak": 0,
@@ -189,11 +547,14 @@ class DatabaseManager:
     
     # ==================== ECONOMY OPERATIONS ====================
     
+    @timed_operation
     def add_coins(self, user_id: int, amount: int) -> bool:
         """Add coins to user account"""
+        self._invalidate_views(user_id)
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                result = self.users_collection.update_one(
+                return self._write(
+                    "users",
                     {"user_id": user_id},
                     {
                         "$inc": {"coins": amount, "economy.total_earned": amount},
@@ -201,47 +562,155 @@ class DatabaseManager:
                     },
                     upsert=True
                 )
-                return result.acknowledged
             else:
-                if user_id not in self.memory_users:
-                    self.memory_users[user_id] = self._create_default_user_data(user_id)
-                self.memory_users[user_id]["coins"] += amount
-                self.memory_users[user_id]["economy"]["total_earned"] += amount
+                self.storage.increment(user_id, {"coins": amount, "economy.total_earned": amount},
+                                       self._create_default_user_data(user_id))
                 return True
                 
         except Exception as e:
             logger.error(f"Error adding coins for {user_id}: {e}")
             return False
     
+    @timed_operation
     def remove_coins(self, user_id: int, amount: int) -> bool:
         """Remove coins from user account"""
         try:
             user_data = self.get_user_data(user_id)
-            if user_data["coins"] < amount:
+            if isinstance(user_data, OfflineUserDocument) or user_data["coins"] < amount:
                 return False
             
+            self._invalidate_views(user_id)
             if self.connected_to_mongodb and self.users_collection is not None:
-                result = self.users_collection.update_one(
-                    {"user_id": user_id},
+                # The balance guard also keeps a replayed debit from overdrawing
+                return self._write(
+                    "users",
+                    {"user_id": user_id, "coins": {"$gte": amount}},
                     {
                         "$inc": {"coins": -amount, "economy.total_spent": amount},
                         "$set": {"last_seen": datetime.now(timezone.utc)}
-                    }
+                    },
+                    require_match=True
                 )
-                return result.acknowledged
             else:
-                self.memory_users[user_id]["coins"] -= amount
-                self.memory_users[user_id]["economy"]["total_spent"] += amount
+                self.storage.increment(user_id, {"coins": -amount, "economy.total_spent": amount},
+                                       self._create_default_user_data(user_id))
                 return True
                 
         except Exception as e:
             logger.error(f"Error removing coins for {user_id}: {e}")
             return False
     
+    @timed_operation
+    def move_coins(self, user_id: int, amount: int, source: str = "coins", target: str = "bank") -> Dict[str, Any]:
+        """Move `amount` between two balances of one user (ATM deposits and withdrawals) in one guarded $inc"""
+        if amount <= 0 or source == target:
+            return {"success": False, "message": "Invalid amount"}
+        self._invalidate_views(user_id)
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                moved = self._write(
+                    "users",
+                    {"user_id": user_id, source: {"$gte": amount}},
+                    {"$inc": {source: -amount, target: amount}, "$set": {"last_seen": datetime.now(timezone.utc)}},
+                    require_match=True
+                )
+                if not moved and self._buffering():
+                    return {"success": False, "message": "The bank is temporarily unavailable, try again shortly"}
+            else:
+                moved = self.storage.move(user_id, source, target, amount, self._create_default_user_data(user_id))
+            if not moved:
+                return {"success": False, "message": "Insufficient funds"}
+            return {"success": True, "amount": amount}
+            
+        except Exception as e:
+            logger.error(f"Error moving {source} to {target} for {user_id}: {e}")
+            return {"success": False, "message": "Transfer failed"}
+    
+    @timed_operation
+    def transfer(self, sender_id: int, recipient_id: int, amount: int, fee: int = 0, field: str = "bank") -> Dict[str, Any]:
+        """Atomically move `amount` from one user's `field` to another's, charging the sender `fee` on top"""
+        if amount <= 0 or fee < 0 or sender_id == recipient_id:
+            return {"success": False, "message": "Invalid transfer"}
+        self._invalidate_views(sender_id)
+        self._invalidate_views(recipient_id)
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                # Balances are unknown while writes are buffered, so don't move coins on a guess
+                if self._buffering():
+                    return {"success": False, "message": "The bank is temporarily unavailable, try again shortly"}
+                if self.coalescer is not None:
+                    for user_id in (sender_id, recipient_id):
+                        self.coalescer.flush_document("users", {"user_id": user_id})
+                balance = self._transfer_mongodb(sender_id, recipient_id, field, amount + fee, amount)
+                self.circuit.record_success()
+            else:
+                balance = self.storage.transfer(sender_id, recipient_id, field, amount + fee, amount,
+                                                self._create_default_user_data(sender_id),
+                                                self._create_default_user_data(recipient_id))
+            if balance is None:
+                return {"success": False, "message": "Insufficient funds"}
+            return {"success": True, "amount": amount, "fee": fee, "balance": balance}
+            
+        except ConnectionFailure as e:
+            self.circuit.record_failure()
+            logger.error(f"MongoDB unreachable transferring from {sender_id} to {recipient_id}: {e}")
+            return {"success": False, "message": "The bank is temporarily unavailable, try again shortly"}
+        except Exception as e:
+            logger.error(f"Error transferring from {sender_id} to {recipient_id}: {e}")
+            return {"success": False, "message": "Transfer failed"}
+    
+    def _transfer_mongodb(self, sender_id: int, recipient_id: int, field: str, debit: int, credit: int) -> Optional[int]:
+        recipient_defaults = {key: value for key, value in hot_defaults(self._create_default_user_data(recipient_id)).items()
+                              if key != "user_id"}
+        if self.transactions_supported:
+            try:
+                with self.mongodb_client.start_session() as session:
+                    return session.with_transaction(
+                        lambda session: self._transfer_in_session(session, sender_id, recipient_id, field, debit,
+                                                                  credit, recipient_defaults))
+            except OperationFailure as e:
+                # IllegalOperation: transactions need a replica set or sharded cluster
+                if e.code != 20:
+                    raise
+                self.transactions_supported = False
+                logger.warning("⚠️ MongoDB has no transaction support here - using two-phase transfers")
+        return self._two_phase().transfer(sender_id, recipient_id, field, debit, credit, recipient_defaults)
+    
+    def _transfer_in_session(self, session, sender_id: int, recipient_id: int, field: str, debit: int,
+                             credit: int, recipient_defaults: Dict[str, Any]) -> Optional[int]:
+        sender = self.users_collection.find_one_and_update(
+            {"user_id": sender_id, field: {"$gte": debit}}, {"$inc": {field: -debit}},
+            projection={field: 1}, return_document=ReturnDocument.AFTER, session=session
+        )
+        if sender is None:
+            return None
+        self.users_collection.update_one(
+            {"user_id": recipient_id},
+            {"$inc": {field: credit}, "$setOnInsert": {k: v for k, v in recipient_defaults.items() if k != field}},
+            upsert=True, session=session
+        )
+        return sender[field]
+    
+    def _two_phase(self) -> TwoPhaseTransfers:
+        if self.two_phase_transfers is None:
+            self.two_phase_transfers = TwoPhaseTransfers(self.mongodb_db)
+        return self.two_phase_transfers
+    
+    def recover_transfers(self) -> int:
+        """Finish two-phase transfers interrupted by a crash (no-op with transactions)"""
+        if self.transactions_supported or not self.connected_to_mongodb or not self.circuit.allow():
+            return 0
+        defaults_for = lambda user_id: {key: value for key, value in
+                                        hot_defaults(self._create_default_user_data(user_id)).items() if key != "user_id"}
+        return self._two_phase().recover(defaults_for=defaults_for)
+    
     def claim_daily_bonus(self, user_id: int) -> Dict[str, Any]:
         """Claim daily bonus with streak system"""
         try:
             user_data = self.get_user_data(user_id)
+            if isinstance(user_data, OfflineUserDocument):
+                # The real streak and last claim are unknown while MongoDB is unreachable
+                return {"success": False, "message": "Daily bonuses are temporarily unavailable, try again shortly"}
             current_time = time.time()
             last_daily = user_data.get("last_daily", 0)
             
@@ -309,8 +778,7 @@ class DatabaseManager:
     def can_work(self, user_id: int) -> bool:
         """Check if user can work"""
         try:
-            user_data = self.get_user_data(user_id)
-            last_work = user_data.get("last_work", 0)
+            last_work = self.get_user_view(user_id, "work")["last_work"]
             return time.time() - last_work >= 3600  # 1 hour cooldown
         except:
             return True
@@ -319,6 +787,8 @@ class DatabaseManager:
         """Process work activity"""
         try:
             user_data = self.get_user_data(user_id)
+            if isinstance(user_data, OfflineUserDocument):
+                return {"success": False, "message": "Work is temporarily unavailable, try again shortly"}
             current_time = time.time()
             
             # Update work data
@@ -357,6 +827,12 @@ class DatabaseManager:
         """Add XP and handle level ups"""
         try:
             user_data = self.get_user_data(user_id)
+            if isinstance(user_data, OfflineUserDocument):
+                # Only the gain is known; the level catches up on the next award after the outage
+                self._invalidate_views(user_id)
+                self._write("users", {"user_id": user_id},
+                            {"$inc": {"xp": amount}, "$set": {"last_seen": datetime.now(timezone.utc)}}, upsert=True)
+                return {"xp_gained": amount, "leveled_up": False}
             old_level = user_data["level"]
             new_xp = user_data["xp"] + amount
             new_level = self._calculate_level(new_xp)
@@ -393,13 +869,7 @@ class DatabaseManager:
                 "purchased_at": time.time()
             }
             
-            user_data = self.get_user_data(user_id)
-            if "temporary_purchases" not in user_data:
-                user_data["temporary_purchases"] = []
-            user_data["temporary_purchases"].append(purchase_data)
-            
-            self.update_user_data(user_id, user_data)
-            return True
+            return self.push_cold_item(user_id, "temporary_purchases", purchase_data)
         except Exception as e:
             logger.error(f"Error adding temporary purchase: {e}")
             return False
@@ -407,11 +877,10 @@ class DatabaseManager:
     def get_active_temporary_purchases(self, user_id: int) -> List[Dict[str, Any]]:
         """Get active temporary purchases"""
         try:
-            user_data = self.get_user_data(user_id)
             current_time = time.time()
             active_purchases = []
             
-            for purchase in user_data.get("temporary_purchases", []):
+            for purchase in self.get_cold_field(user_id, "temporary_purchases", []):
                 if purchase.get("expires_at", 0) > current_time:
                     active_purchases.append(purchase)
             
@@ -420,6 +889,7 @@ class DatabaseManager:
             logger.error(f"Error getting active purchases: {e}")
             return []
     
+    @timed_operation
     def get_active_temporary_roles(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get active temporary roles"""
         try:
@@ -427,16 +897,18 @@ class DatabaseManager:
             active_roles = []
             
             if user_id:
-                user_data = self.get_user_data(user_id)
-                for role in user_data.get("temporary_roles", []):
+                for role in self.get_cold_field(user_id, "temporary_roles", []):
                     if role.get("expires_at", 0) > current_time:
                         active_roles.append(role)
             else:
                 # Get all users with active roles
                 if self.connected_to_mongodb and self.users_collection is not None:
-                    users = self.users_collection.find({"temporary_roles": {"$exists": True}})
+                    query = {"temporary_roles.expires_at": {"$gt": current_time}}
+                    users = list(self.mongodb_db.user_temporary.find(query, {"_id": 0, "temporary_roles": 1}))
+                    if self.legacy_cold_fields:
+                        users += list(self.users_collection.find(query, {"_id": 0, "temporary_roles": 1}))
                 else:
-                    users = self.memory_users.values()
+                    users = self.storage.users()
                 
                 for user_data in users:
                     for role in user_data.get("temporary_roles", []):
@@ -448,6 +920,7 @@ class DatabaseManager:
             logger.error(f"Error getting active roles: {e}")
             return []
     
+    @timed_operation
     def get_pending_reminders(self) -> List[Dict[str, Any]]:
         """Get pending reminders"""
         try:
@@ -455,9 +928,12 @@ class DatabaseManager:
             pending_reminders = []
             
             if self.connected_to_mongodb and self.users_collection is not None:
-                users = self.users_collection.find({"reminders": {"$exists": True}})
+                query = {"reminders.remind_at": {"$lte": current_time}}
+                users = list(self.mongodb_db.user_reminders.find(query, {"_id": 0, "reminders": 1}))
+                if self.legacy_cold_fields:
+                    users += list(self.users_collection.find(query, {"_id": 0, "reminders": 1}))
             else:
-                users = self.memory_users.values()
+                users = self.storage.users()
             
             for user_data in users:
                 for reminder in user_data.get("reminders", []):
@@ -472,38 +948,25 @@ class DatabaseManager:
     def get_live_user_stats(self, user_id: int) -> Dict[str, Any]:
         """Get live user statistics"""
         try:
-            user_data = self.get_user_data(user_id)
-            return {
-                "coins": user_data.get("coins", 0),
-                "bank": user_data.get("bank", 0),
-                "xp": user_data.get("xp", 0),
-                "level": user_data.get("level", 1),
-                "daily_streak": user_data.get("daily_streak", 0),
-                "work_streak": user_data.get("work_streak", 0)
-            }
+            return self.get_user_view(user_id, "stats")
         except Exception as e:
             logger.error(f"Error getting live user stats: {e}")
-            return {"coins": 0, "bank": 0, "xp": 0, "level": 1, "daily_streak": 0, "work_streak": 0}
+            return {"coins": 0, "bank": 0, "xp": 0, "level": 1, "cookies": 0, "daily_streak": 0,
+                    "work_streak": 0, "last_xp_time": 0}
     
     # ==================== PET SYSTEM ====================
     
     def get_user_pets(self, user_id: int) -> List[Dict[str, Any]]:
         """Get user pets"""
         try:
-            user_data = self.get_user_data(user_id)
-            return user_data.get("pets", [])
+            return self.get_cold_field(user_id, "pets", [])
         except:
             return []
     
     def add_pet(self, user_id: int, pet_data: Dict[str, Any]) -> bool:
         """Add pet to user"""
         try:
-            user_data = self.get_user_data(user_id)
-            if "pets" not in user_data:
-                user_data["pets"] = []
-            user_data["pets"].append(pet_data)
-            self.update_user_data(user_id, user_data)
-            return True
+            return self.push_cold_item(user_id, "pets", pet_data)
         except:
             return False
     
@@ -523,8 +986,7 @@ class DatabaseManager:
     def get_cookies(self, user_id: int) -> int:
         """Get user cookies"""
         try:
-            user_data = self.get_user_data(user_id)
-            return user_data.get("cookies", 0)
+            return self.get_user_view(user_id, "cookies")["cookies"]
         except:
             return 0
     
@@ -533,20 +995,14 @@ class DatabaseManager:
     def add_warning(self, user_id: int, warning_data: Dict[str, Any]) -> bool:
         """Add warning to user"""
         try:
-            user_data = self.get_user_data(user_id)
-            if "warnings" not in user_data:
-                user_data["warnings"] = []
-            user_data["warnings"].append(warning_data)
-            self.update_user_data(user_id, user_data)
-            return True
+            return self.push_cold_item(user_id, "warnings", warning_data)
         except:
             return False
     
     def get_warnings(self, user_id: int) -> List[Dict[str, Any]]:
         """Get user warnings"""
         try:
-            user_data = self.get_user_data(user_id)
-            return user_data.get("warnings", [])
+            return self.get_cold_field(user_id, "warnings", [])
         except:
             return []
     
@@ -555,12 +1011,7 @@ class DatabaseManager:
     def add_reminder(self, user_id: int, reminder_data: Dict[str, Any]) -> bool:
         """Add reminder"""
         try:
-            user_data = self.get_user_data(user_id)
-            if "reminders" not in user_data:
-                user_data["reminders"] = []
-            user_data["reminders"].append(reminder_data)
-            self.update_user_data(user_id, user_data)
-            return True
+            return self.push_cold_item(user_id, "reminders", reminder_data)
         except:
             return False
     
@@ -569,18 +1020,14 @@ class DatabaseManager:
     def get_user_stocks(self, user_id: int) -> Dict[str, Any]:
         """Get user stocks"""
         try:
-            user_data = self.get_user_data(user_id)
-            return user_data.get("stocks", {})
+            return self.get_cold_field(user_id, "stocks", {})
         except:
             return {}
     
     def update_user_stocks(self, user_id: int, stocks: Dict[str, Any]) -> bool:
         """Update user stocks"""
         try:
-            user_data = self.get_user_data(user_id)
-            user_data["stocks"] = stocks
-            self.update_user_data(user_id, user_data)
-            return True
+            return self.update_user_data(user_id, {"stocks": stocks})
         except:
             return False
     
@@ -606,16 +1053,18 @@ class DatabaseManager:
     
     # ==================== GUILD DATA OPERATIONS ====================
     
+    @timed_operation
     def get_guild_data(self, guild_id: int) -> Dict[str, Any]:
         """Get guild data from database"""
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                result = self.guilds_collection.find_one({"guild_id": guild_id})
+                result = self.guilds_collection.find_one({"guild_id": guild_id}) if self.circuit.allow() else None
                 if result:
                     return result
             else:
-                if guild_id in self.memory_guilds:
-                    return self.memory_guilds[guild_id]
+                document = self.storage.get_guild(guild_id)
+                if document is not None:
+                    return document
             
             return self._create_default_guild_data(guild_id)
             
@@ -623,20 +1072,14 @@ class DatabaseManager:
             logger.error(f"Error getting guild data for {guild_id}: {e}")
             return self._create_default_guild_data(guild_id)
     
+    @timed_operation
     def update_guild_data(self, guild_id: int, data: Dict[str, Any]) -> bool:
         """Update guild data in database"""
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                self.guilds_collection.update_one(
-                    {"guild_id": guild_id},
-                    {"$set": data},
-                    upsert=True
-                )
-                return True
+                return self._write("guilds", {"guild_id": guild_id}, {"$set": data}, upsert=True)
             else:
-                if guild_id not in self.memory_guilds:
-                    self.memory_guilds[guild_id] = self._create_default_guild_data(guild_id)
-                self.memory_guilds[guild_id].update(data)
+                self.storage.update_guild(guild_id, data, self._create_default_guild_data(guild_id))
                 return True
                 
         except Exception as e:
@@ -674,21 +1117,60 @@ class DatabaseManager:
     
     # ==================== UTILITY METHODS ====================
     
+    @staticmethod
+    def _row_projection(field: str) -> Dict[str, int]:
+        """Leaderboard rows only carry the user id and the ranked field"""
+        return {"_id": 0, "user_id": 1, field: 1}
+    
+    @timed_operation
     def get_leaderboard(self, field: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get leaderboard for specified field"""
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                cursor = self.users_collection.find().sort(field, -1).limit(limit)
+                cursor = self.users_collection.find(
+                    {field: {"$gt": 0}}, self._row_projection(field)
+                ).sort(field, -1).limit(limit)
                 return list(cursor)
             else:
-                users = list(self.memory_users.values())
-                users.sort(key=lambda x: x.get(field, 0), reverse=True)
-                return users[:limit]
+                return self.storage.top(field, limit)
                 
         except Exception as e:
             logger.error(f"Error getting leaderboard: {e}")
             return []
     
+    @timed_operation
+    def get_ranks(self, scores: Dict[str, Any]) -> Dict[str, Any]:
+        """Exact rank for each {field: score}, plus how many users are ranked on that field
+        
+        rank = users strictly above + 1 (ties share a rank); a score of 0 is unranked (None).
+        Each rank is one range count on the field's partial leaderboard index (COUNT_SCAN),
+        so /profile costs one round-trip per field. A single $facet would be one round-trip,
+        but its sub-pipelines cannot use indexes and would scan every ranked user. Totals
+        change slowly and are cached for RANK_TOTAL_TTL seconds.
+        """
+        result = {field: {"rank": None, "total": 0} for field in scores}
+        try:
+            if self.connected_to_mongodb and self.users_collection is not None:
+                count_above = lambda field, value: self.users_collection.count_documents({field: {"$gt": value}})
+            else:
+                count_above = self.storage.count_above
+            for field, score in scores.items():
+                result[field]["total"] = self._ranked_total(field, count_above)
+                if score and score > 0:
+                    result[field]["rank"] = count_above(field, score) + 1
+        except Exception as e:
+            logger.error(f"Error getting ranks for {list(scores)}: {e}")
+        return result
+    
+    def _ranked_total(self, field: str, count_above) -> int:
+        cached = self.rank_totals.get(field)
+        if cached is not None and time.time() - cached[0] < RANK_TOTAL_TTL:
+            return cached[1]
+        total = count_above(field, 0)
+        self.rank_totals[field] = (time.time(), total)
+        return total
+    
+    @timed_operation
     def get_paginated_leaderboard(self, field: str, page: int = 1, members_per_page: int = 10) -> Dict[str, Any]:
         """Get paginated leaderboard for specified field"""
         try:
@@ -702,7 +1184,7 @@ class DatabaseManager:
                 
                 # Get paginated results
                 cursor = self.users_collection.find(
-                    {field: {"$exists": True, "$gt": 0}}
+                    {field: {"$exists": True, "$gt": 0}}, self._row_projection(field)
                 ).sort(field, -1).skip(skip).limit(members_per_page)
                 
                 users = list(cursor)
@@ -716,17 +1198,10 @@ class DatabaseManager:
                 }
                 
             else:
-                # Memory storage fallback
-                users = [user for user in self.memory_users.values() if user.get(field, 0) > 0]
-                users.sort(key=lambda x: x.get(field, 0), reverse=True)
-                
-                total_users = len(users)
+                # Local storage fallback
+                total_users = self.storage.count_above(field, 0)
                 total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                
-                # Paginate results
-                start_idx = (page - 1) * members_per_page
-                end_idx = start_idx + members_per_page
-                paginated_users = users[start_idx:end_idx]
+                paginated_users = self.storage.top(field, members_per_page, (page - 1) * members_per_page)
                 
                 return {
                     'users': paginated_users,
@@ -746,6 +1221,7 @@ class DatabaseManager:
                 'members_per_page': members_per_page
             }
     
+    @timed_operation
     def get_streak_leaderboard(self, page: int = 1, members_per_page: int = 10) -> Dict[str, Any]:
         """Get streak leaderboard with pagination"""
         try:
@@ -759,7 +1235,7 @@ class DatabaseManager:
                 
                 # Get paginated results sorted by daily_streak
                 cursor = self.users_collection.find(
-                    {"daily_streak": {"$exists": True, "$gt": 0}}
+                    {"daily_streak": {"$exists": True, "$gt": 0}}, self._row_projection("daily_streak")
                 ).sort("daily_streak", -1).skip(skip).limit(members_per_page)
                 
                 users = list(cursor)
@@ -773,17 +1249,10 @@ class DatabaseManager:
                 }
                 
             else:
-                # Memory storage fallback
-                users = [user for user in self.memory_users.values() if user.get('daily_streak', 0) > 0]
-                users.sort(key=lambda x: x.get('daily_streak', 0), reverse=True)
-                
-                total_users = len(users)
+                # Local storage fallback
+                total_users = self.storage.count_above('daily_streak', 0)
                 total_pages = max(1, (total_users + members_per_page - 1) // members_per_page)
-                
-                # Paginate results
-                start_idx = (page - 1) * members_per_page
-                end_idx = start_idx + members_per_page
-                paginated_users = users[start_idx:end_idx]
+                paginated_users = self.storage.top('daily_streak', members_per_page, (page - 1) * members_per_page)
                 
                 return {
                     'users': paginated_users,
@@ -803,12 +1272,14 @@ class DatabaseManager:
                 'members_per_page': members_per_page
             }
     
+    @timed_operation
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
             if self.connected_to_mongodb and self.users_collection is not None:
-                user_count = self.users_collection.count_documents({})
-                guild_count = self.guilds_collection.count_documents({})
+                # Metadata counts avoid scanning the collections on every health probe
+                user_count = self.users_collection.estimated_document_count()
+                guild_count = self.guilds_collection.estimated_document_count()
                 return {
                     "users": user_count,
                     "guilds": guild_count,
@@ -817,10 +1288,10 @@ class DatabaseManager:
                 }
             else:
                 return {
-                    "users": len(self.memory_users),
-                    "guilds": len(self.memory_guilds),
-                    "storage": "Memory",
-                    "status": "Fallback"
+                    "users": self.storage.count_users(),
+                    "guilds": self.storage.count_guilds(),
+                    "storage": "SQLite" if self.storage.persistent else "Memory",
+                    "status": "Local" if self.storage.persistent else "Fallback"
                 }
                 
         except Exception as e:
@@ -833,10 +1304,11 @@ class DatabaseManager:
             if self.connected_to_mongodb and self.mongodb_client:
                 self.mongodb_client.admin.command('ping')
                 return {"status": "healthy", "connected": True}
-            return {"status": "memory", "connected": False}
+            return {"status": self.storage.name, "connected": False}
         except Exception as e:
             return {"status": "error", "connected": False, "error": str(e)}
     
+    @timed_operation
     def cleanup_expired_data(self):
         """Clean up expired data"""
         try:
@@ -844,39 +1316,25 @@ class DatabaseManager:
             logger.info("🧹 Starting database cleanup...")
             
             if self.connected_to_mongodb and self.users_collection is not None:
+                self.flush_writes()
+                self.schedule_replay()
+                self.recover_transfers()
                 # Clean up old temporary data
-                self.users_collection.update_many(
-                    {},
-                    {"$pull": {"temporary_items": {"expires_at": {"$lt": current_time}}}}
-                )
-                self.users_collection.update_many(
-                    {},
-                    {"$pull": {"temporary_purchases": {"expires_at": {"$lt": current_time}}}}
-                )
-                self.users_collection.update_many(
-                    {},
-                    {"$pull": {"temporary_roles": {"expires_at": {"$lt": current_time}}}}
+                expired = {"expires_at": {"$lt": current_time}}
+                self.mongodb_db.user_temporary.update_many(
+                    {"$or": [{"temporary_purchases.expires_at": {"$lt": current_time}},
+                             {"temporary_roles.expires_at": {"$lt": current_time}}]},
+                    {"$pull": {"temporary_purchases": expired, "temporary_roles": expired}}
                 )
+                if self.legacy_cold_fields:
+                    self.users_collection.update_many(
+                        {},
+                        {"$pull": {"temporary_items": expired, "temporary_purchases": expired, "temporary_roles": expired}}
+                    )
                 logger.info("✅ MongoDB cleanup completed")
             else:
-                # Clean up memory storage
-                for user_data in self.memory_users.values():
-                    if "temporary_items" in user_data:
-                        user_data["temporary_items"] = [
-                            item for item in user_data["temporary_items"]
-                            if item.get("expires_at", 0) > current_time
-                        ]
-                    if "temporary_purchases" in user_data:
-                        user_data["temporary_purchases"] = [
-                            item for item in user_data["temporary_purchases"]
-                            if item.get("expires_at", 0) > current_time
-                        ]
-                    if "temporary_roles" in user_data:
-                        user_data["temporary_roles"] = [
-                            item for item in user_data["temporary_roles"]
-                            if item.get("expires_at", 0) > current_time
-                        ]
-                logger.info("✅ Memory cleanup completed")
+                changed = self.storage.prune_expired(current_time)
+                logger.info(f"✅ {self.storage.name.capitalize()} cleanup completed ({changed} users)")
                 
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -901,6 +1359,14 @@ def remove_coins(user_id: int, amount: int) -> bool:
     """Legacy function for backward compatibility"""
     return db.remove_coins(user_id, amount)
 
+def transfer(sender_id: int, recipient_id: int, amount: int, fee: int = 0, field: str = "bank") -> Dict[str, Any]:
+    """Atomic transfer between two users' balances"""
+    return db.transfer(sender_id, recipient_id, amount, fee, field)
+
+def move_coins(user_id: int, amount: int, source: str = "coins", target: str = "bank") -> Dict[str, Any]:
+    """Atomic move between two of one user's balances"""
+    return db.move_coins(user_id, amount, source, target)
+
 def get_database():
     """Get database instance"""
     return db
@@ -925,6 +1391,26 @@ def get_live_user_stats(user_id: int):
     """Legacy function for live user stats"""
     return db.get_live_user_stats(user_id)
 
+def get_user_view(user_id: int, view: str):
+    """Projected slice of a user document (see USER_VIEWS)"""
+    return db.get_user_view(user_id, view)
+
+def get_leaderboard(field: str, limit: int = 10):
+    """Top users by a field (user_id and field only)"""
+    return db.get_leaderboard(field, limit)
+
+def get_paginated_leaderboard(field: str, page: int = 1, members_per_page: int = 10):
+    """One leaderboard page (user_id and field only)"""
+    return db.get_paginated_leaderboard(field, page, members_per_page)
+
+def get_ranks(scores: Dict[str, Any]):
+    """Exact ranks for {field: score} (see DatabaseManager.get_ranks)"""
+    return db.get_ranks(scores)
+
+def get_streak_leaderboard(page: int = 1, members_per_page: int = 10):
+    """One daily streak leaderboard page"""
+    return db.get_streak_leaderboard(page, members_per_page)
+
 def add_xp(user_id: int, amount: int):
     """Legacy function for adding XP"""
     return db.add_xp(user_id, amount)
@@ -939,7 +1425,8 @@ __all__ = [
     'add_coins', 'remove_coins', 'get_database', 'cleanup_expired_items',
     'get_active_temporary_roles', 'get_pending_reminders', 
     'get_active_temporary_purchases', 'get_live_user_stats', 'add_xp',
-    'claim_daily_bonus'
+    'claim_daily_bonus', 'get_user_view', 'get_leaderboard',
+    'get_paginated_leaderboard', 'get_streak_leaderboard', 'get_ranks', 'USER_VIEWS'
 ]
 
 logger.info("🎯 Database system initialized successfully!")
@@ -3,6 +3,9 @@ from discord.ext import commands
 import os
 import asyncio
 
+from database import db
+from core.command_sync import CommandSyncer, CommandSyncState
+
 # Simple force sync - add this to your bot or run separately
 async def force_sync_commands():
     """Force sync all Discord commands"""
@@ -18,19 +21,16 @@ async def force_sync_commands():
         print(f'🤖 Connected as {bot.user}')
         
         try:
-            # Clear existing commands
-            bot.tree.clear_commands(guild=None)
-            print("🧹 Cleared existing commands")
-            
-            # Force sync
-            synced = await bot.tree.sync()
-            print(f"✅ Synced {len(synced)} commands globally")
+            # Force sync, recording the result so the bot's next startup compares against it
+            syncer = CommandSyncer(bot, CommandSyncState(db.mongodb_db.bot_state if db.connected_to_mongodb else None))
+            result = await syncer.sync(force=True)
+            print(f"✅ Synced {result['commands']} commands globally")
             
             # Also try guild-specific sync for faster updates
             for guild in bot.guilds:
                 try:
-                    guild_synced = await bot.tree.sync(guild=guild)
-                    print(f"✅ Synced {len(guild_synced)} commands to {guild.name}")
+                    guild_result = await syncer.sync(guild=guild, force=True)
+                    print(f"✅ Synced {guild_result['commands']} commands to {guild.name}")
                 except Exception as e:
                     print(f"❌ Failed to sync to {guild.name}: {e}")
             
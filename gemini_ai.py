@@ -4,23 +4,33 @@ Handles AI conversations with context and memory
 """
 
 import os
+import time
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from datetime import datetime, timedelta, timezone
 import json
+import importlib.util
+
+from core.conversation_memory import ConversationMemory, estimate_tokens
+from core.prompt_builder import PromptBuilder
+from core.ai_cache import ResponseCache, cache_key
+
+MODEL_NAME = 'gemini-1.5-flash'
+# A failed connection attempt is retried after this delay, doubling up to the maximum
+INIT_RETRY_SECONDS = 30
+INIT_RETRY_MAX_SECONDS = 900
+TRIVIA_DIFFICULTIES = ("easy", "medium", "hard")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import Gemini AI with fallback
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
+# The SDK takes ~1s to import, so only check for it here and import it in initialize_gemini
+GEMINI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+if GEMINI_AVAILABLE:
     logger.info("✅ Gemini AI available")
-except ImportError:
-    GEMINI_AVAILABLE = False
+else:
     logger.warning("⚠️ Gemini AI not available")
 
 # Load environment variables
@@ -38,44 +48,107 @@ class GeminiAI:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
         self.model = None
-        self.conversations = {}  # Store conversation history
-        self.max_history = 10   # Maximum messages to remember
+        self.max_history = 50   # Upper bound on remembered turns; prompts are trimmed by token budget
+        # Bounded conversation memory (LRU + idle TTL + per-conversation token budget)
+        self.memory = ConversationMemory(
+            max_conversations=int(os.getenv('AI_MAX_CONVERSATIONS', '5000')),
+            ttl=float(os.getenv('AI_CONVERSATION_TTL_HOURS', '24')) * 3600,
+            max_tokens=int(os.getenv('AI_CONVERSATION_TOKEN_BUDGET', '2000')),
+            max_turns=self.max_history
+        )
+        self.prompt_builder = PromptBuilder(max_prompt_tokens=int(os.getenv('AI_PROMPT_TOKEN_BUDGET', '3000')))
+        self.summary_tasks = set()
+        # Content-addressed cache for deterministic one-shot prompts
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1000')),
+            ttl=float(os.getenv('AI_CACHE_TTL_SECONDS', '3600'))
+        )
         self.initialized = False
-        
-        self.initialize_gemini()
+        self.initialization_attempted = False
+        self.initialization_task: Optional[asyncio.Future] = None
+        # When the next connection attempt may run (None: no retry, the configuration is missing)
+        self.retry_at: Optional[float] = 0.0
+        self.retry_delay = INIT_RETRY_SECONDS
     
     def initialize_gemini(self):
-        """Initialize Gemini AI connection"""
+        """Initialize Gemini AI connection (blocking: run it off the event loop)"""
+        if self.initialized:
+            return True
+        self.initialization_attempted = True
         try:
             if not GEMINI_AVAILABLE:
                 logger.warning("⚠️ Gemini AI library not available")
+                self.retry_at = None
                 return False
             
             if not self.api_key:
                 logger.warning("⚠️ GEMINI_API_KEY not found in environment")
+                self.retry_at = None
                 return False
             
+            import google.generativeai as genai
+            
             # Configure Gemini
             genai.configure(api_key=self.api_key)
             
             # Initialize model
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel(MODEL_NAME)
             
             # Test connection
             test_response = self.model.generate_content("Hello")
             if test_response:
                 self.initialized = True
+                self.retry_delay = INIT_RETRY_SECONDS
                 logger.info("🎯 Gemini AI initialized successfully!")
+                logger.info("🚀 Ready to handle AI conversations!")
                 return True
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini AI: {e}")
-            return False
+        
+        # A failed "Hello" (network blip, API hiccup) must not switch AI off for the whole process
+        self.retry_at = time.monotonic() + self.retry_delay
+        logger.warning(f"⚠️ Retrying Gemini AI initialization in {self.retry_delay}s")
+        self.retry_delay = min(self.retry_delay * 2, INIT_RETRY_MAX_SECONDS)
+        return False
+    
+    def _retry_due(self) -> bool:
+        task = self.initialization_task
+        return (self.retry_at is not None and time.monotonic() >= self.retry_at
+                and (task is None or task.done()))
+    
+    async def initialize_async(self) -> bool:
+        """Import the SDK and verify the API key in a worker thread
+
+        Concurrent callers share one attempt; after a failure the first call past the
+        backoff starts another.
+        """
+        if self.initialized:
+            return True
+        task = self.initialization_task
+        if task is None or (task.done() and self._retry_due()):
+            self.initialization_task = task = asyncio.ensure_future(asyncio.to_thread(self.initialize_gemini))
+        return await asyncio.shield(task)
+    
+    def initialization_pending(self) -> bool:
+        """True until the startup connection attempt has finished"""
+        return self.initialization_task is None or not self.initialization_task.done()
     
     def is_available(self) -> bool:
-        """Check if Gemini AI is available"""
+        """Check if Gemini AI is available (a due retry starts in the background)"""
+        if not self.initialized and self._retry_due():
+            try:
+                asyncio.get_running_loop().create_task(self.initialize_async())
+            except RuntimeError:
+                pass
         return self.initialized and GEMINI_AVAILABLE
     
+    async def ensure_available(self) -> bool:
+        """Like is_available(), but waits for a due reconnection attempt first"""
+        if not self.initialized and self._retry_due():
+            await self.initialize_async()
+        return self.is_available()
+    
     async def generate_response(
         self, 
         user_id: int, 
@@ -96,7 +169,7 @@ class GeminiAI:
             Dict with response data
         """
         try:
-            if not self.is_available():
+            if not await self.ensure_available():
                 return {
                     "success": False,
                     "error": "AI service not available",
@@ -104,8 +177,7 @@ class GeminiAI:
                 }
             
             # Get conversation history
-            conversation_key = f"{user_id}_{context}"
-            history = self.conversations.get(conversation_key, [])
+            history = await self.memory.get_history(user_id, context)
             
             # Create system prompt based on context
             if not system_prompt:
@@ -113,7 +185,7 @@ class GeminiAI:
             
             # Build conversation context
             conversation_context = self._build_conversation_context(
-                history, message, system_prompt
+                history, message, system_prompt, self.memory.get_summary(user_id, context)
             )
             
             # Generate response
@@ -121,9 +193,8 @@ class GeminiAI:
             
             if response["success"]:
                 # Update conversation history
-                self._update_conversation_history(
-                    conversation_key, message, response["response"]
-                )
+                if await self.memory.append(user_id, context, message, response["response"]):
+                    self._schedule_summary(user_id, context)
             
             return response
             
@@ -159,21 +230,34 @@ class GeminiAI:
         self, 
         history: List[Dict], 
         current_message: str, 
-        system_prompt: str
+        system_prompt: str,
+        summary: str = ""
     ) -> str:
-        """Build conversation context with history"""
-        context_parts = [f"System: {system_prompt}\n"]
-        
-        # Add conversation history
-        for entry in history[-self.max_history:]:
-            context_parts.append(f"User: {entry['user_message']}")
-            context_parts.append(f"Assistant: {entry['ai_response']}")
-        
-        # Add current message
-        context_parts.append(f"User: {current_message}")
-        context_parts.append("Assistant:")
+        """Build conversation context from the newest turns that fit the token budget"""
+        prompt, _ = self.prompt_builder.build(system_prompt, history, current_message, summary)
+        return prompt
+    
+    def _schedule_summary(self, user_id: int, context: str):
+        """Fold turns trimmed from memory into the running summary in the background"""
+        task = asyncio.create_task(self._summarise_overflow(user_id, context))
+        self.summary_tasks.add(task)
+        task.add_done_callback(self.summary_tasks.discard)
+    
+    async def _summarise_overflow(self, user_id: int, context: str):
+        previous, turns = self.memory.take_overflow(user_id, context)
+        if not turns:
+            return
         
-        return "\n".join(context_parts)
+        transcript = "\n".join(f"User: {t['user_message']}\nAssistant: {t['ai_response']}" for t in turns)
+        prompt = (
+            "Condense this earlier part of a conversation into at most 80 words, keeping names, "
+            "facts and preferences the user shared.\n"
+            + (f"Existing summary: {previous}\n" if previous else "")
+            + transcript
+        )
+        response = await self._generate_ai_response(prompt)
+        if response["success"]:
+            self.memory.set_summary(user_id, context, response["response"])
     
     async def _generate_ai_response(self, context: str) -> Dict[str, Any]:
         """Generate AI response using Gemini"""
@@ -190,7 +274,7 @@ class GeminiAI:
                 return {
                     "success": True,
                     "response": response.text.strip(),
-                    "tokens_used": len(context.split())
+                    "tokens_used": estimate_tokens(context)
                 }
             else:
                 return {
@@ -207,36 +291,42 @@ class GeminiAI:
                 "response": "Sorry, I encountered an error while thinking."
             }
     
-    def _update_conversation_history(
-        self, 
-        conversation_key: str, 
-        user_message: str, 
-        ai_response: str
-    ):
-        """Update conversation history"""
-        if conversation_key not in self.conversations:
-            self.conversations[conversation_key] = []
+    async def stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text chunks as Gemini produces them"""
+        if not await self.ensure_available():
+            raise RuntimeError("AI service not available")
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
         
-        # Add new entry
-        self.conversations[conversation_key].append({
-            "user_message": user_message,
-            "ai_response": ai_response,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
+        def produce():
+            # The SDK's streaming iterator blocks, so drain it in a worker thread
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
         
-        # Limit history size
-        if len(self.conversations[conversation_key]) > self.max_history:
-            self.conversations[conversation_key] = \
-                self.conversations[conversation_key][-self.max_history:]
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            await asyncio.shield(producer)
     
-    def clear_conversation(self, user_id: int, context: str = "assistant") -> bool:
+    async def clear_conversation(self, user_id: int, context: str = "assistant") -> bool:
         """Clear conversation history for a user"""
         try:
-            conversation_key = f"{user_id}_{context}"
-            if conversation_key in self.conversations:
-                del self.conversations[conversation_key]
-                return True
-            return False
+            return await self.memory.clear(user_id, context)
         except Exception as e:
             logger.error(f"Error clearing conversation: {e}")
             return False
@@ -244,14 +334,7 @@ class GeminiAI:
     def get_conversation_stats(self, user_id: int, context: str = "assistant") -> Dict[str, Any]:
         """Get conversation statistics"""
         try:
-            conversation_key = f"{user_id}_{context}"
-            history = self.conversations.get(conversation_key, [])
-            
-            return {
-                "messages": len(history),
-                "last_interaction": history[-1]["timestamp"] if history else None,
-                "context": context
-            }
+            return self.memory.conversation_stats(user_id, context)
         except Exception as e:
             logger.error(f"Error getting conversation stats: {e}")
             return {"messages": 0, "last_interaction": None, "context": context}
@@ -259,26 +342,68 @@ class GeminiAI:
     def get_all_conversations(self) -> Dict[str, Any]:
         """Get statistics for all conversations"""
         try:
-            total_conversations = len(self.conversations)
-            total_messages = sum(len(history) for history in self.conversations.values())
-            
-            return {
-                "total_conversations": total_conversations,
-                "total_messages": total_messages,
-                "active_users": len(set(key.split('_')[0] for key in self.conversations.keys()))
-            }
+            return self.memory.get_stats()
         except Exception as e:
             logger.error(f"Error getting all conversations: {e}")
             return {"total_conversations": 0, "total_messages": 0, "active_users": 0}
     
+    async def generate_cached(self, prompt: str, context: str = "oneshot", ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Generate a response for a stateless prompt, sharing identical concurrent and repeated calls"""
+        key = cache_key(MODEL_NAME, context, prompt)
+        return await self.response_cache.get_or_compute(
+            key,
+            lambda: self._generate_ai_response(prompt),
+            should_cache=lambda response: response["success"],
+            ttl=ttl
+        )
+    
+    async def generate_trivia_questions(self, difficulty: str = "medium", count: int = 5) -> List[Dict[str, Any]]:
+        """Generate a batch of multiple-choice trivia questions for the background pool"""
+        if not await self.ensure_available():
+            return []
+        
+        prompt = (
+            f"Write {count} different {difficulty} multiple-choice trivia questions about programming, "
+            "science, geography or history. Reply with only a JSON array where each item is "
+            '{"question": str, "options": [4 short strings], "correct": index of the right option, "category": str}.'
+        )
+        # Not cached: every refill should produce fresh questions
+        response = await self._generate_ai_response(prompt)
+        if not response["success"]:
+            return []
+        
+        text = response["response"].strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning("Trivia generation returned invalid JSON")
+            return []
+        
+        questions = []
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            options = item.get("options")
+            correct = item.get("correct")
+            if (isinstance(item.get("question"), str) and isinstance(options, list) and len(options) == 4
+                    and isinstance(correct, int) and 0 <= correct < 4):
+                questions.append({
+                    "question": item["question"],
+                    "options": [str(option) for option in options],
+                    "correct": correct,
+                    "category": str(item.get("category", "general")).lower(),
+                    "difficulty": difficulty
+                })
+        return questions
+    
     async def generate_summary(self, text: str, max_length: int = 100) -> str:
         """Generate a summary of text"""
         try:
-            if not self.is_available():
+            if not await self.ensure_available():
                 return text[:max_length] + "..." if len(text) > max_length else text
             
             prompt = f"Summarize this text in {max_length} characters or less: {text}"
-            response = await self._generate_ai_response(prompt)
+            response = await self.generate_cached(prompt, context="summary")
             
             if response["success"]:
                 return response["response"]
@@ -289,23 +414,15 @@ class GeminiAI:
             logger.error(f"Error generating summary: {e}")
             return text[:max_length] + "..." if len(text) > max_length else text
     
-    def cleanup_old_conversations(self, days: int = 7):
-        """Clean up conversations older than specified days"""
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Response cache statistics"""
+        return self.response_cache.get_stats()
+    
+    def cleanup_old_conversations(self):
+        """Evict conversations idle longer than the memory TTL"""
         try:
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-            conversations_to_remove = []
-            
-            for key, history in self.conversations.items():
-                if history:
-                    last_message_time = datetime.fromisoformat(history[-1]["timestamp"])
-                    if last_message_time < cutoff_date:
-                        conversations_to_remove.append(key)
-            
-            for key in conversations_to_remove:
-                del self.conversations[key]
-            
-            logger.info(f"🧹 Cleaned up {len(conversations_to_remove)} old conversations")
-            
+            removed = self.memory.sweep()
+            logger.info(f"🧹 Cleaned up {removed} old conversations")
         except Exception as e:
             logger.error(f"Error cleaning up conversations: {e}")
 
@@ -318,9 +435,9 @@ async def generate_ai_response(user_id: int, message: str, context: str = "assis
     response = await ai.generate_response(user_id, message, context)
     return response.get("response", "AI is currently unavailable.")
 
-def clear_ai_conversation(user_id: int, context: str = "assistant") -> bool:
+async def clear_ai_conversation(user_id: int, context: str = "assistant") -> bool:
     """Legacy function for backward compatibility"""
-    return ai.clear_conversation(user_id, context)
+    return await ai.clear_conversation(user_id, context)
 
 def get_ai_instance():
     """Get AI instance"""
@@ -331,7 +448,4 @@ __all__ = [
     'GeminiAI', 'ai', 'generate_ai_response', 'clear_ai_conversation', 'get_ai_instance'
 ]
 
-logger.info("🎯 Gemini AI system initialized!")
-logger.info(f"🤖 AI Status: {'Available' if ai.is_available() else 'Unavailable'}")
-if ai.is_available():
-    logger.info("🚀 Ready to handle AI conversations!")
\ No newline at end of file
+logger.info("🎯 Gemini AI system initialized! (model connection deferred to startup)")
\ No newline at end of file
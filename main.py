@@ -14,13 +14,23 @@ from typing import Optional
 
 import discord
 from discord.ext import commands, tasks
-from flask import Flask, jsonify
+from flask import Flask, jsonify, Response
 import threading
 import time
 
 # Import our systems
 from database import db
 from gemini_ai import ai
+from core.modlog import get_modlog_dispatcher
+from core.histogram import get_latency_tracker
+from core.metrics import get_metrics_collector
+from core.database import get_db_manager, initialize_database
+from core.analytics import get_analytics
+from core.instrumentation import CommandInstrumentation, InstrumentedCommandTree
+from core.command_sync import CommandSyncer
+from core.sharding import ShardConfig, is_primary_process, get_shard_metrics
+from core.shared_state import MongoSharedStore, set_shared_store
+from core.indexes import IndexReconciler
 
 # Configure logging
 logging.basicConfig(
@@ -46,6 +56,11 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 DISCORD_CLIENT_ID = os.getenv('DISCORD_CLIENT_ID')
 BOT_PREFIX = os.getenv('BOT_PREFIX', '!')
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+PARALLEL_COG_LOADING = os.getenv('PARALLEL_COG_LOADING', 'True').lower() == 'true'
+# SHARDING_MODE=auto, or SHARD_IDS=0-3 with SHARD_COUNT=8 to run a shard range in this process
+SHARD_CONFIG = ShardConfig.from_env()
+# Cross-shard state backend: "memory" (single process) or "mongodb"; defaults to mongodb when shards span processes
+SHARED_STATE_BACKEND = os.getenv('SHARED_STATE_BACKEND', 'mongodb' if SHARD_CONFIG.is_multi_process else 'memory').lower()
 
 if not DISCORD_TOKEN:
     logger.error("❌ DISCORD_TOKEN not found in environment variables!")
@@ -60,7 +75,7 @@ intents.reactions = True
 intents.voice_states = True
 
 # Create bot instance
-class ProfessionalBot(commands.Bot):
+class ProfessionalBot(commands.AutoShardedBot if SHARD_CONFIG.is_sharded else commands.Bot):
     """Professional Discord Bot with enhanced features"""
     
     def __init__(self):
@@ -70,27 +85,111 @@ class ProfessionalBot(commands.Bot):
             help_command=None,
             case_insensitive=True,
             strip_after_prefix=True,
-            owner_ids={1297924079243890780}  # Your Discord user ID
+            owner_ids={1297924079243890780},  # Your Discord user ID
+            tree_cls=InstrumentedCommandTree,
+            **SHARD_CONFIG.bot_kwargs()
         )
         
         self.start_time = datetime.now(timezone.utc)
         self.commands_used = 0
         self.cogs_loaded = 0
         self.cogs_failed = 0
+        self.cog_load_times = {}
+        self.startup_seconds = None
+        self.instrumentation = CommandInstrumentation(self, get_analytics())
+        self.command_syncer = CommandSyncer(self)
+        self.index_report = None
         
     async def setup_hook(self):
         """Setup hook called when bot is starting"""
         logger.info("🚀 Bot setup hook called")
+        self.instrumentation.install()
+        
+        # Persist AI conversation turns to their own collection
+        if db.connected_to_mongodb:
+            ai.memory.attach_collection(db.mongodb_db.ai_conversations)
+            # Enhanced cogs and analytics share the repository's pool, schema and cache
+            initialize_database(db)
+            self.command_syncer.state.collection = db.mongodb_db.bot_state
+            # Index builds can take a while on large collections, so don't hold up startup
+            asyncio.create_task(self.reconcile_indexes())
+            # Move legacy cold fields out of the hot user documents in small batches
+            asyncio.create_task(db.cold_migrator.run())
+        self.configure_shared_state()
         
         # Start background tasks
         if not self.cleanup_task.is_running():
             self.cleanup_task.start()
+        if not self.activity_rollup_task.is_running():
+            self.activity_rollup_task.start()
+        self.start_metrics()
+        
+        # Connect Gemini in a worker thread while the cogs load
+        ai_ready = asyncio.create_task(ai.initialize_async())
         
         # Load all cogs
+        startup = time.perf_counter()
         await self.load_all_cogs()
+        await ai_ready
+        self.startup_seconds = time.perf_counter() - startup
+        logger.info(f"⏱️ Startup pipeline finished in {self.startup_seconds:.2f}s")
         
-        # Sync commands
-        await self.sync_commands()
+        # Commands are global, so only the process owning shard 0 syncs them
+        if is_primary_process(self):
+            await self.sync_commands()
+    
+    async def reconcile_indexes(self):
+        """Apply pending migrations and create any missing registry indexes"""
+        try:
+            self.index_report = await asyncio.to_thread(IndexReconciler(db.mongodb_db).reconcile)
+            logger.info(f"🗂️ Index reconcile: {len(self.index_report['created'])} created, "
+                        f"{len(self.index_report['existing'])} existing, {len(self.index_report['unused'])} unused")
+        except Exception as e:
+            logger.error(f"❌ Index reconcile failed: {e}")
+    
+    def configure_shared_state(self):
+        """Point rate limits, cooldowns and market prices at the store shared by all shards"""
+        if SHARED_STATE_BACKEND == "mongodb":
+            if db.connected_to_mongodb:
+                set_shared_store(MongoSharedStore(db.mongodb_db.shared_state))
+                return
+            logger.warning("⚠️ MongoDB unavailable - shared state is local to this process")
+        elif SHARD_CONFIG.is_multi_process:
+            logger.warning("⚠️ In-memory shared state with multiple shard processes - limits are per process")
+    
+    def start_metrics(self):
+        """Register metrics sources and start the background snapshot refresher"""
+        metrics = get_metrics_collector()
+        metrics.register("bot", self.get_bot_metrics)
+        metrics.register("database", db.get_database_stats, interval=60, blocking=True)
+        metrics.register("queues", get_queue_metrics)
+        metrics.register("caches", get_cache_metrics)
+        metrics.register("commands", self.instrumentation.get_stats)
+        if db.cold_migrator:
+            metrics.register("user_schema", db.cold_migrator.get_stats)
+        if db.connected_to_mongodb:
+            metrics.register("mongodb_connection", db.get_connection_stats)
+        metrics.start()
+    
+    def get_bot_metrics(self) -> dict:
+        """In-process bot state for the metrics snapshot"""
+        gateway_latency = self.latency if self.latency == self.latency and self.latency != float('inf') else 0
+        return {
+            "ready": self.is_ready(),
+            "guilds": len(self.guilds),
+            "users": sum(g.member_count or 0 for g in self.guilds),
+            "gateway_latency_ms": round(gateway_latency * 1000, 2),
+            "uptime_seconds": int((datetime.now(timezone.utc) - self.start_time).total_seconds()),
+            "cogs_loaded": self.cogs_loaded,
+            "cogs_failed": self.cogs_failed,
+            "commands_registered": len(self.tree.get_commands()),
+            "commands_used": self.commands_used,
+            "startup_seconds": self.startup_seconds or 0,
+            "cog_load_ms": self.cog_load_times,
+            "database_connected": db.connected_to_mongodb,
+            "ai_available": ai.is_available(),
+            "sharding": get_shard_metrics(self)
+        }
     
     async def load_all_cogs(self):
         """Load all cog extensions"""
@@ -116,29 +215,43 @@ class ProfessionalBot(commands.Bot):
         
         logger.info(f"📦 Loading {len(cogs_to_load)} cogs...")
         
-        for cog in cogs_to_load:
-            try:
-                await self.load_extension(cog)
-                self.cogs_loaded += 1
-                logger.info(f"✅ Loaded {cog}")
-            except Exception as e:
-                self.cogs_failed += 1
-                logger.error(f"❌ Failed to load {cog}: {e}")
-                if DEBUG:
-                    traceback.print_exc()
+        if PARALLEL_COG_LOADING:
+            # Extensions are independent, so their setup/cog_load coroutines can overlap
+            await asyncio.gather(*(self.load_cog(cog) for cog in cogs_to_load))
+        else:
+            for cog in cogs_to_load:
+                await self.load_cog(cog)
         
+        slowest = sorted(self.cog_load_times.items(), key=lambda item: item[1], reverse=True)[:5]
+        logger.info("🐢 Slowest cogs: " + ", ".join(f"{cog} {ms:.0f}ms" for cog, ms in slowest))
         logger.info(f"📦 Cog loading complete: {self.cogs_loaded} loaded, {self.cogs_failed} failed")
     
-    async def sync_commands(self):
-        """Sync slash commands"""
+    async def load_cog(self, cog: str):
+        """Load one extension and record how long it took"""
+        start = time.perf_counter()
+        try:
+            await self.load_extension(cog)
+            self.cogs_loaded += 1
+            logger.info(f"✅ Loaded {cog}")
+        except Exception as e:
+            self.cogs_failed += 1
+            logger.error(f"❌ Failed to load {cog}: {e}")
+            if DEBUG:
+                traceback.print_exc()
+        finally:
+            self.cog_load_times[cog] = round((time.perf_counter() - start) * 1000, 1)
+    
+    async def sync_commands(self, force: bool = False):
+        """Sync slash commands, skipping Discord entirely when the tree is unchanged"""
         try:
             logger.info("🔄 Syncing slash commands...")
-            synced = await self.tree.sync()
-            logger.info(f"🔄 Synced {len(synced)} slash commands globally")
-            
-            # Wait for Discord to process
-            await asyncio.sleep(2)
-            logger.info("✅ Command sync completed - commands should be visible shortly")
+            result = await self.command_syncer.sync(force=force)
+            if result["action"] == "skipped":
+                logger.info(f"✅ Command tree unchanged ({result['hash']}), skipped sync of {result['commands']} commands")
+            else:
+                logger.info(f"🔄 {result['action'].capitalize()} sync of {result['commands']} commands "
+                            f"(changed: {len(result['changed'])}, removed: {len(result['removed'])})")
+            return result
             
         except Exception as e:
             logger.error(f"❌ Failed to sync commands: {e}")
@@ -160,6 +273,20 @@ class ProfessionalBot(commands.Bot):
         
         logger.info("✅ Bot is ready and operational!")
     
+    async def on_shard_ready(self, shard_id):
+        """Called when one shard of an AutoShardedBot is ready"""
+        logger.info(f"🧩 Shard {shard_id} ready")
+    
+    async def invoke(self, ctx):
+        """Invoke a prefix command with phase timing"""
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        
+        guild_id = ctx.guild.id if ctx.guild else None
+        async with self.instrumentation.time_command(ctx.command.qualified_name, "prefix", ctx.author.id, guild_id) as timing:
+            await super().invoke(ctx)
+            timing.failed = timing.failed or ctx.command_failed
+    
     async def on_command_error(self, ctx, error):
         """Global command error handler"""
         if isinstance(error, commands.CommandNotFound):
@@ -221,6 +348,42 @@ class ProfessionalBot(commands.Bot):
         # Process commands
         await self.process_commands(message)
     
+    async def close(self):
+        """Flush queued modlog messages, activity counters, ledger rows and coalesced writes before disconnecting
+
+        Each step runs even if an earlier one fails (e.g. the ledger flush while MongoDB is down),
+        so later buffers are still written and the SQLite handle is still closed.
+        """
+        try:
+            await get_modlog_dispatcher().close()
+        except Exception as e:
+            logger.error(f"Error flushing modlog queue on shutdown: {e}")
+        try:
+            await get_metrics_collector().stop()
+        except Exception as e:
+            logger.error(f"Error stopping metrics on shutdown: {e}")
+        try:
+            self.activity_rollup_task.cancel()
+            await get_analytics().flush_activity()
+        except Exception as e:
+            logger.error(f"Error flushing activity counters on shutdown: {e}")
+        try:
+            db_manager = get_db_manager()
+            if db_manager:
+                await db_manager.ledger.close()
+        except Exception as e:
+            logger.error(f"Error flushing transaction ledger on shutdown: {e}")
+        try:
+            await db.flush_writes_async()
+        except Exception as e:
+            logger.error(f"Error flushing coalesced writes on shutdown: {e}")
+        try:
+            if db.storage is not None:
+                db.storage.close()
+        except Exception as e:
+            logger.error(f"Error closing local storage on shutdown: {e}")
+        await super().close()
+    
     @tasks.loop(hours=1)
     async def cleanup_task(self):
         """Periodic cleanup task"""
@@ -242,14 +405,22 @@ class ProfessionalBot(commands.Bot):
     async def before_cleanup(self):
         """Wait for bot to be ready before starting cleanup"""
         await self.wait_until_ready()
+    
+    @tasks.loop(minutes=1)
+    async def activity_rollup_task(self):
+        """Persist command counters even when no new command arrives to trigger a rollup"""
+        try:
+            await get_analytics().flush_activity()
+        except Exception as e:
+            logger.error(f"Error in activity rollup task: {e}")
 
 # Create bot instance
 bot = ProfessionalBot()
 
 # Manual sync command
 @bot.command(name='sync')
-async def sync_commands(ctx):
-    """Manually sync slash commands (Owner/Admin only)"""
+async def sync_commands(ctx, mode: str = ""):
+    """Manually sync slash commands (Owner/Admin only); `!sync force` ignores the stored hash"""
     # Check permissions
     is_owner = ctx.author.id in bot.owner_ids
     is_admin = ctx.guild and ctx.author.guild_permissions.administrator
@@ -261,17 +432,15 @@ async def sync_commands(ctx):
     try:
         await ctx.send("🔄 Starting command sync...")
         
-        # Clear and sync globally
-        bot.tree.clear_commands(guild=None)
-        synced = await bot.tree.sync()
-        await ctx.send(f"✅ Synced {len(synced)} commands globally!")
-        
-        # Wait for Discord to process
-        await asyncio.sleep(2)
-        await ctx.send("🔄 Commands are being processed by Discord - they should appear within 1-2 minutes!")
+        result = await bot.command_syncer.sync(force=mode.lower() == "force")
+        if result["action"] == "skipped":
+            await ctx.send(f"✅ Command tree unchanged ({result['hash']}) - nothing to sync. Use `!sync force` to resync anyway.")
+        else:
+            changed = ", ".join(result["changed"][:20]) or "none"
+            await ctx.send(f"✅ {result['action'].capitalize()} sync of {result['commands']} commands globally! Changed: {changed}")
+            await ctx.send("🔄 Commands are being processed by Discord - they should appear within 1-2 minutes!")
         
-        logger.info(f"Manual sync completed by {ctx.author} (ID: {ctx.author.id})")
-        await ctx.send("✅ Command sync completed successfully!")
+        logger.info(f"Manual sync ({result['action']}) completed by {ctx.author} (ID: {ctx.author.id})")
         
     except Exception as e:
         await ctx.send(f"❌ Sync failed: {e}")
@@ -338,16 +507,31 @@ async def bot_info(ctx):
     embed.set_footer(text="Professional Discord Bot")
     await ctx.send(embed=embed)
 
+def get_queue_metrics() -> dict:
+    """Depths of the in-process write/output queues"""
+    queues = {"modlog": get_modlog_dispatcher().get_stats()["queue_depth"]}
+    db_manager = get_db_manager()
+    if db_manager and db_manager.ledger:
+        queues["transaction_ledger"] = db_manager.ledger.get_stats()["buffered"]
+    return queues
+
+def get_cache_metrics() -> dict:
+    """Hit ratios of the in-process caches"""
+    caches = {"ai_conversations": ai.get_all_conversations(), "ai_responses": ai.get_cache_stats(),
+              "user_views": db.get_view_cache_stats()}
+    return caches
+
 # Flask web server for health checks
 app = Flask(__name__)
 bot_start_time = time.time()
 
 @app.route('/')
 def home():
-    """Health check endpoint"""
+    """Health check endpoint (served from the cached metrics snapshot)"""
     uptime = time.time() - bot_start_time
     uptime_hours = uptime // 3600
     uptime_minutes = (uptime % 3600) // 60
+    snapshot = get_metrics_collector().get_snapshot()
     
     return jsonify({
         "status": "online",
@@ -355,14 +539,16 @@ def home():
         "uptime_hours": int(uptime_hours),
         "uptime_minutes": int(uptime_minutes),
         "guilds": len(bot.guilds) if bot.guilds else 0,
-        "database": db.get_database_stats(),
+        "database": snapshot.get("database", {}),
         "ai_available": ai.is_available(),
+        "snapshot_time": snapshot.get("timestamp"),
         "timestamp": datetime.utcnow().isoformat()
     })
 
 @app.route('/health')
 def health():
     """Detailed health check"""
+    latency = get_latency_tracker()
     return jsonify({
         "bot_ready": bot.is_ready(),
         "database_connected": db.connected_to_mongodb,
@@ -370,9 +556,21 @@ def health():
         "cogs_loaded": bot.cogs_loaded,
         "cogs_failed": bot.cogs_failed,
         "commands_synced": len(bot.tree.get_commands()),
+        "loop_lag_ms": get_metrics_collector().get_snapshot().get("loop_lag_ms", 0),
+        "latency": {
+            "commands": latency.combined("command").summary(),
+            "database": latency.combined("db").summary(),
+            "slowest_commands": latency.summary("command", top=5),
+            "slowest_db_operations": latency.summary("db", top=5)
+        },
         "last_check": datetime.utcnow().isoformat()
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of the cached snapshot and latency histograms"""
+    return Response(get_metrics_collector().render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 def run_flask():
     """Run Flask server in a separate thread"""
     port = int(os.getenv('PORT', 10000))
@@ -391,6 +589,7 @@ async def main():
         logger.info("🎯 Professional Discord Bot Starting...")
         logger.info(f"📊 Database: {'MongoDB' if db.connected_to_mongodb else 'Memory'}")
         logger.info(f"🤖 AI System: {'Available' if ai.is_available() else 'Unavailable'}")
+        logger.info(f"🧩 Gateway: {SHARD_CONFIG.describe()}, shared state: {SHARED_STATE_BACKEND}")
         
         # Start the bot
         await bot.start(DISCORD_TOKEN)
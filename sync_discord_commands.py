@@ -2,14 +2,19 @@
 """
 Discord Command Sync Script
 This script syncs all bot commands to Discord and removes any non-existent commands.
+Only changed commands are sent unless run with --force.
 """
 
 import os
+import sys
 import asyncio
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from database import db
+from core.command_sync import CommandSyncer, CommandSyncState
+
 # Load environment variables
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
@@ -61,26 +66,30 @@ async def on_ready():
         
         print(f"📦 Loaded {loaded_count} cogs")
         
-        # Clear all existing global commands first
-        print("🧹 Clearing existing global commands...")
-        bot.tree.clear_commands(guild=None)
+        syncer = CommandSyncer(bot, CommandSyncState(db.mongodb_db.bot_state if db.connected_to_mongodb else None))
+        force = "--force" in sys.argv
         
         # Sync commands globally
         print("🔄 Syncing commands globally...")
-        synced = await bot.tree.sync()
-        print(f"✅ Successfully synced {len(synced)} global commands")
-        
-        # List all synced commands
-        print("\n📋 Synced Commands:")
-        for i, command in enumerate(synced, 1):
-            print(f"  {i}. /{command.name} - {command.description[:50]}...")
+        result = await syncer.sync(force=force)
+        if result["action"] == "skipped":
+            print(f"✅ Command tree unchanged ({result['hash']}), nothing to sync - pass --force to resync anyway")
+        else:
+            print(f"✅ {result['action'].capitalize()} sync of {result['commands']} global commands")
+            
+            # List what changed
+            print("\n📋 Changed Commands:")
+            for i, name in enumerate(result["changed"], 1):
+                print(f"  {i}. /{name}")
+            for name in result["removed"]:
+                print(f"  🗑️ /{name}")
         
         # Also sync to specific guilds if needed
         print("\n🏰 Syncing to specific guilds...")
         for guild in bot.guilds:
             try:
-                guild_synced = await bot.tree.sync(guild=guild)
-                print(f"✅ Synced {len(guild_synced)} commands to {guild.name}")
+                guild_result = await syncer.sync(guild=guild, force=force)
+                print(f"✅ {guild_result['action'].capitalize()}: {guild_result['commands']} commands for {guild.name}")
             except Exception as e:
                 print(f"❌ Failed to sync to {guild.name}: {e}")
         
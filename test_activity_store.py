@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to verify bounded, time-bucketed command activity counters and their rollups
+"""
+
+import sys
+import os
+import asyncio
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.analytics as analytics_module
+from core.activity import ActivityStore, MINUTE, HOUR, DAY
+from core.analytics import BotAnalytics
+
+# A fixed hour boundary keeps bucket arithmetic predictable
+START = 1_700_000_000 // DAY * DAY
+
+
+def test_bucketing_windows():
+    store = ActivityStore()
+    store.record("balance", 1, 10, 0.2, now=START + 5)
+    store.record("balance", 2, 10, 0.4, now=START + 30)
+    store.record("work", 1, 20, now=START + 2 * MINUTE)
+    store.record("daily", 3, 10, now=START + 2 * HOUR)
+
+    now = START + 2 * HOUR + 1
+    assert store.command_counts(DAY, now=now) == {"balance": 2, "work": 1, "daily": 1}
+    assert store.command_counts(DAY, guild_id=10, now=now) == {"balance": 2, "daily": 1}
+    assert store.total_commands(10 * MINUTE, now=now) == 1, "❌ Minute window counted old buckets"
+    assert store.unique_users(DAY, now=now) == 3
+    assert abs(store.average_duration(DAY, now=now) - 0.3) < 1e-9, "❌ Durations not averaged per timed command"
+    print("✅ Commands land in minute and hour buckets and windows only see live ones")
+
+
+def test_rollup_drains_and_restores():
+    store = ActivityStore()
+    store.last_rollup_minute = int(START // MINUTE)
+    store.record("balance", 1, 10, 0.5, now=START + 1)
+    store.record("balance", 2, 10, 0.5, now=START + 2)
+    store.record("balance", 2, 10, now=START + HOUR + 1)
+
+    assert not store.rollup_due(now=START + 10), "❌ Rollup ran twice in one minute"
+    assert store.rollup_due(now=START + MINUTE) and not store.rollup_due(now=START + MINUTE + 1)
+    rows = sorted(store.drain_pending(), key=lambda row: row["hour"])
+    assert [(row["hour"] - START, row["count"], row["total_time"]) for row in rows] == [(0, 2, 1.0), (HOUR, 1, 0.0)]
+    assert not store.pending and not store.rollup_due(now=START + 5 * MINUTE), "❌ Nothing left should be due"
+
+    store.restore_pending(rows)
+    assert sorted(store.drain_pending(), key=lambda row: row["hour"]) == rows, "❌ Failed rollup lost counters"
+    print("✅ Rollups claim one minute, drain hourly rows and restore them on failure")
+
+
+def test_memory_is_bounded():
+    store = ActivityStore(hours=24, max_profiles=100)
+    for i in range(20000):
+        store.record(f"cmd{i % 5}", i, i % 3, now=START + i * 30)
+    assert len(store.profiles) == 100, f"❌ {len(store.profiles)} user profiles kept"
+    assert 19999 in store.profiles and 0 not in store.profiles, "❌ Profiles not evicted least recently used first"
+    assert len(store.minutes.buckets) == 60 and len(store.hourly.buckets) == 24
+    assert store.get_stats()["hourly_keys"] <= 24 * 15, "❌ Hourly buckets grew past their slots"
+    print("✅ Buckets recycle in place and user profiles stay capped")
+
+
+def test_shutdown_flush_writes_counters():
+    class FakeManager:
+        def __init__(self):
+            self.rows = []
+            self.fail = True
+
+        async def rollup_command_usage(self, rows):
+            if self.fail:
+                return False
+            self.rows.extend(rows)
+            return True
+
+    manager = FakeManager()
+    original = analytics_module.get_db_manager
+    analytics_module.get_db_manager = lambda: manager
+    try:
+        async def run():
+            analytics = BotAnalytics()
+            analytics.activity.last_rollup_minute = -1
+            await analytics.track_command_usage("balance", 1, 10, 0.1)
+            assert analytics.rollup_task is not None, "❌ Rollup task handle not kept"
+            await analytics.flush_activity()
+            assert analytics.activity.pending, "❌ Counters dropped after a failed rollup"
+            manager.fail = False
+            await analytics.flush_activity()
+            return analytics
+
+        analytics = asyncio.run(run())
+    finally:
+        analytics_module.get_db_manager = original
+    assert not analytics.activity.pending and [row["count"] for row in manager.rows] == [1]
+    print("✅ Pending counters are written by the periodic/shutdown flush")
+
+
+if __name__ == "__main__":
+    print("🔧 Activity Store Verification Test")
+    print("=" * 50)
+    test_bucketing_windows()
+    test_rollup_drains_and_restores()
+    test_memory_is_bounded()
+    test_shutdown_flush_writes_counters()
+    print("\n🎉 ALL ACTIVITY STORE TESTS PASSED!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the AI response cache coalesces identical requests
+"""
+
+import sys
+import os
+import asyncio
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ai_cache import ResponseCache, cache_key
+
+
+def test_concurrent_requests_share_one_call():
+    """20 identical concurrent requests and a repeat hit the model once"""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"success": True, "response": "summary"}
+
+    async def run():
+        cache = ResponseCache()
+        key = cache_key("model", "summary", "same prompt")
+        results = await asyncio.gather(*[cache.get_or_compute(key, compute) for _ in range(20)])
+        results.append(await cache.get_or_compute(key, compute))
+        return cache, results
+
+    cache, results = asyncio.run(run())
+    assert len(calls) == 1, f"❌ Expected one upstream call, got {len(calls)}"
+    assert all(r["response"] == "summary" for r in results), "❌ Waiters got different results"
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 19 and stats["hits"] == 1, f"❌ Unexpected stats {stats}"
+    print("✅ Identical requests coalesced into one call")
+
+
+def test_failures_are_not_cached():
+    """Unsuccessful responses are shared with waiters but retried next time"""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"success": False, "response": "error"}
+
+    async def run():
+        cache = ResponseCache()
+        for _ in range(2):
+            await cache.get_or_compute("k", compute, should_cache=lambda r: r["success"])
+
+    asyncio.run(run())
+    assert len(calls) == 2, f"❌ Failed response was cached ({len(calls)} calls)"
+    print("✅ Failed responses are not cached")
+
+
+if __name__ == "__main__":
+    print("🔧 AI Response Cache Verification Test")
+    print("=" * 50)
+    test_concurrent_requests_share_one_call()
+    test_failures_are_not_cached()
+    print("\n🎉 ALL AI CACHE TESTS PASSED!")
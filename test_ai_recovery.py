@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script to verify AI commands recover from a failed startup and keep legacy chat history
+"""
+
+import sys
+import os
+import time
+import asyncio
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import google.generativeai as genai
+from core.conversation_memory import ConversationMemory, legacy_turns
+from gemini_ai import GeminiAI, INIT_RETRY_SECONDS
+
+
+class FlakyModel:
+    """Fails the first `failures` startup calls, like a network blip during boot"""
+
+    calls = 0
+    failures = 0
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_content(self, prompt):
+        FlakyModel.calls += 1
+        if FlakyModel.failures:
+            FlakyModel.failures -= 1
+            raise ConnectionError("503 Service Unavailable")
+        return SimpleNamespace(text="Hi!")
+
+
+class Cursor(list):
+    def sort(self, field, direction):
+        return Cursor(sorted(self, key=lambda document: document[field], reverse=direction < 0))
+
+    def limit(self, count):
+        return Cursor(self[:count])
+
+
+class MemoryCollection:
+    """find/insert/update/delete over plain dicts, enough for ConversationMemory"""
+
+    def __init__(self, database):
+        self.database = database
+        self.documents = []
+
+    def _matches(self, document, query):
+        for field, condition in query.items():
+            if isinstance(condition, dict) and "$exists" in condition:
+                if (field in document) != condition["$exists"]:
+                    return False
+            elif document.get(field) != condition:
+                return False
+        return True
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query, projection=None):
+        return Cursor(dict(document) for document in self.documents if self._matches(document, query))
+
+    def find_one(self, query, projection=None):
+        return next(iter(self.find(query)), None)
+
+    def insert_one(self, document):
+        self.documents.append(dict(document))
+
+    def insert_many(self, documents):
+        self.documents.extend(dict(document) for document in documents)
+
+    def update_one(self, query, update):
+        for document in self.documents:
+            if self._matches(document, query):
+                for field in update.get("$unset", {}):
+                    document.pop(field, None)
+                return
+
+    def delete_many(self, query):
+        kept = [document for document in self.documents if not self._matches(document, query)]
+        deleted, self.documents = len(self.documents) - len(kept), kept
+        return SimpleNamespace(deleted_count=deleted)
+
+
+class MemoryDatabase(dict):
+    def __missing__(self, name):
+        self[name] = MemoryCollection(self)
+        return self[name]
+
+
+def test_failed_startup_is_retried():
+    original = genai.GenerativeModel, genai.configure
+    genai.GenerativeModel, genai.configure = FlakyModel, lambda **kwargs: None
+    try:
+        async def run():
+            FlakyModel.calls, FlakyModel.failures = 0, 1
+            ai = GeminiAI()
+            ai.api_key = "test-key"
+            first = await ai.initialize_async()
+            before_backoff = await ai.ensure_available()
+            calls_before = FlakyModel.calls
+            ai.retry_at = time.monotonic() - 1
+            after_backoff = await ai.ensure_available()
+
+            unconfigured = GeminiAI()
+            unconfigured.api_key = None
+            await unconfigured.initialize_async()
+            return ai, first, before_backoff, calls_before, after_backoff, unconfigured
+
+        ai, first, before_backoff, calls_before, after_backoff, unconfigured = asyncio.run(run())
+    finally:
+        genai.GenerativeModel, genai.configure = original
+
+    assert not first and not before_backoff and calls_before == 1, "❌ Retried before the backoff elapsed"
+    assert after_backoff and ai.is_available() and FlakyModel.calls == 2, "❌ AI stayed off after one failed start"
+    assert ai.retry_delay == INIT_RETRY_SECONDS, "❌ Backoff not reset after recovering"
+    assert unconfigured.retry_at is None and not unconfigured.is_available(), "❌ Retrying without an API key"
+    print("✅ A failed Gemini startup is retried with backoff instead of disabling AI for good")
+
+
+def test_legacy_history_is_imported():
+    assert legacy_turns(["You: hi", "Sensei: hello", "You: lost reply", "You: why?", "Sensei: because"]) == \
+        [("hi", "hello"), ("why?", "because")]
+
+    database = MemoryDatabase()
+    database["user_ai"].insert_one({"_id": 7, "sensei_conversation": ["You: hi", "Sensei: hello",
+                                                                       "You: and now?", "Sensei: now we train"]})
+    database["users"].insert_one({"user_id": 7, "bleky_nephew_conversation": ["You: yo", "Bleky: hey uncle!"]})
+    memory = ConversationMemory()
+    memory.attach_collection(database["ai_conversations"])
+
+    async def run():
+        sensei = await memory.get_history(7, "sensei")
+        nephew = await memory.get_history(7, "nephew")
+        memory.conversations.clear()
+        reloaded = await memory.get_history(7, "sensei")
+        return sensei, nephew, reloaded
+
+    sensei, nephew, reloaded = asyncio.run(run())
+    assert [(turn["user_message"], turn["ai_response"]) for turn in sensei] == [("hi", "hello"), ("and now?", "now we train")]
+    assert [turn["ai_response"] for turn in nephew] == ["hey uncle!"]
+    assert "sensei_conversation" not in database["user_ai"].documents[0], "❌ Legacy field left behind"
+    assert "bleky_nephew_conversation" not in database["users"].documents[0]
+    assert reloaded == sensei and len(database["ai_conversations"].documents) == 3, "❌ Legacy turns imported twice"
+    print("✅ Sensei and Bleky history stored on user documents moves into AI memory")
+
+
+if __name__ == "__main__":
+    print("🔧 AI Recovery Verification Test")
+    print("=" * 50)
+    test_failed_startup_is_retried()
+    test_legacy_history_is_imported()
+    print("\n🎉 ALL AI RECOVERY TESTS PASSED!")
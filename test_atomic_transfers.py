@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Test script to verify transfers never create or destroy coins under concurrency
+"""
+
+import sys
+import os
+import random
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from pymongo.errors import OperationFailure
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.storage import MemoryStorage, SQLiteStorage
+from core.transfers import TwoPhaseTransfers
+from database import DatabaseManager
+
+USERS = 20
+STARTING_BANK = 1000
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if not (condition in value if isinstance(value, list) else value == condition):
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$gte" and not (value or 0) >= operand:
+                return False
+            if operator == "$lt" and not value < operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$ne" and (operand in (value or []) if isinstance(value, list) or value is None else value == operand):
+                return False
+    return True
+
+
+class AtomicCollection:
+    """Single-document atomic operations (one lock per collection), like the server gives us"""
+
+    def __init__(self):
+        self.documents = []
+        self.lock = threading.Lock()
+
+    def _apply(self, document, update, inserted=False):
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        for field, value in update.get("$set", {}).items():
+            document[field] = value
+        for field, item in update.get("$push", {}).items():
+            document.setdefault(field, []).append(item)
+        for field, item in update.get("$pull", {}).items():
+            document[field] = [value for value in document.get(field, []) if value != item]
+        if inserted:
+            for field, value in update.get("$setOnInsert", {}).items():
+                document.setdefault(field, value)
+
+    def insert_one(self, document):
+        with self.lock:
+            self.documents.append(dict(document))
+
+    def find(self, query):
+        with self.lock:
+            return [dict(document) for document in self.documents if matches(document, query)]
+
+    def find_one(self, query, projection=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def find_one_and_update(self, query, update, projection=None, return_document=None):
+        with self.lock:
+            for document in self.documents:
+                if matches(document, query):
+                    self._apply(document, update)
+                    return dict(document)
+        return None
+
+    def update_one(self, query, update, upsert=False):
+        with self.lock:
+            for document in self.documents:
+                if matches(document, query):
+                    self._apply(document, update)
+                    return SimpleNamespace(acknowledged=True, matched_count=1)
+            if upsert:
+                document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+                self._apply(document, update, inserted=True)
+                self.documents.append(document)
+        return SimpleNamespace(acknowledged=True, matched_count=0)
+
+    def update_many(self, query, update):
+        with self.lock:
+            for document in self.documents:
+                if matches(document, query):
+                    self._apply(document, update)
+
+
+class AtomicDatabase(dict):
+    def __missing__(self, name):
+        self[name] = AtomicCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class StandaloneClient:
+    """start_session() on a standalone server: transactions are refused with IllegalOperation"""
+
+    def start_session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def with_transaction(self, callback):
+        raise OperationFailure("Transaction numbers are only allowed on a replica set member or mongos", code=20)
+
+
+def run_transfers(manager: DatabaseManager, count: int, workers: int = 32) -> int:
+    """Fire `count` random transfers in parallel; returns the total fees charged"""
+    rng = random.Random(42)
+    jobs = []
+    for _ in range(count):
+        sender, recipient = rng.sample(range(1, USERS + 1), 2)
+        jobs.append((sender, recipient, rng.randint(1, 400)))
+
+    def send(job):
+        sender, recipient, amount = job
+        fee = max(1, amount // 100)
+        return fee if manager.transfer(sender, recipient, amount, fee=fee)["success"] else 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(send, jobs))
+
+
+def local_manager(storage) -> DatabaseManager:
+    manager = DatabaseManager()
+    manager.connected_to_mongodb, manager.users_collection, manager.storage = False, None, storage
+    for user_id in range(1, USERS + 1):
+        manager.update_user_data(user_id, {"bank": STARTING_BANK})
+    return manager
+
+
+def assert_conserved(balances, fees, label):
+    assert min(balances) >= 0, f"❌ {label}: a balance went negative"
+    assert sum(balances) + fees == USERS * STARTING_BANK, \
+        f"❌ {label}: {sum(balances)} + {fees} fees != {USERS * STARTING_BANK}"
+
+
+def test_memory_transfers_conserve_coins():
+    manager = local_manager(MemoryStorage())
+    fees = run_transfers(manager, 5000)
+    balances = [manager.get_user_data(user_id)["bank"] for user_id in range(1, USERS + 1)]
+    assert_conserved(balances, fees, "memory")
+    print(f"✅ 5000 parallel memory transfers conserved coins ({fees} in fees)")
+
+
+def test_sqlite_transfers_conserve_coins():
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bot.db"))
+        manager = local_manager(storage)
+        fees = run_transfers(manager, 2000)
+        balances = [manager.get_user_data(user_id)["bank"] for user_id in range(1, USERS + 1)]
+        storage.close()
+    assert_conserved(balances, fees, "sqlite")
+    print(f"✅ 2000 parallel SQLite transfers conserved coins ({fees} in fees)")
+
+
+def test_two_phase_transfers_conserve_coins():
+    database = AtomicDatabase()
+    manager = DatabaseManager()
+    manager.connected_to_mongodb, manager.mongodb_db, manager.mongodb_client = True, database, StandaloneClient()
+    manager.users_collection = database.users
+    for user_id in range(1, USERS + 1):
+        database.users.insert_one({"user_id": user_id, "bank": STARTING_BANK})
+
+    fees = run_transfers(manager, 2000)
+    assert not manager.transactions_supported, "❌ Standalone server not detected"
+    balances = [database.users.find_one({"user_id": user_id})["bank"] for user_id in range(1, USERS + 1)]
+    assert_conserved(balances, fees, "two-phase")
+    assert not any(d.get("pending_transfers") for d in database.users.documents), "❌ Transfer markers left behind"
+    assert not database.transfers.find({"state": {"$in": ["pending", "applied"]}}), "❌ Unfinished transfers"
+    print(f"✅ 2000 parallel two-phase transfers conserved coins ({fees} in fees)")
+
+
+def test_interrupted_transfer_recovers_once():
+    database = AtomicDatabase()
+    database.users.insert_one({"user_id": 1, "bank": 500})
+    transfers = TwoPhaseTransfers(database)
+
+    # Crash right after the debit: the credit never ran
+    transfers._finish = lambda transfer, defaults: (_ for _ in ()).throw(ConnectionError("process died"))
+    try:
+        transfers.transfer(1, 2, "bank", 110, 100, {"bank": 0})
+    except ConnectionError:
+        pass
+    assert database.users.find_one({"user_id": 1})["bank"] == 390 and database.users.find_one({"user_id": 2}) is None
+
+    recovering = TwoPhaseTransfers(database)
+    database.transfers.documents[0]["created_at"] = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert recovering.recover() == 1 and recovering.recover() == 0, "❌ Transfer recovered more than once"
+    assert database.users.find_one({"user_id": 2})["bank"] == 100, "❌ Credit lost after a crash"
+    assert database.transfers.documents[0]["state"] == "done"
+    print("✅ Interrupted two-phase transfers are completed exactly once")
+
+
+def test_transfer_rejections():
+    manager = local_manager(MemoryStorage())
+    assert manager.transfer(1, 2, 990, fee=11) == {"success": False, "message": "Insufficient funds"}
+    assert not manager.transfer(1, 1, 10)["success"] and not manager.transfer(1, 2, -5)["success"]
+    assert manager.get_user_data(1)["bank"] == STARTING_BANK and manager.get_user_data(2)["bank"] == STARTING_BANK
+    result = manager.transfer(1, 2, 989, fee=11)
+    assert result == {"success": True, "amount": 989, "fee": 11, "balance": 0}, f"❌ Unexpected result {result}"
+    print("✅ Rejected transfers change nothing")
+
+
+if __name__ == "__main__":
+    print("🔧 Atomic Transfer Verification Test")
+    print("=" * 50)
+    test_memory_transfers_conserve_coins()
+    test_sqlite_transfers_conserve_coins()
+    test_two_phase_transfers_conserve_coins()
+    test_interrupted_transfer_recovers_once()
+    test_transfer_rejections()
+    print("\n🎉 ALL TRANSFER TESTS PASSED!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script to verify command timing splits phases and counts failed and timed-out commands
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.instrumentation import CommandInstrumentation, InstrumentedCommandTree, measure_phase
+from core.histogram import get_latency_tracker
+
+DISCORD_DELAY = 0.03
+DB_DELAY = 0.05
+
+
+class FakeHTTP:
+    async def request(self, route, **kwargs):
+        await asyncio.sleep(DISCORD_DELAY)
+
+
+class FakeAnalytics:
+    def __init__(self):
+        self.usage = []
+        self.performance = []
+
+    async def track_command_usage(self, name, user_id, guild_id, seconds):
+        self.usage.append((name, user_id, guild_id))
+
+    async def track_performance(self, kind, seconds, success):
+        self.performance.append((kind, success))
+
+
+def build_tree():
+    """A real command tree whose commands reply through an instrumented fake HTTP client"""
+    bot = SimpleNamespace(http=FakeHTTP(), commands_used=0)
+    analytics = FakeAnalytics()
+    instrumentation = CommandInstrumentation(bot, analytics)
+    instrumentation.install()
+
+    client = discord.Client(intents=discord.Intents.default())
+    client.instrumentation = instrumentation
+    tree = InstrumentedCommandTree(client)
+
+    @tree.command(name="work", description="Work a shift")
+    async def work(interaction):
+        with measure_phase("db"):
+            await asyncio.sleep(DB_DELAY)
+        await bot.http.request("reply")
+
+    @tree.command(name="broken", description="Always fails")
+    async def broken(interaction):
+        await bot.http.request("reply")
+        raise ValueError("boom")
+
+    @tree.command(name="slow", description="Misses its deadline")
+    async def slow(interaction):
+        await asyncio.wait_for(asyncio.sleep(1), timeout=0.01)
+
+    return tree, instrumentation, analytics, bot
+
+
+def fake_interaction(tree, name):
+    return SimpleNamespace(type=discord.InteractionType.application_command, data={"name": name, "type": 1},
+                           user=SimpleNamespace(id=1), guild_id=2, guild=None, command=None, command_failed=False,
+                           _state=tree.client._connection, client=tree.client, extras={})
+
+
+def test_phases_are_split_and_recorded():
+    get_latency_tracker().reset()
+    tree, instrumentation, analytics, bot = build_tree()
+    asyncio.run(tree._call(fake_interaction(tree, "work")))
+
+    latency = get_latency_tracker()
+    total = latency.get("command", "work").total
+    discord_time = latency.get("command_discord", "work").total
+    db_time = latency.get("command_db", "work").total
+    cpu_time = latency.get("command_cpu", "work").total
+    assert DISCORD_DELAY <= discord_time < DISCORD_DELAY + 0.02, f"❌ Discord phase {discord_time:.3f}s"
+    assert DB_DELAY <= db_time < DB_DELAY + 0.02, f"❌ DB phase {db_time:.3f}s"
+    assert abs(total - discord_time - db_time - cpu_time) < 1e-6 and cpu_time < 0.02, "❌ Phases do not add up"
+    assert analytics.usage == [("work", 1, 2)] and analytics.performance == [("slash_command", True)]
+    assert bot.commands_used == 1 and instrumentation.get_stats()["succeeded"] == 1
+    breakdown = instrumentation.phase_breakdown("work")
+    assert set(breakdown) == {"discord", "db", "cpu"}, f"❌ Breakdown missing phases: {breakdown}"
+    print("✅ A slash command's latency splits into Discord, DB and CPU histograms")
+
+
+def test_failures_and_timeouts_are_counted():
+    get_latency_tracker().reset()
+    tree, instrumentation, analytics, bot = build_tree()
+
+    async def run():
+        for name in ("work", "broken", "broken", "slow"):
+            await tree._call(fake_interaction(tree, name))
+
+    asyncio.run(run())
+    assert instrumentation.get_stats() == {"succeeded": 1, "failed": 2, "timed_out": 1}, \
+        f"❌ Wrong outcome counts: {instrumentation.get_stats()}"
+    assert [success for _, success in analytics.performance] == [True, False, False, False]
+    assert get_latency_tracker().get("command", "broken").count == 2, "❌ Failed commands not timed"
+    assert get_latency_tracker().get("command_discord", "broken").total >= 2 * DISCORD_DELAY
+    assert bot.commands_used == 4
+    print("✅ Failed and timed-out commands are counted separately and still timed")
+
+
+if __name__ == "__main__":
+    print("🔧 Command Instrumentation Verification Test")
+    print("=" * 50)
+    test_phases_are_split_and_recorded()
+    test_failures_and_timeouts_are_counted()
+    print("\n🎉 ALL COMMAND INSTRUMENTATION TESTS PASSED!")
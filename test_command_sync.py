@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script to verify command sync is skipped when the command tree is unchanged
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from discord import app_commands
+
+from core.command_sync import CommandSyncer, CommandSyncState
+
+
+class FakeHTTP:
+    """Records the per-command endpoints the syncer calls"""
+
+    def __init__(self):
+        self.upserts = []
+
+    async def upsert_global_command(self, application_id, payload):
+        self.upserts.append(payload["name"])
+
+
+class FakeBot:
+    def __init__(self):
+        self.client = discord.Client(intents=discord.Intents.none())
+        self.tree = app_commands.CommandTree(self.client)
+        self.http = FakeHTTP()
+        self.application_id = 1
+        self.full_syncs = 0
+
+        async def sync(guild=None):
+            self.full_syncs += 1
+            return self.tree.get_commands(guild=guild)
+        self.tree.sync = sync
+
+    def add(self, name: str, description: str):
+        async def callback(interaction: discord.Interaction):
+            pass
+        self.tree.add_command(app_commands.Command(name=name, description=description, callback=callback),
+                              override=True)
+
+
+def test_restart_skips_and_edits_are_incremental():
+    """First start syncs everything, an identical restart syncs nothing, one edit upserts one command"""
+    with tempfile.TemporaryDirectory() as directory:
+        state = CommandSyncState(path=os.path.join(directory, "sync.json"))
+
+        bot = FakeBot()
+        for name in ("balance", "work", "daily"):
+            bot.add(name, f"{name} command")
+        first = asyncio.run(CommandSyncer(bot, state).sync())
+        assert first["action"] == "full" and bot.full_syncs == 1, f"❌ Unexpected first sync {first}"
+
+        # Restart with the same tree
+        restarted = FakeBot()
+        for name in ("daily", "work", "balance"):
+            restarted.add(name, f"{name} command")
+        second = asyncio.run(CommandSyncer(restarted, state).sync())
+        assert second["action"] == "skipped" and restarted.full_syncs == 0, f"❌ Unchanged tree was synced {second}"
+        print("✅ Restart with an unchanged tree skips syncing")
+
+        restarted.add("work", "work a shift")
+        third = asyncio.run(CommandSyncer(restarted, state).sync())
+        assert third["action"] == "incremental" and third["changed"] == ["work"], f"❌ Unexpected sync {third}"
+        assert restarted.http.upserts == ["work"] and restarted.full_syncs == 0
+        print("✅ A single edited command is upserted on its own")
+
+        forced = asyncio.run(CommandSyncer(restarted, state).sync(force=True))
+        assert forced["action"] == "full", f"❌ Forced sync was not full {forced}"
+        print("✅ Forced sync ignores the stored hash")
+
+
+if __name__ == "__main__":
+    print("🔧 Command Sync Verification Test")
+    print("=" * 50)
+    test_restart_skips_and_edits_are_incremental()
+    print("\n🎉 ALL COMMAND SYNC TESTS PASSED!")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script to verify AI conversation memory stays bounded and persists one document per turn
+"""
+
+import sys
+import os
+import asyncio
+import threading
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.conversation_memory import ConversationMemory, estimate_tokens
+
+
+class Cursor(list):
+    def sort(self, field, direction):
+        return Cursor(sorted(self, key=lambda document: document[field], reverse=direction < 0))
+
+    def limit(self, count):
+        return Cursor(self[:count])
+
+
+class TurnCollection:
+    """Records every call so tests can check turns are only ever inserted"""
+
+    def __init__(self):
+        self.documents = []
+        self.calls = []
+        self.database = {"user_ai": self, "users": self}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def insert_one(self, document):
+        self.calls.append("insert_one")
+        self.documents.append(dict(document))
+
+    def find(self, query, projection=None):
+        return Cursor(dict(document) for document in self.documents if document["conversation"] == query["conversation"])
+
+    def find_one(self, query, projection=None):
+        return None
+
+    def update_one(self, query, update):
+        self.calls.append("update_one")
+
+    def delete_many(self, query):
+        self.calls.append(("delete_many", threading.current_thread().name))
+        kept = [document for document in self.documents if document["conversation"] != query["conversation"]]
+        deleted, self.documents = len(self.documents) - len(kept), kept
+        return SimpleNamespace(deleted_count=deleted)
+
+
+def test_lru_eviction():
+    memory = ConversationMemory(max_conversations=2)
+
+    async def run():
+        await memory.append(1, "sensei", "hi", "hello")
+        await memory.append(2, "sensei", "hi", "hello")
+        await memory.get_history(1, "sensei")  # 1 is now the most recently used
+        await memory.append(3, "sensei", "hi", "hello")
+        return [await memory.get_history(user_id, "sensei") for user_id in (1, 2, 3)]
+
+    one, two, three = asyncio.run(run())
+    assert one and three and not two, "❌ Evicted a recently used conversation instead of the oldest"
+    assert memory.stats["evicted_lru"] == 1 and len(memory.conversations) == 2
+    print("✅ The least recently used conversation is evicted at capacity")
+
+
+def test_ttl_expiry():
+    memory = ConversationMemory(ttl=60)
+
+    async def run():
+        await memory.append(1, "nephew", "hi", "hey")
+        await memory.append(2, "nephew", "hi", "hey")
+        await memory.append(3, "nephew", "hi", "hey")
+        memory.conversations["1_nephew"].last_active -= 120
+        memory.conversations["2_nephew"].last_active -= 120
+        expired_read = await memory.get_history(1, "nephew")
+        swept = memory.sweep()
+        return expired_read, swept
+
+    expired_read, swept = asyncio.run(run())
+    assert expired_read == [] and swept == 1, "❌ Idle conversations outlived the TTL"
+    assert list(memory.conversations) == ["3_nephew"] and memory.stats["evicted_ttl"] == 2
+    print("✅ Conversations idle past the TTL expire on read and on sweep")
+
+
+def test_token_budget_trims_oldest():
+    memory = ConversationMemory(max_tokens=60, max_turns=50)
+    message = "word " * 20
+
+    async def run():
+        overflowed = [await memory.append(1, "sensei", f"{i} {message}", "ok") for i in range(6)]
+        return overflowed, await memory.get_history(1, "sensei")
+
+    overflowed, history = asyncio.run(run())
+    per_turn = estimate_tokens(f"0 {message}") + estimate_tokens("ok")
+    assert sum(turn["tokens"] for turn in history) <= 60 and len(history) == 60 // per_turn
+    assert history[-1]["user_message"].startswith("5 "), "❌ Newest turn trimmed"
+    assert not overflowed[0] and overflowed[-1], "❌ Overflow not reported once the budget was exceeded"
+    summary, trimmed = memory.take_overflow(1, "sensei")
+    assert [turn["user_message"][0] for turn in trimmed] == [str(i) for i in range(6 - len(history))]
+    assert memory.take_overflow(1, "sensei") == ("", []), "❌ Overflow handed out twice"
+    print(f"✅ Token budget keeps the newest {len(history)} turns and hands the rest to the summariser")
+
+
+def test_persistence_is_append_only():
+    collection = TurnCollection()
+    memory = ConversationMemory(max_turns=3)
+    memory.attach_collection(collection)
+
+    async def run():
+        for i in range(5):
+            await memory.append(1, "sensei", f"question {i}", f"answer {i}")
+        restarted = ConversationMemory(max_turns=3)
+        restarted.attach_collection(collection)
+        restored = await restarted.get_history(1, "sensei")
+        loop_thread = threading.current_thread().name
+        cleared = await restarted.clear(1, "sensei")
+        return restored, restarted, loop_thread, cleared
+
+    restored, restarted, loop_thread, cleared = asyncio.run(run())
+    assert collection.calls[:5] == ["insert_one"] * 5, f"❌ Turns were not appended one document each: {collection.calls}"
+    assert [turn["user_message"] for turn in restored] == ["question 2", "question 3", "question 4"], \
+        "❌ Restart did not restore the newest turns in order"
+    assert restarted.stats["loaded"] == 1
+    assert cleared and "1_sensei" not in restarted.conversations and not collection.documents
+    deletes = [call for call in collection.calls if isinstance(call, tuple)]
+    assert deletes and deletes[0][1] != loop_thread, "❌ Stored turns deleted on the event loop thread"
+    print("✅ Each turn is one insert, restarts restore the newest turns, clearing deletes off the loop")
+
+
+if __name__ == "__main__":
+    print("🔧 Conversation Memory Verification Test")
+    print("=" * 50)
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_token_budget_trims_oldest()
+    test_persistence_is_append_only()
+    print("\n🎉 ALL CONVERSATION MEMORY TESTS PASSED!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script to verify log-bucketed latency histograms report accurate, mergeable percentiles
+"""
+
+import sys
+import os
+import json
+import random
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.histogram import LogHistogram, LatencyTracker
+
+
+def exact_percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def test_percentiles_within_bucket_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-3, 1.2) for _ in range(100000)]
+    histogram = LogHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for p in (50, 95, 99):
+        exact = exact_percentile(values, p)
+        error = abs(histogram.percentile(p) - exact) / exact
+        assert error < 0.02, f"❌ p{p} off by {error:.1%}"
+    assert histogram.count == 100000 and abs(histogram.mean - sum(values) / len(values)) < 1e-9
+    assert histogram.percentile(100) == histogram.max and histogram.percentile(0.001) >= histogram.min
+    print("✅ p50/p95/p99 within 2% of the exact values over 100k samples")
+
+
+def test_merge_matches_single_histogram():
+    rng = random.Random(11)
+    values = [rng.expovariate(20) for _ in range(20000)]
+    whole, left, right = LogHistogram(), LogHistogram(), LogHistogram()
+    for i, value in enumerate(values):
+        whole.record(value)
+        (left if i % 2 else right).record(value)
+    left.merge(right)
+    assert left.counts == whole.counts and left.count == whole.count
+    assert (left.min, left.max) == (whole.min, whole.max)
+    assert all(left.percentile(p) == whole.percentile(p) for p in (50, 95, 99)), "❌ Merged percentiles differ"
+
+    try:
+        left.merge(LogHistogram(growth=1.1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("❌ Histograms with different buckets merged")
+    print("✅ Merged histograms equal one histogram over all samples")
+
+
+def test_snapshot_round_trip():
+    tracker = LatencyTracker()
+    for i in range(1, 1001):
+        tracker.record("command", "balance", i / 1000)
+    tracker.record("db", "find_one", 0.004)
+
+    snapshot = json.loads(json.dumps(tracker.snapshot()))
+    restored = LogHistogram.from_snapshot(snapshot["command"]["balance"])
+    original = tracker.get("command", "balance")
+    assert restored.counts == original.counts and restored.summary() == original.summary(), "❌ Snapshot lost data"
+    assert len(snapshot["command"]["balance"]["buckets"]) < 200, "❌ Snapshot is not sparse"
+
+    empty = LogHistogram.from_snapshot(LogHistogram().snapshot())
+    assert empty.count == 0 and empty.percentile(99) == 0.0
+    assert list(tracker.summary("command")) == ["balance"] and tracker.combined("db").count == 1
+    print("✅ Snapshots survive a JSON round trip and stay sparse")
+
+
+if __name__ == "__main__":
+    print("🔧 Latency Histogram Verification Test")
+    print("=" * 50)
+    test_percentiles_within_bucket_error()
+    test_merge_matches_single_histogram()
+    test_snapshot_round_trip()
+    print("\n🎉 ALL HISTOGRAM TESTS PASSED!")
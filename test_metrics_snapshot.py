@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the metrics snapshot refreshes in the background and renders for Prometheus
+"""
+
+import sys
+import os
+import asyncio
+import threading
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.metrics import MetricsCollector
+
+
+def test_sources_refresh_on_their_interval():
+    calls = {"fast": 0, "slow": 0}
+    threads = []
+
+    def fast():
+        calls["fast"] += 1
+        return {"guilds": 3}
+
+    def slow():
+        calls["slow"] += 1
+        threads.append(threading.current_thread().name)
+        return {"users": 42, "connected": True}
+
+    async def run():
+        collector = MetricsCollector(refresh_interval=60)
+        collector.register("bot", fast, interval=5)
+        collector.register("database", slow, blocking=True)
+        await collector.refresh()
+        await collector.refresh()
+        collector.sources["bot"].last_run -= 5
+        await collector.refresh()
+        return collector
+
+    collector = asyncio.run(run())
+    snapshot = collector.get_snapshot()
+    assert calls == {"fast": 2, "slow": 1}, f"❌ Sources ran off their interval: {calls}"
+    assert threads and threads[0] != "MainThread", "❌ Blocking source ran on the event loop"
+    assert snapshot["bot"] == {"guilds": 3} and snapshot["database"]["users"] == 42 and snapshot["timestamp"]
+    print("✅ Sources refresh on their own interval, blocking ones off the loop")
+
+
+def test_failing_source_keeps_snapshot_whole():
+    def broken():
+        raise RuntimeError("database down")
+
+    async def run():
+        collector = MetricsCollector()
+        collector.register("bot", lambda: {"guilds": 1})
+        collector.register("database", broken)
+        before = collector.get_snapshot()
+        await collector.refresh()
+        return collector, before
+
+    collector, before = asyncio.run(run())
+    snapshot = collector.get_snapshot()
+    assert snapshot is not before and before == {"timestamp": None}, "❌ Snapshot mutated in place"
+    assert snapshot["database"] == {"error": "database down"} and snapshot["bot"] == {"guilds": 1}
+    print("✅ A failing source is reported without breaking the snapshot")
+
+
+def test_prometheus_rendering():
+    async def run():
+        collector = MetricsCollector()
+        collector.latency.reset()
+        collector.register("database", lambda: {"users": 42, "connected": True, "name": "coalbot"})
+        await collector.refresh()
+        for ms in range(1, 101):
+            collector.latency.record("command", 'say "hi"', ms / 1000)
+        return collector.render_prometheus()
+
+    text = asyncio.run(run())
+    assert "coalbot_database_users 42" in text and "coalbot_database_connected 1" in text
+    assert "coalbot_database_name" not in text, "❌ Non-numeric value rendered as a gauge"
+    assert '# TYPE coalbot_command_latency_seconds summary' in text
+    assert 'coalbot_command_latency_seconds_count{name="say \\"hi\\""} 100' in text, "❌ Label not escaped"
+    assert 'quantile="0.99"' in text
+    print("✅ Snapshot gauges and latency summaries render as Prometheus text")
+
+
+if __name__ == "__main__":
+    print("🔧 Metrics Snapshot Verification Test")
+    print("=" * 50)
+    test_sources_refresh_on_their_interval()
+    test_failing_source_keeps_snapshot_whole()
+    test_prometheus_rendering()
+    print("\n🎉 ALL METRICS TESTS PASSED!")
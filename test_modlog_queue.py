@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the modlog dispatcher coalesces, paces and applies backpressure
+"""
+
+import sys
+import os
+import time
+import asyncio
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from core.modlog import ModlogDispatcher, ChannelBucket, MAX_EMBEDS_PER_MESSAGE
+
+
+class FakeChannel:
+    """Channel that records every message instead of calling Discord"""
+
+    def __init__(self, channel_id: int = 1):
+        self.id = channel_id
+        self.messages = []
+
+    async def send(self, content=None, embeds=None):
+        self.messages.append({"content": content, "embeds": embeds or [], "sent_at": time.monotonic()})
+
+
+def _embed(i: int) -> discord.Embed:
+    return discord.Embed(title=f"Event {i}", description=f"details {i}")
+
+
+def test_embeds_are_coalesced():
+    """25 events should need only 3 messages of up to 10 embeds"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = ModlogDispatcher(linger=0.05)
+        for i in range(25):
+            await dispatcher.enqueue(channel, embed=_embed(i), event_type="member_join")
+        await dispatcher.close()
+        return channel, dispatcher.get_stats()
+
+    channel, stats = asyncio.run(run())
+    assert len(channel.messages) == 3, f"❌ Expected 3 messages, got {len(channel.messages)}"
+    assert all(len(m["embeds"]) <= MAX_EMBEDS_PER_MESSAGE for m in channel.messages)
+    assert stats["delivered"] == 25
+    print("✅ Embeds coalesced into batches of 10")
+
+
+def test_text_events_are_joined():
+    """Plain text modlog lines share one message"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = ModlogDispatcher(linger=0.05)
+        for i in range(5):
+            await dispatcher.enqueue(channel, content=f"✅ user{i} joined", event_type="member_join")
+        await dispatcher.close()
+        return channel
+
+    channel = asyncio.run(run())
+    assert len(channel.messages) == 1, "❌ Text events should share a message"
+    assert channel.messages[0]["content"].count("\n") == 4
+    print("✅ Text events joined into one message")
+
+
+def test_merge_policy_summarises_flood():
+    """Overflowing events are folded into a flood summary embed instead of lost"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = ModlogDispatcher(max_queue=10, overflow_policy="merge", linger=0.05)
+        for i in range(40):
+            await dispatcher.enqueue(channel, embed=_embed(i), event_type="member_join")
+        await dispatcher.close()
+        return channel, dispatcher.get_stats()
+
+    channel, stats = asyncio.run(run())
+    assert stats["merged"] == 30, f"❌ Expected 30 merged events, got {stats['merged']}"
+    titles = [e.title for m in channel.messages for e in m["embeds"]]
+    assert any("Flood Summary (30 events)" in t for t in titles), "❌ Missing flood summary embed"
+    print("✅ Merge policy produced a flood summary")
+
+
+def test_flood_summary_survives_rate_limit():
+    """A 429 on the batch carrying the flood summary must not lose the merged/dropped counts"""
+    class RateLimitedOnceChannel(FakeChannel):
+        def __init__(self):
+            super().__init__()
+            self.limited = False
+
+        async def send(self, content=None, embeds=None):
+            if not self.limited:
+                self.limited = True
+                raise discord.RateLimited(0.05)
+            await super().send(content=content, embeds=embeds)
+
+    async def run():
+        channel = RateLimitedOnceChannel()
+        dispatcher = ModlogDispatcher(max_queue=10, overflow_policy="merge", linger=0.05)
+        for i in range(40):
+            await dispatcher.enqueue(channel, embed=_embed(i), event_type="member_join")
+        await dispatcher.close()
+        return channel, dispatcher.get_stats()
+
+    channel, stats = asyncio.run(run())
+    assert stats["rate_limited"] == 1 and stats["delivered"] == 10, f"❌ Unexpected stats {stats}"
+    titles = [e.title for m in channel.messages for e in m["embeds"]]
+    assert titles.count("🌊 Modlog Flood Summary (30 events)") == 1, f"❌ Flood counts lost on 429: {titles}"
+    print("✅ Flood summary re-sent intact after a rate limit")
+
+
+def test_http_429_is_retried():
+    """A plain HTTPException with status 429 backs off for its Retry-After and re-sends the batch"""
+    class TooManyRequestsChannel(FakeChannel):
+        def __init__(self):
+            super().__init__()
+            self.limited_at = None
+
+        async def send(self, content=None, embeds=None):
+            if self.limited_at is None:
+                self.limited_at = time.monotonic()
+                response = SimpleNamespace(status=429, reason="Too Many Requests", headers={"Retry-After": "0.2"})
+                raise discord.HTTPException(response, "You are being rate limited.")
+            await super().send(content=content, embeds=embeds)
+
+    async def run():
+        channel = TooManyRequestsChannel()
+        dispatcher = ModlogDispatcher(linger=0.01)
+        await dispatcher.enqueue(channel, content="🔨 user banned", event_type="member_ban")
+        await dispatcher.close()
+        return channel, dispatcher.get_stats()
+
+    channel, stats = asyncio.run(run())
+    assert stats["rate_limited"] == 1 and stats["failed"] == 0 and stats["delivered"] == 1, f"❌ Unexpected stats {stats}"
+    assert channel.messages[0]["sent_at"] - channel.limited_at >= 0.2, "❌ Retried before Retry-After elapsed"
+    print("✅ HTTP 429 responses back off for Retry-After and re-send")
+
+
+def test_sends_are_paced_locally():
+    """The channel bucket is paced from the dispatcher's own sends"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = ModlogDispatcher(linger=0.01, bucket_limit=2, bucket_window=0.3)
+        for i in range(25):
+            await dispatcher.enqueue(channel, embed=_embed(i), event_type="member_join")
+        await dispatcher.close()
+        return channel
+
+    channel = asyncio.run(run())
+    sent = [message["sent_at"] for message in channel.messages]
+    assert len(sent) == 3 and sent[1] - sent[0] < 0.1, f"❌ Unexpected sends {sent}"
+    assert sent[2] - sent[0] >= 0.3, "❌ Third message sent before the bucket window reset"
+    print("✅ Sends are paced by the local bucket")
+
+
+def test_drop_policy_reports_dropped():
+    """Drop policy rejects events beyond the bound and reports the count"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = ModlogDispatcher(max_queue=10, overflow_policy="drop", linger=0.05)
+        results = [await dispatcher.enqueue(channel, embed=_embed(i), event_type="message_delete") for i in range(15)]
+        await dispatcher.close()
+        return channel, results
+
+    channel, results = asyncio.run(run())
+    assert results.count(False) == 5
+    fields = [f.value for m in channel.messages for e in m["embeds"] for f in e.fields if f.name == "Dropped"]
+    assert fields == ["5× message_delete"], f"❌ Unexpected dropped report: {fields}"
+    print("✅ Drop policy reported dropped events")
+
+
+def test_bucket_headers():
+    """Rate limit headers override the local bucket model"""
+    bucket = ChannelBucket(limit=5, window=5.0)
+    assert bucket.delay(100.0) == 0
+    assert bucket.update_from_headers({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "2.5"}, 100.0)
+    assert bucket.delay(100.0) == 2.5
+    assert bucket.delay(103.0) == 0
+    print("✅ Bucket respects rate limit headers")
+
+
+if __name__ == "__main__":
+    print("🔧 Modlog Dispatcher Verification Test")
+    print("=" * 50)
+    test_embeds_are_coalesced()
+    test_text_events_are_joined()
+    test_merge_policy_summarises_flood()
+    test_flood_summary_survives_rate_limit()
+    test_http_429_is_retried()
+    test_sends_are_paced_locally()
+    test_drop_policy_reports_dropped()
+    test_bucket_headers()
+    print("\n🎉 ALL MODLOG TESTS PASSED!")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test script to verify MongoDB outages buffer writes and replay them without loss
+"""
+
+import sys
+import os
+import time
+import tempfile
+from types import SimpleNamespace
+
+from bson import json_util
+from pymongo.errors import AutoReconnect, NetworkTimeout, DuplicateKeyError
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.connection import CircuitBreaker, WriteAheadBuffer
+from core.user_schema import OfflineUserDocument, offline_changes
+from database import DatabaseManager
+
+
+class FlakyCollection:
+    """Applies $set/$inc/$push to documents keyed by their filter id; raises while the server is down"""
+
+    def __init__(self, server):
+        self.server = server
+        self.documents = {}
+
+    def _check(self):
+        if self.server.down:
+            raise AutoReconnect("connection refused")
+        if self.server.timeouts:
+            self.server.timeouts -= 1
+            raise NetworkTimeout("timed out")
+
+    def find_one(self, query, projection=None):
+        self._check()
+        return self.documents.get(query.get("_id", query.get("user_id")))
+
+    def update_one(self, query, update, upsert=False):
+        self._check()
+        key = query.get("_id", query.get("user_id"))
+        if key in self.server.rejected:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        document = self.documents.get(key)
+        minimum = query.get("coins", {}).get("$gte") if isinstance(query.get("coins"), dict) else None
+        if (document is None and not upsert) or (minimum is not None and (document or {}).get("coins", 0) < minimum):
+            return SimpleNamespace(acknowledged=True, matched_count=0)
+        document = self.documents.setdefault(key, {})
+        for path, value in update.get("$set", {}).items():
+            document[path] = value
+        for path, amount in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            target = document
+            for name in parents:
+                target = target.setdefault(name, {})
+            target[leaf] = target.get(leaf, 0) + amount
+        for path, value in update.get("$push", {}).items():
+            items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+            document.setdefault(path, []).extend(items)
+        return SimpleNamespace(acknowledged=True, matched_count=1)
+
+
+class FlakyDatabase(dict):
+    def __init__(self):
+        super().__init__()
+        self.down = False
+        self.timeouts = 0
+        self.rejected = set()
+
+    def __missing__(self, name):
+        self[name] = FlakyCollection(self)
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def wait_for_replay(manager, timeout=2):
+    deadline = time.time() + timeout
+    while manager.replay_thread is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def connect(manager, database, directory):
+    manager.connected_to_mongodb, manager.mongodb_db = True, database
+    manager.users_collection, manager.guilds_collection = database.users, database.guilds
+    manager.write_buffer = WriteAheadBuffer(os.path.join(directory, "pending.jsonl"),
+                                            dead_letter_path=os.path.join(directory, "dead.jsonl"))
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow(), "❌ Breaker did not trip"
+    time.sleep(0.06)
+    assert breaker.state == "half_open" and breaker.allow(), "❌ Breaker never probes"
+    breaker.record_success()
+    stats = breaker.get_stats()
+    assert stats["state"] == "closed" and stats["trips"] == 1 and stats["recoveries"] == 1, f"❌ {stats}"
+    print("✅ Circuit breaker opens, probes and closes")
+
+
+def test_buffer_survives_restart_and_replays_in_order():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pending.jsonl")
+        buffer = WriteAheadBuffer(path)
+        buffer.append("users", {"user_id": 1}, {"$set": {"coins": 5}}, upsert=True)
+        buffer.append("users", {"user_id": 1}, {"$inc": {"coins": 2}})
+
+        restored = WriteAheadBuffer(path)
+        assert len(restored) == 2, "❌ Buffered writes lost on restart"
+        database = FlakyDatabase()
+        assert restored.replay(database) == 2
+        assert database.users.documents[1]["coins"] == 7, "❌ Replay out of order"
+        assert not os.path.exists(path), "❌ Buffer file not cleared after replay"
+        print("✅ Buffered writes persist across restarts and replay in order")
+
+
+def test_outage_is_loss_free():
+    with tempfile.TemporaryDirectory() as directory:
+        database = FlakyDatabase()
+        manager = DatabaseManager()
+        manager.connected_to_mongodb, manager.mongodb_db = True, database
+        manager.users_collection, manager.guilds_collection = database.users, database.guilds
+        manager.write_buffer = WriteAheadBuffer(os.path.join(directory, "pending.jsonl"))
+        database.users.documents[1] = {"user_id": 1, "coins": 5000, "economy": {"total_earned": 0}}
+        database.user_pets.documents[1] = {"pets": [{"name": "Old"}]}
+
+        database.down = True
+        manager.add_coins(1, 100)
+        user = manager.get_user_data(1)
+        assert isinstance(user, OfflineUserDocument), "❌ Outage read did not fall back to an offline document"
+        user["coins"] += 25
+        user["pets"].append({"name": "New"})
+        user["last_work"] = 123.0
+        manager.update_user_data(1, user)
+        manager.flush_writes()
+        wait_for_replay(manager)
+        # add_coins and the offline edit coalesce into one users write; once it is buffered,
+        # the pets write queues behind it and one background replay probes the server
+        assert manager.get_connection_stats()["circuit"]["failures"] == 3
+        assert len(manager.write_buffer) == 2, f"❌ Expected 2 buffered writes, got {len(manager.write_buffer)}"
+
+        database.down = False
+        manager._on_mongodb_up()
+        deadline = time.time() + 2
+        while len(manager.write_buffer) and time.time() < deadline:
+            time.sleep(0.01)
+        stored = database.users.documents[1]
+        assert stored["coins"] == 5125 and stored["last_work"] == 123.0, f"❌ Replay clobbered the balance: {stored}"
+        assert database.user_pets.documents[1]["pets"] == [{"name": "Old"}, {"name": "New"}]
+        print("✅ Writes during an outage merge in once MongoDB returns")
+
+
+def test_outage_helpers_never_write_defaults():
+    with tempfile.TemporaryDirectory() as directory:
+        database = FlakyDatabase()
+        manager = DatabaseManager()
+        manager.connected_to_mongodb, manager.mongodb_db = True, database
+        manager.users_collection, manager.guilds_collection = database.users, database.guilds
+        manager.write_buffer = WriteAheadBuffer(os.path.join(directory, "pending.jsonl"))
+        database.users.documents[1] = {"user_id": 1, "coins": 50, "xp": 90000, "level": 31,
+                                       "last_daily": time.time(), "daily_streak": 12}
+
+        database.down = True
+        manager.circuit.trip()
+        assert manager.add_xp(1, 5) == {"xp_gained": 5, "leveled_up": False}
+        assert not manager.claim_daily_bonus(1)["success"], "❌ Daily claimed against offline defaults"
+        assert not manager.process_work(1, "Miner", 200)["success"], "❌ Work paid against offline defaults"
+        assert not manager.remove_coins(1, 500), "❌ Debit accepted against the offline 1000 coin default"
+        manager.flush_writes()
+        assert len(manager.write_buffer) == 1, f"❌ Expected only the XP gain buffered, got {len(manager.write_buffer)}"
+
+        database.down = False
+        manager.circuit.record_success()
+        assert manager.replay_pending_writes() == 1
+        stored = database.users.documents[1]
+        assert (stored["coins"], stored["xp"], stored["level"], stored["daily_streak"]) == (50, 90005, 31, 12), \
+            f"❌ Replay overwrote real values with defaults: {stored}"
+        print("✅ XP, daily, work and debits during an outage never replay offline defaults")
+
+
+def test_buffer_drains_without_topology_event():
+    with tempfile.TemporaryDirectory() as directory:
+        database = FlakyDatabase()
+        manager = DatabaseManager()
+        connect(manager, database, directory)
+        database.users.documents[1] = {"user_id": 1, "coins": 5000}
+
+        # A socket timeout fails one write but the server never leaves the topology
+        database.timeouts = 1
+        manager.add_coins(1, 100)
+        manager.flush_writes()
+        assert len(manager.write_buffer) == 1 and manager.circuit.state == "closed"
+
+        manager.add_coins(1, 5)
+        manager.flush_writes()
+        wait_for_replay(manager)
+        assert len(manager.write_buffer) == 0, "❌ Buffer never replayed without a topology event"
+        user = manager.get_user_data(1)
+        assert not isinstance(user, OfflineUserDocument) and user["coins"] == 5105, f"❌ Still offline: {user}"
+        assert manager.remove_coins(1, 10) and database.users.documents[1]["coins"] == 5095
+        print("✅ A buffer filled by a timeout drains on the next write")
+
+
+def test_rejected_write_is_dead_lettered():
+    with tempfile.TemporaryDirectory() as directory:
+        database = FlakyDatabase()
+        manager = DatabaseManager()
+        connect(manager, database, directory)
+        database.rejected.add(2)
+        manager.write_buffer.append("users", {"user_id": 2}, {"$set": {"coins": 1}}, upsert=True)
+        manager.write_buffer.append("users", {"user_id": 1}, {"$inc": {"coins": 7}}, upsert=True)
+
+        assert manager.replay_pending_writes() == 1 and len(manager.write_buffer) == 0, "❌ Rejected write blocked the queue"
+        assert database.users.documents[1]["coins"] == 7
+        with open(os.path.join(directory, "dead.jsonl")) as handle:
+            dead = [json_util.loads(line) for line in handle]
+        assert len(dead) == 1 and dead[0]["filter"] == {"user_id": 2} and "E11000" in dead[0]["error"]
+        assert manager.write_buffer.get_stats()["dead_lettered"] == 1
+        print("✅ A write the server rejects is dead-lettered instead of retried forever")
+
+
+def test_offline_changes_are_deltas():
+    defaults = {"user_id": 1, "coins": 1000, "last_daily": 0, "economy": {"total_spent": 0}, "warnings": []}
+    document = OfflineUserDocument({"user_id": 1, "coins": 1000, "last_daily": 0, "economy": {"total_spent": 0}}, defaults)
+    document["coins"] -= 40
+    document["last_daily"] = 99
+    document["economy"]["total_spent"] += 40
+    document["warnings"] = ["spam"]
+    changes = offline_changes(document)
+    assert changes["users"] == {"$inc": {"coins": -40, "economy.total_spent": 40}, "$set": {"last_daily": 99}}, changes
+    assert changes["user_moderation"] == {"$push": {"warnings": {"$each": ["spam"]}}}
+    print("✅ Offline edits become $inc/$push deltas")
+
+
+if __name__ == "__main__":
+    print("🔧 MongoDB Failover Verification Test")
+    print("=" * 50)
+    test_circuit_breaker_states()
+    test_buffer_survives_restart_and_replays_in_order()
+    test_outage_is_loss_free()
+    test_outage_helpers_never_write_defaults()
+    test_buffer_drains_without_topology_event()
+    test_rejected_write_is_dead_lettered()
+    test_offline_changes_are_deltas()
+    print("\n🎉 ALL FAILOVER TESTS PASSED!")
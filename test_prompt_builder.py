@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script to verify AI prompts stay within their token budget and carry a rolling summary
+"""
+
+import sys
+import os
+import asyncio
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.conversation_memory import ConversationMemory, estimate_tokens
+from core.prompt_builder import PromptBuilder
+from gemini_ai import GeminiAI
+
+
+def turns(count: int, words: int = 30):
+    history = []
+    for i in range(count):
+        user_message = f"question {i} " + "word " * words
+        ai_response = f"answer {i} " + "reply " * words
+        history.append({"user_message": user_message, "ai_response": ai_response,
+                        "tokens": estimate_tokens(user_message) + estimate_tokens(ai_response)})
+    return history
+
+
+def test_prompt_fits_budget_newest_first():
+    builder = PromptBuilder(max_prompt_tokens=600)
+    prompt, tokens = builder.build("You are   a helpful\n bot.", turns(40), "latest question")
+
+    assert tokens <= 600, f"❌ Prompt is {tokens} tokens, over the 600 budget"
+    assert estimate_tokens(prompt) <= 600 * 1.1, "❌ Reported token count far below the rendered prompt"
+    assert "question 39" in prompt and "question 0 " not in prompt, "❌ Budget did not keep the newest turns"
+    kept = [i for i in range(40) if f"question {i} " in prompt]
+    assert kept == list(range(40 - len(kept), 40)), "❌ Kept turns are not a contiguous newest run"
+    assert prompt.startswith("System: You are a helpful bot.\n") and prompt.endswith("User: latest question\nAssistant:")
+    print(f"✅ {len(kept)} newest turns kept in order within a 600 token budget")
+
+
+def test_summary_is_included_and_budgeted():
+    builder = PromptBuilder(max_prompt_tokens=600)
+    history = turns(40)
+    plain, _ = builder.build("System.", history, "hi")
+    summary = "The user is called Sam and mines coal. " * 10
+    with_summary, tokens = builder.build("System.", history, "hi", summary)
+
+    assert tokens <= 600 and f"Earlier in this conversation: {summary}" in with_summary
+    assert with_summary.index("Earlier in this conversation") < with_summary.index("User: question")
+    assert with_summary.count("User: question") < plain.count("User: question"), "❌ Summary not charged to the budget"
+    print("✅ Rolling summary sits before the turns and counts against the budget")
+
+
+def test_overflow_is_folded_into_summary():
+    async def run():
+        ai = GeminiAI()
+        ai.memory = ConversationMemory(max_tokens=300, max_turns=50)
+        prompts = []
+
+        async def fake_generate(prompt):
+            prompts.append(prompt)
+            return {"success": True, "response": f"summary #{len(prompts)}"}
+
+        ai._generate_ai_response = fake_generate
+        overflowed = False
+        for turn in turns(10):
+            overflowed = await ai.memory.append(1, "sensei", turn["user_message"], turn["ai_response"])
+        assert overflowed, "❌ Trimmed turns were not reported for summarising"
+
+        await ai._summarise_overflow(1, "sensei")
+        await ai.memory.append(1, "sensei", "one more", "ok")
+        await ai._summarise_overflow(1, "sensei")
+        return ai, prompts
+
+    ai, prompts = asyncio.run(run())
+    assert len(prompts) == 1, "❌ Summarised again without new overflow"
+    assert "question 0 " in prompts[0] and "Existing summary" not in prompts[0]
+    assert ai.memory.get_summary(1, "sensei") == "summary #1"
+    history = asyncio.run(ai.memory.get_history(1, "sensei"))
+    assert sum(turn["tokens"] for turn in history) <= 300
+    prompt = ai._build_conversation_context(history, "hi", "System.", ai.memory.get_summary(1, "sensei"))
+    assert "Earlier in this conversation: summary #1" in prompt
+    print("✅ Turns trimmed from memory are folded into the summary used by the next prompt")
+
+
+if __name__ == "__main__":
+    print("🔧 Prompt Builder Verification Test")
+    print("=" * 50)
+    test_prompt_fits_budget_newest_first()
+    test_summary_is_included_and_budgeted()
+    test_overflow_is_folded_into_summary()
+    print("\n🎉 ALL PROMPT BUILDER TESTS PASSED!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script to verify daily savings interest is applied once per day and logged like other transactions
+
+The end-to-end check needs a real MongoDB: set TEST_MONGODB_URI to run it
+(a throwaway database is created and dropped).
+"""
+
+import sys
+import os
+import uuid
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import DatabaseManager as EnhancedDatabase
+from database import DatabaseManager
+
+
+class RecordingCollection:
+    """Records the update and aggregation pipelines instead of running them"""
+
+    def __init__(self):
+        self.calls = []
+
+    def update_many(self, query, pipeline):
+        self.calls.append(("update_many", query, pipeline))
+        return SimpleNamespace(modified_count=0)
+
+    def aggregate(self, pipeline):
+        self.calls.append(("aggregate", pipeline))
+        return iter([])
+
+
+def interest_manager(database, client):
+    repository = DatabaseManager()
+    repository.connected_to_mongodb, repository.mongodb_db = True, database
+    repository.users_collection = database["users"]
+    repository.mongodb_client = client
+    return EnhancedDatabase(repository)
+
+
+def test_interest_runs_server_side():
+    """Offline: interest is one guarded update pipeline plus an idempotent $merge into the ledger"""
+    database = defaultdict(RecordingCollection)
+    users = database["users"]
+    client = SimpleNamespace(options=SimpleNamespace(pool_options=SimpleNamespace(max_pool_size=25)))
+    manager = interest_manager(database, client)
+    result = asyncio.run(manager.apply_savings_interest(0.02, day="2026-01-05"))
+
+    (_, query, update), (_, pipeline) = users.calls
+    assert result["success"] and query["last_interest_day"] == {"$ne": "2026-01-05"}, f"❌ Not guarded per day: {query}"
+    assert isinstance(update, list), "❌ Interest must be computed in an update pipeline"
+    assert pipeline[-1]["$merge"]["whenMatched"] == "keepExisting", "❌ Ledger merge would overwrite existing rows"
+    timestamp = pipeline[1]["$project"]["timestamp"]["$literal"]
+    assert timestamp.tzinfo is not None and timestamp.utcoffset().total_seconds() == 0, "❌ Interest rows not in UTC"
+    print("✅ Interest is a guarded update pipeline merged idempotently into the ledger")
+
+
+def test_second_run_same_day_is_a_noop():
+    """Against MongoDB: repeat runs on the same day change nothing, ledger rows are UTC"""
+    uri = os.getenv("TEST_MONGODB_URI")
+    if not uri:
+        print("⏭️ TEST_MONGODB_URI not set, skipping end-to-end interest check")
+        return
+
+    from pymongo import MongoClient
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    name = f"coalbot_interest_test_{uuid.uuid4().hex[:8]}"
+    database = client[name]
+    try:
+        database.users.insert_many([
+            {"user_id": 1, "savings_balance": 1000},
+            {"user_id": 2, "savings_balance": 55},
+            {"user_id": 3, "savings_balance": 0},
+        ])
+        manager = interest_manager(database, client)
+
+        async def run():
+            first = await manager.apply_savings_interest(0.02, day="2026-01-05")
+            second = await manager.apply_savings_interest(0.02, day="2026-01-05")
+            third = await manager.apply_savings_interest(0.02, day="2026-01-06")
+            return first, second, third
+
+        before = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        first, second, third = asyncio.run(run())
+        assert first["users"] == 2 and second == {"success": True, "day": "2026-01-05", "users": 0}, f"❌ {second}"
+        assert third["users"] == 2
+        balances = [document["savings_balance"] for document in database.users.find({}, sort=[("user_id", 1)])]
+        assert balances == [1040, 57, 0], f"❌ Interest applied twice in a day: {balances}"
+
+        rows = list(database.transactions.find({}, sort=[("_id", 1)]))
+        assert [row["_id"] for row in rows] == ["savings_interest:2026-01-05:1", "savings_interest:2026-01-05:2",
+                                                "savings_interest:2026-01-06:1", "savings_interest:2026-01-06:2"]
+        assert rows[0]["amount"] == 20 and rows[0]["details"] == {"rate": 0.02, "day": "2026-01-05"}
+        assert all(row["timestamp"] >= before for row in rows), "❌ Interest rows not stored as UTC"
+        print("✅ A second interest run on the same day changes nothing")
+    finally:
+        client.drop_database(name)
+        client.close()
+
+
+if __name__ == "__main__":
+    print("🔧 Savings Interest Verification Test")
+    print("=" * 50)
+    test_interest_runs_server_side()
+    test_second_run_same_day_is_a_noop()
+    print("\n🎉 ALL SAVINGS INTEREST TESTS PASSED!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script to verify sharding configuration and the in-memory shared state store
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.sharding import ShardConfig, parse_shard_ids
+from core.shared_state import SharedStore, MemorySharedStore
+
+
+def test_shard_config():
+    """Shard ranges parse and explicit mode validates them"""
+    assert parse_shard_ids("0-3") == [0, 1, 2, 3]
+    assert parse_shard_ids("4, 6-7") == [4, 6, 7]
+
+    config = ShardConfig("explicit", 8, parse_shard_ids("0-3"))
+    assert config.is_sharded and config.is_multi_process
+    assert config.bot_kwargs() == {"shard_count": 8, "shard_ids": [0, 1, 2, 3]}
+    assert not ShardConfig("auto").is_multi_process and ShardConfig("auto").bot_kwargs() == {}
+
+    try:
+        ShardConfig("explicit", 2, [0, 2])
+        assert False, "❌ Out-of-range shard id accepted"
+    except ValueError:
+        pass
+    print("✅ Shard configuration parsed and validated")
+
+
+def test_rate_limit_window():
+    """A sliding window admits `limit` hits and reports when the next one is allowed"""
+    async def run():
+        store = MemorySharedStore()
+        results = [await store.hit("ratelimit:1:transfer", 3, 300) for _ in range(4)]
+        other_user = await store.hit("ratelimit:2:transfer", 3, 300)
+        return results, other_user
+
+    results, other_user = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, True, False], f"❌ Unexpected window {results}"
+    assert 299 < results[-1][1] <= 300, f"❌ Unexpected retry_after {results[-1][1]}"
+    assert other_user[0], "❌ Limit leaked across users"
+    print("✅ Rate limit window enforced per key")
+
+
+def test_cooldown_and_values_expire():
+    async def run():
+        store = MemorySharedStore()
+        first = await store.hit("cooldown:rps:1", 1, 0.05)
+        blocked = await store.hit("cooldown:rps:1", 1, 0.05)
+        await store.set("market:prices", {"TECH": 101.5}, ttl=0.05)
+        stored = await store.get("market:prices")
+        await asyncio.sleep(0.06)
+        return first, blocked, await store.hit("cooldown:rps:1", 1, 0.05), stored, await store.get("market:prices")
+
+    first, blocked, after, stored, expired = asyncio.run(run())
+    assert first[0] and not blocked[0] and after[0], "❌ Cooldown did not expire"
+    assert stored == {"TECH": 101.5} and expired is None, "❌ Value TTL not honoured"
+    print("✅ Cooldowns and values expire")
+
+
+def test_incomplete_store_fails_at_creation():
+    class CounterOnly(SharedStore):
+        async def hit(self, key, limit, window):
+            return True, 0.0
+
+    try:
+        CounterOnly()
+    except TypeError:
+        print("✅ A store missing get/set/delete cannot be created")
+        return
+    raise AssertionError("❌ Incomplete shared store was instantiated")
+
+
+if __name__ == "__main__":
+    print("🔧 Shared State Verification Test")
+    print("=" * 50)
+    test_shard_config()
+    test_rate_limit_window()
+    test_cooldown_and_values_expire()
+    test_incomplete_store_fails_at_creation()
+    print("\n🎉 ALL SHARED STATE TESTS PASSED!")
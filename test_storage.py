@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the local storage backends behave alike and SQLite persists
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.storage import LocalStorage, MemoryStorage, SQLiteStorage
+from database import DatabaseManager
+
+
+def managers(path):
+    """One DatabaseManager per local backend"""
+    for storage in (MemoryStorage(), SQLiteStorage(path)):
+        manager = DatabaseManager()
+        manager.storage = storage
+        yield manager
+
+
+def test_backends_agree():
+    with tempfile.TemporaryDirectory() as directory:
+        for manager in managers(os.path.join(directory, "agree.db")):
+            name = manager.storage.name
+            for user_id, xp in ((1, 10), (2, 30), (3, 20), (4, 0)):
+                manager.update_user_data(user_id, {"xp": xp})
+            manager.add_coins(2, 50)
+            manager.add_pet(3, {"name": "Rex"})
+            manager.update_guild_data(9, {"prefix": "?"})
+
+            rows = manager.get_paginated_leaderboard("xp", 1, 2)
+            assert rows["users"] == [{"user_id": 2, "xp": 30}, {"user_id": 3, "xp": 20}], f"❌ {name}: {rows}"
+            assert rows["total_users"] == 3
+            assert manager.get_ranks({"xp": 20})["xp"] == {"rank": 2, "total": 3}
+            assert manager.get_user_data(2)["coins"] == 1050 and manager.get_user_data(2)["economy"]["total_earned"] == 50
+            assert manager.get_user_pets(3) == [{"name": "Rex"}]
+            assert manager.move_coins(2, 300, "coins", "bank")["success"]
+            assert not manager.move_coins(2, 2000, "coins", "bank")["success"]
+            assert (manager.get_user_data(2)["coins"], manager.get_user_data(2)["bank"]) == (750, 300)
+            assert manager.get_guild_data(9)["prefix"] == "?"
+            assert manager.get_database_stats()["users"] == 4
+            manager.storage.close()
+            print(f"✅ {name} storage answers reads like MongoDB")
+
+
+def test_sqlite_survives_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "restart.db")
+        storage = SQLiteStorage(path)
+        storage.update_user(5, {"cookies": 7, "reminders": [{"remind_at": 1.5}]}, {"user_id": 5, "coins": 0})
+        storage.close()
+
+        storage = SQLiteStorage(path)
+        assert storage.get_user(5) == {"user_id": 5, "coins": 0, "cookies": 7, "reminders": [{"remind_at": 1.5}]}
+        assert storage.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal", "❌ SQLite not in WAL mode"
+        storage.close()
+        print("✅ SQLite storage persists across restarts in WAL mode")
+
+
+def test_sqlite_leaderboard_uses_index():
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "plan.db"))
+        plan = storage.explain_top("coins")
+        assert "users_coins_leaderboard" in plan and "TEMP B-TREE" not in plan, f"❌ Unexpected plan: {plan}"
+        storage.close()
+        print("✅ SQLite leaderboard reads walk the partial index")
+
+
+def test_sqlite_increments_are_atomic():
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "inc.db"))
+        defaults = {"user_id": 1, "coins": 0, "economy": {"total_earned": 0}}
+
+        def worker():
+            for _ in range(100):
+                storage.increment(1, {"coins": 1, "economy.total_earned": 2}, defaults)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        user = storage.get_user(1)
+        assert user["coins"] == 800 and user["economy"]["total_earned"] == 1600, f"❌ Lost increments: {user}"
+        storage.close()
+        print("✅ SQLite increments lose no updates under concurrency")
+
+
+def test_incomplete_backend_fails_at_creation():
+    class ReadOnly(LocalStorage):
+        def get_user(self, user_id):
+            return None
+
+    try:
+        ReadOnly()
+    except TypeError:
+        print("✅ A backend missing storage methods cannot be created")
+        return
+    raise AssertionError("❌ Incomplete storage backend was instantiated")
+
+
+if __name__ == "__main__":
+    print("🔧 Storage Backend Verification Test")
+    print("=" * 50)
+    test_backends_agree()
+    test_sqlite_survives_restart()
+    test_sqlite_leaderboard_uses_index()
+    test_sqlite_increments_are_atomic()
+    test_incomplete_backend_fails_at_creation()
+    print("\n🎉 ALL STORAGE TESTS PASSED!")
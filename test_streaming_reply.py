@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script to verify streamed AI replies are throttled, split across messages and survive errors
+"""
+
+import sys
+import os
+import asyncio
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from core.streaming import StreamingReply, EMBED_DESCRIPTION_LIMIT, TYPING_CURSOR
+
+
+class FakeMessage:
+    def __init__(self, log, embed, view=None):
+        self.log = log
+        self.embed = embed
+        self.view = view
+
+    async def edit(self, embed=None, view=None):
+        self.log.append(("edit", asyncio.get_running_loop().time()))
+        self.embed = embed
+        self.view = view or self.view
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+        self.log = []
+
+    async def send(self, embed=None, view=None, wait=False):
+        self.log.append(("send", asyncio.get_running_loop().time()))
+        message = FakeMessage(self.log, embed, view)
+        self.messages.append(message)
+        return message
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.followup = FakeFollowup()
+
+
+def build_embed(text):
+    return discord.Embed(description=text)
+
+
+async def stream(chunks, delay=0.0, fail_after=None):
+    for i, chunk in enumerate(chunks):
+        if fail_after is not None and i == fail_after:
+            raise ConnectionError("stream reset")
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+def test_edits_are_throttled():
+    async def run():
+        interaction = FakeInteraction()
+        reply = StreamingReply(interaction, build_embed, min_interval=0.1, min_chars=20)
+        view = discord.ui.View()
+        text = await reply.run(stream(["word " for _ in range(100)], delay=0.005), view=view)
+        return interaction.followup, reply, text, view
+
+    followup, reply, text, view = asyncio.run(run())
+    assert text == "word " * 100 and len(followup.messages) == 1
+    times = [t for kind, t in followup.log]
+    gaps = [b - a for a, b in zip(times[:-2], times[1:-1])]
+    assert all(gap >= 0.099 for gap in gaps), f"❌ Progress edits closer than the interval: {gaps}"
+    assert 2 <= reply.edits <= (times[-1] - times[0]) / 0.1 + 2, f"❌ {reply.edits} edits in {times[-1] - times[0]:.2f}s"
+    final = followup.messages[0]
+    assert final.embed.description == text and TYPING_CURSOR not in final.embed.description
+    assert final.view is view and reply.first_chunk_delay < 0.1
+    print(f"✅ 100 chunks shown with {reply.edits} throttled edits, view on the final edit")
+
+
+def test_long_reply_is_split():
+    async def run():
+        interaction = FakeInteraction()
+        reply = StreamingReply(interaction, build_embed, min_interval=0, min_chars=1)
+        view = discord.ui.View()
+        words = [f"w{i:04d} " for i in range(1800)]
+        chunks = ["".join(words[i:i + 90]) for i in range(0, len(words), 90)]
+        text = await reply.run(stream(chunks), view=view)
+        return interaction.followup, reply, text, view
+
+    followup, reply, text, view = asyncio.run(run())
+    pages = [message.embed.description for message in followup.messages]
+    assert len(pages) == reply.pages == 3, f"❌ Expected 3 pages, got {len(pages)}"
+    assert all(len(page) <= EMBED_DESCRIPTION_LIMIT for page in pages), "❌ Page over the embed limit"
+    assert " ".join(pages) == text, "❌ Text lost between pages"
+    assert all(page.split()[-1].startswith("w") and len(page.split()[-1]) == 5 for page in pages), "❌ Split mid-word"
+    assert followup.messages[-1].view is view and all(m.view is None for m in followup.messages[:-1])
+    print("✅ A 10k character reply continues across 3 followups split at word breaks")
+
+
+def test_stream_error_keeps_partial_reply():
+    async def run():
+        interaction = FakeInteraction()
+        reply = StreamingReply(interaction, build_embed)
+        text = await reply.run(stream(["Hello ", "there"], fail_after=1))
+        empty = StreamingReply(FakeInteraction(), build_embed)
+        nothing = await empty.run(stream(["x"], fail_after=0))
+        return interaction.followup, reply, text, empty, nothing
+
+    followup, reply, text, empty, nothing = asyncio.run(run())
+    assert text == "Hello " and isinstance(reply.error, ConnectionError)
+    assert followup.messages[0].embed.description == "Hello ", "❌ Partial reply left with a typing cursor"
+    assert nothing == "" and empty.pages == 0 and isinstance(empty.error, ConnectionError)
+    print("✅ An interrupted stream keeps the partial reply and records the error")
+
+
+if __name__ == "__main__":
+    print("🔧 Streaming Reply Verification Test")
+    print("=" * 50)
+    test_edits_are_throttled()
+    test_long_reply_is_split()
+    test_stream_error_keeps_partial_reply()
+    print("\n🎉 ALL STREAMING TESTS PASSED!")
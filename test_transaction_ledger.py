@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the transaction ledger buffers writes and flushes them in bulk
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bson import ObjectId
+from core.ledger import TransactionLedger, encode_cursor, decode_cursor
+
+
+class FakeCollection:
+    """Records insert_many/create_index calls like a Motor collection would receive them"""
+
+    def __init__(self):
+        self.documents = []
+        self.insert_calls = []
+        self.indexes = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.insert_calls.append((len(documents), ordered))
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        self.documents.extend(documents)
+        return type("InsertManyResult", (), {"inserted_ids": [d["_id"] for d in documents]})()
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(kwargs.get("name"))
+
+
+def test_interest_run_is_batched():
+    """50k recorded transactions become 50 unordered bulk inserts"""
+    async def run():
+        collection = FakeCollection()
+        ledger = TransactionLedger(collection, batch_size=1000)
+        for user_id in range(50000):
+            ledger.record(user_id, "savings_interest", 10, {"rate": 0.02})
+        written = await ledger.flush()
+        await ledger.close()
+        return collection, written
+
+    collection, written = asyncio.run(run())
+    assert written == 50000, f"❌ Expected 50000 written, got {written}"
+    assert len(collection.insert_calls) == 50, f"❌ Expected 50 inserts, got {len(collection.insert_calls)}"
+    assert all(ordered is False for _, ordered in collection.insert_calls), "❌ Inserts must be unordered"
+    assert collection.indexes == ["user_id_timestamp", "type_timestamp"], "❌ Ledger indexes not created"
+    print("✅ Interest transactions flushed in bulk with indexes")
+
+
+def test_cursor_round_trip():
+    """Pagination cursors encode and decode the sort position"""
+    transaction = {"_id": ObjectId(), "timestamp": datetime(2024, 1, 2, 3, 4, 5, 678000)}
+    timestamp, object_id = decode_cursor(encode_cursor(transaction))
+    assert timestamp == transaction["timestamp"]
+    assert object_id == transaction["_id"]
+    print("✅ Pagination cursor round trip works")
+
+
+if __name__ == "__main__":
+    print("🔧 Transaction Ledger Verification Test")
+    print("=" * 50)
+    test_interest_run_is_batched()
+    test_cursor_round_trip()
+    print("\n🎉 ALL LEDGER TESTS PASSED!")
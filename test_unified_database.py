@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the enhanced database adapter shares the root repository
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import DatabaseManager as EnhancedDatabase, AsyncCollection, initialize_database
+from database import DatabaseManager
+
+
+class ListCursor(list):
+    def sort(self, field, direction=1):
+        return ListCursor(sorted(self, key=lambda d: d[field], reverse=direction < 0))
+
+    def limit(self, count):
+        return ListCursor(self[:count])
+
+
+class FakeCollection:
+    """Documents keyed by user id, answering the handful of calls the repository makes"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def find(self, query=None, projection=None):
+        return ListCursor(self.documents.values())
+
+    def find_one(self, query, projection=None):
+        document = self.documents.get(query.get("_id", query.get("user_id")))
+        if document is None or projection is None:
+            return document
+        return {k: v for k, v in document.items() if projection.get(k)}
+
+    def update_one(self, query, update, upsert=False):
+        key = query.get("_id", query.get("user_id"))
+        self.documents.setdefault(key, {"user_id": key}).update(update.get("$set", {}))
+        return SimpleNamespace(acknowledged=True, matched_count=1)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def connected_repository() -> DatabaseManager:
+    repository = DatabaseManager()
+    database = FakeDatabase()
+    repository.connected_to_mongodb, repository.mongodb_db = True, database
+    repository.users_collection, repository.guilds_collection = database.users, database.guilds
+    repository.mongodb_client = SimpleNamespace(options=SimpleNamespace(pool_options=SimpleNamespace(max_pool_size=25)))
+    return repository
+
+
+def test_async_collection_wraps_sync_driver():
+    collection = FakeCollection()
+    for user_id, xp in ((1, 5), (2, 50), (3, 20)):
+        collection.documents[user_id] = {"user_id": user_id, "xp": xp}
+
+    async def run():
+        wrapped = AsyncCollection(collection)
+        rows = await wrapped.find({}).sort("xp", -1).limit(2).to_list(None)
+        return rows, await wrapped.find_one({"user_id": 3})
+
+    rows, user = asyncio.run(run())
+    assert [row["user_id"] for row in rows] == [2, 3] and user["xp"] == 20, f"❌ Unexpected rows {rows}"
+    print("✅ Motor-style calls run on the sync driver")
+
+
+def test_adapter_shares_repository_state():
+    repository = connected_repository()
+    adapter = EnhancedDatabase(repository)
+    assert repository.get_user_view(3, "balance")["bank"] == 0
+
+    assert asyncio.run(adapter.update_user_data_cached(3, {"coins": 5, "bank_balance": 40}))
+    repository.flush_writes()
+    stored = repository.mongodb_db.users.documents[3]
+    assert stored["bank"] == 40 and "bank_balance" not in stored, f"❌ Alias not mapped: {stored}"
+    assert repository.get_user_view(3, "balance")["bank"] == 40, "❌ Repository view went stale"
+    assert asyncio.run(adapter.get_user_data_cached(3))["coins"] == 5
+    assert adapter.get_cache_stats() == repository.get_view_cache_stats(), "❌ Adapter keeps its own cache"
+    assert adapter.connection_pool_size == 25
+    print("✅ Adapter reads and writes through the shared repository")
+
+
+def test_memory_mode_has_no_adapter():
+    assert initialize_database(DatabaseManager()) is None, "❌ Adapter created without MongoDB"
+    print("✅ Memory mode falls back to the repository directly")
+
+
+if __name__ == "__main__":
+    print("🔧 Unified Database Verification Test")
+    print("=" * 50)
+    test_async_collection_wraps_sync_driver()
+    test_adapter_shares_repository_state()
+    test_memory_mode_has_no_adapter()
+    print("\n🎉 ALL UNIFIED DATABASE TESTS PASSED!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the hot/cold user document split
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+import bson
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.user_schema import COLD_FIELDS, UserDocument, split_user_update, hot_defaults, move_cold_fields
+from database import DatabaseManager
+
+
+class FakeCollection:
+    """Just enough of a collection to record updates keyed by a single filter field"""
+
+    def __init__(self):
+        self.updates = []
+        self.documents = {}
+
+    def find_one(self, query, projection=None):
+        key = query.get("_id", query.get("user_id"))
+        document = self.documents.get(key)
+        if document is None or projection is None:
+            return document
+        return {k: v for k, v in document.items() if projection.get(k)}
+
+    def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        key = query.get("_id", query.get("user_id"))
+        document = self.documents.setdefault(key, {})
+        document.update(update.get("$set", {}))
+        for field, item in update.get("$push", {}).items():
+            document.setdefault(field, []).append(item)
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        return SimpleNamespace(acknowledged=True, matched_count=1)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def test_hot_document_is_small():
+    defaults = DatabaseManager()._create_default_user_data(123456789012345678)
+    size = len(bson.encode(hot_defaults(defaults)))
+    assert size < 1024, f"❌ Hot user document is {size} bytes"
+    assert not set(hot_defaults(defaults)) & set(COLD_FIELDS), "❌ Cold field left in hot document"
+    print(f"✅ Default hot user document is {size} bytes")
+
+
+def test_cold_fields_load_lazily():
+    loads = []
+
+    def loader(collection):
+        loads.append(collection)
+        return {"pets": [{"name": "Rex"}]} if collection == "user_pets" else {}
+
+    document = UserDocument({"user_id": 1, "coins": 5}, loader, {"warnings": [], "mutes": []})
+    assert document["coins"] == 5 and not loads, "❌ Hot read touched a feature collection"
+    assert document["pets"] == [{"name": "Rex"}] and loads == ["user_pets"]
+    assert document.get("warnings") == [] and "mutes" in document
+    assert loads == ["user_pets", "user_moderation"], f"❌ Feature documents loaded more than once: {loads}"
+    assert document.get("insurance", "none") == "none"
+    print("✅ Cold fields load once per feature on first access")
+
+
+def test_only_changed_cold_fields_are_written():
+    document = UserDocument({"user_id": 1, "coins": 5}, lambda c: {"pets": [], "portfolio": {"A": 1}}, {})
+    document["pets"].append({"name": "Rex"})
+    document.get("portfolio")
+    document["coins"] = 10
+    hot, cold = split_user_update(document)
+    assert hot == {"user_id": 1, "coins": 10}, f"❌ Unexpected hot update {hot}"
+    assert cold == {"user_pets": {"pets": [{"name": "Rex"}]}}, f"❌ Unexpected cold update {cold}"
+
+    hot, cold = split_user_update({"_id": "x", "xp": 3, "reminders": []})
+    assert hot == {"xp": 3} and cold == {"user_reminders": {"reminders": []}}
+    print("✅ Updates split into hot $set and changed cold fields")
+
+
+def test_legacy_fields_move_out():
+    database = FakeDatabase()
+    database.users.documents["oid"] = {"_id": "oid", "user_id": 9, "coins": 1, "pets": ["cat"], "stocks": {}}
+    moved = move_cold_fields(database, dict(database.users.documents["oid"]))
+    assert moved == 2
+    assert database.user_pets.documents[9] == {"pets": ["cat"]} and "stocks" in database.user_portfolio.documents[9]
+    assert database.users.documents["oid"] == {"_id": "oid", "user_id": 9, "coins": 1}, "❌ Legacy fields not unset"
+    print("✅ Legacy cold fields moved to feature collections")
+
+
+def test_legacy_ai_conversations_move_out():
+    database = FakeDatabase()
+    history = [{"user_message": "hi", "ai_response": "hello"}] * 50
+    database.users.documents["oid"] = {"_id": "oid", "user_id": 7, "coins": 1, "sensei_conversation": history,
+                                       "bleky_nephew_conversation": ["You: yo", "Bleky: sup"]}
+    assert move_cold_fields(database, dict(database.users.documents["oid"])) == 2
+    assert database.user_ai.documents[7] == {"sensei_conversation": history,
+                                             "bleky_nephew_conversation": ["You: yo", "Bleky: sup"]}
+    assert database.users.documents["oid"] == {"_id": "oid", "user_id": 7, "coins": 1}, "❌ AI history left in users"
+    print("✅ Legacy AI conversation histories moved out of the hot document")
+
+
+def test_manager_routes_writes():
+    database = FakeDatabase()
+    manager = DatabaseManager()
+    manager.connected_to_mongodb, manager.mongodb_db, manager.users_collection = True, database, database.users
+
+    manager.update_user_data(5, {"coins": 50, "warnings": ["spam"]})
+    manager.flush_writes()
+    assert database.users.documents[5] == {"coins": 50}, f"❌ Cold field written to users: {database.users.documents[5]}"
+    manager.add_pet(5, {"name": "Rex"})
+    manager.flush_writes()
+    assert manager.get_user_pets(5) == [{"name": "Rex"}] and manager.get_warnings(5) == ["spam"]
+    assert database.user_pets.updates[-1][1] == {"$push": {"pets": {"name": "Rex"}}}, "❌ Pet not appended with $push"
+
+    user = manager.get_user_data(5)
+    assert user["coins"] == 50 and user["pets"] == [{"name": "Rex"}]
+    print("✅ Manager writes hot fields to users and cold fields to feature collections")
+
+
+if __name__ == "__main__":
+    print("🔧 User Schema Split Verification Test")
+    print("=" * 50)
+    test_hot_document_is_small()
+    test_cold_fields_load_lazily()
+    test_only_changed_cold_fields_are_written()
+    test_legacy_fields_move_out()
+    test_legacy_ai_conversations_move_out()
+    test_manager_routes_writes()
+    print("\n🎉 ALL USER SCHEMA TESTS PASSED!")
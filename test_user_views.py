@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to verify projected user views only fetch the fields they need
+"""
+
+import sys
+import os
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager, USER_VIEWS
+
+
+class RecordingCollection:
+    """Answers find_one from one stored document and records the projections asked for"""
+
+    def __init__(self, document):
+        self.document = document
+        self.projections = []
+
+    def find_one(self, query, projection=None):
+        self.projections.append(projection)
+        return {key: value for key, value in self.document.items() if projection is None or projection.get(key)}
+
+
+def test_views_are_projected_and_cached():
+    manager = DatabaseManager()
+    collection = RecordingCollection({"user_id": 7, "coins": 250, "bank": 10, "last_work": 5,
+                                      "pets": [{"name": "Rex"}] * 50, "warnings": ["spam"] * 20})
+    manager.connected_to_mongodb, manager.users_collection = True, collection
+
+    balance = manager.get_user_view(7, "balance")
+    assert balance == {"user_id": 7, "coins": 250, "bank": 10, "last_work": 5}, f"❌ Unexpected view {balance}"
+    assert set(collection.projections[0]) == {"_id", "user_id", *USER_VIEWS["balance"]}, "❌ Projection not sent"
+
+    manager.get_user_view(7, "balance")
+    assert len(collection.projections) == 1, "❌ Second read was not served from the view cache"
+    cookies = manager.get_user_view(7, "cookies")
+    assert cookies["cookies"] == 0 and len(collection.projections) == 2, "❌ Views share a cache entry"
+    print("✅ Views fetch only their fields and are cached per view")
+
+
+def test_writes_invalidate_views():
+    manager = DatabaseManager()
+    manager.update_user_data(8, {"coins": 100})
+    assert manager.get_user_view(8, "balance")["coins"] == 100
+    manager.add_coins(8, 50)
+    assert manager.get_user_view(8, "balance")["coins"] == 150, "❌ Stale view after add_coins"
+    assert manager.get_live_user_stats(8)["coins"] == 150
+    print("✅ Writes invalidate cached views")
+
+
+def test_leaderboard_rows_are_slim():
+    manager = DatabaseManager()
+    for user_id, xp in ((1, 10), (2, 30), (3, 20)):
+        manager.update_user_data(user_id, {"xp": xp})
+    rows = manager.get_paginated_leaderboard("xp", 1, 2)["users"]
+    assert rows == [{"user_id": 2, "xp": 30}, {"user_id": 3, "xp": 20}], f"❌ Unexpected rows {rows}"
+    print("✅ Leaderboard rows carry only user_id and the ranked field")
+
+
+def test_exact_ranks_beyond_top_ten():
+    """Ranks are exact outside the top 10, tie-aware, and unranked at zero"""
+    manager = DatabaseManager()
+    for user_id in range(1, 26):
+        manager.update_user_data(user_id, {"coins": user_id * 100, "xp": 500})
+    ranks = manager.get_ranks({"coins": 600, "xp": 500, "cookies": 0})
+    assert ranks["coins"] == {"rank": 20, "total": 25}, f"❌ Unexpected coin rank {ranks['coins']}"
+    assert ranks["xp"]["rank"] == 1 and ranks["cookies"]["rank"] is None, f"❌ Unexpected ranks {ranks}"
+    print("✅ Exact ranks computed for users outside the top 10")
+
+
+def test_ranks_use_index_counts():
+    """Each rank is a range count the field's partial index can answer"""
+    class CountingCollection:
+        def __init__(self):
+            self.filters = []
+
+        def count_documents(self, query):
+            self.filters.append(query)
+            return 4
+
+    manager = DatabaseManager()
+    collection = CountingCollection()
+    manager.connected_to_mongodb, manager.users_collection = True, collection
+    ranks = manager.get_ranks({"xp": 10, "cookies": 0, "coins": 99})
+    assert {"coins": {"$gt": 99}} in collection.filters and {"xp": {"$gt": 0}} in collection.filters
+    assert len(collection.filters) == 5, f"❌ Unexpected queries {collection.filters}"
+    assert ranks["coins"] == {"rank": 5, "total": 4} and ranks["cookies"]["rank"] is None, f"❌ Unexpected ranks {ranks}"
+
+    collection.filters.clear()
+    assert manager.get_ranks({"xp": 12, "cookies": 3, "coins": 99})["cookies"] == {"rank": 5, "total": 4}
+    assert collection.filters == [{"xp": {"$gt": 12}}, {"cookies": {"$gt": 3}}, {"coins": {"$gt": 99}}], \
+        f"❌ Totals not cached: {collection.filters}"
+    print("✅ Ranks computed from index range counts with cached totals")
+
+
+if __name__ == "__main__":
+    print("🔧 User View Verification Test")
+    print("=" * 50)
+    test_views_are_projected_and_cached()
+    test_writes_invalidate_views()
+    test_leaderboard_rows_are_slim()
+    test_exact_ranks_beyond_top_ten()
+    test_ranks_use_index_counts()
+    print("\n🎉 ALL USER VIEW TESTS PASSED!")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-user write coalescing and read-your-writes
+"""
+
+import sys
+import os
+import asyncio
+import threading
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.write_coalescer import PendingUpdate, WriteCoalescer
+from database import DatabaseManager
+
+
+class CountingCollection:
+    """Applies $set/$inc/$push (dotted paths, $gte guards) and counts the update_one calls"""
+
+    def __init__(self):
+        self.documents = {}
+        self.updates = []
+
+    def find_one(self, query, projection=None):
+        document = self.documents.get(query.get("_id", query.get("user_id")))
+        if document is None or projection is None:
+            return document
+        return {k: v for k, v in document.items() if projection.get(k)}
+
+    def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        key = query.get("_id", query.get("user_id"))
+        document = self.documents.get(key)
+        minimum = query["coins"]["$gte"] if isinstance(query.get("coins"), dict) else None
+        if (document is None and not upsert) or (minimum is not None and (document or {}).get("coins", 0) < minimum):
+            return SimpleNamespace(acknowledged=True, matched_count=0)
+        document = self.documents.setdefault(key, {})
+        for operator in ("$set", "$inc", "$push"):
+            for path, value in update.get(operator, {}).items():
+                *parents, leaf = path.split(".")
+                target = document
+                for name in parents:
+                    target = target.setdefault(name, {})
+                if operator == "$set":
+                    target[leaf] = value
+                elif operator == "$inc":
+                    target[leaf] = target.get(leaf, 0) + value
+                else:
+                    items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    target.setdefault(leaf, []).extend(items)
+        return SimpleNamespace(acknowledged=True, matched_count=1)
+
+
+class CountingDatabase(dict):
+    def __missing__(self, name):
+        self[name] = CountingCollection()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def connected_manager(window: float = 60) -> DatabaseManager:
+    """A manager on fake collections whose coalescer only flushes when asked (long window)"""
+    manager = DatabaseManager()
+    database = CountingDatabase()
+    manager.connected_to_mongodb, manager.mongodb_db = True, database
+    manager.users_collection, manager.guilds_collection = database.users, database.guilds
+    manager.coalescer = WriteCoalescer(manager._write_now, window)
+    return manager
+
+
+def test_merge_rules():
+    pending = PendingUpdate(upsert=True)
+    assert pending.merge({"$inc": {"coins": 5}}) and pending.merge({"$inc": {"coins": 7, "xp": 1}})
+    assert pending.merge({"$set": {"xp": 10}}) and pending.merge({"$inc": {"xp": 2}})
+    assert pending.merge({"$push": {"pets": "cat"}}) and pending.merge({"$push": {"pets": {"$each": ["dog"]}}})
+    assert pending.merge({"$set": {"economy": {"total_spent": 1}}}) and pending.merge({"$inc": {"economy.total_spent": 4}})
+    assert pending.to_update() == {"$set": {"xp": 12, "economy": {"total_spent": 5}}, "$inc": {"coins": 12},
+                                   "$push": {"pets": {"$each": ["cat", "dog"]}}}, pending.to_update()
+
+    assert not pending.merge({"$set": {"pets.0": "owl"}}), "❌ Overlapping $set and $push merged"
+    assert not pending.merge({"$pull": {"pets": "cat"}}), "❌ Unsupported operator merged"
+    assert pending.to_update()["$push"] == {"pets": {"$each": ["cat", "dog"]}}, "❌ Failed merge left changes behind"
+    assert pending.apply({"coins": 100, "pets": ["rat"]}) == {"coins": 112, "xp": 12, "economy": {"total_spent": 5},
+                                                              "pets": ["rat", "cat", "dog"]}
+    print("✅ $set/$inc/$push merge in arrival order and conflicts are refused")
+
+
+def test_purchase_flow_is_one_write():
+    manager = connected_manager()
+    users = manager.mongodb_db.users
+    users.documents[1] = {"user_id": 1, "coins": 1000, "xp": 0, "economy": {"total_spent": 0}}
+
+    # Economy.buy: save the document, debit the price, then reread the balance
+    user = manager.get_user_data(1)
+    user["xp"] += 10
+    manager.update_user_data(1, user)
+    assert manager.remove_coins(1, 300), "❌ Debit refused"
+    manager.add_coins(1, 50)
+    assert manager.get_user_data(1)["coins"] == 750, "❌ Read did not see queued writes"
+    assert manager.find_user(1, ("coins", "xp")) == {"user_id": 1, "coins": 750, "xp": 10}
+    assert not users.updates, "❌ Writes reached the database before the flush"
+
+    manager.flush_writes()
+    assert len(users.updates) == 1, f"❌ Expected one update_one, got {len(users.updates)}"
+    assert users.documents[1]["coins"] == 750 and users.documents[1]["economy"]["total_spent"] == 300
+    stats = manager.get_connection_stats()["coalescer"]
+    assert stats["writes_saved"] == 2 and stats["guards_resolved"] == 1, f"❌ Unexpected stats {stats}"
+    print("✅ Save, debit and credit for one user become one update_one")
+
+
+def test_guarded_debit_keeps_its_answer():
+    manager = connected_manager()
+    users = manager.mongodb_db.users
+    users.documents[2] = {"user_id": 2, "coins": 100}
+
+    manager.update_user_data(2, {"coins": 40})
+    assert not manager.remove_coins(2, 50), "❌ Debit beyond the queued balance accepted"
+    manager.flush_writes()
+    assert users.documents[2]["coins"] == 40
+
+    # A queued $inc cannot decide the guard, so it is written first and the server answers
+    manager.add_coins(2, 20)
+    assert manager.remove_coins(2, 60) and len(users.updates) == 3, "❌ Guarded write did not flush ahead"
+    assert users.documents[2]["coins"] == 0
+    print("✅ Guarded debits are decided locally or after flushing, never reordered")
+
+
+def test_concurrent_credits_are_not_lost():
+    manager = connected_manager(window=0.01)
+    users = manager.mongodb_db.users
+    users.documents[3] = {"user_id": 3, "coins": 0}
+
+    def credit():
+        for _ in range(200):
+            manager.add_coins(3, 1)
+
+    threads = [threading.Thread(target=credit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert manager.get_user_data(3)["coins"] == 1600, "❌ Read lost queued credits"
+    manager.flush_writes()
+    assert users.documents[3]["coins"] == 1600, f"❌ Credits lost: {users.documents[3]['coins']}"
+    assert len(users.updates) < 1600, "❌ Nothing was coalesced"
+    print(f"✅ 1600 concurrent credits landed in {len(users.updates)} writes")
+
+
+def test_failed_write_is_retried_not_lost():
+    written, handed_off, failures = [], [], [1]
+
+    def flaky_writer(collection, query, update, upsert):
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError("write conflict")
+        written.append(update)
+
+    coalescer = WriteCoalescer(flaky_writer, window=60, fallback=lambda *write: handed_off.append(write))
+    coalescer.submit("users", {"user_id": 1}, {"$inc": {"coins": 5}}, True)
+    assert coalescer.flush() == 0 and coalescer.get_stats()["pending"] == 1, "❌ Failed update was thrown away"
+    coalescer.submit("users", {"user_id": 1}, {"$inc": {"coins": 3}}, True)
+    assert coalescer.flush() == 1 and written == [{"$inc": {"coins": 8}}], f"❌ Retry lost the update: {written}"
+
+    failures[0] = 10
+    coalescer.submit("users", {"user_id": 2}, {"$set": {"xp": 7}}, True)
+    for _ in range(coalescer.max_retries):
+        coalescer.flush()
+    assert handed_off == [("users", {"user_id": 2}, {"$set": {"xp": 7}}, True)], f"❌ {handed_off}"
+    stats = coalescer.get_stats()
+    assert stats["pending"] == 0 and stats["handed_off"] == 1 and stats["dropped"] == 0, f"❌ {stats}"
+    print("✅ A failed coalesced write is retried, then handed to the write-ahead buffer")
+
+
+def test_atm_move_keeps_the_debit():
+    manager = connected_manager()
+    users = manager.mongodb_db.users
+    users.documents[4] = {"user_id": 4, "coins": 1000, "bank": 0}
+
+    # A save queued just before the deposit used to overwrite its debit with a stale balance
+    user = manager.get_user_data(4)
+    user["xp"] = 5
+    manager.update_user_data(4, user)
+    assert manager.move_coins(4, 300, "coins", "bank")["success"]
+    assert manager.move_coins(4, 800, "coins", "bank") == {"success": False, "message": "Insufficient funds"}
+    assert manager.move_coins(4, 100, "bank", "coins")["success"]
+    asyncio.run(manager.flush_writes_async())
+    stored = users.documents[4]
+    assert (stored["coins"], stored["bank"], stored["xp"]) == (800, 200, 5), f"❌ Deposit lost the debit: {stored}"
+    print("✅ ATM deposits and withdrawals move coins and bank in one guarded write")
+
+
+if __name__ == "__main__":
+    print("🔧 Write Coalescer Verification Test")
+    print("=" * 50)
+    test_merge_rules()
+    test_purchase_flow_is_one_write()
+    test_guarded_debit_keeps_its_answer()
+    test_concurrent_credits_are_not_lost()
+    test_failed_write_is_retried_not_lost()
+    test_atm_move_keeps_the_debit()
+    print("\n🎉 ALL WRITE COALESCER TESTS PASSED!")